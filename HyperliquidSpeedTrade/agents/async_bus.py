@@ -0,0 +1,286 @@
+"""
+非同期メッセージバス実装（asyncio）
+
+エージェントごとに上限付きの受信箱とタスクを持ち、publish は受信箱に積むだけで戻る。
+受信箱が満杯のときの扱いはトピック（または購読）ごとのポリシーで決める:
+
+- block: 捨てずに空き待ちに並べる。待つのは publish_async() で送る外部の送信元（市場データなど）だけで、
+  エージェントのタスクは止めない（リスク→実行→監査→リスクのような循環があってもデッドロックしない）。
+  背圧は送信元にかかり、パイプライン内の溜まり具合は metrics() の waiting で見る
+- drop_oldest: 最も古いメッセージを捨てて積む
+- conflate: キー（既定は payload["symbol"]）ごとに最新の1件だけを残す（ティック向け）
+drop_oldest / conflate が捨てるのは drop_oldest / conflate で積んだメッセージだけで、
+block のメッセージは捨てない（捨てられるものがなければ block と同じく空き待ちに並ぶ）。
+
+遅いログエージェントは drop_oldest で購読すれば、ティック→シグナルの経路を遅らせない。
+トピック・ポリシーともワイルドカードのパターンで指定できる（topics.py）。
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import inspect
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from .base import Agent, Message, Publisher
+from .topics import DispatchTable
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+CONFLATE = "conflate"
+OVERFLOW_POLICIES = (BLOCK, DROP_OLDEST, CONFLATE)
+
+
+def symbol_key(message: Message) -> Hashable:
+    # 型付きメッセージは属性から（payload辞書を作らない）
+    symbol = getattr(message, "symbol", None)
+    return symbol if symbol is not None else message.payload.get("symbol")
+
+
+@dataclass(frozen=True)
+class TopicPolicy:
+    overflow: str = BLOCK
+    conflate_key: Callable[[Message], Hashable] = symbol_key
+
+    def __post_init__(self) -> None:
+        if self.overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"未知のオーバーフローポリシー: {self.overflow}")
+
+
+DEFAULT_POLICY = TopicPolicy()
+
+
+# エージェントのタスクで on_message を実行中か（タスクからの送信は空き待ちで止めない）
+_in_agent_task: contextvars.ContextVar[bool] = contextvars.ContextVar("_in_agent_task", default=False)
+
+
+class _Inbox:
+    """エージェント1つ分の受信箱（イベントループのスレッドからのみ操作する）"""
+
+    def __init__(self, agent: Agent, capacity: int) -> None:
+        self.agent = agent
+        self.capacity = capacity
+        # 要素: ("m", Message)（block）、("d", Message)（drop_oldest）、
+        # ("c", (topic, key))（conflate。最新値は _latest に保持）
+        self._queue: Deque[Tuple[str, Any]] = deque()
+        self._latest: Dict[Tuple[str, Hashable], Message] = {}
+        # 満杯で空き待ちの要素（到着順）。捨てられる要素がないときは drop_oldest / conflate もここで待つ
+        self._waiting: Deque[Tuple[Tuple[str, Any], Optional[asyncio.Future]]] = deque()
+        self._has_items = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.busy = False
+        self.processed = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.max_depth = 0
+
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def put(self, message: Message, policy: TopicPolicy, want_future: bool) -> Optional[asyncio.Future]:
+        """積む。満杯で捨てられるものがなければ空き待ちに回す（want_futureなら受け入れ時に完了するFutureを返す）"""
+        if policy.overflow == CONFLATE:
+            slot = (message.topic, policy.conflate_key(message))
+            if slot in self._latest:
+                self._latest[slot] = message  # 未処理の古い値を上書き
+                self.conflated += 1
+                return None
+            self._latest[slot] = message
+            entry: Tuple[str, Any] = ("c", slot)
+        elif policy.overflow == DROP_OLDEST:
+            entry = ("d", message)
+        else:
+            entry = ("m", message)
+
+        if len(self._queue) < self.capacity and not self._waiting:
+            self._append(entry)
+            return None
+        if entry[0] != "m" and self._drop_oldest():
+            self._append(entry)
+            return None
+
+        future = asyncio.get_running_loop().create_future() if want_future and entry[0] == "m" else None
+        self._waiting.append((entry, future))
+        return future
+
+    def _append(self, entry: Tuple[str, Any]) -> None:
+        self._queue.append(entry)
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._has_items.set()
+
+    def _drop_oldest(self) -> bool:
+        """捨ててよい（drop_oldest / conflate の）最も古いメッセージを1件捨てる。blockのものは捨てない"""
+        for i, (kind, value) in enumerate(self._queue):
+            if kind == "m":
+                continue
+            del self._queue[i]
+            if kind == "c":
+                self._latest.pop(value, None)
+            self.dropped += 1
+            return True
+        return False
+
+    async def get(self) -> Message:
+        while not self._queue:
+            self._has_items.clear()
+            await self._has_items.wait()
+        kind, value = self._queue.popleft()
+        message = self._latest.pop(value) if kind == "c" else value
+        # 空いた分だけ空き待ちのメッセージを受け入れる
+        while self._waiting and len(self._queue) < self.capacity:
+            entry, future = self._waiting.popleft()
+            self._append(entry)
+            if future is not None and not future.done():
+                future.set_result(None)
+        return message
+
+
+class AsyncMessageBus(Publisher):
+    """エージェントごとの受信箱とタスクで配信する非同期バス
+
+    - publish(): 同期（Publisherプロトコル互換）。受信箱に積むだけで戻る
+    - publish_async(): blockポリシーで満杯なら受け入れまで待つ（エージェントのタスク内からは待たない）
+    - publish_threadsafe(): 別スレッド（WebSocketなど）からの配信
+    """
+
+    def __init__(self, default_capacity: int = 1024, policies: Optional[Dict[str, TopicPolicy]] = None) -> None:
+        """
+        Args:
+            policies: トピックのパターン -> ポリシー（複数一致する場合は先に登録したもの）
+        """
+        self.default_capacity = default_capacity
+        self._policy_patterns: Dict[str, TopicPolicy] = {}
+        self._policies: DispatchTable[TopicPolicy] = DispatchTable(key=lambda policy: 0)
+        # 同じエージェントに複数の購読が一致しても配信は1回
+        self._subscribers: DispatchTable[Tuple[_Inbox, Optional[TopicPolicy]]] = DispatchTable(
+            key=lambda subscription: id(subscription[0]))
+        # トピック -> ((受信箱, 適用するポリシー), ...)。購読・ポリシーの変更時に作り直す
+        self._routes: Dict[str, Tuple[Tuple[_Inbox, TopicPolicy], ...]] = {}
+        self._inboxes: Dict[int, _Inbox] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._started: bool = False
+        for pattern, policy in (policies or {}).items():
+            self.set_policy(pattern, policy)
+
+    def set_policy(self, pattern: str, policy: TopicPolicy) -> None:
+        old = self._policy_patterns.get(pattern)
+        if old is not None:
+            self._policies.remove(pattern, old)
+        self._policy_patterns[pattern] = policy
+        self._policies.add(pattern, policy)
+        self._routes = {}
+
+    def subscribe(self, topic: str, agent: Agent, policy: Optional[TopicPolicy] = None,
+                  capacity: Optional[int] = None) -> None:
+        """購読。policy はこの購読だけに適用（省略時はトピックのポリシー）"""
+        inbox = self._inboxes.get(id(agent))
+        if inbox is None:
+            inbox = self._inboxes[id(agent)] = _Inbox(agent, capacity or self.default_capacity)
+        elif capacity:
+            inbox.capacity = capacity
+        self._subscribers.add(topic, (inbox, policy))
+        self._routes = {}
+
+    def _routes_for(self, topic: str) -> Tuple[Tuple[_Inbox, TopicPolicy], ...]:
+        routes = self._routes.get(topic)
+        if routes is None:
+            topic_policy = self._policies.first(topic) or DEFAULT_POLICY
+            routes = self._routes[topic] = tuple(
+                (inbox, override or topic_policy) for inbox, override in self._subscribers.resolve(topic))
+        return routes
+
+    def publish(self, message: Message) -> None:
+        # 待たない（block で満杯なら空き待ちに並べるだけ）
+        for inbox, policy in self._routes_for(message.topic):
+            inbox.put(message, policy, False)
+
+    async def publish_async(self, message: Message) -> None:
+        if _in_agent_task.get():
+            # 循環する購読で互いの受け入れを待ち合わないよう、エージェントからは待たない
+            self.publish(message)
+            return
+        futures = []
+        for inbox, policy in self._routes_for(message.topic):
+            future = inbox.put(message, policy, True)
+            if future is not None:
+                futures.append(future)
+        if futures:
+            await asyncio.gather(*futures)
+
+    def publish_threadsafe(self, message: Message) -> None:
+        self.call_soon_threadsafe(self.publish, message)
+
+    def call_soon_threadsafe(self, callback: Callable[..., Any], *args: Any) -> None:
+        """別スレッドからバスのイベントループで callback を実行（まとめて publish するときなど）"""
+        if self._loop is None:
+            raise RuntimeError("バスが開始されていません")
+        self._loop.call_soon_threadsafe(callback, *args)
+
+    async def start(self, agents: List[Agent]) -> None:
+        if self._started:
+            return
+        self._started = True
+        self._loop = asyncio.get_running_loop()
+        for agent in agents:
+            agent.on_start(self)
+        for inbox in self._inboxes.values():
+            inbox.task = asyncio.create_task(self._run(inbox), name=f"agent-{getattr(inbox.agent, 'name', '?')}")
+
+    async def stop(self, agents: List[Agent], drain: bool = True, timeout: float = 5.0) -> None:
+        if not self._started:
+            return
+        if drain:
+            try:
+                await asyncio.wait_for(self.drain(), timeout)
+            except asyncio.TimeoutError:
+                print("[BUS] 未処理メッセージを残して停止します")
+        for inbox in self._inboxes.values():
+            if inbox.task:
+                inbox.task.cancel()
+        await asyncio.gather(*(i.task for i in self._inboxes.values() if i.task), return_exceptions=True)
+        for agent in agents:
+            agent.on_stop()
+        self._started = False
+
+    async def drain(self) -> None:
+        """全受信箱が空になるまで待つ"""
+        while any(i.depth() or i._waiting for i in self._inboxes.values()) or self._busy():
+            await asyncio.sleep(0.001)
+
+    def _busy(self) -> bool:
+        return any(i.busy for i in self._inboxes.values())
+
+    async def _run(self, inbox: _Inbox) -> None:
+        agent = inbox.agent
+        while True:
+            message = await inbox.get()
+            inbox.busy = True
+            token = _in_agent_task.set(True)
+            try:
+                result = agent.on_message(message, self)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                print(f"[BUS] {getattr(agent, 'name', agent)} でエラー ({message.topic}): {e}")
+            finally:
+                _in_agent_task.reset(token)
+            inbox.processed += 1
+            inbox.busy = False
+
+    def metrics(self) -> Dict[str, Dict[str, int]]:
+        """エージェントごとの受信箱の状態"""
+        return {
+            getattr(inbox.agent, "name", str(key)): {
+                "depth": inbox.depth(),
+                "waiting": len(inbox._waiting),
+                "capacity": inbox.capacity,
+                "max_depth": inbox.max_depth,
+                "processed": inbox.processed,
+                "dropped": inbox.dropped,
+                "conflated": inbox.conflated,
+            }
+            for key, inbox in self._inboxes.items()
+        }
+
@@ -1,48 +1,49 @@
 """
 監査/パフォーマンスログエージェント（デモ）
 
-execution.filled を受け取り、簡易PnLを推定して配信。
+execution.filled / execution.partial を受け取り、簡易PnLを推定して配信。
+直前の約定価格は通貨ごとに持つ（別の通貨の約定価格とは比べない）。累積PnLは全通貨の合計。
 """
 from __future__ import annotations
 
-from typing import Optional
+from typing import Dict
 
 from .base import Agent, Message, Publisher
+from .messages import Fill, PnL, as_typed
 
 
 class AuditAgent:
     name = "audit_logger"
 
     def __init__(self) -> None:
-        self.last_fill_price: Optional[float] = None
+        self.last_fill_price: Dict[str, float] = {}  # 通貨 -> 直前の約定価格
         self.cum_pnl: float = 0.0
 
     def on_start(self, bus: Publisher) -> None:
         return
 
     def on_message(self, message: Message, bus: Publisher) -> None:
-        if message.topic != "execution.filled":
+        if message.topic not in ("execution.filled", "execution.partial"):
             return
 
-        price = float(message.payload["price"])
-        side = message.payload["side"]
-        size = float(message.payload["size"])
+        fill = as_typed(message, Fill)
+        price = fill.price
+        side = fill.side
+        size = fill.size
 
         pnl = 0.0
-        if self.last_fill_price is not None:
+        last_price = self.last_fill_price.get(fill.symbol)
+        if last_price is not None:
             if side == "SELL":
-                pnl = (price - self.last_fill_price) * size
+                pnl = (price - last_price) * size
             else:
-                pnl = (self.last_fill_price - price) * size
+                pnl = (last_price - price) * size
 
-        self.last_fill_price = price
+        self.last_fill_price[fill.symbol] = price
         self.cum_pnl += pnl
 
         # ログ配信
-        bus.publish(Message(
-            topic="audit.pnL",
-            payload={"pnl": pnl, "cum_pnl": self.cum_pnl},
-        ))
+        bus.publish(PnL(pnl, self.cum_pnl))
 
     def on_stop(self) -> None:
         return
@@ -0,0 +1,286 @@
+"""
+イベント時刻のバックテストエンジン
+
+過去のティック（またはローソク足から展開したティック）を、実運用と同じエージェントに
+同期バスで順に流す。時刻は VirtualClock をティックの時刻に進めるだけで待たないため、
+CPUの速さで進む（1か月分の1秒ティックが数秒〜十数秒）。
+
+- 時刻で判断するエージェントには engine.clock を渡す（RiskAgent(clock=engine.clock)）
+- 乱数を使うエージェントには engine.rng を渡す（DryRunExecutionAgent(rng=engine.rng)）。
+  同じ seed・同じデータなら結果は毎回同じ
+- ティックは時刻順であること（前のティックより古いものは数えて捨てる）
+
+データ:
+- load_ticks(): ティックCSV（ヘッダ ts/time, price/px, 任意で symbol/coin）
+- load_candles(): ローソク足CSV（ts/time, open, high, low, close）または
+  candleSnapshot のJSON（[{"t", "T", "s", "o", "h", "l", "c"}, ...]）。1本を4ティックに展開
+- synthetic_ticks(): 乱数による価格の疑似データ（seed 指定で再現可能）
+時刻は秒またはミリ秒（1e11 より大きければミリ秒とみなす）。
+
+scalper_pipeline() は agents_demo.py と同じ 戦略 → リスク → 実行（ドライラン）→ 監査 の構成を登録する。
+"""
+from __future__ import annotations
+
+import csv
+import json
+import random
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .audit import AuditAgent
+from .base import Agent, Message, Publisher
+from .bus import MessageBus
+from .clock import VirtualClock
+from .execution import DryRunExecutionAgent
+from .messages import Fill, PnL, Tick, as_typed
+from .risk import RiskAgent
+from .strategy_scalper import ScalperAgent
+from .topics import market_tick_topic
+
+TickRow = Tuple[float, str, float]  # (時刻[秒], 通貨, 価格)
+
+# 結果として数えるトピック（ティックは数えない）
+RECORD_TOPICS = ("strategy.#", "risk.#", "execution.#", "audit.#")
+_MS_THRESHOLD = 1e11
+
+
+def _to_seconds(value: Any) -> float:
+    ts = float(value)
+    return ts / 1000.0 if ts > _MS_THRESHOLD else ts
+
+
+def _column(fieldnames: List[str], *names: str) -> Optional[str]:
+    lowered = {name.lower(): name for name in fieldnames}
+    for name in names:
+        if name in lowered:
+            return lowered[name]
+    return None
+
+
+def load_ticks(path: str, symbol: Optional[str] = None) -> Iterator[TickRow]:
+    """ティックCSVを読む（symbol 列があれば symbol の行だけ。なければすべて symbol とみなす）"""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        fields = reader.fieldnames or []
+        ts_col = _column(fields, "ts", "time", "timestamp")
+        px_col = _column(fields, "price", "px", "mid")
+        sym_col = _column(fields, "symbol", "coin")
+        if ts_col is None or px_col is None:
+            raise ValueError(f"{path}: ts（time）と price（px）の列が必要です")
+        if sym_col is None and symbol is None:
+            raise ValueError(f"{path}: symbol 列がないため通貨を指定してください")
+        for row in reader:
+            coin = row[sym_col] if sym_col else symbol
+            if symbol is not None and coin != symbol:
+                continue
+            yield _to_seconds(row[ts_col]), coin, float(row[px_col])
+
+
+def candle_ticks(ts: float, interval: float, symbol: str, open_: float, high: float,
+                 low: float, close: float) -> List[TickRow]:
+    """ローソク足1本を4ティックに展開（陽線は 始値→安値→高値→終値、陰線は 始値→高値→安値→終値）"""
+    step = interval / 4.0
+    middle = (low, high) if close >= open_ else (high, low)
+    prices = (open_,) + middle + (close,)
+    return [(ts + i * step, symbol, price) for i, price in enumerate(prices)]
+
+
+def load_candles(path: str, symbol: Optional[str] = None, interval: Optional[float] = None) -> Iterator[TickRow]:
+    """ローソク足（CSV / candleSnapshot のJSON）を読み、ティックに展開する
+
+    Args:
+        interval: 足の長さ（秒）。省略時は JSON の t/T、CSV は先頭2本の時刻差から求める
+    """
+    rows: List[Tuple[float, Optional[float], str, float, float, float, float]] = []
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        for candle in data:
+            coin = candle.get("s", symbol)
+            if symbol is not None and coin != symbol:
+                continue
+            start = _to_seconds(candle["t"])
+            length = _to_seconds(candle["T"]) - start if candle.get("T") else None
+            rows.append((start, length, coin, float(candle["o"]), float(candle["h"]),
+                         float(candle["l"]), float(candle["c"])))
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            fields = reader.fieldnames or []
+            cols = [_column(fields, *names) for names in (
+                ("ts", "time", "timestamp", "t"), ("open", "o"), ("high", "h"), ("low", "l"), ("close", "c"))]
+            if None in cols:
+                raise ValueError(f"{path}: ts, open, high, low, close の列が必要です")
+            sym_col = _column(fields, "symbol", "coin", "s")
+            if sym_col is None and symbol is None:
+                raise ValueError(f"{path}: symbol 列がないため通貨を指定してください")
+            ts_col, o_col, h_col, l_col, c_col = cols
+            for row in reader:
+                coin = row[sym_col] if sym_col else symbol
+                if symbol is not None and coin != symbol:
+                    continue
+                rows.append((_to_seconds(row[ts_col]), None, coin, float(row[o_col]), float(row[h_col]),
+                             float(row[l_col]), float(row[c_col])))
+
+    if interval is None:
+        if rows and rows[0][1]:
+            interval = rows[0][1]
+        elif len(rows) >= 2 and rows[1][0] > rows[0][0]:
+            interval = rows[1][0] - rows[0][0]
+        else:
+            interval = 60.0
+    for start, _, coin, o, h, l, c in rows:
+        yield from candle_ticks(start, interval, coin, o, h, l, c)
+
+
+def synthetic_ticks(symbol: str = "HYPE", n: int = 86400, interval: float = 1.0, start: float = 0.0,
+                    base_price: float = 1.0, volatility: float = 0.0005,
+                    seed: Optional[int] = None, chunk: int = 1 << 16) -> Iterator[TickRow]:
+    """対数正規のランダムウォーク（interval 秒ごとに1ティック、1ティックの標準偏差 volatility）"""
+    rng = np.random.default_rng(seed)
+    log_price = float(np.log(base_price))
+    done = 0
+    while done < n:
+        m = min(chunk, n - done)
+        paths = log_price + np.cumsum(rng.normal(0.0, volatility, m))
+        log_price = float(paths[-1])
+        times = start + (done + np.arange(m)) * interval
+        yield from zip(times.tolist(), [symbol] * m, np.exp(paths).tolist())
+        done += m
+
+
+class _Recorder:
+    """エンジンが結果を集めるための購読者"""
+    name = "backtest_recorder"
+
+    def __init__(self, clock: VirtualClock) -> None:
+        self.clock = clock
+        self.counts: Dict[str, int] = {}
+        self.fills: List[Tuple[float, Fill]] = []
+        self.cum_pnl = 0.0
+        self.peak_pnl = 0.0
+        self.max_drawdown = 0.0  # 累積PnLの高値からの最大下落幅
+
+    def on_start(self, bus: Publisher) -> None:
+        return
+
+    def on_message(self, message: Message, bus: Publisher) -> None:
+        topic = message.topic
+        self.counts[topic] = self.counts.get(topic, 0) + 1
+        if topic in ("execution.filled", "execution.partial"):
+            self.fills.append((self.clock.time(), as_typed(message, Fill)))
+        elif topic == PnL.TOPIC:
+            self.cum_pnl = as_typed(message, PnL).cum_pnl
+            if self.cum_pnl > self.peak_pnl:
+                self.peak_pnl = self.cum_pnl
+            elif self.peak_pnl - self.cum_pnl > self.max_drawdown:
+                self.max_drawdown = self.peak_pnl - self.cum_pnl
+
+    def on_stop(self) -> None:
+        return
+
+
+class BacktestEngine:
+    """エージェントを過去データで動かすエンジン（1つのエンジンで run() は1回）
+
+    使い方:
+        engine = BacktestEngine(seed=1)
+        engine.add(ScalperAgent("HYPE"), [market_tick_topic("HYPE")])
+        engine.add(RiskAgent(clock=engine.clock), ["strategy.signal", "audit.pnL"])
+        engine.add(DryRunExecutionAgent(rng=engine.rng), ["risk.approved"])
+        engine.add(AuditAgent(), ["execution.filled"])
+        result = engine.run(load_ticks("hype_ticks.csv", "HYPE"))
+    """
+
+    def __init__(self, seed: Optional[int] = None, start: float = 0.0) -> None:
+        self.seed = seed
+        self.clock = VirtualClock(start)
+        self.rng = random.Random(seed)
+        self.bus = MessageBus()
+        self.agents: List[Agent] = []
+        self._recorder = _Recorder(self.clock)
+        for pattern in RECORD_TOPICS:
+            self.bus.subscribe(pattern, self._recorder)
+        self._done = False
+
+    @property
+    def fills(self) -> List[Tuple[float, Fill]]:
+        """(仮想時刻, 約定) の一覧"""
+        return self._recorder.fills
+
+    def add(self, agent: Agent, topics: Iterable[str]) -> None:
+        """エージェントを登録（topics: 購読するトピックのパターン）"""
+        for pattern in topics:
+            self.bus.subscribe(pattern, agent)
+        if agent not in self.agents:
+            self.agents.append(agent)
+
+    def run(self, ticks: Iterable[TickRow], progress_every: int = 0) -> Dict[str, Any]:
+        """ティックを最後まで流して結果をまとめる
+
+        Args:
+            progress_every: この件数ごとに進捗を表示（0で表示しない）
+        """
+        if self._done:
+            raise RuntimeError("BacktestEngine.run() は1回だけ呼べます")
+        self._done = True
+        clock = self.clock
+        publish = self.bus.publish
+        topics: Dict[str, str] = {}
+        count = skipped = 0
+        first: Optional[float] = None
+
+        wall_start = time.perf_counter()
+        self.bus.start(self.agents)
+        try:
+            for ts, symbol, price in ticks:
+                if ts < clock.time():
+                    skipped += 1
+                    continue
+                clock.set(ts)
+                if first is None:
+                    first = ts
+                topic = topics.get(symbol)
+                if topic is None:
+                    topic = topics[symbol] = market_tick_topic(symbol)
+                publish(Tick(symbol, price, ts, ts, topic=topic))
+                count += 1
+                if progress_every and count % progress_every == 0:
+                    print(f"[BACKTEST] {count:,} ティック（仮想時刻 {ts - first:,.0f}秒）")
+        finally:
+            self.bus.stop(self.agents)
+        wall = time.perf_counter() - wall_start
+
+        simulated = clock.time() - first if first is not None else 0.0
+        return {
+            "seed": self.seed,
+            "ticks": count,
+            "skipped": skipped,
+            "start": first,
+            "end": clock.time() if first is not None else None,
+            "simulated_seconds": simulated,
+            "wall_seconds": wall,
+            "ticks_per_second": count / wall if wall > 0 else 0.0,
+            "speedup": simulated / wall if wall > 0 else 0.0,
+            "messages": dict(sorted(self._recorder.counts.items())),
+            "fills": len(self._recorder.fills),
+            "cum_pnl": self._recorder.cum_pnl,
+            "max_drawdown": self._recorder.max_drawdown,
+        }
+
+
+def scalper_pipeline(engine: BacktestEngine, symbol: str, short: int = 5, long: int = 20, size: float = 50.0,
+                     max_notional: float = 150.0, max_losses: int = 3,
+                     cooldown: float = 10.0) -> DryRunExecutionAgent:
+    """agents_demo.py と同じ構成をエンジンに登録し、実行エージェント（最終ポジションの確認用）を返す"""
+    strat = ScalperAgent(symbol=symbol, short=short, long=long, size=size)
+    risk = RiskAgent(max_notional_per_trade_usd=max_notional, max_consecutive_losses=max_losses,
+                     cooldown_seconds=cooldown, clock=engine.clock)
+    exec_agent = DryRunExecutionAgent(rng=engine.rng)
+    engine.add(strat, [market_tick_topic(symbol)])
+    engine.add(risk, ["strategy.signal", "audit.pnL"])
+    engine.add(exec_agent, ["risk.approved"])
+    engine.add(AuditAgent(), ["execution.filled"])
+    return exec_agent
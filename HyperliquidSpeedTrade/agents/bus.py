@@ -1,27 +1,42 @@
 """
 シンプルなメッセージバス実装（同期型）
+
+購読はワイルドカード付きの階層トピック（market.tick.*, execution.# など）。
+配信先はトピックごとに解決済みのタプルを使い回し、購読が変わったときだけ作り直す。
+配信は呼び出したスレッドで行う。別スレッド（WebSocket・注文ワーカーなど）からは call_threadsafe() で
+配信を直列化すること（エージェントが同時に2つのスレッドから呼ばれないようにする）。
 """
 from __future__ import annotations
 
-from collections import defaultdict
-from typing import Callable, Dict, List
+import threading
+from typing import Any, Callable, List
 
 from .base import Agent, Message, Publisher
+from .topics import DispatchTable
 
 
 class MessageBus(Publisher):
     def __init__(self) -> None:
-        self._subscribers: Dict[str, List[Agent]] = defaultdict(list)
+        self._subscribers: DispatchTable[Agent] = DispatchTable()
         self._started: bool = False
+        self._lock = threading.RLock()
 
     def subscribe(self, topic: str, agent: Agent) -> None:
-        self._subscribers[topic].append(agent)
+        self._subscribers.add(topic, agent)
+
+    def unsubscribe(self, topic: str, agent: Agent) -> bool:
+        return self._subscribers.remove(topic, agent)
 
     def publish(self, message: Message) -> None:
-        # 対象トピックの購読者に配信
-        for agent in list(self._subscribers.get(message.topic, [])):
+        # 対象トピックの購読者に配信（タプルは不変なので配信中に購読が変わってもコピー不要）
+        for agent in self._subscribers.resolve(message.topic):
             agent.on_message(message, self)
 
+    def call_threadsafe(self, callback: Callable[..., Any], *args: Any) -> Any:
+        """別スレッドから callback を実行（他の call_threadsafe と排他。中からの publish はそのまま配信）"""
+        with self._lock:
+            return callback(*args)
+
     def start(self, agents: List[Agent]) -> None:
         if self._started:
             return
@@ -0,0 +1,50 @@
+"""
+時計（エージェントが読む「現在時刻」）
+
+時刻で判断するエージェント（RiskAgent のクールダウンなど）は time.time() を直接呼ばず、
+コンストラクタで受け取った時計の time() を読む。
+- SystemClock: 実時間（既定）
+- VirtualClock: バックテスト用。イベントの時刻まで進めるだけで、待たない
+"""
+from __future__ import annotations
+
+import time
+from typing import Protocol
+
+
+class Clock(Protocol):
+    def time(self) -> float:  # pragma: no cover
+        ...
+
+
+class SystemClock:
+    """実時間（time.time()）"""
+
+    def time(self) -> float:
+        return time.time()
+
+
+SYSTEM_CLOCK = SystemClock()
+
+
+class VirtualClock:
+    """仮想時計（UNIX秒。巻き戻しはできない）"""
+
+    def __init__(self, start: float = 0.0) -> None:
+        self._now = float(start)
+
+    def time(self) -> float:
+        return self._now
+
+    def set(self, ts: float) -> None:
+        """時刻を ts に進める（現在より前なら ValueError）"""
+        if ts < self._now:
+            raise ValueError(f"時刻は巻き戻せません: {ts} < {self._now}")
+        self._now = float(ts)
+
+    def advance(self, seconds: float) -> float:
+        """seconds 秒進めて、新しい時刻を返す"""
+        if seconds < 0:
+            raise ValueError("seconds は0以上")
+        self._now += seconds
+        return self._now
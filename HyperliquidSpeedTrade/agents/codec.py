@@ -0,0 +1,128 @@
+"""
+メッセージのバイナリ符号化（プロセス間の受け渡し用）
+
+型付きメッセージ（messages.py）は固定レイアウトで符号化する:
+  ヘッダ <BB（型タグ, フラグ） + 数値フィールド <Nd + 文字列（<H 長さ + UTF-8）の並び
+文字列は topic・（あれば）correlation_id・文字列フィールドの順。値が None の数値フィールドは NaN で表す。
+型タグ0は従来の Message(topic, payload) と未登録の型（Mids など）で、msgpack で符号化する。
+（受信側には Message として届くため、as_typed() で読むこと）
+"""
+from __future__ import annotations
+
+import math
+import struct
+from typing import Dict, List, Optional, Tuple, Type
+
+import msgpack
+
+from .base import Message
+from .messages import AnyMessage, Approval, Book, Fill, PnL, Signal, Tick, Trade, TypedMessage
+
+TAG_MESSAGE = 0
+_HEADER = struct.Struct("<BB")
+_STR_LEN = struct.Struct("<H")
+_FLAG_CORRELATION = 0x01
+_NAN = float("nan")
+
+
+class CodecError(Exception):
+    """復号できないバイト列"""
+
+
+class _Layout:
+    __slots__ = ("tag", "cls", "floats", "strings", "optional", "numbers")
+
+    def __init__(self, tag: int, cls: Type[TypedMessage]) -> None:
+        self.tag = tag
+        self.cls = cls
+        self.floats: Tuple[str, ...] = tuple(name for name in cls.FIELDS if name in cls.FLOAT_FIELDS)
+        self.strings: Tuple[str, ...] = tuple(name for name in cls.FIELDS if name not in cls.FLOAT_FIELDS)
+        self.optional = frozenset(cls.OPTIONAL_FIELDS)
+        self.numbers = struct.Struct(f"<{len(self.floats)}d")
+
+
+_by_class: Dict[type, _Layout] = {}
+_by_tag: Dict[int, _Layout] = {}
+
+
+def register(cls: Type[TypedMessage], tag: int) -> None:
+    """型付きメッセージを型タグに登録（送信側・受信側で同じタグにすること）"""
+    if not 0 < tag < 256:
+        raise ValueError(f"型タグは1〜255: {tag}")
+    existing = _by_tag.get(tag)
+    if existing is not None and existing.cls is not cls:
+        raise ValueError(f"型タグ {tag} は {existing.cls.__name__} で使用済み")
+    layout = _Layout(tag, cls)
+    _by_class[cls] = layout
+    _by_tag[tag] = layout
+
+
+for _tag, _cls in enumerate((Tick, Signal, Approval, Fill, PnL, Book, Trade), start=1):
+    register(_cls, _tag)
+
+
+def _pack_str(parts: List[bytes], value: str) -> None:
+    data = value.encode("utf-8")
+    if len(data) > 0xFFFF:
+        raise ValueError("文字列が長すぎます")
+    parts.append(_STR_LEN.pack(len(data)))
+    parts.append(data)
+
+
+def encode(message: AnyMessage) -> bytes:
+    layout = _by_class.get(type(message))
+    if layout is None:
+        return _HEADER.pack(TAG_MESSAGE, 0) + msgpack.packb(
+            [message.topic, message.payload, message.correlation_id], use_bin_type=True)
+
+    flags = _FLAG_CORRELATION if message.correlation_id is not None else 0
+    numbers = [getattr(message, name) for name in layout.floats]
+    if layout.optional:
+        numbers = [_NAN if value is None else value for value in numbers]
+    parts = [_HEADER.pack(layout.tag, flags), layout.numbers.pack(*numbers)]
+    _pack_str(parts, message.topic)
+    if flags:
+        _pack_str(parts, message.correlation_id)
+    for name in layout.strings:
+        _pack_str(parts, getattr(message, name))
+    return b"".join(parts)
+
+
+def _unpack_str(data: bytes, offset: int) -> Tuple[str, int]:
+    (length,) = _STR_LEN.unpack_from(data, offset)
+    offset += _STR_LEN.size
+    end = offset + length
+    if end > len(data):
+        raise CodecError("文字列が途中で切れています")
+    return data[offset:end].decode("utf-8"), end
+
+
+def decode(data: bytes) -> AnyMessage:
+    try:
+        tag, flags = _HEADER.unpack_from(data, 0)
+        if tag == TAG_MESSAGE:
+            topic, payload, correlation_id = msgpack.unpackb(data[_HEADER.size:], raw=False)
+            return Message(topic=topic, payload=payload, correlation_id=correlation_id)
+
+        layout = _by_tag.get(tag)
+        if layout is None:
+            raise CodecError(f"未知の型タグ: {tag}")
+        message = layout.cls.__new__(layout.cls)
+        offset = _HEADER.size
+        numbers = layout.numbers.unpack_from(data, offset)
+        offset += layout.numbers.size
+        for name, value in zip(layout.floats, numbers):
+            if name in layout.optional and math.isnan(value):
+                value = None
+            setattr(message, name, value)
+        message.topic, offset = _unpack_str(data, offset)
+        correlation_id: Optional[str] = None
+        if flags & _FLAG_CORRELATION:
+            correlation_id, offset = _unpack_str(data, offset)
+        message.correlation_id = correlation_id
+        for name in layout.strings:
+            value, offset = _unpack_str(data, offset)
+            setattr(message, name, value)
+        return message
+    except (struct.error, UnicodeDecodeError, ValueError, msgpack.UnpackException) as e:
+        raise CodecError(f"メッセージを復号できません: {e}") from e
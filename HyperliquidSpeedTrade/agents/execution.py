@@ -2,21 +2,43 @@
 実行エージェント（ドライラン）
 
 risk.approved を受け取り、実行ログを発行するだけ（約定シミュレーション）。
+スリッページの乱数は rng（random.Random）を渡すと再現できる（バックテスト用）。
 """
 from __future__ import annotations
 
 import random
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 from .base import Agent, Message, Publisher
+from .messages import Approval, Fill, as_typed
+
+
+def apply_fill(position: float, avg_price: Optional[float], delta: float,
+               price: float) -> Tuple[float, Optional[float]]:
+    """約定（delta: 買いは+、売りは-）を反映した (ポジション, 平均価格) を返す"""
+    new_pos = position + delta
+    if position == 0.0 or (position > 0) == (new_pos > 0):
+        # 同方向への追加：加重平均
+        if avg_price is None:
+            return new_pos, price
+        total_notional = abs(position) * avg_price + abs(delta) * price
+        total_size = abs(position) + abs(delta)
+        return new_pos, total_notional / max(total_size, 1e-9)
+    # 反対売買：部分決済
+    if abs(delta) >= abs(position):
+        # 反転またはフラット
+        return new_pos, (price if new_pos != 0 else None)
+    # 平均価格は変えない（残ポジションに対して）
+    return new_pos, avg_price
 
 
 class DryRunExecutionAgent:
     name = "execution_dryrun"
 
-    def __init__(self) -> None:
-        self.position: float = 0.0  # HYPEの口数（+ロング/-ショート）
-        self.avg_price: Optional[float] = None
+    def __init__(self, rng: Optional[random.Random] = None) -> None:
+        self.rng = rng or random.Random()
+        # 通貨 -> (口数（+ロング/-ショート）, 平均価格)。複数通貨を1つのエージェントで扱える
+        self._positions: Dict[str, Tuple[float, Optional[float]]] = {}
 
     def on_start(self, bus: Publisher) -> None:
         return
@@ -25,47 +47,25 @@ class DryRunExecutionAgent:
         if message.topic != "risk.approved":
             return
 
-        symbol = message.payload["symbol"]
-        side = message.payload["side"]  # BUY/SELL
-        size = float(message.payload["size"])
-        price = float(message.payload["price"])
+        approval = as_typed(message, Approval)
+        symbol = approval.symbol
+        side = approval.side  # BUY/SELL
+        size = approval.size
+        price = approval.price
 
-        slip_bp = random.uniform(-2.0, 2.0)  # ±2bp
+        slip_bp = self.rng.uniform(-2.0, 2.0)  # ±2bp
         exec_price = price * (1.0 + slip_bp / 10000.0)
 
         delta = size if side == "BUY" else -size
-        new_pos = self.position + delta
-
-        if self.position == 0.0 or (self.position > 0) == (new_pos > 0):
-            # 同方向への追加：加重平均
-            if self.avg_price is None:
-                self.avg_price = exec_price
-            else:
-                total_notional = abs(self.position) * self.avg_price + abs(delta) * exec_price
-                total_size = abs(self.position) + abs(delta)
-                self.avg_price = total_notional / max(total_size, 1e-9)
-            self.position = new_pos
-        else:
-            # 反対売買：部分決済
-            if abs(delta) >= abs(self.position):
-                # 反転またはフラット
-                self.position = new_pos
-                self.avg_price = exec_price if self.position != 0 else None
-            else:
-                self.position = new_pos
-                # 平均価格は変えない（残ポジションに対して）
-
-        bus.publish(Message(
-            topic="execution.filled",
-            payload={
-                "symbol": symbol,
-                "side": side,
-                "size": size,
-                "price": exec_price,
-                "position": self.position,
-                "avg_price": self.avg_price,
-            },
-        ))
+        position, avg_price = self._positions.get(symbol, (0.0, None))
+        position, avg_price = apply_fill(position, avg_price, delta, exec_price)
+        self._positions[symbol] = (position, avg_price)
+
+        bus.publish(Fill(symbol, side, size, exec_price, position, avg_price))
+
+    def position(self, symbol: str) -> Tuple[float, Optional[float]]:
+        """(ポジション, 平均価格)"""
+        return self._positions.get(symbol, (0.0, None))
 
     def on_stop(self) -> None:
         return
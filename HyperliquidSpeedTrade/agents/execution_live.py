@@ -0,0 +1,343 @@
+"""
+実行エージェント（取引所へ発注）
+
+risk.approved を受け取り、HyperliquidAPI で発注して結果を配信する。
+- 発注は注文ワーカー（OrderDispatcher）で行い、バスのスレッドは取引所の応答を待たない
+- 注文ごとにクライアント注文ID（cloid）を振り、配信するメッセージの correlation_id にする
+- 約定は注文応答と userFills ストリームの両方から受け取り、注文ごとに多い方の約定数量だけを配信する
+  （同じ約定を二重に配信しない。順序もどちらが先でもよい）
+
+配信するトピック:
+- execution.filled: 注文の残りがすべて約定した（Fill。size は今回増えた約定数量）
+- execution.partial: 一部が約定した（Fill。成行は残りが取引所でキャンセルされ、これで終わることもある）
+- execution.rejected: 発注できなかった（Message。payload の reason に理由）
+
+mode:
+- "live": 取引所に発注する。共有のレートリミッターの残り（送信中の注文を除く）が reserve_calls 以下なら
+  発注せずに拒否し、発注も優先度 NORMAL で送る（手動注文の HIGH のように上限をバイパスしない）
+- "dry_run": 取引所には送らず、承認価格で全量約定したものとして同じ経路で配信する
+
+結果は注文ワーカー / WebSocket のスレッドで受け取り、バスのスレッドで配信する:
+非同期バスは call_soon_threadsafe、同期バスは call_threadsafe で直列化する。
+どちらもないバス（ProcessRuntime など）では呼び出し側のループから flush() を呼ぶ。
+"""
+from __future__ import annotations
+
+import threading
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from order_dispatcher import OrderDispatcher, OrderJob
+
+from .base import Agent, Message, Publisher
+from .execution import apply_fill
+from .messages import Approval, Fill, as_typed
+
+MODES = ("dry_run", "live")
+ORDER_TYPES = ("market", "limit")
+FILLED_TOPIC = "execution.filled"
+PARTIAL_TOPIC = "execution.partial"
+REJECTED_TOPIC = "execution.rejected"
+_EPS = 1e-9
+
+
+def new_cloid() -> str:
+    """クライアント注文ID（"0x" + 32桁の16進数）"""
+    return "0x" + uuid.uuid4().hex
+
+
+class _Order:
+    """発注中の注文（ロック内でだけ読み書きする）"""
+    __slots__ = ("cloid", "symbol", "side", "size", "price", "oid", "acked", "acked_notional",
+                 "streamed", "stream_notional", "published", "published_notional", "tids")
+
+    def __init__(self, cloid: str, symbol: str, side: str, size: float, price: float) -> None:
+        self.cloid = cloid
+        self.symbol = symbol
+        self.side = side
+        self.size = size
+        self.price = price
+        self.oid: Any = None
+        self.acked = 0.0            # 注文応答の約定数量
+        self.acked_notional = 0.0
+        self.streamed = 0.0         # userFills の累計
+        self.stream_notional = 0.0
+        self.published = 0.0        # 配信済みの約定数量
+        self.published_notional = 0.0
+        self.tids: Set[Any] = set()
+
+
+class LiveExecutionAgent:
+    name = "execution_live"
+
+    def __init__(self, api: Any = None, mode: str = "dry_run", order_type: str = "market",
+                 reserve_calls: int = 2, workers: int = 2, queue_size: int = 8,
+                 dispatcher: Optional[OrderDispatcher] = None) -> None:
+        """
+        Args:
+            api: HyperliquidAPI（live では initialize() 済みであること）
+            mode: "dry_run" または "live"（Config.AGENT_EXECUTION_MODE）
+            order_type: "market"（スリッページ付きIOC）または "limit"（承認価格のGTC指値）
+            reserve_calls: 手動注文のために残すレートリミットの呼び出し数
+            workers / queue_size: 注文ワーカーの数とワーカーごとのキュー上限（dispatcher を渡した場合は無視）
+        """
+        if mode not in MODES:
+            raise ValueError(f"未知の実行モード: {mode}")
+        if order_type not in ORDER_TYPES:
+            raise ValueError(f"未知の注文種別: {order_type}")
+        if mode == "live" and api is None:
+            raise ValueError("live では api が必要です")
+        self.api = api
+        self.mode = mode
+        self.order_type = order_type
+        self.reserve_calls = reserve_calls
+        self._dispatcher = dispatcher or OrderDispatcher(workers, queue_size)
+        self._owns_dispatcher = dispatcher is None
+
+        self._lock = threading.Lock()
+        self._orders: Dict[str, _Order] = {}
+        self._by_oid: Dict[Any, _Order] = {}
+        self._in_flight = 0  # 応答待ちの注文数
+        self._positions: Dict[str, Tuple[float, Optional[float]]] = {}
+        self._outbox: Deque[Message] = deque()
+        self._bus: Optional[Publisher] = None
+        self._delivery = "manual"
+        self._flush_scheduled = False
+        self._running = False
+        self._priority = None
+        self._fills_subscription: Optional[Dict[str, str]] = None
+
+        self.submitted = 0
+        self.filled = 0
+        self.partial = 0
+        self.rejected = 0
+        self.last_ack_ms: Optional[float] = None
+
+    # --- ライフサイクル -------------------------------------------------
+
+    def on_start(self, bus: Publisher) -> None:
+        self._bus = bus
+        self._running = True
+        if hasattr(bus, "call_soon_threadsafe"):
+            self._delivery = "loop"
+        elif hasattr(bus, "call_threadsafe"):
+            self._delivery = "locked"
+        self._dispatcher.start()
+        if self.mode == "live":
+            from rate_limiter import RequestPriority
+            self._priority = RequestPriority.NORMAL
+            if getattr(self.api, "address", None):
+                self._fills_subscription = {"type": "userFills", "user": self.api.address}
+                self.api.subscribe_stream(self._fills_subscription, self._on_user_fills)
+            if not self.api.is_streaming():
+                print("[EXEC] 価格ストリーム未開始のため、約定は注文応答からのみ受け取ります")
+        print(f"[EXEC] 実行エージェントを開始（{self.mode} / {self.order_type} / 配信: {self._delivery}）")
+
+    def on_message(self, message: Message, bus: Publisher) -> None:
+        if message.topic != "risk.approved":
+            return
+        approval = as_typed(message, Approval)
+        order = _Order(new_cloid(), approval.symbol, approval.side, approval.size, approval.price)
+
+        if self.mode == "live" and self._budget_exhausted():
+            bus.publish(self._rejection(order, "rate_limit"))
+            return
+        with self._lock:
+            self._orders[order.cloid] = order
+            self._in_flight += 1
+        # 同じ通貨の注文は同じワーカーで順に送る
+        accepted = self._dispatcher.submit(order.symbol, lambda: self._send(order),
+                                           on_done=lambda job: self._on_ack(order, job))
+        if not accepted:
+            with self._lock:
+                self._orders.pop(order.cloid, None)
+                self._in_flight -= 1
+            bus.publish(self._rejection(order, "queue_full"))
+            return
+        self.submitted += 1
+
+    def on_stop(self) -> None:
+        self._running = False
+        if self._fills_subscription is not None:
+            # userFills の購読はポジションブックも使うため、ハンドラだけ外す
+            self.api.remove_stream_handler("userFills", self._on_user_fills)
+            self._fills_subscription = None
+        if self._owns_dispatcher:
+            self._dispatcher.stop()
+        with self._lock:
+            open_orders = len(self._orders)
+        if open_orders:
+            print(f"[EXEC] 未完了の注文が{open_orders}件あります（取引所側の注文はキャンセルしていません）")
+
+    # --- 発注（注文ワーカー） --------------------------------------------
+
+    def _budget_exhausted(self) -> bool:
+        limiter = getattr(self.api, "rate_limiter", None)
+        if limiter is None:
+            return False
+        with self._lock:
+            in_flight = self._in_flight
+        return limiter.get_remaining_calls() - in_flight <= self.reserve_calls
+
+    def _send(self, order: _Order) -> Dict:
+        if self.mode == "dry_run":
+            return {'success': True, 'filled_size': order.size, 'filled_price': order.price}
+        is_buy = order.side == "BUY"
+        if self.order_type == "limit":
+            return self.api.place_limit_order(order.symbol, is_buy, order.size, order.price,
+                                              cloid=order.cloid, priority=self._priority)
+        return self.api.place_market_order(order.symbol, is_buy, order.size,
+                                           cloid=order.cloid, priority=self._priority)
+
+    def _on_ack(self, order: _Order, job: OrderJob) -> None:
+        result = job.result if job.error is None else {'success': False, 'error': str(job.error)}
+        with self._lock:
+            self._in_flight -= 1
+            if job.t_ack is not None and job.t_submit is not None:
+                self.last_ack_ms = (job.t_ack - job.t_submit) * 1000.0
+            if order.cloid not in self._orders:
+                pass  # userFills で既に全量約定済み
+            elif not result or not result.get('success'):
+                self._finish(order)
+                error = (result or {}).get('error') or (result or {}).get('message') or "unknown"
+                self._outbox.append(self._rejection(order, str(error)))
+            else:
+                oid = result.get('order_id')
+                if oid is not None:
+                    order.oid = oid
+                    self._by_oid[oid] = order
+                filled_size = result.get('filled_size')
+                if filled_size is not None:
+                    filled_size = float(filled_size)
+                    filled_price = float(result.get('filled_price') or order.price)
+                    order.acked = filled_size
+                    order.acked_notional = filled_size * filled_price
+                    self._advance(order)
+                    if self.order_type == "market" and order.cloid in self._orders:
+                        self._finish(order)  # IOC: 残りは取引所でキャンセル済み
+        self._deliver()
+
+    # --- userFills（WebSocket スレッド） ---------------------------------
+
+    def _on_user_fills(self, data: Dict) -> None:
+        if not self._running or data.get('isSnapshot'):
+            return  # 接続時の過去約定は対象外
+        with self._lock:
+            for fill in data.get('fills', ()):
+                order = self._orders.get(fill.get('cloid')) or self._by_oid.get(fill.get('oid'))
+                if order is None:
+                    continue  # 手動注文・完了済みの注文
+                tid = fill.get('tid')
+                if tid is not None:
+                    if tid in order.tids:
+                        continue
+                    order.tids.add(tid)
+                try:
+                    size = float(fill['sz'])
+                    price = float(fill['px'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if order.oid is None and fill.get('oid') is not None:
+                    order.oid = fill['oid']
+                    self._by_oid[order.oid] = order
+                order.streamed += size
+                order.stream_notional += size * price
+                self._advance(order)
+        self._deliver()
+
+    # --- 約定の集計（ロック内） -------------------------------------------
+
+    def _advance(self, order: _Order) -> None:
+        """注文応答とストリームの多い方まで約定を進め、増えた分を配信待ちにする"""
+        if order.acked >= order.streamed:
+            total, notional = order.acked, order.acked_notional
+        else:
+            total, notional = order.streamed, order.stream_notional
+        increment = total - order.published
+        if increment <= _EPS:
+            return
+        price = (notional - order.published_notional) / increment
+        order.published = total
+        order.published_notional = notional
+
+        position, avg_price = self._positions.get(order.symbol, (0.0, None))
+        delta = increment if order.side == "BUY" else -increment
+        position, avg_price = apply_fill(position, avg_price, delta, price)
+        self._positions[order.symbol] = (position, avg_price)
+
+        complete = total >= order.size - _EPS
+        if complete:
+            self.filled += 1
+            self._finish(order)
+        else:
+            self.partial += 1
+        self._outbox.append(Fill(order.symbol, order.side, increment, price, position, avg_price,
+                                 topic=FILLED_TOPIC if complete else PARTIAL_TOPIC,
+                                 correlation_id=order.cloid))
+
+    def _finish(self, order: _Order) -> None:
+        self._orders.pop(order.cloid, None)
+        if order.oid is not None:
+            self._by_oid.pop(order.oid, None)
+
+    def _rejection(self, order: _Order, reason: str) -> Message:
+        self.rejected += 1
+        return Message(REJECTED_TOPIC, {
+            "symbol": order.symbol,
+            "side": order.side,
+            "size": order.size,
+            "price": order.price,
+            "reason": reason,
+        }, correlation_id=order.cloid)
+
+    # --- 配信側 --------------------------------------------------------
+
+    def _deliver(self) -> None:
+        """配信待ちをバスのスレッドへ渡す（ロックの外で呼ぶ。バスのロック → 自分のロックの順にするため）"""
+        if not self._running:
+            return
+        if self._delivery == "loop":
+            with self._lock:
+                if self._flush_scheduled or not self._outbox:
+                    return
+                self._flush_scheduled = True
+            try:
+                self._bus.call_soon_threadsafe(self.flush)
+            except RuntimeError:
+                with self._lock:
+                    self._flush_scheduled = False  # ループ停止中
+        elif self._delivery == "locked":
+            self._bus.call_threadsafe(self.flush)
+
+    def flush(self, bus: Optional[Publisher] = None) -> int:
+        """配信待ちのメッセージを配信（配信した件数を返す）"""
+        bus = bus or self._bus
+        with self._lock:
+            self._flush_scheduled = False
+            if not self._outbox:
+                return 0
+            messages: List[Message] = list(self._outbox)
+            self._outbox.clear()
+        for message in messages:
+            bus.publish(message)
+        return len(messages)
+
+    def position(self, symbol: str) -> Tuple[float, Optional[float]]:
+        """このエージェントの約定から見た (ポジション, 平均価格)"""
+        with self._lock:
+            return self._positions.get(symbol, (0.0, None))
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            open_orders = len(self._orders)
+            in_flight = self._in_flight
+        return {
+            "submitted": self.submitted,
+            "filled": self.filled,
+            "partial": self.partial,
+            "rejected": self.rejected,
+            "open": open_orders,
+            "in_flight": in_flight,
+            "last_ack_ms": self.last_ack_ms,
+        }
@@ -0,0 +1,425 @@
+"""
+インクリメンタル指標ライブラリ（戦略エージェント向け）
+
+どの指標も1回の update() が O(1)（ローリング最小・最大は償却 O(1)）で、
+ウィンドウを長くしてもティックごとのコストは増えない。
+
+共通API:
+- update(...): 新しい値を1つ取り込み、現在値を返す（ウォームアップ中は None）
+- value: 現在値（ウォームアップ中は None）
+- ready: 値が確定しているか
+- seed(history): 過去データからまとめて初期化（NumPy配列・リスト。可能なものはベクトル演算）
+- reset(): 初期状態に戻す
+"""
+from __future__ import annotations
+
+import math
+from collections import deque
+from typing import Deque, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 累積和の丸め誤差が溜まらないよう、この回数ごとにウィンドウから合計を取り直す（償却 O(1)）
+_RESYNC_UPDATES = 4096
+
+
+class Indicator:
+    """指標の基底クラス"""
+
+    def __init__(self) -> None:
+        self._value: Optional[float] = None
+
+    @property
+    def value(self):
+        return self._value
+
+    @property
+    def ready(self) -> bool:
+        return self._value is not None
+
+    def update(self, x: float):  # pragma: no cover
+        raise NotImplementedError
+
+    def seed(self, history: Sequence[float]):
+        """過去データで初期化（既定は1件ずつ update。ベクトル化できる指標は上書きする）"""
+        self.reset()
+        for x in np.asarray(history, dtype=float).ravel().tolist():
+            self.update(x)
+        return self.value
+
+    def reset(self) -> None:  # pragma: no cover
+        raise NotImplementedError
+
+
+def _tail(history: Sequence[float], window: int) -> np.ndarray:
+    return np.asarray(history, dtype=float).ravel()[-window:]
+
+
+class SMA(Indicator):
+    """単純移動平均（累積和）"""
+
+    def __init__(self, window: int) -> None:
+        if window <= 0:
+            raise ValueError("window は1以上")
+        super().__init__()
+        self.window = window
+        self.reset()
+
+    def reset(self) -> None:
+        self._values: Deque[float] = deque(maxlen=self.window)
+        self._sum = 0.0
+        self._updates = 0
+        self._value = None
+
+    def update(self, x: float) -> Optional[float]:
+        values = self._values
+        if len(values) == self.window:
+            self._sum -= values[0]
+        values.append(x)
+        self._sum += x
+        self._updates += 1
+        if self._updates >= _RESYNC_UPDATES:
+            self._sum = math.fsum(values)
+            self._updates = 0
+        if len(values) == self.window:
+            self._value = self._sum / self.window
+        return self._value
+
+    def seed(self, history: Sequence[float]) -> Optional[float]:
+        self.reset()
+        tail = _tail(history, self.window)
+        self._values.extend(tail.tolist())
+        self._sum = float(tail.sum())
+        if len(self._values) == self.window:
+            self._value = self._sum / self.window
+        return self._value
+
+
+class EMA(Indicator):
+    """指数移動平均（最初の period 件の単純平均から開始）"""
+
+    def __init__(self, period: int, alpha: Optional[float] = None) -> None:
+        """
+        Args:
+            alpha: 平滑化係数（省略時は 2 / (period + 1)）
+        """
+        if period <= 0:
+            raise ValueError("period は1以上")
+        super().__init__()
+        self.period = period
+        self.alpha = alpha if alpha is not None else 2.0 / (period + 1)
+        self.reset()
+
+    def reset(self) -> None:
+        self._count = 0
+        self._warmup_sum = 0.0
+        self._value = None
+
+    def update(self, x: float) -> Optional[float]:
+        if self._value is not None:
+            self._value += self.alpha * (x - self._value)
+            return self._value
+        self._count += 1
+        self._warmup_sum += x
+        if self._count == self.period:
+            self._value = self._warmup_sum / self.period
+        return self._value
+
+
+class RollingVariance(Indicator):
+    """ローリング分散（Welford法。値を入れ替えるときも平均と偏差平方和を差分で更新）"""
+
+    def __init__(self, window: int, ddof: int = 0) -> None:
+        """
+        Args:
+            ddof: 0で母分散、1で不偏分散
+        """
+        if window <= ddof:
+            raise ValueError("window は ddof より大きくすること")
+        super().__init__()
+        self.window = window
+        self.ddof = ddof
+        self.reset()
+
+    def reset(self) -> None:
+        self._values: Deque[float] = deque(maxlen=self.window)
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._updates = 0
+        self._value = None
+
+    def update(self, x: float) -> Optional[float]:
+        values = self._values
+        n = len(values)
+        if n < self.window:
+            n += 1
+            delta = x - self.mean
+            self.mean += delta / n
+            self._m2 += delta * (x - self.mean)
+        else:
+            old = values[0]
+            old_mean = self.mean
+            self.mean += (x - old) / n
+            self._m2 += (x - old) * (x - self.mean + old - old_mean)
+        values.append(x)
+        self._updates += 1
+        if self._updates >= _RESYNC_UPDATES:
+            self.mean = math.fsum(values) / n
+            self._m2 = math.fsum((v - self.mean) ** 2 for v in values)
+            self._updates = 0
+        if n == self.window:
+            self._value = max(self._m2, 0.0) / (n - self.ddof)
+        return self._value
+
+    @property
+    def std(self) -> Optional[float]:
+        return math.sqrt(self._value) if self._value is not None else None
+
+    def seed(self, history: Sequence[float]) -> Optional[float]:
+        self.reset()
+        tail = _tail(history, self.window)
+        self._values.extend(tail.tolist())
+        if len(tail):
+            self.mean = float(tail.mean())
+            self._m2 = float(((tail - self.mean) ** 2).sum())
+        if len(tail) == self.window:
+            self._value = self._m2 / (self.window - self.ddof)
+        return self._value
+
+
+class BollingerBands(NamedTuple):
+    middle: float
+    upper: float
+    lower: float
+
+
+class Bollinger(Indicator):
+    """ボリンジャーバンド（中心 ± k × 標準偏差）。値は BollingerBands"""
+
+    def __init__(self, window: int = 20, k: float = 2.0, ddof: int = 0) -> None:
+        super().__init__()
+        self.k = k
+        self._variance = RollingVariance(window, ddof)
+
+    @property
+    def window(self) -> int:
+        return self._variance.window
+
+    def reset(self) -> None:
+        self._variance.reset()
+        self._value = None
+
+    def _bands(self) -> Optional[BollingerBands]:
+        std = self._variance.std
+        if std is None:
+            return None
+        middle = self._variance.mean
+        self._value = BollingerBands(middle, middle + self.k * std, middle - self.k * std)
+        return self._value
+
+    def update(self, x: float) -> Optional[BollingerBands]:
+        self._variance.update(x)
+        return self._bands()
+
+    def seed(self, history: Sequence[float]) -> Optional[BollingerBands]:
+        self._value = None
+        self._variance.seed(history)
+        return self._bands()
+
+
+class RSI(Indicator):
+    """RSI（Wilderの平滑化。最初の period 件の変化の単純平均から開始）"""
+
+    def __init__(self, period: int = 14) -> None:
+        if period <= 0:
+            raise ValueError("period は1以上")
+        super().__init__()
+        self.period = period
+        self.reset()
+
+    def reset(self) -> None:
+        self._prev: Optional[float] = None
+        self._count = 0
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+        self._value = None
+
+    def update(self, x: float) -> Optional[float]:
+        prev, self._prev = self._prev, x
+        if prev is None:
+            return None
+        change = x - prev
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        if self._count < self.period:
+            self._count += 1
+            self._avg_gain += gain / self.period
+            self._avg_loss += loss / self.period
+            if self._count < self.period:
+                return None
+        else:
+            p = self.period
+            self._avg_gain = (self._avg_gain * (p - 1) + gain) / p
+            self._avg_loss = (self._avg_loss * (p - 1) + loss) / p
+        if self._avg_loss == 0.0:
+            self._value = 100.0 if self._avg_gain > 0 else 50.0
+        else:
+            self._value = 100.0 - 100.0 / (1.0 + self._avg_gain / self._avg_loss)
+        return self._value
+
+
+class ATR(Indicator):
+    """ATR（真の値幅のWilder平滑化）
+
+    update(high, low, close)。ティックだけなら update(price) で高値=安値=終値として扱う。
+    """
+
+    def __init__(self, period: int = 14) -> None:
+        if period <= 0:
+            raise ValueError("period は1以上")
+        super().__init__()
+        self.period = period
+        self.reset()
+
+    def reset(self) -> None:
+        self._prev_close: Optional[float] = None
+        self._count = 0
+        self._warmup_sum = 0.0
+        self._value = None
+
+    def update(self, high: float, low: Optional[float] = None, close: Optional[float] = None) -> Optional[float]:
+        if low is None:
+            low = high
+        if close is None:
+            close = high
+        prev_close, self._prev_close = self._prev_close, close
+        if prev_close is None:
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        if self._value is not None:
+            self._value = (self._value * (self.period - 1) + tr) / self.period
+            return self._value
+        self._count += 1
+        self._warmup_sum += tr
+        if self._count == self.period:
+            self._value = self._warmup_sum / self.period
+        return self._value
+
+    def seed(self, history) -> Optional[float]:
+        """history: 終値の1次元配列、または (高値, 安値, 終値) の列を持つ (n, 3) 配列"""
+        self.reset()
+        rows = np.asarray(history, dtype=float)
+        if rows.ndim == 1:
+            rows = np.repeat(rows[:, None], 3, axis=1)
+        for high, low, close in rows.tolist():
+            self.update(high, low, close)
+        return self._value
+
+
+class VWAP(Indicator):
+    """出来高加重平均価格
+
+    window=None でセッション累積（新しいセッションは reset()）、整数なら直近 window 件のローリング。
+    """
+
+    def __init__(self, window: Optional[int] = None) -> None:
+        if window is not None and window <= 0:
+            raise ValueError("window は1以上")
+        super().__init__()
+        self.window = window
+        self.reset()
+
+    def reset(self) -> None:
+        self._entries: Optional[Deque[Tuple[float, float]]] = deque() if self.window else None
+        self._pv = 0.0
+        self._volume = 0.0
+        self._updates = 0
+        self._value = None
+
+    def update(self, price: float, volume: float = 1.0) -> Optional[float]:
+        pv = price * volume
+        self._pv += pv
+        self._volume += volume
+        entries = self._entries
+        if entries is not None:
+            if len(entries) == self.window:
+                old_pv, old_volume = entries.popleft()
+                self._pv -= old_pv
+                self._volume -= old_volume
+            entries.append((pv, volume))
+            self._updates += 1
+            if self._updates >= _RESYNC_UPDATES:
+                self._pv = math.fsum(e[0] for e in entries)
+                self._volume = math.fsum(e[1] for e in entries)
+                self._updates = 0
+        if self._volume > 0:
+            self._value = self._pv / self._volume
+        return self._value
+
+    def seed(self, history) -> Optional[float]:
+        """history: 価格の1次元配列（出来高1）、または (価格, 出来高) の列を持つ (n, 2) 配列"""
+        self.reset()
+        rows = np.asarray(history, dtype=float)
+        if rows.ndim == 1:
+            rows = np.column_stack([rows, np.ones_like(rows)])
+        if self.window:
+            rows = rows[-self.window:]
+        pv = rows[:, 0] * rows[:, 1]
+        if self._entries is not None:
+            self._entries.extend(zip(pv.tolist(), rows[:, 1].tolist()))
+        self._pv = float(pv.sum())
+        self._volume = float(rows[:, 1].sum())
+        if self._volume > 0:
+            self._value = self._pv / self._volume
+        return self._value
+
+
+class _RollingExtreme(Indicator):
+    """単調デックによるローリング最小・最大（償却 O(1)）"""
+
+    _is_max = False
+
+    def __init__(self, window: int) -> None:
+        if window <= 0:
+            raise ValueError("window は1以上")
+        super().__init__()
+        self.window = window
+        self.reset()
+
+    def reset(self) -> None:
+        # (通し番号, 値)。値は先頭から単調（最大なら減少、最小なら増加）
+        self._deque: Deque[Tuple[int, float]] = deque()
+        self._index = 0
+        self._value = None
+
+    def update(self, x: float) -> Optional[float]:
+        d = self._deque
+        if self._is_max:
+            while d and d[-1][1] <= x:
+                d.pop()
+        else:
+            while d and d[-1][1] >= x:
+                d.pop()
+        d.append((self._index, x))
+        if d[0][0] <= self._index - self.window:
+            d.popleft()
+        self._index += 1
+        if self._index >= self.window:
+            self._value = d[0][1]
+        return self._value
+
+    def seed(self, history: Sequence[float]) -> Optional[float]:
+        # 結果に効くのは直近 window 件だけ
+        self.reset()
+        for x in _tail(history, self.window).tolist():
+            self.update(x)
+        return self._value
+
+
+class RollingMax(_RollingExtreme):
+    _is_max = True
+
+
+class RollingMin(_RollingExtreme):
+    _is_max = False
@@ -2,7 +2,7 @@
 市場データアダプタ（デモ用）
 
 HYPE の疑似ティックを生成して配信する。
-必要に応じて Hyperliquid の実データに差し替え可能。
+実データは market_data_hyperliquid.HyperliquidMarketDataAgent を使う。
 """
 from __future__ import annotations
 
@@ -12,6 +12,8 @@ import time
 from typing import Optional
 
 from .base import Agent, Message, Publisher
+from .messages import Tick
+from .topics import market_tick_topic
 
 
 class DemoMarketDataAgent:
@@ -19,6 +21,7 @@ class DemoMarketDataAgent:
 
     def __init__(self, symbol: str = "HYPE", base_price: float = 1.0, interval_ms: int = 250) -> None:
         self.symbol = symbol.upper()
+        self.topic = market_tick_topic(self.symbol)  # market.tick.<SYMBOL>
         self.base_price = base_price
         self.interval_ms = interval_ms
         self._running = False
@@ -51,14 +54,6 @@ class DemoMarketDataAgent:
         price = max(0.0001, (self.base_price * (1.0 + drift * self._t)) * (1.0 + 0.01 * math.sin(self._t)) )
         price *= (1.0 + random.uniform(-0.0025, 0.0025))
 
-        message = Message(
-            topic="market.tick",
-            payload={
-                "symbol": self.symbol,
-                "price": float(price),
-                "ts": now,
-            },
-        )
-        bus.publish(message)
+        bus.publish(Tick(self.symbol, float(price), now, topic=self.topic))
 
 
@@ -0,0 +1,290 @@
+"""
+市場データアダプタ（Hyperliquid 実データ）
+
+HyperliquidAPI の WebSocket ストリーム（allMids・l2Book・trades）を購読し、
+型付きメッセージとしてバスに配信する。tick() で呼び出す必要はない。
+
+- allMids  -> Tick（market.tick.<COIN>）。価格が変わった通貨だけ。publish_frames なら Mids（market.mids）も
+- l2Book   -> Book（market.book.<COIN>、最良気配）
+- trades   -> Trade（market.trade.<COIN>）
+
+WebSocket スレッドで受けた Tick / Book / Mids は通貨ごとに最新の1件だけを保留し（conflate）、
+バスのスレッドでまとめて配信する。Trade は間引かずに順に配信する。
+配信先のスレッドは dispatch で選ぶ:
+- "loop": 非同期バスのイベントループ（AsyncMessageBus.call_soon_threadsafe）
+- "thread": 専用の配信スレッド（同期バス。エージェントはこのスレッドで動き、
+  バスに call_threadsafe があれば他スレッドからの配信と直列化する）
+- "manual": 呼び出し側のループから flush(bus) を呼ぶ（ProcessRuntime のメインループなど）
+- "auto": 非同期バスなら loop、それ以外は thread
+
+再接続したときは REST で中値と板のスナップショットを取り直して配信し、
+trades は再購読時に届く直近の約定を tid で重複除去して、切断中の約定だけを配信する。
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from .base import Agent, Message, Publisher
+from .messages import Book, Mids, Tick, Trade
+from .topics import market_tick_topic
+
+CHANNELS = ("allMids", "l2Book", "trades")
+DISPATCH_MODES = ("auto", "loop", "thread", "manual")
+_TRADE_SIDES = {"B": "BUY", "A": "SELL"}
+_SEEN_TRADES_PER_COIN = 2048  # 重複除去に覚えておく tid の数
+
+
+class HyperliquidMarketDataAgent:
+    name = "market_data_hyperliquid"
+
+    def __init__(self, api: Any, symbols: Optional[Iterable[str]] = None,
+                 channels: Iterable[str] = CHANNELS, publish_frames: bool = False,
+                 dispatch: str = "auto", max_pending_trades: int = 10000) -> None:
+        """
+        Args:
+            api: HyperliquidAPI（REST での欠損復旧には initialize() 済みであること）
+            symbols: 対象の通貨（None で allMids の全通貨。l2Book / trades は指定した通貨のみ）
+            channels: 購読するチャネル（CHANNELS の部分集合）
+            publish_frames: allMids のフレームを Mids としても配信する（ベクトル化戦略向け）
+            max_pending_trades: 配信待ちの約定の上限（超えたら古いものから捨てる）
+        """
+        unknown = set(channels) - set(CHANNELS)
+        if unknown:
+            raise ValueError(f"未知のチャネル: {', '.join(sorted(unknown))}")
+        if dispatch not in DISPATCH_MODES:
+            raise ValueError(f"未知の配信方式: {dispatch}")
+        self.api = api
+        self.symbols: Optional[List[str]] = list(symbols) if symbols is not None else None
+        self.channels = tuple(channels)
+        self.publish_frames = publish_frames
+        self.dispatch = dispatch
+
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str], Message] = {}
+        self._pending_trades: Deque[Trade] = deque(maxlen=max_pending_trades)
+        self._last_price: Dict[str, float] = {}
+        self._tick_topics: Dict[str, str] = {}
+        self._seen_trades: Dict[str, "OrderedDict[Any, None]"] = {}
+        self._subscriptions: List[Dict[str, str]] = []
+        self._bus: Optional[Publisher] = None
+        self._mode = dispatch
+        self._flush_scheduled = False
+        self._wakeup = threading.Event()
+        self._dispatcher: Optional[threading.Thread] = None
+        self._running = False
+        self.last_recv_wall: Optional[float] = None
+
+        self.received = 0
+        self.published = 0
+        self.conflated = 0
+        self.trades_deduplicated = 0
+        self.gaps_recovered = 0
+
+    # --- ライフサイクル -------------------------------------------------
+
+    def on_start(self, bus: Publisher) -> None:
+        self._bus = bus
+        self._running = True
+        if self._mode == "auto":
+            self._mode = "loop" if hasattr(bus, "call_soon_threadsafe") else "thread"
+        if self._mode == "thread":
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name="md-dispatch", daemon=True)
+            self._dispatcher.start()
+
+        self.api.add_connection_listener(self._on_connected)
+        if "allMids" in self.channels:
+            self.api.add_mids_listener(self._on_mids)
+        for symbol in self.symbols or ():
+            if "l2Book" in self.channels:
+                self._subscribe({"type": "l2Book", "coin": symbol}, self._on_book)
+            if "trades" in self.channels:
+                self._subscribe({"type": "trades", "coin": symbol}, self._on_trades)
+        if not self.api.is_streaming():
+            self.api.start_price_stream(self.symbols or [], None)
+        print(f"[MD] Hyperliquid市場データを開始（{', '.join(self.channels)} / 配信: {self._mode}）")
+
+    def _subscribe(self, subscription: Dict[str, str], handler) -> None:
+        self.api.subscribe_stream(subscription, handler)
+        self._subscriptions.append(subscription)
+
+    def on_message(self, message: Message, bus: Publisher) -> None:
+        # 市場データは配信のみ
+        return
+
+    def on_stop(self) -> None:
+        self._running = False
+        self.api.remove_connection_listener(self._on_connected)
+        self.api.remove_mids_listener(self._on_mids)
+        for subscription in self._subscriptions:
+            self.api.unsubscribe_stream(subscription)
+        self._subscriptions.clear()
+        self._wakeup.set()
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout=2.0)
+            self._dispatcher = None
+
+    # --- WebSocket スレッド側 ------------------------------------------
+
+    def _stage(self, key: Tuple[str, str], message: Message) -> None:
+        with self._lock:
+            if key in self._pending:
+                self.conflated += 1  # 未配信の古い値を上書き
+            self._pending[key] = message
+            self._notify()
+
+    def _notify(self) -> None:
+        """保留分ができたことを配信側に知らせる（ロック内で呼ぶ）"""
+        if self._mode == "thread":
+            self._wakeup.set()
+        elif self._mode == "loop" and not self._flush_scheduled and self._running:
+            self._flush_scheduled = True
+            try:
+                self._bus.call_soon_threadsafe(self.flush)
+            except RuntimeError:
+                self._flush_scheduled = False  # ループ停止中
+
+    def _tick_topic(self, coin: str) -> str:
+        topic = self._tick_topics.get(coin)
+        if topic is None:
+            topic = self._tick_topics[coin] = market_tick_topic(coin)
+        return topic
+
+    def _on_mids(self, mids: Dict[str, str], t_recv: Optional[float] = None, force: bool = False) -> None:
+        now = time.time()
+        self.received += 1
+        self.last_recv_wall = now
+        if self.symbols is not None:
+            items = ((coin, mids.get(coin)) for coin in self.symbols)
+        else:
+            items = ((coin, mid) for coin, mid in mids.items() if not coin.startswith("@"))
+        for coin, mid in items:
+            if mid is None:
+                continue
+            try:
+                price = float(mid)
+            except (TypeError, ValueError):
+                continue
+            if not force and self._last_price.get(coin) == price:
+                continue  # 変化なし
+            self._last_price[coin] = price
+            self._stage(("tick", coin), Tick(coin, price, now, None, t_recv, topic=self._tick_topic(coin)))
+        if self.publish_frames:
+            self._stage(("mids", ""), Mids(dict(mids), now))
+
+    def _on_book(self, data: Dict) -> None:
+        t_recv = time.perf_counter()
+        now = time.time()
+        self.received += 1
+        self.last_recv_wall = now
+        coin = data.get("coin")
+        if not coin or (self.symbols is not None and coin not in self.symbols):
+            return  # 他のエージェントが購読した通貨
+        levels = data.get("levels") or [[], []]
+        bids = levels[0] if len(levels) > 0 else []
+        asks = levels[1] if len(levels) > 1 else []
+        try:
+            bid, bid_size = (float(bids[0]["px"]), float(bids[0]["sz"])) if bids else (None, None)
+            ask, ask_size = (float(asks[0]["px"]), float(asks[0]["sz"])) if asks else (None, None)
+        except (KeyError, TypeError, ValueError):
+            return
+        exchange_ts = data["time"] / 1000.0 if data.get("time") else None
+        self._stage(("book", coin), Book(coin, bid, ask, bid_size, ask_size, now, exchange_ts, t_recv))
+
+    def _on_trades(self, data: List[Dict]) -> None:
+        t_recv = time.perf_counter()
+        now = time.time()
+        self.received += 1
+        self.last_recv_wall = now
+        staged = False
+        with self._lock:
+            for trade in data or ():
+                coin = trade.get("coin")
+                if not coin or (self.symbols is not None and coin not in self.symbols):
+                    continue
+                # 再購読時には直近の約定がもう一度届くため tid（なければ時刻と価格）で重複を除く
+                key = trade.get("tid") or (trade.get("time"), trade.get("px"), trade.get("sz"))
+                seen = self._seen_trades.setdefault(coin, OrderedDict())
+                if key in seen:
+                    self.trades_deduplicated += 1
+                    continue
+                seen[key] = None
+                if len(seen) > _SEEN_TRADES_PER_COIN:
+                    seen.popitem(last=False)
+                try:
+                    message = Trade(coin, _TRADE_SIDES.get(trade.get("side"), trade.get("side", "")),
+                                    float(trade["px"]), float(trade["sz"]), now,
+                                    trade["time"] / 1000.0 if trade.get("time") else None, t_recv)
+                except (KeyError, TypeError, ValueError):
+                    continue
+                self._pending_trades.append(message)
+                staged = True
+            if staged:
+                self._notify()
+
+    def _on_connected(self, reconnected: bool) -> None:
+        if reconnected and self._running:
+            # REST はWebSocketのループを止めないよう別スレッドで
+            threading.Thread(target=self._recover_gap, name="md-recover", daemon=True).start()
+
+    def _recover_gap(self) -> None:
+        gap = time.time() - self.last_recv_wall if self.last_recv_wall else None
+        if getattr(self.api, "info", None) is None:
+            print("[MD] 再接続しました（REST未初期化のため欠損の取り直しは省略）")
+            return
+        if "allMids" in self.channels:
+            mids = self.api.get_all_mids()
+            if mids:
+                self._on_mids(mids, time.perf_counter(), force=True)
+        if "l2Book" in self.channels:
+            for coin in self.symbols or ():
+                snapshot = self.api.get_l2_snapshot(coin)
+                if snapshot:
+                    self._on_book(snapshot)
+        self.gaps_recovered += 1
+        gap_text = f"{gap:.1f}秒" if gap is not None else "不明"
+        print(f"[MD] 再接続: 欠損（最終受信から{gap_text}）をスナップショットで復旧しました")
+
+    # --- 配信側 --------------------------------------------------------
+
+    def flush(self, bus: Optional[Publisher] = None) -> int:
+        """保留中のメッセージを配信（配信した件数を返す）"""
+        bus = bus or self._bus
+        with self._lock:
+            self._flush_scheduled = False
+            if not self._pending and not self._pending_trades:
+                return 0
+            pending, self._pending = self._pending, {}
+            trades = list(self._pending_trades)
+            self._pending_trades.clear()
+        for message in trades:
+            bus.publish(message)
+        for message in pending.values():
+            bus.publish(message)
+        count = len(trades) + len(pending)
+        self.published += count
+        return count
+
+    def _dispatch_loop(self) -> None:
+        run = getattr(self._bus, "call_threadsafe", None)
+        while self._running:
+            self._wakeup.wait(0.5)
+            self._wakeup.clear()
+            try:
+                if run is not None:
+                    run(self.flush)
+                else:
+                    self.flush()
+            except Exception as e:
+                print(f"[MD] 配信でエラー: {e}")
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "received": self.received,
+            "published": self.published,
+            "conflated": self.conflated,
+            "trades_deduplicated": self.trades_deduplicated,
+            "gaps_recovered": self.gaps_recovered,
+        }
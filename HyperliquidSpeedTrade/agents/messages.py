@@ -0,0 +1,236 @@
+"""
+主要トピックの型付きメッセージ
+
+__slots__ のクラスで数値フィールドを解析済みの float として持ち、
+メッセージごとの payload 辞書の生成と、受信側での float() の再変換をなくす。
+
+互換性:
+- payload プロパティで従来の辞書形式を返す（ログ出力など）
+- 受信側は as_typed() で、型付きメッセージでも従来の Message(topic, payload) でも同じように扱える
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple, Type, TypeVar, Union
+
+from .base import Message
+from .topics import market_book_topic, market_tick_topic, market_trade_topic
+
+M = TypeVar("M", bound="TypedMessage")
+
+
+class TypedMessage:
+    __slots__ = ("topic", "correlation_id")
+
+    TOPIC: str = ""
+    FIELDS: Tuple[str, ...] = ()
+    FLOAT_FIELDS: Tuple[str, ...] = ()
+    OPTIONAL_FIELDS: Tuple[str, ...] = ()
+    # 従来の辞書にないときの既定値（呼び出し可能なら from_payload の時点で呼ぶ）。
+    # 受信側が使わない補助的なフィールドだけに付け、必須のフィールドがなければ従来どおりエラーにする
+    DEFAULTS: Dict[str, Any] = {}
+
+    @property
+    def payload(self) -> Dict[str, Any]:
+        """従来形式の辞書（呼ぶたびに生成するため、ホットパスでは使わない）"""
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    @classmethod
+    def from_payload(cls: Type[M], topic: str, payload: Dict[str, Any],
+                     correlation_id: Optional[str] = None) -> M:
+        """従来形式の辞書から生成（数値フィールドはここで一度だけ float に変換）"""
+        message = cls.__new__(cls)
+        message.topic = topic
+        message.correlation_id = correlation_id
+        for name in cls.FIELDS:
+            value = payload.get(name)
+            if value is None and name in cls.DEFAULTS:
+                default = cls.DEFAULTS[name]
+                value = default() if callable(default) else default
+            if name in cls.FLOAT_FIELDS and (value is not None or name not in cls.OPTIONAL_FIELDS):
+                value = float(value)
+            setattr(message, name, value)
+        return message
+
+    def to_message(self) -> Message:
+        """従来の Message に変換"""
+        return Message(topic=self.topic, payload=self.payload, correlation_id=self.correlation_id)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"{type(self).__name__}({self.topic}: {fields})"
+
+
+class Tick(TypedMessage):
+    """価格ティック
+
+    ts は受信（生成）時刻の time.time()。実データでは取引所の時刻（秒）を exchange_ts に、
+    ソケットで受信した時刻（time.perf_counter、遅延計測用）を recv_ts に入れる。
+    """
+
+    __slots__ = ("symbol", "price", "ts", "exchange_ts", "recv_ts")
+
+    FIELDS = ("symbol", "price", "ts", "exchange_ts", "recv_ts")
+    FLOAT_FIELDS = ("price", "ts", "exchange_ts", "recv_ts")
+    OPTIONAL_FIELDS = ("exchange_ts", "recv_ts")
+    DEFAULTS = {"ts": time.time}  # 時刻がない従来の辞書は受信時刻
+
+    def __init__(self, symbol: str, price: float, ts: float, exchange_ts: Optional[float] = None,
+                 recv_ts: Optional[float] = None, topic: Optional[str] = None,
+                 correlation_id: Optional[str] = None) -> None:
+        self.topic = topic or market_tick_topic(symbol)
+        self.correlation_id = correlation_id
+        self.symbol = symbol
+        self.price = price
+        self.ts = ts
+        self.exchange_ts = exchange_ts
+        self.recv_ts = recv_ts
+
+
+class Book(TypedMessage):
+    """板の最良気配（l2Book の先頭）"""
+
+    __slots__ = ("symbol", "bid", "ask", "bid_size", "ask_size", "ts", "exchange_ts", "recv_ts")
+
+    FIELDS = ("symbol", "bid", "ask", "bid_size", "ask_size", "ts", "exchange_ts", "recv_ts")
+    FLOAT_FIELDS = ("bid", "ask", "bid_size", "ask_size", "ts", "exchange_ts", "recv_ts")
+    OPTIONAL_FIELDS = ("bid", "ask", "bid_size", "ask_size", "exchange_ts", "recv_ts")  # 片側の板が空なら None
+    DEFAULTS = {"ts": time.time}
+
+    def __init__(self, symbol: str, bid: Optional[float], ask: Optional[float], bid_size: Optional[float],
+                 ask_size: Optional[float], ts: float, exchange_ts: Optional[float] = None,
+                 recv_ts: Optional[float] = None, topic: Optional[str] = None,
+                 correlation_id: Optional[str] = None) -> None:
+        self.topic = topic or market_book_topic(symbol)
+        self.correlation_id = correlation_id
+        self.symbol = symbol
+        self.bid = bid
+        self.ask = ask
+        self.bid_size = bid_size
+        self.ask_size = ask_size
+        self.ts = ts
+        self.exchange_ts = exchange_ts
+        self.recv_ts = recv_ts
+
+    @property
+    def mid(self) -> Optional[float]:
+        if self.bid is None or self.ask is None:
+            return None
+        return (self.bid + self.ask) / 2.0
+
+
+class Trade(TypedMessage):
+    """約定（trades）。side はテイカー側の BUY/SELL"""
+
+    __slots__ = ("symbol", "side", "price", "size", "ts", "exchange_ts", "recv_ts")
+
+    FIELDS = ("symbol", "side", "price", "size", "ts", "exchange_ts", "recv_ts")
+    FLOAT_FIELDS = ("price", "size", "ts", "exchange_ts", "recv_ts")
+    OPTIONAL_FIELDS = ("exchange_ts", "recv_ts")
+    DEFAULTS = {"ts": time.time}
+
+    def __init__(self, symbol: str, side: str, price: float, size: float, ts: float,
+                 exchange_ts: Optional[float] = None, recv_ts: Optional[float] = None,
+                 topic: Optional[str] = None, correlation_id: Optional[str] = None) -> None:
+        self.topic = topic or market_trade_topic(symbol)
+        self.correlation_id = correlation_id
+        self.symbol = symbol
+        self.side = side
+        self.price = price
+        self.size = size
+        self.ts = ts
+        self.exchange_ts = exchange_ts
+        self.recv_ts = recv_ts
+
+
+class Mids(TypedMessage):
+    """全通貨の仲値のフレーム（Hyperliquid の allMids。値は文字列のままでもよい）"""
+
+    __slots__ = ("mids", "ts")
+
+    TOPIC = "market.mids"
+    FIELDS = ("mids", "ts")
+    FLOAT_FIELDS = ("ts",)
+    DEFAULTS = {"ts": time.time}
+
+    def __init__(self, mids: Mapping[str, Any], ts: float, topic: Optional[str] = None,
+                 correlation_id: Optional[str] = None) -> None:
+        self.topic = topic or self.TOPIC
+        self.correlation_id = correlation_id
+        self.mids = mids
+        self.ts = ts
+
+
+class _Order(TypedMessage):
+    """売買方向・サイズ・価格を持つメッセージ（シグナルと承認）"""
+
+    __slots__ = ("symbol", "side", "size", "price")
+
+    FIELDS = ("symbol", "side", "size", "price")
+    FLOAT_FIELDS = ("size", "price")
+
+    def __init__(self, symbol: str, side: str, size: float, price: float, topic: Optional[str] = None,
+                 correlation_id: Optional[str] = None) -> None:
+        self.topic = topic or self.TOPIC
+        self.correlation_id = correlation_id
+        self.symbol = symbol
+        self.side = side
+        self.size = size
+        self.price = price
+
+
+class Signal(_Order):
+    __slots__ = ()
+    TOPIC = "strategy.signal"
+
+
+class Approval(_Order):
+    __slots__ = ()
+    TOPIC = "risk.approved"
+
+
+class Fill(TypedMessage):
+    __slots__ = ("symbol", "side", "size", "price", "position", "avg_price")
+
+    TOPIC = "execution.filled"
+    FIELDS = ("symbol", "side", "size", "price", "position", "avg_price")
+    FLOAT_FIELDS = ("size", "price", "position", "avg_price")
+    OPTIONAL_FIELDS = ("avg_price",)  # フラット時は None
+
+    def __init__(self, symbol: str, side: str, size: float, price: float, position: float,
+                 avg_price: Optional[float], topic: Optional[str] = None,
+                 correlation_id: Optional[str] = None) -> None:
+        self.topic = topic or self.TOPIC
+        self.correlation_id = correlation_id
+        self.symbol = symbol
+        self.side = side
+        self.size = size
+        self.price = price
+        self.position = position
+        self.avg_price = avg_price
+
+
+class PnL(TypedMessage):
+    __slots__ = ("pnl", "cum_pnl")
+
+    TOPIC = "audit.pnL"
+    FIELDS = ("pnl", "cum_pnl")
+    FLOAT_FIELDS = ("pnl", "cum_pnl")
+    DEFAULTS = {"pnl": 0.0, "cum_pnl": 0.0}  # 従来の RiskAgent は pnl がなければ 0.0 とみなしていた
+
+    def __init__(self, pnl: float, cum_pnl: float, topic: Optional[str] = None,
+                 correlation_id: Optional[str] = None) -> None:
+        self.topic = topic or self.TOPIC
+        self.correlation_id = correlation_id
+        self.pnl = pnl
+        self.cum_pnl = cum_pnl
+
+
+AnyMessage = Union[Message, TypedMessage]
+
+
+def as_typed(message: AnyMessage, cls: Type[M]) -> M:
+    """型付きメッセージならそのまま、従来の Message なら payload を解析して変換"""
+    if isinstance(message, cls):
+        return message
+    return cls.from_payload(message.topic, message.payload, message.correlation_id)
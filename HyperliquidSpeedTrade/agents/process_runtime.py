@@ -0,0 +1,343 @@
+"""
+マルチプロセスのエージェントランタイム
+
+エージェントごとに配置先のプロセス（"main" またはワーカー名）を指定し、
+CPU負荷の高い戦略などをワーカープロセスで動かす。エージェントのコードは配置先に関係なく同じで、
+bus.publish() したメッセージは購読しているプロセスに届く。
+
+- プロセス内の配信は同期バスと同じ（ワイルドカード購読・解決済みタプルのキャッシュ）
+- プロセス間は送信元→送信先の組ごとの共有メモリリング（shm_ring.py）で、
+  メッセージは codec.py のバイナリ形式。購読者のいるプロセスにだけ1回符号化して送る
+- 送信先のリングが満杯なら空くまで待つ（背圧）。待つ間も自分宛てのリングは読み進めて
+  溜めておくため、2プロセスが互いに満杯のリングを待ち合ってもデッドロックしない
+- 送信先のプロセスが終了していたら待たずに捨てる（dropped に数える。以後その宛先へは送らない）。
+  ワーカーの生死はメインプロセスが共有メモリのフラグに書き、ワーカーどうしはそれを読む
+
+ワーカーに置いたエージェントはワーカーへ複製されるため（spawn では pickle）、
+その状態はワーカー側にあり、メインプロセスの元のオブジェクトには反映されない。
+"""
+from __future__ import annotations
+
+import multiprocessing
+import os
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from .base import Agent, Message, Publisher
+from .codec import CodecError, decode, encode
+from .shm_ring import ShmRing
+from .topics import DispatchTable
+
+MAIN = "main"
+
+# 受信待ちの待機時間（秒）。空振りが続くほど長くする
+_IDLE_SLEEPS = (0.0, 0.00005, 0.0002, 0.001)
+
+
+class _ProcessBus(Publisher):
+    """1プロセス分のバス（ローカル配信 + 他プロセスへの転送）"""
+
+    def __init__(self, process: str, agents: List[Tuple[Agent, Tuple[str, ...]]],
+                 remote_topics: Dict[str, Tuple[str, ...]],
+                 outbound: Dict[str, ShmRing], inbound: Dict[str, ShmRing], stop_event=None,
+                 peer_alive: Optional[Callable[[str], bool]] = None) -> None:
+        """
+        Args:
+            stop_event: 設定されたら満杯のリングを待たずに捨てる
+            peer_alive: 送信先プロセス名 -> 生きているか（満杯のリングを待つ間に確認する）
+        """
+        self.process = process
+        self.agents = [agent for agent, _ in agents]
+        self._local: DispatchTable[Agent] = DispatchTable()
+        for agent, topics in agents:
+            for topic in topics:
+                self._local.add(topic, agent)
+        # 送信先プロセス名で重複を除く（同じプロセスの複数の購読に一致しても送るのは1回）
+        self._remote: DispatchTable[str] = DispatchTable(key=lambda name: name)
+        for name, topics in remote_topics.items():
+            for topic in topics:
+                self._remote.add(topic, name)
+        self._outbound = outbound
+        self._inbound = inbound
+        self._backlog: Deque[bytes] = deque()
+        self._stop_event = stop_event
+        self._peer_alive = peer_alive
+        self._dead: Set[str] = set()
+        self.sent = 0
+        self.received = 0
+        self.ring_waits = 0
+        self.dropped = 0
+        self.decode_errors = 0
+
+    def publish(self, message: Message) -> None:
+        targets = self._remote.resolve(message.topic)
+        if targets:
+            # 先に他プロセスへ送り、ローカルの処理と並行して進める
+            data = encode(message)
+            for name in targets:
+                self._send(name, data)
+        for agent in self._local.resolve(message.topic):
+            agent.on_message(message, self)
+
+    def _send(self, name: str, data: bytes) -> None:
+        if name in self._dead:
+            self.dropped += 1
+            return
+        ring = self._outbound[name]
+        if ring.try_write(data):
+            self.sent += 1
+            return
+        self.ring_waits += 1
+        idle = 0
+        while not ring.try_write(data):
+            if self._stop_event is not None and self._stop_event.is_set():
+                self.dropped += 1  # 停止中は相手が読まないため捨てる
+                return
+            # 相手も自分宛てのリング待ちかもしれないので、受信分を溜めて空けておく
+            if not self._collect():
+                if self._peer_alive is not None and not self._peer_alive(name):
+                    self._dead.add(name)
+                    self.dropped += 1
+                    print(f"[RUNTIME] {self.process}: {name} が終了しているため、以後の送信は捨てます")
+                    return
+                time.sleep(_IDLE_SLEEPS[min(idle, len(_IDLE_SLEEPS) - 1)])
+                idle += 1
+        self.sent += 1
+
+    def _collect(self, limit: int = 256) -> int:
+        n = 0
+        for ring in self._inbound.values():
+            records = ring.read_many(limit)
+            self._backlog.extend(records)
+            n += len(records)
+        return n
+
+    def poll(self, max_messages: int = 1024) -> int:
+        """届いたメッセージをローカルのエージェントに配信（配信した件数を返す）"""
+        if len(self._backlog) < max_messages:
+            self._collect(max_messages)
+        n = 0
+        while self._backlog and n < max_messages:
+            data = self._backlog.popleft()
+            n += 1
+            try:
+                message = decode(data)
+            except CodecError as e:
+                self.decode_errors += 1
+                print(f"[RUNTIME] {self.process}: {e}")
+                continue
+            self.received += 1
+            for agent in self._local.resolve(message.topic):
+                try:
+                    agent.on_message(message, self)
+                except Exception as e:
+                    print(f"[RUNTIME] {getattr(agent, 'name', agent)} でエラー ({message.topic}): {e}")
+        return n
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "sent": self.sent,
+            "received": self.received,
+            "backlog": len(self._backlog),
+            "ring_waits": self.ring_waits,
+            "dropped": self.dropped,
+            "decode_errors": self.decode_errors,
+        }
+
+
+def _worker_main(process: str, agents: List[Tuple[Agent, Tuple[str, ...]]],
+                 remote_topics: Dict[str, Tuple[str, ...]], outbound_names: Dict[str, str],
+                 inbound_names: Dict[str, str], ready, stop_event, alive, slots: Dict[str, int]) -> None:
+    """ワーカープロセスの本体（alive[slots[名前]]: ワーカーの生死フラグ）"""
+    outbound = {name: ShmRing.attach(ring) for name, ring in outbound_names.items()}
+    inbound = {name: ShmRing.attach(ring) for name, ring in inbound_names.items()}
+    parent = multiprocessing.parent_process()
+
+    def peer_alive(name: str) -> bool:
+        if parent is not None and not parent.is_alive():
+            return False  # メインプロセスがなければ誰も片付けない
+        return name == MAIN or bool(alive[slots[name]])
+
+    bus = _ProcessBus(process, agents, remote_topics, outbound, inbound, stop_event, peer_alive=peer_alive)
+    try:
+        for agent in bus.agents:
+            agent.on_start(bus)
+        ready.set()
+        idle = 0
+        while not stop_event.is_set():
+            if bus.poll():
+                idle = 0
+            else:
+                time.sleep(_IDLE_SLEEPS[min(idle, len(_IDLE_SLEEPS) - 1)])
+                idle += 1
+        while bus.poll():  # 停止前に届いていた分を処理
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        alive[slots[process]] = 0
+        for agent in bus.agents:
+            try:
+                agent.on_stop()
+            except Exception as e:
+                print(f"[RUNTIME] {getattr(agent, 'name', agent)} の停止でエラー: {e}")
+        for ring in list(outbound.values()) + list(inbound.values()):
+            ring.close()
+
+
+class ProcessRuntime:
+    """エージェントをプロセスに配置して動かすランタイム
+
+    使い方:
+        runtime = ProcessRuntime()
+        runtime.add(market, [])                                  # メインプロセス
+        runtime.add(strat, ["market.tick.HYPE"], process="w1")   # ワーカー w1
+        runtime.add(risk, ["strategy.signal"])
+        runtime.start()
+        while ...:
+            market.tick(runtime.bus)
+            runtime.poll()
+        runtime.stop()
+    """
+
+    def __init__(self, ring_capacity: int = 1 << 20, start_method: Optional[str] = None) -> None:
+        """
+        Args:
+            ring_capacity: プロセス間リング1本あたりのバイト数
+            start_method: multiprocessing の開始方式（None でOSの既定。spawn ではエージェントが pickle 可能であること）
+        """
+        self.ring_capacity = ring_capacity
+        self._context = multiprocessing.get_context(start_method)
+        self._placements: Dict[str, List[Tuple[Agent, Tuple[str, ...]]]] = {MAIN: []}
+        self._rings: Dict[Tuple[str, str], ShmRing] = {}
+        self._workers: Dict[str, multiprocessing.process.BaseProcess] = {}
+        self._stop_event = None
+        self._alive = None  # ワーカーの生死フラグ（共有メモリ。メインプロセスが更新する）
+        self._slots: Dict[str, int] = {}
+        self._alive_checked = 0.0
+        self._bus: Optional[_ProcessBus] = None
+        self._started = False
+
+    def add(self, agent: Agent, topics: Iterable[str], process: str = MAIN) -> None:
+        """エージェントを配置する（topics: 購読するトピックのパターン）"""
+        if self._started:
+            raise RuntimeError("開始後は配置を変更できません")
+        self._placements.setdefault(process, []).append((agent, tuple(topics)))
+
+    @property
+    def bus(self) -> Publisher:
+        """メインプロセスのバス（メインに置いたエージェントの外から publish するとき）"""
+        if self._bus is None:
+            raise RuntimeError("ランタイムが開始されていません")
+        return self._bus
+
+    def _topics(self, process: str) -> Tuple[str, ...]:
+        topics: List[str] = []
+        for _, agent_topics in self._placements.get(process, []):
+            topics.extend(t for t in agent_topics if t not in topics)
+        return tuple(topics)
+
+    def start(self, timeout: float = 10.0) -> None:
+        if self._started:
+            return
+        self._started = True
+        processes = list(self._placements)
+        topics = {name: self._topics(name) for name in processes}
+        # 購読のあるプロセスへのリングだけ作る
+        tag = f"hst{os.getpid()}"
+        for src in processes:
+            for dst in processes:
+                if src != dst and topics[dst]:
+                    self._rings[(src, dst)] = ShmRing.create(
+                        self.ring_capacity, name=f"{tag}_{processes.index(src)}_{processes.index(dst)}")
+
+        def rings_of(process: str):
+            outbound = {dst: ring for (src, dst), ring in self._rings.items() if src == process}
+            inbound = {src: ring for (src, dst), ring in self._rings.items() if dst == process}
+            remote = {dst: topics[dst] for dst in outbound}
+            return outbound, inbound, remote
+
+        self._stop_event = self._context.Event()
+        workers = [process for process in processes if process != MAIN]
+        self._slots = {process: i for i, process in enumerate(workers)}
+        self._alive = self._context.Array('b', [1] * len(workers), lock=False)
+        ready_events = []
+        try:
+            for process in processes:
+                if process == MAIN:
+                    continue
+                outbound, inbound, remote = rings_of(process)
+                ready = self._context.Event()
+                worker = self._context.Process(
+                    target=_worker_main, name=f"agents-{process}", daemon=True,
+                    args=(process, self._placements[process], remote,
+                          {name: ring.name for name, ring in outbound.items()},
+                          {name: ring.name for name, ring in inbound.items()},
+                          ready, self._stop_event, self._alive, self._slots))
+                worker.start()
+                self._workers[process] = worker
+                ready_events.append((process, ready))
+
+            outbound, inbound, remote = rings_of(MAIN)
+            self._bus = _ProcessBus(MAIN, self._placements[MAIN], remote, outbound, inbound, self._stop_event,
+                                    peer_alive=self._worker_alive)
+            for process, ready in ready_events:
+                if not ready.wait(timeout):
+                    raise RuntimeError(f"ワーカー {process} が起動しませんでした")
+            for agent in self._bus.agents:
+                agent.on_start(self._bus)
+        except Exception:
+            self.stop()
+            raise
+        print(f"[RUNTIME] 起動しました（ワーカー: {', '.join(self._workers) or 'なし'}）")
+
+    def _worker_alive(self, process: str) -> bool:
+        worker = self._workers.get(process)
+        alive = worker is not None and worker.is_alive()
+        if not alive and process in self._slots:
+            self._alive[self._slots[process]] = 0
+        return alive
+
+    def poll(self, max_messages: int = 1024) -> int:
+        """メインプロセス宛てのメッセージを配信（メインループから定期的に呼ぶ）"""
+        if self._bus is None:
+            return 0
+        now = time.monotonic()
+        if now - self._alive_checked >= 0.1:
+            # 異常終了したワーカーをフラグに反映（ほかのワーカーが満杯のリングを待ち続けないように）
+            self._alive_checked = now
+            for process in self._workers:
+                self._worker_alive(process)
+        return self._bus.poll(max_messages)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if not self._started:
+            return
+        if self._stop_event is not None:
+            self._stop_event.set()
+        for process, worker in self._workers.items():
+            worker.join(timeout)
+            if worker.is_alive():
+                print(f"[RUNTIME] ワーカー {process} が停止しないため強制終了します")
+                worker.terminate()
+                worker.join(1.0)
+        if self._bus is not None:
+            for agent in self._bus.agents:
+                agent.on_stop()
+        for ring in self._rings.values():
+            ring.close()
+            ring.unlink()
+        self._rings.clear()
+        self._workers.clear()
+        self._bus = None
+        self._started = False
+
+    def metrics(self) -> Dict[str, Dict[str, int]]:
+        """メインプロセスの送受信件数と、プロセス間リングの使用バイト数"""
+        result: Dict[str, Dict[str, int]] = {}
+        if self._bus is not None:
+            result[MAIN] = self._bus.metrics()
+        result["rings"] = {f"{src}->{dst}": ring.used() for (src, dst), ring in self._rings.items()}
+        result["workers"] = {process: int(worker.is_alive()) for process, worker in self._workers.items()}
+        return result
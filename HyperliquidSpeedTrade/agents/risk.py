@@ -4,13 +4,16 @@
 機能:
 - 1トレードの名目額上限
 - 連続損失による一時停止（サーキットブレーカー）
+
+クールダウンの時刻は clock（既定は実時間）で測る。バックテストでは VirtualClock を渡す。
 """
 from __future__ import annotations
 
-import time
 from typing import Optional
 
 from .base import Agent, Message, Publisher
+from .clock import SYSTEM_CLOCK, Clock
+from .messages import Approval, PnL, Signal, as_typed
 
 
 class RiskAgent:
@@ -21,7 +24,9 @@ class RiskAgent:
         max_notional_per_trade_usd: float = 200.0,
         max_consecutive_losses: int = 3,
         cooldown_seconds: float = 30.0,
+        clock: Optional[Clock] = None,
     ) -> None:
+        self.clock = clock or SYSTEM_CLOCK
         self.max_notional = max_notional_per_trade_usd
         self.max_consecutive_losses = max_consecutive_losses
         self.cooldown_seconds = cooldown_seconds
@@ -33,7 +38,7 @@ class RiskAgent:
 
     def on_message(self, message: Message, bus: Publisher) -> None:
         if message.topic == "strategy.signal":
-            if self.blocked_until_ts and time.time() < self.blocked_until_ts:
+            if self.blocked_until_ts and self.clock.time() < self.blocked_until_ts:
                 # ブロック中は破棄
                 bus.publish(Message(
                     topic="risk.blocked",
@@ -41,31 +46,23 @@ class RiskAgent:
                 ))
                 return
 
-            symbol = message.payload["symbol"]
-            price = float(message.payload["price"])
-            size = float(message.payload["size"])
+            signal = as_typed(message, Signal)
+            price = signal.price
+            size = signal.size
             notional = price * size
 
             if notional > self.max_notional:
                 size = self.max_notional / max(price, 1e-9)
 
-            bus.publish(Message(
-                topic="risk.approved",
-                payload={
-                    "symbol": symbol,
-                    "side": message.payload["side"],
-                    "size": size,
-                    "price": price,
-                },
-            ))
+            bus.publish(Approval(signal.symbol, signal.side, size, price))
 
         elif message.topic == "audit.pnL":
             # 実行結果の疑似PnLに基づき連敗カウント
-            pnl = float(message.payload.get("pnl", 0.0))
+            pnl = as_typed(message, PnL).pnl
             if pnl < 0:
                 self.consecutive_losses += 1
                 if self.consecutive_losses >= self.max_consecutive_losses:
-                    self.blocked_until_ts = time.time() + self.cooldown_seconds
+                    self.blocked_until_ts = self.clock.time() + self.cooldown_seconds
                     self.consecutive_losses = 0
                     bus.publish(Message(
                         topic="risk.blocked",
@@ -0,0 +1,133 @@
+"""
+共有メモリのリングバッファ（単一プロデューサ・単一コンシューマ）
+
+レイアウト（multiprocessing.shared_memory 上）:
+  0:   head（書き込み位置、プロデューサだけが書く）
+  8:   容量
+  64:  tail（読み出し位置、コンシューマだけが書く。head と別のキャッシュラインに置く）
+  128: データ領域
+
+head / tail は単調増加の通し位置で、データ領域内の位置は容量で割った余り。
+レコードは「<I 長さ + 本体」を8バイト境界に揃えて並べ、末尾に収まらないときは
+折り返しマーカーを書いて先頭から続ける。本体を書いてから head を進めるため、
+ロックなしで1対1の受け渡しができる（1つのリングに書くのは1プロセスの1スレッドだけにすること）。
+"""
+from __future__ import annotations
+
+import struct
+from multiprocessing import shared_memory
+from typing import List, Optional
+
+_U64 = struct.Struct("<Q")
+_LEN = struct.Struct("<I")
+_HEAD = 0
+_CAPACITY = 8
+_TAIL = 64
+_DATA = 128
+_ALIGN = 8
+_WRAP = 0xFFFFFFFF
+
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) & ~(_ALIGN - 1)
+
+
+class RingFull(Exception):
+    """リングに空きがない"""
+
+
+class ShmRing:
+    """共有メモリ上の SPSC リングバッファ
+
+    create() で作成したプロセスが unlink() の責任を持ち、相手側は attach() で名前から開く。
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool) -> None:
+        self._shm = shm
+        self._buf = shm.buf
+        self.owner = owner
+        self.name = shm.name
+        self.capacity = _U64.unpack_from(self._buf, _CAPACITY)[0]
+        self.max_record = self.capacity // 2 - _LEN.size
+
+    @classmethod
+    def create(cls, capacity: int = 1 << 20, name: Optional[str] = None) -> "ShmRing":
+        capacity = _aligned(max(capacity, 4096))
+        shm = shared_memory.SharedMemory(name=name, create=True, size=_DATA + capacity)
+        shm.buf[:_DATA] = bytes(_DATA)
+        _U64.pack_into(shm.buf, _CAPACITY, capacity)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "ShmRing":
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    def _head(self) -> int:
+        return _U64.unpack_from(self._buf, _HEAD)[0]
+
+    def _tail(self) -> int:
+        return _U64.unpack_from(self._buf, _TAIL)[0]
+
+    def used(self) -> int:
+        return self._head() - self._tail()
+
+    def try_write(self, data: bytes) -> bool:
+        """1レコード書き込む（空きがなければ False）"""
+        size = len(data)
+        if size > self.max_record:
+            raise ValueError(f"レコードが大きすぎます: {size} > {self.max_record}")
+        record = _aligned(_LEN.size + size)
+        head = self._head()
+        free = self.capacity - (head - self._tail())
+        pos = head % self.capacity
+        skip = self.capacity - pos if pos + record > self.capacity else 0
+        if skip + record > free:
+            return False
+        buf = self._buf
+        if skip:
+            _LEN.pack_into(buf, _DATA + pos, _WRAP)
+            head += skip
+            pos = 0
+        start = _DATA + pos
+        _LEN.pack_into(buf, start, size)
+        buf[start + _LEN.size:start + _LEN.size + size] = data
+        _U64.pack_into(buf, _HEAD, head + record)  # 本体を書いてから公開
+        return True
+
+    def write(self, data: bytes) -> None:
+        if not self.try_write(data):
+            raise RingFull(self.name)
+
+    def read_many(self, limit: int = 256) -> List[bytes]:
+        """最大 limit 件を読み出す（tail の更新は最後に1回）"""
+        buf = self._buf
+        head = self._head()
+        tail = self._tail()
+        records: List[bytes] = []
+        while tail < head and len(records) < limit:
+            pos = tail % self.capacity
+            (size,) = _LEN.unpack_from(buf, _DATA + pos)
+            if size == _WRAP:
+                tail += self.capacity - pos
+                continue
+            start = _DATA + pos + _LEN.size
+            records.append(bytes(buf[start:start + size]))
+            tail += _aligned(_LEN.size + size)
+        if records or tail != self._tail():
+            _U64.pack_into(buf, _TAIL, tail)
+        return records
+
+    def close(self) -> None:
+        self._buf = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass
+
+    def unlink(self) -> None:
+        """共有メモリを削除（作成側のみ）"""
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
@@ -7,21 +7,27 @@
 """
 from __future__ import annotations
 
-from collections import deque
-from typing import Deque, Optional
+from typing import Optional, Sequence
 
 from .base import Agent, Message, Publisher
+from .indicators import SMA
+from .messages import Signal, Tick, as_typed
+from .topics import market_tick_topic
 
 
 class ScalperAgent:
     name = "strategy_scalper"
 
     def __init__(self, symbol: str = "HYPE", short: int = 5, long: int = 20, size: float = 10.0) -> None:
-        self.symbol = symbol.upper()
+        # 通貨名はそのまま（kPEPE など大文字・小文字を区別する）。トピックのキーだけ大文字にする
+        self.symbol = symbol
+        self.tick_topic = market_tick_topic(self.symbol)  # market.tick.<SYMBOL> を購読する
         self.short = short
         self.long = long
         self.size = size  # 名目サイズ（実行エージェントで口数換算）
-        self.prices: Deque[float] = deque(maxlen=max(self.short, self.long))
+        # 移動平均は累積和で1ティック O(1)
+        self.short_ma = SMA(self.short)
+        self.long_ma = SMA(self.long)
         self.prev_signal: Optional[str] = None  # "BUY" | "SELL" | None
 
     def on_start(self, bus: Publisher) -> None:
@@ -30,20 +36,17 @@ class ScalperAgent:
         return
 
     def on_message(self, message: Message, bus: Publisher) -> None:
-        if message.topic != "market.tick":
-            return
-        if message.payload.get("symbol") != self.symbol:
+        # 通貨はトピックの階層で絞り込み済み
+        if message.topic != self.tick_topic:
             return
 
-        price = float(message.payload["price"])
-        self.prices.append(price)
+        price = as_typed(message, Tick).price
+        short_ma = self.short_ma.update(price)
+        long_ma = self.long_ma.update(price)
 
-        if len(self.prices) < max(self.short, self.long):
+        if short_ma is None or long_ma is None:
             return
 
-        short_ma = sum(list(self.prices)[-self.short:]) / self.short
-        long_ma = sum(list(self.prices)[-self.long:]) / self.long
-
         signal: Optional[str] = None
         if short_ma > long_ma and self.prev_signal != "BUY":
             signal = "BUY"
@@ -52,15 +55,12 @@ class ScalperAgent:
 
         if signal:
             self.prev_signal = signal
-            bus.publish(Message(
-                topic="strategy.signal",
-                payload={
-                    "symbol": self.symbol,
-                    "side": signal,
-                    "size": self.size,
-                    "price": price,
-                },
-            ))
+            bus.publish(Signal(self.symbol, signal, self.size, price))
+
+    def warmup(self, prices: Sequence[float]) -> None:
+        """過去の価格で移動平均を初期化（起動直後からシグナルを出せるように）"""
+        self.short_ma.seed(prices)
+        self.long_ma.seed(prices)
 
     def on_stop(self) -> None:
         return
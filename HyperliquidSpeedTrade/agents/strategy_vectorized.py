@@ -0,0 +1,192 @@
+"""
+全通貨一括のベクトル化戦略エージェント
+
+ScalperAgent と同じ移動平均クロスのルールを、全通貨分の状態（価格リングバッファ・
+移動平均の累積和・直前のシグナル）を通貨IDで引く NumPy 配列に持って計算する。
+allMids のフレーム（market.mids）1つにつき、価格が変わった通貨だけを1回のベクトル演算で更新し、
+クロスした通貨についてだけ strategy.signal を発行する。
+
+- 移動平均のサンプルは「価格が変わったフレーム」（同じ価格の繰り返しは数えない）
+- フレームは全通貨の最新値を持つ前提なので、非同期バスでは conflate で購読して古いフレームを捨ててよい
+- 個別のティック（market.tick.<SYMBOL>）も受け付ける（1通貨分の更新として処理）
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .base import Agent, Message, Publisher
+from .messages import Mids, Signal, Tick, as_typed
+
+_SIDES = {1: "BUY", -1: "SELL"}
+_RESYNC_UPDATES = 4096  # この回数の更新ごとに累積和をバッファから取り直す
+
+
+class VectorizedScalperAgent:
+    name = "strategy_vectorized"
+
+    def __init__(self, short: int = 5, long: int = 20, size: float = 10.0,
+                 symbols: Optional[Iterable[str]] = None, include_spot: bool = False,
+                 capacity: int = 256) -> None:
+        """
+        Args:
+            symbols: 対象の通貨（allMids と同じ表記。None でフレームに現れた全通貨）
+            include_spot: symbols=None のとき現物（"@" で始まるID）も対象にするか
+            capacity: 通貨数の初期容量（足りなければ倍に広げる）
+        """
+        if short <= 0 or long <= 0:
+            raise ValueError("short / long は1以上")
+        self.short = short
+        self.long = long
+        self.size = size
+        self.include_spot = include_spot
+        self._fixed_universe = symbols is not None
+        self._depth = max(short, long)  # 価格リングバッファの長さ
+
+        self.symbols: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._allocate(max(capacity, 1))
+        for symbol in symbols or ():
+            self._register(symbol)
+
+        # 直前のフレームのキー順（allMids は毎回ほぼ同じ順なので、同じなら通貨IDの配列を使い回す）
+        self._frame_keys: Optional[List[str]] = None
+        self._frame_ids: Optional[np.ndarray] = None
+        self._frame_mask: Optional[np.ndarray] = None
+        self._updates = 0
+        self.frames = 0
+        self.signals = 0
+
+    def _allocate(self, capacity: int) -> None:
+        old = len(self.symbols)
+        buffers = np.zeros((capacity, self._depth))
+        counts = np.zeros(capacity, dtype=np.int64)
+        short_sum = np.zeros(capacity)
+        long_sum = np.zeros(capacity)
+        last = np.full(capacity, np.nan)
+        prev = np.zeros(capacity, dtype=np.int8)  # 直前のシグナル（1=BUY, -1=SELL, 0=なし）
+        if old:
+            buffers[:old] = self._buffers[:old]
+            counts[:old] = self._counts[:old]
+            short_sum[:old] = self._short_sum[:old]
+            long_sum[:old] = self._long_sum[:old]
+            last[:old] = self._last[:old]
+            prev[:old] = self._prev[:old]
+        self._buffers, self._counts = buffers, counts
+        self._short_sum, self._long_sum = short_sum, long_sum
+        self._last, self._prev = last, prev
+
+    def _register(self, symbol: str) -> int:
+        coin_id = self._ids.get(symbol)
+        if coin_id is None:
+            coin_id = len(self.symbols)
+            if coin_id >= len(self._counts):
+                self._allocate(len(self._counts) * 2)
+            self._ids[symbol] = coin_id
+            self.symbols.append(symbol)
+        return coin_id
+
+    def _lookup(self, symbol: str) -> int:
+        """通貨ID（対象外なら -1）"""
+        coin_id = self._ids.get(symbol)
+        if coin_id is not None:
+            return coin_id
+        if self._fixed_universe or (not self.include_spot and symbol.startswith("@")):
+            return -1
+        return self._register(symbol)
+
+    def on_start(self, bus: Publisher) -> None:
+        return
+
+    def on_message(self, message: Message, bus: Publisher) -> None:
+        if message.topic == Mids.TOPIC:
+            signals = self.process_mids(as_typed(message, Mids).mids)
+        elif message.topic.startswith("market.tick."):
+            tick = as_typed(message, Tick)
+            signals = self.process_prices([tick.symbol], [tick.price])
+        else:
+            return
+        for signal in signals:
+            bus.publish(signal)
+
+    def process_mids(self, mids: Mapping[str, object]) -> List[Signal]:
+        """allMids のフレームを取り込み、クロスした通貨のシグナルを返す"""
+        self.frames += 1
+        keys = list(mids)
+        if keys != self._frame_keys:
+            ids = np.fromiter((self._lookup(k) for k in keys), dtype=np.int64, count=len(keys))
+            self._frame_keys, self._frame_ids, self._frame_mask = keys, ids, ids >= 0
+        prices = np.fromiter(map(float, mids.values()), dtype=np.float64, count=len(keys))
+        mask = self._frame_mask
+        return self._step(self._frame_ids[mask], prices[mask])
+
+    def process_prices(self, symbols: Sequence[str], prices: Sequence[float]) -> List[Signal]:
+        """通貨と価格の組を取り込み、クロスした通貨のシグナルを返す"""
+        ids = np.fromiter((self._lookup(s) for s in symbols), dtype=np.int64, count=len(symbols))
+        values = np.asarray(prices, dtype=np.float64)
+        mask = ids >= 0
+        return self._step(ids[mask], values[mask])
+
+    def _step(self, ids: np.ndarray, prices: np.ndarray) -> List[Signal]:
+        # 初回（直前値がNaN）も変化として扱う。NaNの価格は状態を壊すので取り込まない
+        changed = (prices != self._last[ids]) & (prices == prices)
+        if not changed.all():
+            ids, prices = ids[changed], prices[changed]
+        if not len(ids):
+            return []
+        self._last[ids] = prices
+
+        depth = self._depth
+        buffers = self._buffers
+        counts = self._counts[ids]
+        # ウィンドウから抜ける値（まだ埋まっていなければ0）。書き込み前に読む
+        out_short = np.where(counts >= self.short, buffers[ids, (counts - self.short) % depth], 0.0)
+        out_long = np.where(counts >= self.long, buffers[ids, (counts - self.long) % depth], 0.0)
+        buffers[ids, counts % depth] = prices
+        self._short_sum[ids] += prices - out_short
+        self._long_sum[ids] += prices - out_long
+        counts += 1
+        self._counts[ids] = counts
+
+        self._updates += 1
+        if self._updates >= _RESYNC_UPDATES:
+            self._resync()
+
+        ready = counts >= depth
+        diff = self._short_sum[ids] / self.short - self._long_sum[ids] / self.long
+        side = np.sign(diff).astype(np.int8)
+        crossed = ready & (side != 0) & (side != self._prev[ids])
+        if not crossed.any():
+            return []
+        crossed_ids = ids[crossed]
+        crossed_sides = side[crossed]
+        self._prev[crossed_ids] = crossed_sides
+        self.signals += len(crossed_ids)
+        return [
+            Signal(self.symbols[coin_id], _SIDES[s], self.size, price)
+            for coin_id, s, price in zip(crossed_ids.tolist(), crossed_sides.tolist(), prices[crossed].tolist())
+        ]
+
+    def _resync(self) -> None:
+        """累積和の丸め誤差を捨てるため、バッファから合計を計算し直す"""
+        self._updates = 0
+        n = len(self.symbols)
+        if not n:
+            return
+        counts = self._counts[:n, None]
+        for window, sums in ((self.short, self._short_sum), (self.long, self._long_sum)):
+            lags = np.arange(1, window + 1)
+            positions = (counts - lags) % self._depth
+            values = np.take_along_axis(self._buffers[:n], positions, axis=1)
+            sums[:n] = np.where(counts >= lags, values, 0.0).sum(axis=1)
+
+    def moving_averages(self, symbol: str) -> Optional[Tuple[float, float]]:
+        """通貨の (短期MA, 長期MA)。ウォームアップ中・対象外なら None"""
+        coin_id = self._ids.get(symbol)
+        if coin_id is None or self._counts[coin_id] < self._depth:
+            return None
+        return (float(self._short_sum[coin_id] / self.short), float(self._long_sum[coin_id] / self.long))
+
+    def on_stop(self) -> None:
+        return
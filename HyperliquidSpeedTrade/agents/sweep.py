@@ -0,0 +1,357 @@
+"""
+パラメータスイープ（バックテストをプロセスプールで並列実行）
+
+scalper_pipeline() の引数（short, long, size, max_notional, max_losses, cooldown）を探索する。
+- grid: 全組み合わせ
+- random: 探索範囲から一様に n 点
+- bayes: 最初に random で数点を試し、以降はガウス過程の期待改善量（EI）が大きい点を
+  ワーカー数ずつまとめて試す（NumPy のみで実装。パラメータが少なく1点の評価が重い前提）
+
+データは親プロセスで1回だけ読み、(時刻, 価格) の配列を .npy に書き出す。各ワーカーは初期化時に
+np.load(mmap_mode="r") で開くため、OSのページキャッシュを共有し、点ごとにファイルを読み直さない。
+すべての点で同じ seed を使う（スリッページの乱数を揃え、パラメータの差だけを比べる）。
+short >= long の組み合わせは探索しない。
+"""
+from __future__ import annotations
+
+import array
+import csv
+import itertools
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .backtest import BacktestEngine, TickRow, scalper_pipeline
+
+PARAMS = ("short", "long", "size", "max_notional", "max_losses", "cooldown")
+METRICS = ("pnl", "max_drawdown", "trades", "signals", "blocked", "wall_seconds")
+MINIMIZE = ("max_drawdown", "wall_seconds")  # 小さいほど良い指標（それ以外は大きいほど良い）
+_INT_PARAMS = ("short", "long", "max_losses")
+_CHUNK = 1 << 16
+
+
+class Choice(NamedTuple):
+    """候補値の列（grid はすべて、random / bayes はいずれか1つ）"""
+    values: Tuple[Any, ...]
+
+
+class Range(NamedTuple):
+    """範囲 [low, high]（grid では step 刻み。integer なら整数だけ）"""
+    low: float
+    high: float
+    step: Optional[float] = None
+    integer: bool = False
+
+
+Spec = Union[Choice, Range]
+
+
+def _number(text: str) -> Union[int, float]:
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def parse_space(specs: Iterable[str]) -> Dict[str, Spec]:
+    """"name=a,b,c"（候補値）/ "name=low:high[:step]"（範囲）を探索空間にする"""
+    space: Dict[str, Spec] = {}
+    for spec in specs:
+        name, sep, body = spec.partition("=")
+        name = name.strip().replace("-", "_")
+        if not sep or name not in PARAMS:
+            raise ValueError(f"パラメータの指定が不正です: {spec}（{', '.join(PARAMS)} のいずれか）")
+        if ":" in body:
+            parts = [_number(p) for p in body.split(":")]
+            if len(parts) not in (2, 3) or parts[0] > parts[1]:
+                raise ValueError(f"範囲の指定が不正です: {spec}")
+            integer = name in _INT_PARAMS or all(isinstance(p, int) for p in parts)
+            space[name] = Range(parts[0], parts[1], parts[2] if len(parts) == 3 else None, integer)
+        else:
+            values = tuple(_number(v) for v in body.split(",") if v.strip())
+            if not values:
+                raise ValueError(f"候補値がありません: {spec}")
+            space[name] = Choice(values)
+    return space
+
+
+def _valid(point: Dict[str, Any]) -> bool:
+    return point.get("short", 5) < point.get("long", 20)
+
+
+def grid_points(space: Dict[str, Spec]) -> List[Dict[str, Any]]:
+    """全組み合わせ（範囲は step が必要）"""
+    axes = []
+    for name, spec in space.items():
+        if isinstance(spec, Choice):
+            axes.append(spec.values)
+        elif spec.step:
+            count = int(math.floor((spec.high - spec.low) / spec.step + 1e-9)) + 1
+            values = [spec.low + i * spec.step for i in range(count)]
+            axes.append(tuple(int(round(v)) if spec.integer else v for v in values))
+        else:
+            raise ValueError(f"grid では範囲に刻みが必要です: {name}=low:high:step")
+    points = [dict(zip(space, combo)) for combo in itertools.product(*axes)]
+    return [p for p in points if _valid(p)]
+
+
+def _sample(spec: Spec, rng: random.Random) -> Any:
+    if isinstance(spec, Choice):
+        return rng.choice(spec.values)
+    if spec.integer:
+        return rng.randint(int(spec.low), int(spec.high))
+    return rng.uniform(spec.low, spec.high)
+
+
+def random_points(space: Dict[str, Spec], n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """探索空間から一様に重複なく n 点（short < long を満たさない点・重複は引き直す）"""
+    points: List[Dict[str, Any]] = []
+    seen = set()
+    attempts = 0
+    while len(points) < n and attempts < n * 100:
+        attempts += 1
+        point = {name: _sample(spec, rng) for name, spec in space.items()}
+        if _valid(point):
+            points.extend(_unique([point], seen))
+    return points
+
+
+def ticks_to_arrays(ticks: Iterable[TickRow]) -> Tuple[np.ndarray, np.ndarray]:
+    """ティックを (時刻, 価格) の配列にする（通貨は1つに絞ってあること）"""
+    times = array.array("d")
+    prices = array.array("d")
+    for ts, _, price in ticks:
+        times.append(ts)
+        prices.append(price)
+    return np.frombuffer(times, dtype=np.float64), np.frombuffer(prices, dtype=np.float64)
+
+
+def iter_arrays(times: np.ndarray, prices: np.ndarray, symbol: str) -> Iterator[TickRow]:
+    """配列をティックの列に戻す（memmap からも一定のメモリで読めるよう分割して変換）"""
+    for start in range(0, len(times), _CHUNK):
+        end = start + _CHUNK
+        yield from zip(times[start:end].tolist(), itertools.repeat(symbol), prices[start:end].tolist())
+
+
+def run_point(times: np.ndarray, prices: np.ndarray, symbol: str, seed: Optional[int],
+              params: Dict[str, Any]) -> Dict[str, Any]:
+    """1点分のバックテストを実行し、パラメータと指標を1行にまとめる"""
+    engine = BacktestEngine(seed=seed)
+    scalper_pipeline(engine, symbol, **params)
+    result = engine.run(iter_arrays(times, prices, symbol))
+    messages = result["messages"]
+    row = dict(params)
+    row.update({
+        "pnl": result["cum_pnl"],
+        "max_drawdown": result["max_drawdown"],
+        "trades": result["fills"],
+        "signals": messages.get("strategy.signal", 0),
+        "blocked": messages.get("risk.blocked", 0),
+        "wall_seconds": result["wall_seconds"],
+    })
+    return row
+
+
+# --- ワーカープロセス --------------------------------------------------
+
+_worker_data: Optional[Tuple[np.ndarray, np.ndarray, str, Optional[int]]] = None
+
+
+def _init_worker(path: str, symbol: str, seed: Optional[int]) -> None:
+    global _worker_data
+    data = np.load(path, mmap_mode="r")
+    _worker_data = (data[0], data[1], symbol, seed)
+
+
+def _run_in_worker(params: Dict[str, Any]) -> Dict[str, Any]:
+    times, prices, symbol, seed = _worker_data
+    return run_point(times, prices, symbol, seed, params)
+
+
+class SweepRunner:
+    """ティックを共有してバックテストを並列に回す
+
+    使い方:
+        with SweepRunner(times, prices, "HYPE", seed=0, processes=8) as runner:
+            rows = runner.run(grid_points(space))
+            rows += runner.bayes(space, 100)
+    """
+
+    def __init__(self, times: np.ndarray, prices: np.ndarray, symbol: str, seed: Optional[int] = 0,
+                 processes: Optional[int] = None, start_method: Optional[str] = None) -> None:
+        """
+        Args:
+            processes: ワーカー数（None でCPU数。0 ならプールを使わず親プロセスで順に実行）
+            start_method: multiprocessing の開始方式（None でOSの既定）
+        """
+        self.symbol = symbol
+        self.seed = seed
+        self.processes = (os.cpu_count() or 1) if processes is None else processes
+        self.ticks = len(times)
+        self._dir = tempfile.mkdtemp(prefix="hst_sweep_")
+        self.path = os.path.join(self._dir, "ticks.npy")
+        np.save(self.path, np.vstack([times, prices]))
+        self._pool = None
+        if self.processes > 0:
+            context = multiprocessing.get_context(start_method)
+            self._pool = context.Pool(self.processes, initializer=_init_worker,
+                                      initargs=(self.path, symbol, seed))
+        else:
+            _init_worker(self.path, symbol, seed)
+        self.results: List[Dict[str, Any]] = []
+
+    def __enter__(self) -> "SweepRunner":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+    def run(self, points: Sequence[Dict[str, Any]],
+            progress: Optional[Callable[[int, int, Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """点の一覧を評価（終わった順に progress(完了数, 総数, 行) を呼ぶ）。行は points の順で返す"""
+        rows: List[Optional[Dict[str, Any]]] = [None] * len(points)
+        if self._pool is None:
+            results = ((i, _run_in_worker(p)) for i, p in enumerate(points))
+        else:
+            results = self._pool.imap_unordered(_indexed, list(enumerate(points)))
+        for done, (i, row) in enumerate(results, start=1):
+            rows[i] = row
+            if progress:
+                progress(done, len(points), row)
+        self.results.extend(rows)
+        return rows
+
+    def bayes(self, space: Dict[str, Spec], n: int, objective: str = "pnl", initial: Optional[int] = None,
+              rng: Optional[random.Random] = None, candidates: int = 2000,
+              progress: Optional[Callable[[int, int, Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """ガウス過程で次の点を選びながら n 点を評価（objective を改善する方向。MINIMIZE の指標は最小化）"""
+        rng = rng or random.Random(self.seed)
+        batch = max(1, self.processes)
+        initial = min(n, initial or max(10, batch))
+        rows: List[Dict[str, Any]] = []
+        seen = set()
+
+        def evaluate(points: List[Dict[str, Any]]) -> None:
+            offset = len(rows)
+
+            def report(done: int, total: int, row: Dict[str, Any]) -> None:
+                if progress:
+                    progress(offset + done, n, row)
+            rows.extend(self.run(points, report))
+
+        first = _unique(random_points(space, initial, rng), seen)
+        evaluate(first)
+        while len(rows) < n:
+            pool = _unique(random_points(space, candidates, rng), set(seen))
+            if not pool:
+                break  # 探索空間を評価し尽くした
+            X = np.array([_encode(space, row) for row in rows])
+            y = np.array([objective_value(row, objective) for row in rows])
+            ei = _expected_improvement(X, y, np.array([_encode(space, p) for p in pool]))
+            order = np.argsort(-ei)[:min(batch, n - len(rows))]
+            chosen = _unique([pool[i] for i in order.tolist()], seen)
+            evaluate(chosen)
+        return rows
+
+
+def objective_value(row: Dict[str, Any], objective: str) -> float:
+    """大きいほど良い値に揃えた指標（MINIMIZE の指標は符号を反転）"""
+    value = float(row[objective])
+    return -value if objective in MINIMIZE else value
+
+
+def _indexed(item: Tuple[int, Dict[str, Any]]) -> Tuple[int, Dict[str, Any]]:
+    i, params = item
+    return i, _run_in_worker(params)
+
+
+def _key(point: Dict[str, Any]) -> Tuple:
+    return tuple(sorted((k, point[k]) for k in PARAMS if k in point))
+
+
+def _unique(points: List[Dict[str, Any]], seen: set) -> List[Dict[str, Any]]:
+    """まだ評価していない点だけ（seen に追加する）"""
+    result = []
+    for point in points:
+        key = _key(point)
+        if key not in seen:
+            seen.add(key)
+            result.append(point)
+    return result
+
+
+def _encode(space: Dict[str, Spec], point: Dict[str, Any]) -> List[float]:
+    """各パラメータを [0, 1] に正規化（候補値は並び順の位置）"""
+    features = []
+    for name, spec in space.items():
+        value = point[name]
+        if isinstance(spec, Choice):
+            features.append(spec.values.index(value) / max(len(spec.values) - 1, 1))
+        else:
+            features.append((value - spec.low) / (spec.high - spec.low) if spec.high > spec.low else 0.0)
+    return features
+
+
+_erf = np.frompyfunc(math.erf, 1, 1)
+
+
+def _expected_improvement(X: np.ndarray, y: np.ndarray, candidates: np.ndarray,
+                          length_scale: float = 0.2, noise: float = 1e-3) -> np.ndarray:
+    """RBFカーネルのガウス過程で、候補点ごとの期待改善量（最大化）"""
+    std = y.std()
+    y = (y - y.mean()) / std if std > 0 else y - y.mean()
+
+    def kernel(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        d2 = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2)
+        return np.exp(-0.5 * d2 / length_scale ** 2)
+
+    L = np.linalg.cholesky(kernel(X, X) + noise * np.eye(len(X)))
+    alpha = np.linalg.solve(L.T, np.linalg.solve(L, y))
+    k_star = kernel(candidates, X)
+    mean = k_star @ alpha
+    v = np.linalg.solve(L, k_star.T)
+    sigma = np.sqrt(np.maximum(1.0 - (v ** 2).sum(axis=0), 1e-12))
+    z = (mean - y.max()) / sigma
+    cdf = 0.5 * (1.0 + _erf(z / math.sqrt(2.0)).astype(float))
+    pdf = np.exp(-0.5 * z ** 2) / math.sqrt(2.0 * math.pi)
+    return (mean - y.max()) * cdf + sigma * pdf
+
+
+def write_csv(rows: Sequence[Dict[str, Any]], path: str) -> None:
+    """結果表をCSVに書き出す（列はパラメータ → 指標の順）"""
+    params = [p for p in PARAMS if any(p in row for row in rows)]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=params + list(METRICS), extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def format_table(rows: Sequence[Dict[str, Any]], objective: str = "pnl", top: int = 10) -> str:
+    """objective の良い順（MINIMIZE の指標は小さい順）に上位 top 行を表にする"""
+    params = [p for p in PARAMS if any(p in row for row in rows)]
+    columns = params + list(METRICS)
+    ranked = sorted(rows, key=lambda row: objective_value(row, objective), reverse=True)[:top]
+
+    def cell(value: Any) -> str:
+        if isinstance(value, float):
+            return f"{value:.4f}" if abs(value) < 1e6 else f"{value:.3e}"
+        return str(value)
+
+    body = [[cell(row.get(c, "")) for c in columns] for row in ranked]
+    widths = [max([len(c)] + [len(line[i]) for line in body]) for i, c in enumerate(columns)]
+    lines = ["  ".join(c.rjust(w) for c, w in zip(columns, widths))]
+    lines += ["  ".join(v.rjust(w) for v, w in zip(line, widths)) for line in body]
+    return "\n".join(lines)
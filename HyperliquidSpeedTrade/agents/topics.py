@@ -0,0 +1,154 @@
+"""
+階層トピックとワイルドカード購読
+
+トピックは "." 区切りの階層（例: market.tick.BTC）。購読パターンでは
+- "*": ちょうど1階層に一致（market.tick.* は market.tick.BTC に一致）
+- "#": 0階層以上に一致（execution.# は execution / execution.filled / execution.filled.BTC に一致）
+
+パターンはトライ木で管理し、トピックごとの配信先は初回の publish で解決してキャッシュする。
+購読が変わったときだけキャッシュを捨てるため、publish は一致する購読者の数に比例するコストで済み、
+メッセージごとのリスト生成もない。
+"""
+from __future__ import annotations
+
+import itertools
+from typing import Callable, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+SEPARATOR = "."
+SINGLE = "*"
+MULTI = "#"
+
+
+def topic(*parts: str) -> str:
+    """階層トピックを組み立てる（例: topic("market.tick", "BTC") -> "market.tick.BTC"）"""
+    return SEPARATOR.join(parts)
+
+
+def market_tick_topic(symbol: str) -> str:
+    return topic("market.tick", symbol.upper())
+
+
+def market_book_topic(symbol: str) -> str:
+    return topic("market.book", symbol.upper())
+
+
+def market_trade_topic(symbol: str) -> str:
+    return topic("market.trade", symbol.upper())
+
+
+class _Node(Generic[T]):
+    __slots__ = ("children", "entries")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Node[T]"] = {}
+        self.entries: List[Tuple[int, T]] = []  # (登録順, 値)
+
+
+class TopicTrie(Generic[T]):
+    """購読パターンのトライ木"""
+
+    def __init__(self) -> None:
+        self._root: _Node[T] = _Node()
+        self._seq = itertools.count()
+
+    def insert(self, pattern: str, value: T) -> None:
+        node = self._root
+        for part in pattern.split(SEPARATOR):
+            node = node.children.setdefault(part, _Node())
+        node.entries.append((next(self._seq), value))
+
+    def remove(self, pattern: str, value: T) -> bool:
+        path = [self._root]
+        for part in pattern.split(SEPARATOR):
+            node = path[-1].children.get(part)
+            if node is None:
+                return False
+            path.append(node)
+        leaf = path[-1]
+        for i, (_, existing) in enumerate(leaf.entries):
+            if existing is value or existing == value:
+                del leaf.entries[i]
+                break
+        else:
+            return False
+        # 空になったノードを刈り取る
+        parts = pattern.split(SEPARATOR)
+        for depth in range(len(parts), 0, -1):
+            node = path[depth]
+            if node.entries or node.children:
+                break
+            del path[depth - 1].children[parts[depth - 1]]
+        return True
+
+    def match(self, topic_name: str, key: Callable[[T], Hashable] = id) -> List[T]:
+        """トピックに一致する値を登録順で返す（key が同じ値は最初の1つだけ）"""
+        found: List[Tuple[int, T]] = []
+        self._match(self._root, topic_name.split(SEPARATOR), 0, found)
+        found.sort(key=lambda entry: entry[0])
+        seen = set()
+        values = []
+        for _, value in found:
+            k = key(value)
+            if k not in seen:
+                seen.add(k)
+                values.append(value)
+        return values
+
+    def _match(self, node: _Node[T], parts: List[str], i: int, found: List[Tuple[int, T]]) -> None:
+        multi = node.children.get(MULTI)
+        if multi is not None:
+            # "#" は0階層以上を読み飛ばし、その先のパターン（a.#.z など）を続けて照合
+            for j in range(i, len(parts) + 1):
+                self._match(multi, parts, j, found)
+        if i == len(parts):
+            found.extend(node.entries)
+            return
+        child = node.children.get(parts[i])
+        if child is not None:
+            self._match(child, parts, i + 1, found)
+        single = node.children.get(SINGLE)
+        if single is not None:
+            self._match(single, parts, i + 1, found)
+
+
+class DispatchTable(Generic[T]):
+    """トピック -> 配信先タプルのキャッシュ付き解決
+
+    購読の追加・削除でキャッシュを破棄し、各トピックの初回 publish で作り直す。
+    """
+
+    def __init__(self, key: Callable[[T], Hashable] = id) -> None:
+        """
+        Args:
+            key: 重複判定のキー（同じ購読者に複数のパターンが一致しても1回だけ配信する）
+        """
+        self._key = key
+        self._trie: TopicTrie[T] = TopicTrie()
+        self._cache: Dict[str, Tuple[T, ...]] = {}
+        self.version = 0  # 購読が変わるたびに増える
+
+    def add(self, pattern: str, value: T) -> None:
+        self._trie.insert(pattern, value)
+        self._invalidate()
+
+    def remove(self, pattern: str, value: T) -> bool:
+        removed = self._trie.remove(pattern, value)
+        if removed:
+            self._invalidate()
+        return removed
+
+    def _invalidate(self) -> None:
+        self._cache = {}
+        self.version += 1
+
+    def resolve(self, topic_name: str) -> Tuple[T, ...]:
+        targets = self._cache.get(topic_name)
+        if targets is None:
+            targets = self._cache[topic_name] = tuple(self._trie.match(topic_name, self._key))
+        return targets
+
+    def first(self, topic_name: str) -> Optional[T]:
+        targets = self.resolve(topic_name)
+        return targets[0] if targets else None
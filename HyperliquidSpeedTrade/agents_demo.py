@@ -2,64 +2,84 @@
 マルチエージェント デモランナー（HYPE）
 
 使い方:
-  python agents_demo.py
+  python agents_demo.py          # 同期バス
+  python agents_demo.py --async  # 非同期バス（エージェントごとの受信箱とタスク）
+  python agents_demo.py --processes 2 --symbols HYPE,BTC,ETH  # 戦略を2つのワーカープロセスに分散
+  python agents_demo.py --processes 1 --symbols HYPE,BTC,ETH --vectorized  # 全通貨を1つの戦略でまとめて計算
+  python agents_demo.py --live --symbols HYPE  # Hyperliquid の実データ（WebSocket）で実行
+    （発注は AGENT_EXECUTION_MODE=live のときだけ。既定の dry_run は取引所に送らない）
 """
 from __future__ import annotations
 
+import argparse
+import asyncio
 import time
 
 from agents.base import Message
 from agents.bus import MessageBus
+from agents.async_bus import AsyncMessageBus, TopicPolicy, CONFLATE, DROP_OLDEST
 from agents.market_data import DemoMarketDataAgent
+from agents.market_data_hyperliquid import HyperliquidMarketDataAgent
+from agents.process_runtime import MAIN, ProcessRuntime
+from agents.topics import market_tick_topic
 from agents.strategy_scalper import ScalperAgent
+from agents.strategy_vectorized import VectorizedScalperAgent
 from agents.risk import RiskAgent
 from agents.execution import DryRunExecutionAgent
+from agents.execution_live import LiveExecutionAgent
 from agents.audit import AuditAgent
 
 
-def main() -> None:
-    bus = MessageBus()
+class Logger:
+    """ログ用の簡易サブスクライバ"""
+    name = "logger"
+    def on_start(self, b):
+        pass
+    def on_message(self, m, b):
+        if m.topic == "strategy.signal":
+            print(f"[SIGNAL] {m.payload}")
+        elif m.topic == "risk.approved":
+            print(f"[RISK]   {m.payload}")
+        elif m.topic == "execution.filled":
+            print(f"[FILL]   {m.payload}")
+        elif m.topic == "execution.partial":
+            print(f"[PART]   {m.payload}")
+        elif m.topic == "execution.rejected":
+            print(f"[REJECT] {m.payload}")
+        elif m.topic == "risk.blocked":
+            print(f"[BLOCK]  {m.payload}")
+        elif m.topic == "audit.pnL":
+            print(f"[PNL]    {m.payload}")
+    def on_stop(self):
+        pass
 
+
+def build_agents():
     market = DemoMarketDataAgent(symbol="HYPE", base_price=1.0, interval_ms=200)
     strat = ScalperAgent(symbol="HYPE", short=5, long=20, size=50.0)
     risk = RiskAgent(max_notional_per_trade_usd=150.0, max_consecutive_losses=3, cooldown_seconds=10)
     exec_agent = DryRunExecutionAgent()
     audit = AuditAgent()
+    return market, strat, risk, exec_agent, audit, Logger()
+
+
+# ログはワイルドカードで購読（market.tick.* 以外すべて）
+LOG_TOPICS = ["strategy.#", "risk.#", "execution.#", "audit.#"]
 
+
+def main() -> None:
+    bus = MessageBus()
+    market, strat, risk, exec_agent, audit, logger = build_agents()
     agents = [market, strat, risk, exec_agent, audit]
 
     # サブスクライブ設定
-    bus.subscribe("market.tick", strat)
+    bus.subscribe(market_tick_topic("HYPE"), strat)
     bus.subscribe("strategy.signal", risk)
     bus.subscribe("risk.approved", exec_agent)
     bus.subscribe("execution.filled", audit)
     bus.subscribe("audit.pnL", risk)
-
-    # ログ用の簡易サブスクライバ（匿名）
-    class Logger:
-        name = "logger"
-        def on_start(self, b):
-            pass
-        def on_message(self, m, b):
-            if m.topic == "strategy.signal":
-                print(f"[SIGNAL] {m.payload}")
-            elif m.topic == "risk.approved":
-                print(f"[RISK]   {m.payload}")
-            elif m.topic == "execution.filled":
-                print(f"[FILL]   {m.payload}")
-            elif m.topic == "risk.blocked":
-                print(f"[BLOCK]  {m.payload}")
-            elif m.topic == "audit.pnL":
-                print(f"[PNL]    {m.payload}")
-        def on_stop(self):
-            pass
-
-    logger = Logger()
-    bus.subscribe("strategy.signal", logger)
-    bus.subscribe("risk.approved", logger)
-    bus.subscribe("execution.filled", logger)
-    bus.subscribe("risk.blocked", logger)
-    bus.subscribe("audit.pnL", logger)
+    for topic in LOG_TOPICS:
+        bus.subscribe(topic, logger)
 
     bus.start(agents + [logger])
 
@@ -74,7 +94,147 @@ def main() -> None:
         bus.stop(agents + [logger])
 
 
+async def main_async() -> None:
+    # ティックは通貨ごとに最新値だけ残す。判断系のトピックは既定の block（取りこぼさない）
+    bus = AsyncMessageBus(default_capacity=256, policies={"market.tick.*": TopicPolicy(CONFLATE)})
+    market, strat, risk, exec_agent, audit, logger = build_agents()
+    agents = [market, strat, risk, exec_agent, audit]
+
+    bus.subscribe(market_tick_topic("HYPE"), strat)
+    bus.subscribe("strategy.signal", risk)
+    bus.subscribe("risk.approved", exec_agent)
+    # 約定は累積PnLと連敗判定に使うため block（取りこぼさない）。循環（監査→リスク）があっても止まらない
+    bus.subscribe("execution.filled", audit)
+    bus.subscribe("audit.pnL", risk)
+    # ログだけは遅れても売買の経路を止めないよう drop_oldest で購読
+    for topic in LOG_TOPICS:
+        bus.subscribe(topic, logger, policy=TopicPolicy(DROP_OLDEST))
+
+    await bus.start(agents + [logger])
+
+    print("--- Agents demo (async bus) running for HYPE (Ctrl+C to stop) ---")
+    last_report = time.time()
+    try:
+        while True:
+            market.tick(bus)
+            await asyncio.sleep(0.02)
+            if time.time() - last_report >= 10:
+                last_report = time.time()
+                print(f"[BUS]    {bus.metrics()}")
+    finally:
+        await bus.stop(agents + [logger])
+
+
+def main_multiprocess(processes: int, symbols: list, vectorized: bool = False) -> None:
+    # 市場データとリスク・実行・監査はメイン、通貨ごとの戦略はワーカーに順に割り当てる
+    runtime = ProcessRuntime()
+    markets = []
+    for i, symbol in enumerate(symbols):
+        market = DemoMarketDataAgent(symbol=symbol, base_price=1.0, interval_ms=200)
+        runtime.add(market, [])
+        markets.append(market)
+        if not vectorized:
+            strat = ScalperAgent(symbol=symbol, short=5, long=20, size=50.0)
+            runtime.add(strat, [market_tick_topic(symbol)], process=f"worker-{i % processes}" if processes else MAIN)
+    if vectorized:
+        # 全通貨を1つのエージェントで（allMids のフレームと個別ティックの両方を購読）
+        strat = VectorizedScalperAgent(short=5, long=20, size=50.0, symbols=symbols)
+        runtime.add(strat, ["market.mids", "market.tick.*"], process="worker-0" if processes else MAIN)
+    runtime.add(RiskAgent(max_notional_per_trade_usd=150.0, max_consecutive_losses=3, cooldown_seconds=10),
+                ["strategy.signal", "audit.pnL"])
+    # 実行・監査は全通貨で1つ（ポジションと直前の約定価格は通貨ごとに持つ）
+    exec_agent = DryRunExecutionAgent()
+    runtime.add(exec_agent, ["risk.approved"])
+    runtime.add(AuditAgent(), ["execution.filled"])
+    runtime.add(Logger(), LOG_TOPICS)
+
+    runtime.start()
+    print(f"--- Agents demo (processes={processes}) running for {', '.join(symbols)} (Ctrl+C to stop) ---")
+    last_report = time.time()
+    try:
+        while True:
+            for market in markets:
+                market.tick(runtime.bus)
+            runtime.poll()
+            time.sleep(0.02)
+            if time.time() - last_report >= 10:
+                last_report = time.time()
+                print(f"[RUNTIME] {runtime.metrics()}")
+                print(f"[POS]    {({symbol: exec_agent.position(symbol)[0] for symbol in symbols})}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runtime.stop()
+
+
+def main_live(symbols: list) -> None:
+    from config import Config
+    from hyperliquid_api import HyperliquidAPI
+
+    api = HyperliquidAPI()
+    mode = Config.AGENT_EXECUTION_MODE
+    if not api.initialize():
+        print("[MD] API未初期化のため、WebSocketのみで実行します（再接続時の欠損復旧なし）")
+        if mode == "live":
+            print("[EXEC] API未初期化のため dry_run で実行します")
+            mode = "dry_run"
+    bus = MessageBus()
+    # 市場データは専用スレッドからバスに配信する（tick() のループは不要）
+    market = HyperliquidMarketDataAgent(api, symbols=symbols)
+    agents = [market]
+    for symbol in symbols:
+        strat = ScalperAgent(symbol=symbol, short=5, long=20, size=50.0)
+        bus.subscribe(market_tick_topic(symbol), strat)
+        agents.append(strat)
+    risk = RiskAgent(max_notional_per_trade_usd=150.0, max_consecutive_losses=3, cooldown_seconds=10)
+    # 発注は注文ワーカーで行い、結果は call_threadsafe でバスに戻す
+    exec_agent = LiveExecutionAgent(api, mode=mode, reserve_calls=Config.AGENT_RATE_LIMIT_RESERVE,
+                                    workers=Config.ORDER_WORKERS, queue_size=Config.ORDER_QUEUE_SIZE)
+    audit = AuditAgent()
+    logger = Logger()
+    bus.subscribe("strategy.signal", risk)
+    bus.subscribe("risk.approved", exec_agent)
+    bus.subscribe("execution.filled", audit)
+    bus.subscribe("execution.partial", audit)
+    bus.subscribe("audit.pnL", risk)
+    for topic in LOG_TOPICS:
+        bus.subscribe(topic, logger)
+    agents += [risk, exec_agent, audit, logger]
+
+    bus.start(agents)
+    print(f"--- Agents demo (live) running for {', '.join(symbols)} (Ctrl+C to stop) ---")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"[MD]     {market.metrics()}")
+            print(f"[EXEC]   {exec_agent.metrics()}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        bus.stop(agents)
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="マルチエージェント デモランナー")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="非同期バスで実行")
+    parser.add_argument("--processes", type=int, default=None, metavar="N",
+                        help="戦略をN個のワーカープロセスに分散して実行（0でメインプロセスのみ）")
+    parser.add_argument("--live", action="store_true", help="Hyperliquid の実データで実行")
+    parser.add_argument("--symbols", default="HYPE", help="--processes / --live 時の通貨（カンマ区切り）")
+    parser.add_argument("--vectorized", action="store_true", help="--processes 時に全通貨を1つのベクトル化戦略で計算")
+    args = parser.parse_args()
+    symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+    if args.live:
+        # 実データの通貨名は大文字・小文字を区別する（kPEPE など）
+        main_live([s.strip() for s in args.symbols.split(",") if s.strip()])
+    elif args.processes is not None:
+        main_multiprocess(max(0, args.processes), symbols, vectorized=args.vectorized)
+    elif args.use_async:
+        try:
+            asyncio.run(main_async())
+        except KeyboardInterrupt:
+            pass
+    else:
+        main()
 
 
@@ -0,0 +1,75 @@
+"""
+エージェントパイプラインのバックテスト（agents_demo.py と同じ構成）
+
+戦略 → リスク → 実行（ドライラン）→ 監査 を、過去のティックまたはローソク足で仮想時刻のまま動かします。
+RiskAgent のクールダウンも仮想時刻で進むため、1か月分のデータが実時間を待たずに数秒で終わります。
+同じ --seed・同じデータなら結果（約定・PnL）は毎回同じです。
+
+使い方:
+  python backtest_agents.py --synthetic 30 --seed 1               # 1秒ティックの疑似データ30日分
+  python backtest_agents.py --ticks hype_ticks.csv --symbol HYPE  # ティックCSV（ts, price[, symbol]）
+  python backtest_agents.py --candles hype_1m.json --symbol HYPE  # candleSnapshot のJSON / OHLC のCSV
+"""
+from __future__ import annotations
+
+import argparse
+from typing import Iterable
+
+from agents.backtest import BacktestEngine, TickRow, load_candles, load_ticks, scalper_pipeline, synthetic_ticks
+
+
+def add_data_arguments(parser: argparse.ArgumentParser) -> None:
+    """データの指定（sweep_agents.py と共通）"""
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--ticks", metavar="CSV", help="ティックCSV（ts/time, price/px, 任意で symbol/coin）")
+    source.add_argument("--candles", metavar="FILE", help="ローソク足（candleSnapshot のJSON、または OHLC のCSV）")
+    source.add_argument("--synthetic", type=float, metavar="DAYS", help="疑似データの日数")
+    parser.add_argument("--symbol", default="HYPE", help="通貨（ファイルに symbol 列があればこの通貨の行だけ使う）")
+    parser.add_argument("--interval", type=float, default=None, help="--candles の足の長さ（秒。省略時は自動）")
+    parser.add_argument("--tick-interval", type=float, default=1.0, help="--synthetic のティック間隔（秒）")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード（スリッページ・疑似データ）")
+
+
+def load_data(args: argparse.Namespace) -> Iterable[TickRow]:
+    if args.ticks:
+        return load_ticks(args.ticks, args.symbol)
+    if args.candles:
+        return load_candles(args.candles, args.symbol, args.interval)
+    n = int(args.synthetic * 86400 / args.tick_interval)
+    return synthetic_ticks(args.symbol, n, interval=args.tick_interval, seed=args.seed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="エージェントパイプラインのバックテスト")
+    add_data_arguments(parser)
+    parser.add_argument("--short", type=int, default=5)
+    parser.add_argument("--long", type=int, default=20)
+    parser.add_argument("--size", type=float, default=50.0)
+    parser.add_argument("--max-notional", type=float, default=150.0)
+    parser.add_argument("--max-losses", type=int, default=3)
+    parser.add_argument("--cooldown", type=float, default=10.0, help="連敗後の停止時間（仮想時刻の秒）")
+    parser.add_argument("--fills", type=int, default=0, metavar="N", help="最後のN件の約定を表示")
+    args = parser.parse_args()
+
+    engine = BacktestEngine(seed=args.seed)
+    exec_agent = scalper_pipeline(engine, args.symbol, short=args.short, long=args.long, size=args.size,
+                                  max_notional=args.max_notional, max_losses=args.max_losses,
+                                  cooldown=args.cooldown)
+    result = engine.run(load_data(args), progress_every=1_000_000)
+
+    print(f"[BACKTEST] {args.symbol} seed={result['seed']}")
+    print(f"[BACKTEST] ティック {result['ticks']:,}（時刻順でないため除外 {result['skipped']:,}）"
+          f" / 仮想時間 {result['simulated_seconds'] / 86400:.2f}日")
+    print(f"[BACKTEST] 実行時間 {result['wall_seconds']:.2f}秒"
+          f"（{result['ticks_per_second']:,.0f} ティック/秒、実時間の {result['speedup']:,.0f}倍）")
+    for topic, count in result['messages'].items():
+        print(f"[BACKTEST]   {topic:<18} {count:>10,}")
+    print(f"[BACKTEST] 約定 {result['fills']:,} / 累積PnL {result['cum_pnl']:.6f}"
+          f" / 最大ドローダウン {result['max_drawdown']:.6f}"
+          f" / 最終ポジション {exec_agent.position(args.symbol)[0]:g}")
+    for ts, fill in engine.fills[-args.fills:] if args.fills else ():
+        print(f"[FILL]   t={ts:.0f} {fill.side} {fill.size:g} @ {fill.price:.6f} → {fill.position:g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+エージェントパイプラインのベンチマーク（agents_demo.py と同じ構成）
+
+戦略 → リスク → 実行 → 監査 の経路に合成ティックを間隔なしで流し、
+1秒あたりのメッセージ数と、メッセージ1件あたりの確保バイト数を測ります。
+
+- typed: 型付きメッセージ（agents/messages.py）を配信する現在のエージェント
+- dict: 従来の Message(topic, payload) を作って配信し、payload 辞書を直接読むエージェント
+  （判断のロジックは typed と同じで、メッセージの表現だけが違う）
+
+確保バイト数は tracemalloc で測ります。計測中は配信したメッセージをすべて保持して解放させず、
+増えたメモリ（保持用のリスト自体を除く）をメッセージ数で割ります。
+
+--scan N では N 通貨の allMids フレームを、通貨ごとの ScalperAgent と
+VectorizedScalperAgent（1エージェントで全通貨）に流してフレームあたりの処理時間を比べます。
+
+使い方:
+  python bench_agents.py                  # dict と typed を比較
+  python bench_agents.py --mode typed --ticks 500000
+  python bench_agents.py --scan 200       # 200通貨のユニバーススキャン
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import math
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from agents.audit import AuditAgent
+from agents.base import Message, Publisher
+from agents.bus import MessageBus
+from agents.execution import DryRunExecutionAgent, apply_fill
+from agents.messages import Mids, Tick
+from agents.risk import RiskAgent
+from agents.strategy_scalper import ScalperAgent
+from agents.strategy_vectorized import VectorizedScalperAgent
+from agents.topics import market_tick_topic
+
+SYMBOL = "HYPE"
+
+
+class CountingBus(MessageBus):
+    """配信したメッセージ数を数えるバス（keep=True なら配信したメッセージを保持する）"""
+
+    def __init__(self, keep: bool = False) -> None:
+        super().__init__()
+        self.published = 0
+        self.kept: List[Message] = []
+        self._keep = keep
+
+    def publish(self, message: Message) -> None:
+        self.published += 1
+        if self._keep:
+            self.kept.append(message)
+        super().publish(message)
+
+
+# ---- 比較用: payload 辞書を直接読み書きするエージェント（判断のロジックは現在のものと同じ） ----
+
+class DictScalperAgent(ScalperAgent):
+    def on_message(self, message: Message, bus: Publisher) -> None:
+        if message.topic != self.tick_topic:
+            return
+        price = float(message.payload["price"])
+        short_ma = self.short_ma.update(price)
+        long_ma = self.long_ma.update(price)
+        if short_ma is None or long_ma is None:
+            return
+        signal = None
+        if short_ma > long_ma and self.prev_signal != "BUY":
+            signal = "BUY"
+        elif short_ma < long_ma and self.prev_signal != "SELL":
+            signal = "SELL"
+        if signal:
+            self.prev_signal = signal
+            bus.publish(Message(topic="strategy.signal", payload={
+                "symbol": self.symbol, "side": signal, "size": self.size, "price": price}))
+
+
+class DictRiskAgent(RiskAgent):
+    def on_message(self, message: Message, bus: Publisher) -> None:
+        if message.topic == "strategy.signal":
+            if self.blocked_until_ts and self.clock.time() < self.blocked_until_ts:
+                bus.publish(Message(topic="risk.blocked",
+                                    payload={"reason": "cooldown", "until": self.blocked_until_ts}))
+                return
+            price = float(message.payload["price"])
+            size = float(message.payload["size"])
+            if price * size > self.max_notional:
+                size = self.max_notional / max(price, 1e-9)
+            bus.publish(Message(topic="risk.approved", payload={
+                "symbol": message.payload["symbol"], "side": message.payload["side"], "size": size, "price": price}))
+        elif message.topic == "audit.pnL":
+            if float(message.payload.get("pnl", 0.0)) < 0:
+                self.consecutive_losses += 1
+                if self.consecutive_losses >= self.max_consecutive_losses:
+                    self.blocked_until_ts = self.clock.time() + self.cooldown_seconds
+                    self.consecutive_losses = 0
+                    bus.publish(Message(topic="risk.blocked",
+                                        payload={"reason": "loss_streak", "until": self.blocked_until_ts}))
+            else:
+                self.consecutive_losses = 0
+
+
+class DictExecutionAgent(DryRunExecutionAgent):
+    def on_message(self, message: Message, bus: Publisher) -> None:
+        if message.topic != "risk.approved":
+            return
+        symbol = message.payload["symbol"]
+        side = message.payload["side"]
+        size = float(message.payload["size"])
+        exec_price = float(message.payload["price"]) * (1.0 + self.rng.uniform(-2.0, 2.0) / 10000.0)
+        position, avg_price = self._positions.get(symbol, (0.0, None))
+        position, avg_price = apply_fill(position, avg_price, size if side == "BUY" else -size, exec_price)
+        self._positions[symbol] = (position, avg_price)
+        bus.publish(Message(topic="execution.filled", payload={
+            "symbol": symbol, "side": side, "size": size, "price": exec_price,
+            "position": position, "avg_price": avg_price}))
+
+
+class DictAuditAgent(AuditAgent):
+    def on_message(self, message: Message, bus: Publisher) -> None:
+        if message.topic != "execution.filled":
+            return
+        symbol = message.payload["symbol"]
+        price = float(message.payload["price"])
+        size = float(message.payload["size"])
+        pnl = 0.0
+        last_price = self.last_fill_price.get(symbol)
+        if last_price is not None:
+            pnl = (price - last_price) * size if message.payload["side"] == "SELL" else (last_price - price) * size
+        self.last_fill_price[symbol] = price
+        self.cum_pnl += pnl
+        bus.publish(Message(topic="audit.pnL", payload={"pnl": pnl, "cum_pnl": self.cum_pnl}))
+
+
+def build_pipeline(mode: str, keep: bool = False) -> CountingBus:
+    bus = CountingBus(keep)
+    dict_mode = mode == "dict"
+    strat = (DictScalperAgent if dict_mode else ScalperAgent)(symbol=SYMBOL, short=5, long=20, size=50.0)
+    # クールダウンで経路が止まらないように0秒
+    risk = (DictRiskAgent if dict_mode else RiskAgent)(
+        max_notional_per_trade_usd=150.0, max_consecutive_losses=3, cooldown_seconds=0.0)
+    exec_agent = (DictExecutionAgent if dict_mode else DryRunExecutionAgent)()
+    audit = (DictAuditAgent if dict_mode else AuditAgent)()
+
+    bus.subscribe(market_tick_topic(SYMBOL), strat)
+    bus.subscribe("strategy.signal", risk)
+    bus.subscribe("risk.approved", exec_agent)
+    bus.subscribe("execution.filled", audit)
+    bus.subscribe("audit.pnL", risk)
+    bus.start([strat, risk, exec_agent, audit])
+    return bus
+
+
+def synthetic_prices(n: int) -> List[float]:
+    # 短い周期のサイン波で移動平均のクロスを頻繁に起こす
+    return [1.0 + 0.01 * math.sin(i * 0.3) + 0.002 * math.sin(i * 1.7) for i in range(n)]
+
+
+def tick_factory(mode: str) -> Callable[[float, float], Message]:
+    """市場データエージェントが配信するティック（dict は従来の payload 形式）"""
+    topic = market_tick_topic(SYMBOL)
+    if mode == "dict":
+        return lambda price, now: Message(topic=topic, payload={"symbol": SYMBOL, "price": price, "ts": now})
+    return lambda price, now: Tick(SYMBOL, price, now, topic=topic)
+
+
+def run(mode: str, ticks: int, alloc_ticks: int) -> Dict[str, float]:
+    prices = synthetic_prices(ticks)
+    make_tick = tick_factory(mode)
+    now = time.time()
+
+    # 1回目: 処理時間（tracemallocなし）
+    bus = build_pipeline(mode)
+    gc.collect()
+    t0 = time.perf_counter()
+    for price in prices:
+        bus.publish(make_tick(price, now))
+    elapsed = time.perf_counter() - t0
+    published = bus.published
+
+    # 2回目: 確保バイト数（配信したメッセージを保持して、増えた分をメッセージ数で割る）
+    bus = build_pipeline(mode, keep=True)
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for price in prices[:alloc_ticks]:
+        bus.publish(make_tick(price, now))
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocated = after - before - sys.getsizeof(bus.kept)
+
+    return {
+        "messages": published,
+        "seconds": elapsed,
+        "msgs_per_sec": published / elapsed if elapsed > 0 else 0.0,
+        "ns_per_msg": elapsed * 1e9 / published if published else 0.0,
+        "bytes_per_msg": allocated / max(bus.published, 1),
+    }
+
+
+class _SignalCounter:
+    def __init__(self) -> None:
+        self.published = 0
+
+    def publish(self, message: Message) -> None:
+        self.published += 1
+
+
+def synthetic_frames(coins: int, frames: int) -> List[Dict[str, str]]:
+    """allMids 形式（値は文字列）のフレーム。毎フレーム約7割の通貨の価格が動く"""
+    symbols = [f"C{i}" for i in range(coins)]
+    result = []
+    for t in range(frames):
+        frame = {}
+        for i, symbol in enumerate(symbols):
+            step = t if (t * 7 + i) % 10 < 7 else t - 1
+            frame[symbol] = f"{10.0 + 0.05 * math.sin(step * 0.3 + i) + 0.01 * math.sin(step * 1.7 + i):.5f}"
+        result.append(frame)
+    return result
+
+
+def run_scan(coins: int, frames: int) -> None:
+    data = synthetic_frames(coins, frames)
+
+    # 通貨ごとのエージェント（変更前）: 価格が変わった通貨だけティックとして配信
+    bus = CountingBus()
+    for symbol in data[0]:
+        bus.subscribe(market_tick_topic(symbol), ScalperAgent(symbol=symbol, short=5, long=20, size=1.0))
+    last: Dict[str, str] = {}
+    ticks = 0
+    t0 = time.perf_counter()
+    for frame in data:
+        for symbol, mid in frame.items():
+            if last.get(symbol) != mid:
+                last[symbol] = mid
+                ticks += 1
+                bus.publish(Tick(symbol, float(mid), 0.0))
+    per_agent = time.perf_counter() - t0
+    per_agent_signals = bus.published - ticks
+
+    # ベクトル化（1エージェントで全通貨）
+    sink = _SignalCounter()
+    agent = VectorizedScalperAgent(short=5, long=20, size=1.0)
+    t0 = time.perf_counter()
+    for frame in data:
+        agent.on_message(Mids(frame, 0.0), sink)
+    vectorized = time.perf_counter() - t0
+
+    print(f"[BENCH] scan {coins} coins x {frames} frames")
+    print(f"[BENCH] per-agent : {per_agent * 1e6 / frames:8.1f} us/frame ({per_agent_signals:,} signals)")
+    print(f"[BENCH] vectorized: {vectorized * 1e6 / frames:8.1f} us/frame ({sink.published:,} signals)")
+    print(f"[BENCH] vectorized / per-agent: {per_agent / max(vectorized, 1e-9):.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="エージェントパイプラインのベンチマーク")
+    parser.add_argument("--mode", choices=["dict", "typed", "both"], default="both")
+    parser.add_argument("--ticks", type=int, default=200000, help="合成ティック数")
+    parser.add_argument("--repeat", type=int, default=3, help="繰り返し回数（最速の回を表示）")
+    parser.add_argument("--alloc-ticks", type=int, default=20000,
+                        help="確保バイト数の計測に使うティック数（メッセージを保持するため少なめ）")
+    parser.add_argument("--scan", type=int, default=None, metavar="N", help="N通貨のユニバーススキャンを計測")
+    parser.add_argument("--frames", type=int, default=2000, help="--scan のフレーム数")
+    args = parser.parse_args()
+
+    if args.scan:
+        run_scan(args.scan, args.frames)
+        return
+
+    modes = ["dict", "typed"] if args.mode == "both" else [args.mode]
+    results = {}
+    for mode in modes:
+        best = None
+        for _ in range(args.repeat):
+            result = run(mode, args.ticks, min(args.alloc_ticks, args.ticks))
+            if best is None or result["seconds"] < best["seconds"]:
+                best = result
+        results[mode] = best
+        print(f"[BENCH] {mode:5s}: {best['messages']:,} msgs in {best['seconds']:.3f}s "
+              f"= {best['msgs_per_sec']:,.0f} msgs/s ({best['ns_per_msg']:.0f} ns/msg), "
+              f"{best['bytes_per_msg']:.0f} B/msg")
+
+    if "dict" in results and "typed" in results:
+        speedup = results["dict"]["seconds"] / max(results["typed"]["seconds"], 1e-9)
+        print(f"[BENCH] typed / dict: {speedup:.2f}x throughput, "
+              f"{results['dict']['bytes_per_msg']:.0f} -> {results['typed']['bytes_per_msg']:.0f} B/msg")
+
+
+if __name__ == "__main__":
+    main()
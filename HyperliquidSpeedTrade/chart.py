@@ -0,0 +1,163 @@
+"""
+チャートモジュール
+現在の通貨のティックライン・1秒足・1分足をCanvasに描画します。
+Canvasのアイテムは作り直さず、座標と色が変わったものだけを更新します
+"""
+from typing import List, Optional
+
+import numpy as np
+import tkinter as tk
+
+from price_history import PriceHistoryStore
+
+
+class PriceChart:
+    """インクリメンタル描画のプライスチャート
+
+    - ティックは1本のlineアイテムの座標だけを差し替える
+    - ローソク足は本数分の矩形・ヒゲをプールし、前回と座標が変わった足だけ更新する
+    - fpsごとに履歴のversionを確認し、変化がなければ何もしない
+    """
+
+    MODES = ('tick', '1s', '1m')
+    BG = "#1a1a1a"
+    UP = "#44FF44"
+    DOWN = "#FF4444"
+
+    def __init__(self, parent, store: PriceHistoryStore, width: int = 760, height: int = 140,
+                 max_candles: int = 90, max_ticks: int = 600, fps: int = 30):
+        self.store = store
+        self.width = width
+        self.height = height
+        self.max_candles = max_candles
+        self.max_ticks = max_ticks
+        self.interval_ms = max(1, int(1000 / fps))
+        self.symbol: Optional[str] = None
+        self.mode = 'tick'
+        self._drawn_version = -1
+        self._running = False
+
+        self.canvas = tk.Canvas(parent, width=width, height=height, bg=self.BG, highlightthickness=0)
+        self._tick_line = self.canvas.create_line(0, 0, 0, 0, fill="#4FC3F7", width=1.5)
+        self._last_line = self.canvas.create_line(0, 0, width, 0, fill="gray", dash=(2, 2))
+        self._high_text = self.canvas.create_text(width - 4, 4, anchor="ne", fill="gray", font=("", 9))
+        self._low_text = self.canvas.create_text(width - 4, height - 4, anchor="se", fill="gray", font=("", 9))
+        self._last_text = self.canvas.create_text(4, 4, anchor="nw", fill="white", font=("", 9, "bold"))
+        self._wicks: List[int] = []
+        self._bodies: List[int] = []
+        self._candle_state: List[Optional[tuple]] = []  # 足ごとの前回描画内容
+        for _ in range(max_candles):
+            self._wicks.append(self.canvas.create_line(0, 0, 0, 0, state="hidden"))
+            self._bodies.append(self.canvas.create_rectangle(0, 0, 0, 0, state="hidden", width=0))
+            self._candle_state.append(None)
+
+    def set_symbol(self, symbol: str):
+        """表示通貨を切り替え（履歴はメモリ上にあるため即時）"""
+        self.symbol = symbol
+        self._drawn_version = -1
+
+    def set_mode(self, mode: str):
+        """表示モード（'tick' / '1s' / '1m'）を切り替え"""
+        if mode in self.MODES:
+            self.mode = mode
+            self._drawn_version = -1
+
+    def start(self):
+        """fpsごとの描画ループを開始"""
+        if not self._running:
+            self._running = True
+            self.canvas.after(self.interval_ms, self._loop)
+
+    def stop(self):
+        self._running = False
+
+    def _loop(self):
+        if not self._running:
+            return
+        try:
+            self.redraw()
+        finally:
+            self.canvas.after(self.interval_ms, self._loop)
+
+    def redraw(self):
+        """表示中の通貨の履歴が更新されていれば描画"""
+        if not self.symbol:
+            return
+        version = self.store.coin_version(self.symbol)
+        if version == self._drawn_version:
+            return
+        self._drawn_version = version
+        if self.mode == 'tick':
+            self._draw_ticks()
+        else:
+            self._draw_candles()
+
+    def _scale(self, low: float, high: float):
+        pad = (high - low) * 0.05 or max(abs(high) * 0.0005, 1e-9)
+        low, high = low - pad, high + pad
+        return lambda values: (high - values) / (high - low) * self.height
+
+    def _draw_labels(self, last: float, low: float, high: float, y_of):
+        y_last = float(y_of(np.array([last]))[0])
+        self.canvas.coords(self._last_line, 0, y_last, self.width, y_last)
+        self.canvas.itemconfigure(self._last_text, text=f"{self.symbol} {self.mode}  ${last:,.4f}")
+        self.canvas.itemconfigure(self._high_text, text=f"${high:,.4f}")
+        self.canvas.itemconfigure(self._low_text, text=f"${low:,.4f}")
+
+    def _draw_ticks(self):
+        self._hide_candles()
+        _, prices = self.store.ticks(self.symbol, self.max_ticks)
+        if len(prices) < 2:
+            self.canvas.coords(self._tick_line, 0, 0, 0, 0)
+            return
+        low, high = float(prices.min()), float(prices.max())
+        y_of = self._scale(low, high)
+        xs = np.linspace(0, self.width - 60, len(prices))
+        # x, y を交互に並べた座標列で1本のlineを更新
+        coords = np.empty(len(prices) * 2)
+        coords[0::2] = xs
+        coords[1::2] = y_of(prices)
+        self.canvas.coords(self._tick_line, *coords.tolist())
+        self._draw_labels(float(prices[-1]), low, high, y_of)
+
+    def _draw_candles(self):
+        self.canvas.coords(self._tick_line, 0, 0, 0, 0)
+        _, ohlc = self.store.candles(self.symbol, self.mode, self.max_candles)
+        n = len(ohlc)
+        if n == 0:
+            self._hide_candles()
+            return
+        low, high = float(np.nanmin(ohlc[:, 2])), float(np.nanmax(ohlc[:, 1]))
+        y_of = self._scale(low, high)
+        ys = y_of(ohlc)  # (n, 4)
+        slot = (self.width - 60) / self.max_candles
+        body_w = max(1.0, slot * 0.7)
+
+        for i in range(self.max_candles):
+            if i >= n:
+                if self._candle_state[i] is not None:
+                    self.canvas.itemconfigure(self._wicks[i], state="hidden")
+                    self.canvas.itemconfigure(self._bodies[i], state="hidden")
+                    self._candle_state[i] = None
+                continue
+            o, h, l, c = ys[i]
+            x = (i + 0.5) * slot
+            color = self.UP if ohlc[i, 3] >= ohlc[i, 0] else self.DOWN
+            state = (round(x, 1), round(o, 1), round(h, 1), round(l, 1), round(c, 1), color)
+            if state == self._candle_state[i]:
+                continue  # 前回と同じ（通常は最新の足だけが変わる）
+            self._candle_state[i] = state
+            top, bottom = min(o, c), max(o, c)
+            self.canvas.coords(self._wicks[i], x, h, x, l)
+            self.canvas.coords(self._bodies[i], x - body_w / 2, top, x + body_w / 2, max(bottom, top + 1))
+            self.canvas.itemconfigure(self._wicks[i], fill=color, state="normal")
+            self.canvas.itemconfigure(self._bodies[i], fill=color, state="normal")
+
+        self._draw_labels(float(ohlc[-1, 3]), low, high, y_of)
+
+    def _hide_candles(self):
+        for i, state in enumerate(self._candle_state):
+            if state is not None:
+                self.canvas.itemconfigure(self._wicks[i], state="hidden")
+                self.canvas.itemconfigure(self._bodies[i], state="hidden")
+                self._candle_state[i] = None
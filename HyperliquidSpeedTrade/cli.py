@@ -8,6 +8,7 @@ CLI エントリポイント（裁量補助向け・ヘッドレス運用）
   - positions: 現在のポジション一覧を表示
   - open-orders: 未約定注文一覧を表示
   - price: 指定シンボルの現在価格を表示
+  - order: 新規注文（--tp/--slで取引所ネイティブのTP/SLを同時発注）
 """
 import argparse
 import sys
@@ -125,6 +126,21 @@ def cmd_price(args: argparse.Namespace) -> int:
     return 0
 
 
+def cmd_order(args: argparse.Namespace) -> int:
+    api = HyperliquidAPI()
+    if not api.initialize():
+        return 1
+    is_buy = args.side == "buy"
+    if args.tp is not None or args.sl is not None:
+        result = api.place_order_with_tpsl(args.symbol, is_buy, args.size, args.limit, args.tp, args.sl)
+    elif args.limit is not None:
+        result = api.place_limit_order(args.symbol, is_buy, args.size, args.limit)
+    else:
+        result = api.place_market_order(args.symbol, is_buy, args.size)
+    print(result.get("message", ""))
+    return 0 if result.get("success") else 2
+
+
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(prog="hl-cli", description="Hyperliquid 裁量補助 CLI")
     sub = parser.add_subparsers(dest="command")
@@ -149,6 +165,15 @@ def build_parser() -> argparse.ArgumentParser:
     p_price.add_argument("--symbol", type=str, help="通貨シンボル (例: BTC)")
     p_price.set_defaults(func=cmd_price)
 
+    p_order = sub.add_parser("order", help="新規注文 (--tp/--slで取引所ネイティブTP/SLを同時発注)")
+    p_order.add_argument("symbol", type=str, help="通貨シンボル (例: BTC)")
+    p_order.add_argument("side", choices=["buy", "sell"], help="売買方向")
+    p_order.add_argument("size", type=float, help="注文サイズ")
+    p_order.add_argument("--limit", type=float, help="指値価格 (省略時は成行)")
+    p_order.add_argument("--tp", type=float, help="利確トリガー価格 (指値で発注)")
+    p_order.add_argument("--sl", type=float, help="損切りトリガー価格 (成行で発注)")
+    p_order.set_defaults(func=cmd_order)
+
     return parser
 
 
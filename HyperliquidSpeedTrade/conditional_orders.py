@@ -0,0 +1,370 @@
+"""
+条件付き注文エンジンモジュール
+ストップ・利確・OCO・トレーリングストップをクライアント側で監視し、
+価格がトリガーに達したら注文ディスパッチ経由で成行注文を発注します
+"""
+import bisect
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class ConditionalOrder:
+    """条件付き注文（トリガー）
+
+    direction:
+        'above' … 価格がtrigger_px以上になったら発動（買いストップ、売り利確）
+        'below' … 価格がtrigger_px以下になったら発動（売りストップ、買い利確）
+    """
+
+    KINDS = ('stop', 'take_profit', 'trailing')
+
+    def __init__(self, order_id: str, coin: str, kind: str, is_buy: bool, size: float,
+                 trigger_px: float = 0.0, reduce_only: bool = True, oco_group: Optional[str] = None,
+                 trail_pct: Optional[float] = None, extreme_px: Optional[float] = None,
+                 created_at: Optional[float] = None):
+        if kind not in self.KINDS:
+            raise ValueError(f"未対応の条件注文タイプです: {kind}")
+        self.order_id = order_id
+        self.coin = coin
+        self.kind = kind
+        self.is_buy = is_buy
+        self.size = size
+        self.trigger_px = trigger_px
+        self.reduce_only = reduce_only
+        self.oco_group = oco_group
+        self.trail_pct = trail_pct  # トレーリング幅（%）
+        self.extreme_px = extreme_px  # トレーリング中の最高値（売り）/最安値（買い）
+        self.created_at = created_at or time.time()
+        # OCOで発動したときに取り消した相手（発注できずに restore() するとき一緒に戻す。保存はしない）
+        self.cancelled_siblings: List['ConditionalOrder'] = []
+
+    @property
+    def direction(self) -> str:
+        """発動方向（'above' / 'below'）"""
+        if self.kind == 'take_profit':
+            return 'below' if self.is_buy else 'above'
+        # ストップ・トレーリングは逆行方向で発動
+        return 'above' if self.is_buy else 'below'
+
+    def is_new_extreme(self, price: float) -> bool:
+        """トレーリングの基準価格を更新する価格か（売りは高値更新、買いは安値更新）"""
+        if self.kind != 'trailing' or not self.trail_pct:
+            return False
+        return self.extreme_px is None or (price < self.extreme_px if self.is_buy else price > self.extreme_px)
+
+    def update_trailing(self, price: float) -> bool:
+        """トレーリングの基準価格を更新（トリガー価格が動いたらTrue）"""
+        if not self.is_new_extreme(price):
+            return False
+        self.extreme_px = price
+        ratio = self.trail_pct / 100.0
+        self.trigger_px = price * (1 + ratio) if self.is_buy else price * (1 - ratio)
+        return True
+
+    def describe(self) -> str:
+        """ログ表示用の説明"""
+        labels = {'stop': 'ストップ', 'take_profit': '利確', 'trailing': 'トレーリング'}
+        side = '買い' if self.is_buy else '売り'
+        text = f"{self.coin} {labels[self.kind]} {side} {self.size} @ ${self.trigger_px:,.4f}"
+        if self.kind == 'trailing':
+            text += f" (幅 {self.trail_pct}%)"
+        if self.oco_group:
+            text += " [OCO]"
+        return text
+
+    def to_dict(self) -> Dict:
+        return {
+            'order_id': self.order_id,
+            'coin': self.coin,
+            'kind': self.kind,
+            'is_buy': self.is_buy,
+            'size': self.size,
+            'trigger_px': self.trigger_px,
+            'reduce_only': self.reduce_only,
+            'oco_group': self.oco_group,
+            'trail_pct': self.trail_pct,
+            'extreme_px': self.extreme_px,
+            'created_at': self.created_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ConditionalOrder':
+        return cls(**data)
+
+
+class _CoinTriggerIndex:
+    """1通貨分のトリガー索引（トリガー価格でソート済み）
+
+    above側は昇順、below側は符号反転して昇順に保持し、
+    どちらも「先頭からk件」が発動対象になるようにしています。
+    """
+
+    def __init__(self):
+        self.above_keys: List[float] = []
+        self.above_orders: List[ConditionalOrder] = []
+        self.below_keys: List[float] = []
+        self.below_orders: List[ConditionalOrder] = []
+
+    def __len__(self):
+        return len(self.above_orders) + len(self.below_orders)
+
+    def _side(self, order: ConditionalOrder):
+        if order.direction == 'above':
+            return self.above_keys, self.above_orders, order.trigger_px
+        return self.below_keys, self.below_orders, -order.trigger_px
+
+    def insert(self, order: ConditionalOrder):
+        keys, orders, key = self._side(order)
+        i = bisect.bisect_right(keys, key)
+        keys.insert(i, key)
+        orders.insert(i, order)
+
+    def remove(self, order: ConditionalOrder) -> bool:
+        keys, orders, key = self._side(order)
+        i = bisect.bisect_left(keys, key)
+        while i < len(keys) and keys[i] == key:
+            if orders[i] is order:
+                del keys[i]
+                del orders[i]
+                return True
+            i += 1
+        return False
+
+    def pop_triggered(self, price: float) -> List[ConditionalOrder]:
+        """priceで発動する注文を取り出す（O(log n + 発動件数)）"""
+        fired: List[ConditionalOrder] = []
+        k = bisect.bisect_right(self.above_keys, price)
+        if k:
+            fired.extend(self.above_orders[:k])
+            del self.above_keys[:k]
+            del self.above_orders[:k]
+        k = bisect.bisect_right(self.below_keys, -price)
+        if k:
+            fired.extend(self.below_orders[:k])
+            del self.below_keys[:k]
+            del self.below_orders[:k]
+        return fired
+
+
+class ConditionalOrderEngine:
+    """条件付き注文エンジン
+
+    - 通貨ごとにトリガー価格でソートした索引を持ち、価格更新ごとに二分探索で判定
+    - 発動した注文はfire_callbackに渡す（呼び出し側で注文ディスパッチへ投入）
+    - OCOは同じグループの片方が発動したら残りを取り消す
+    - 登録内容はJSONファイルに保存し、再起動後も引き継ぐ
+    """
+
+    def __init__(self, fire_callback: Optional[Callable[[ConditionalOrder], None]] = None,
+                 storage_path: Optional[str] = None):
+        """
+        Args:
+            fire_callback: 発動時に呼ばれるコールバック（価格ストリームのスレッドから呼ばれる）
+            storage_path: 保存先JSONファイル（Noneなら保存しない）
+        """
+        self.fire_callback = fire_callback
+        self.storage_path = storage_path
+        self._lock = threading.Lock()
+        self._orders: Dict[str, ConditionalOrder] = {}
+        self._index: Dict[str, _CoinTriggerIndex] = {}
+        self._trailing: Dict[str, List[ConditionalOrder]] = {}
+        self._last_px: Dict[str, float] = {}
+        self._ids = itertools.count(1)
+        self._dirty = False  # トレーリング基準価格の未保存変更
+
+    def add(self, coin: str, kind: str, is_buy: bool, size: float, trigger_px: float = 0.0,
+            reduce_only: bool = True, oco_group: Optional[str] = None,
+            trail_pct: Optional[float] = None) -> ConditionalOrder:
+        """条件付き注文を登録
+
+        トレーリングではtrigger_pxを基準価格として扱います（省略時は直近の判定価格）。
+        """
+        with self._lock:
+            order = ConditionalOrder(self._next_id(), coin, kind, is_buy, size, trigger_px,
+                                     reduce_only, oco_group, trail_pct)
+            if kind == 'trailing':
+                # 登録時点の価格を基準にトリガー価格を決める
+                reference_px = trigger_px or self._last_px.get(coin)
+                if not reference_px:
+                    raise ValueError(f"{coin}の現在価格が未取得のためトレーリングを登録できません")
+                order.update_trailing(reference_px)
+            self._insert(order)
+            self._save_locked()
+            return order
+
+    def add_oco(self, coin: str, is_buy: bool, size: float, stop_px: float, take_profit_px: float,
+                reduce_only: bool = True) -> List[ConditionalOrder]:
+        """ストップと利確をOCOで登録（片方が発動したらもう片方を取り消す）"""
+        group = f"oco-{int(time.time() * 1000)}"
+        with self._lock:
+            orders = [
+                ConditionalOrder(self._next_id(), coin, 'stop', is_buy, size, stop_px, reduce_only, group),
+                ConditionalOrder(self._next_id(), coin, 'take_profit', is_buy, size, take_profit_px, reduce_only, group),
+            ]
+            for order in orders:
+                self._insert(order)
+            self._save_locked()
+            return orders
+
+    def restore(self, order: ConditionalOrder):
+        """発動済みの注文を再登録（発注できなかった場合）。OCOなら取り消した相手も戻す"""
+        with self._lock:
+            siblings, order.cancelled_siblings = order.cancelled_siblings, []
+            restored = [o for o in [order] + siblings if o.order_id not in self._orders]
+            if not restored:
+                return
+            for item in restored:
+                self._insert(item)
+            self._last_px.pop(order.coin, None)  # 同じ価格でも次の更新で再判定させる
+            self._save_locked()
+
+    def cancel(self, order_id: str) -> bool:
+        """条件付き注文を取り消す"""
+        with self._lock:
+            order = self._orders.get(order_id)
+            if not order:
+                return False
+            self._remove(order)
+            self._save_locked()
+            return True
+
+    def cancel_coin(self, coin: str) -> int:
+        """指定通貨の条件付き注文をすべて取り消す"""
+        with self._lock:
+            targets = [o for o in self._orders.values() if o.coin == coin]
+            for order in targets:
+                self._remove(order)
+            if targets:
+                self._save_locked()
+            return len(targets)
+
+    def orders(self, coin: Optional[str] = None) -> List[ConditionalOrder]:
+        """登録中の条件付き注文一覧"""
+        with self._lock:
+            return [o for o in self._orders.values() if coin is None or o.coin == coin]
+
+    def count(self) -> int:
+        """登録中の条件付き注文数"""
+        with self._lock:
+            return len(self._orders)
+
+    def on_prices(self, mids: Dict[str, str]):
+        """価格更新（allMids）でトリガーを判定
+
+        トリガーを持つ通貨だけを見るため、購読銘柄数ではなく
+        トリガー登録通貨数 × log(トリガー数) のコストで済みます。
+        """
+        fired: List[ConditionalOrder] = []
+        with self._lock:
+            for coin in list(self._index):
+                raw = mids.get(coin)
+                if raw is None:
+                    continue
+                price = float(raw)
+                if self._last_px.get(coin) == price:
+                    continue
+                self._last_px[coin] = price
+
+                # トレーリングは基準価格が更新された時だけ索引を付け替える
+                index = self._index[coin]
+                for order in self._trailing.get(coin, ()):
+                    if order.is_new_extreme(price):
+                        index.remove(order)
+                        order.update_trailing(price)
+                        index.insert(order)
+                        self._dirty = True
+
+                for order in self._index[coin].pop_triggered(price):
+                    if order.order_id not in self._orders:
+                        continue  # 同じティックでOCOの相手が先に発動済み
+                    self._forget(order)
+                    fired.append(order)
+                    if order.oco_group:
+                        siblings = [o for o in self._orders.values() if o.oco_group == order.oco_group]
+                        for sibling in siblings:
+                            self._remove(sibling)
+                        order.cancelled_siblings = siblings
+
+            if fired:
+                self._save_locked()
+
+        for order in fired:
+            if self.fire_callback:
+                try:
+                    self.fire_callback(order)
+                except Exception as e:
+                    print(f"[CONDITIONAL] 発動処理でエラー: {e}")
+
+    def flush(self):
+        """トレーリング基準価格などの未保存変更を保存"""
+        with self._lock:
+            if self._dirty:
+                self._save_locked()
+
+    def load(self) -> int:
+        """保存済みの条件付き注文を読み込む"""
+        if not self.storage_path or not os.path.exists(self.storage_path):
+            return 0
+        try:
+            with open(self.storage_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[CONDITIONAL] 条件付き注文の読み込みに失敗しました: {e}")
+            return 0
+
+        with self._lock:
+            max_id = 0
+            for item in data.get('orders', []):
+                try:
+                    order = ConditionalOrder.from_dict(item)
+                except (TypeError, ValueError):
+                    continue
+                self._insert(order)
+                if order.order_id.isdigit():
+                    max_id = max(max_id, int(order.order_id))
+            self._ids = itertools.count(max_id + 1)
+            return len(self._orders)
+
+    def _next_id(self) -> str:
+        return str(next(self._ids))
+
+    def _insert(self, order: ConditionalOrder):
+        self._orders[order.order_id] = order
+        self._index.setdefault(order.coin, _CoinTriggerIndex()).insert(order)
+        if order.kind == 'trailing':
+            self._trailing.setdefault(order.coin, []).append(order)
+
+    def _remove(self, order: ConditionalOrder):
+        index = self._index.get(order.coin)
+        if index:
+            index.remove(order)
+        self._forget(order)
+
+    def _forget(self, order: ConditionalOrder):
+        self._orders.pop(order.order_id, None)
+        if order.kind == 'trailing':
+            trailing = self._trailing.get(order.coin, [])
+            if order in trailing:
+                trailing.remove(order)
+            if not trailing:
+                self._trailing.pop(order.coin, None)
+        index = self._index.get(order.coin)
+        if index is not None and not len(index):
+            del self._index[order.coin]
+
+    def _save_locked(self):
+        self._dirty = False
+        if not self.storage_path:
+            return
+        data = {'orders': [o.to_dict() for o in self._orders.values()]}
+        tmp_path = f"{self.storage_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.storage_path)  # 書き込み途中で落ちても壊れないように
+        except OSError as e:
+            print(f"[CONDITIONAL] 条件付き注文の保存に失敗しました: {e}")
@@ -80,6 +80,45 @@ class Config:
         print("警告: MAX_NOTIONAL_PER_ORDERの値が不正です。既定値を使用します。")
         MAX_NOTIONAL_PER_ORDER = 50000 if USE_TESTNET else 10000
     
+    # ウォッチリスト設定（購読中の全通貨を一覧表示、表示行数分だけウィジェットを作成）
+    WATCHLIST_ENABLED = os.getenv('WATCHLIST_ENABLED', 'True').lower() == 'true'
+    try:
+        WATCHLIST_ROWS = int(os.getenv('WATCHLIST_ROWS', '20'))
+        if WATCHLIST_ROWS <= 0:
+            print("警告: WATCHLIST_ROWSは正の数である必要があります。デフォルト値20を使用します。")
+            WATCHLIST_ROWS = 20
+    except (ValueError, TypeError):
+        print("警告: WATCHLIST_ROWSの値が不正です。デフォルト値20を使用します。")
+        WATCHLIST_ROWS = 20
+    
+    # チャート設定（全購読通貨のティック・1秒足・1分足をメモリに保持）
+    CHART_ENABLED = os.getenv('CHART_ENABLED', 'True').lower() == 'true'
+    try:
+        CHART_FPS = int(os.getenv('CHART_FPS', '30'))
+        CHART_TICK_CAPACITY = int(os.getenv('CHART_TICK_CAPACITY', '3600'))  # 保持するティック数
+        CHART_CANDLE_CAPACITY = int(os.getenv('CHART_CANDLE_CAPACITY', '720'))  # 時間足ごとに保持する本数
+        if CHART_FPS <= 0 or CHART_TICK_CAPACITY <= 0 or CHART_CANDLE_CAPACITY <= 0:
+            print("警告: CHART_FPS/CHART_TICK_CAPACITY/CHART_CANDLE_CAPACITYは正の数である必要があります。既定値を使用します。")
+            CHART_FPS = 30
+            CHART_TICK_CAPACITY = 3600
+            CHART_CANDLE_CAPACITY = 720
+    except (ValueError, TypeError):
+        print("警告: チャート設定の値が不正です。既定値を使用します。")
+        CHART_FPS = 30
+        CHART_TICK_CAPACITY = 3600
+        CHART_CANDLE_CAPACITY = 720
+    
+    # 板ラダー設定（現在の通貨のL2板を購読）
+    DOM_ENABLED = os.getenv('DOM_ENABLED', 'True').lower() == 'true'
+    try:
+        DOM_LEVELS = int(os.getenv('DOM_LEVELS', '10'))  # 片側の表示段数
+        if DOM_LEVELS <= 0:
+            print("警告: DOM_LEVELSは正の数である必要があります。デフォルト値10を使用します。")
+            DOM_LEVELS = 10
+    except (ValueError, TypeError):
+        print("警告: DOM_LEVELSの値が不正です。デフォルト値10を使用します。")
+        DOM_LEVELS = 10
+    
     # WebSocket設定
     WS_RECONNECT_DELAY = 5  # 秒
     
@@ -87,7 +126,112 @@ class Config:
     RATE_LIMIT_MAX_CALLS = int(os.getenv('RATE_LIMIT_MAX_CALLS', '12'))  # 60秒あたりの最大呼び出し数
     RATE_LIMIT_PERIOD = int(os.getenv('RATE_LIMIT_PERIOD', '60'))  # 期間（秒）
     RATE_LIMIT_PRIORITY_BYPASS = os.getenv('RATE_LIMIT_PRIORITY_BYPASS', 'True').lower() == 'true'  # 高優先度バイパス
-    
+
+    # 注文ディスパッチ設定（事前起動ワーカー数と、ワーカーごとの待機キュー上限）
+    try:
+        ORDER_WORKERS = int(os.getenv('ORDER_WORKERS', '4'))
+        ORDER_QUEUE_SIZE = int(os.getenv('ORDER_QUEUE_SIZE', '8'))
+        if ORDER_WORKERS <= 0 or ORDER_QUEUE_SIZE <= 0:
+            print("警告: ORDER_WORKERS/ORDER_QUEUE_SIZEは正の数である必要があります。既定値を使用します。")
+            ORDER_WORKERS = 4
+            ORDER_QUEUE_SIZE = 8
+    except (ValueError, TypeError):
+        print("警告: ORDER_WORKERS/ORDER_QUEUE_SIZEの値が不正です。既定値を使用します。")
+        ORDER_WORKERS = 4
+        ORDER_QUEUE_SIZE = 8
+
+    # エージェントの注文実行（dry_run: 取引所に送らず約定をシミュレート / live: 実際に発注）
+    AGENT_EXECUTION_MODE = os.getenv('AGENT_EXECUTION_MODE', 'dry_run').lower()
+    if AGENT_EXECUTION_MODE not in ('dry_run', 'live'):
+        print("警告: AGENT_EXECUTION_MODEはdry_runまたはliveである必要があります。dry_runを使用します。")
+        AGENT_EXECUTION_MODE = 'dry_run'
+    # 手動注文・決済のために残しておくレートリミットの呼び出し数（残りがこれ以下ならエージェントの注文は拒否）
+    try:
+        AGENT_RATE_LIMIT_RESERVE = int(os.getenv('AGENT_RATE_LIMIT_RESERVE', '2'))
+        if AGENT_RATE_LIMIT_RESERVE < 0:
+            print("警告: AGENT_RATE_LIMIT_RESERVEは0以上である必要があります。デフォルト値2を使用します。")
+            AGENT_RATE_LIMIT_RESERVE = 2
+    except (ValueError, TypeError):
+        print("警告: AGENT_RATE_LIMIT_RESERVEの値が不正です。デフォルト値2を使用します。")
+        AGENT_RATE_LIMIT_RESERVE = 2
+
+    # 条件付き注文（ストップ・利確・OCO・トレーリング）の保存先
+    CONDITIONAL_ORDERS_FILE = os.getenv(
+        'CONDITIONAL_ORDERS_FILE',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'conditional_orders.json')
+    )
+
+    # レイテンシ計測（クリック→取引所応答・価格受信→描画の区間別ヒストグラム）
+    LATENCY_TRACING = os.getenv('LATENCY_TRACING', 'True').lower() == 'true'
+    LATENCY_EXPORT_FILE = os.getenv(
+        'LATENCY_EXPORT_FILE',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs', 'latency.json')
+    )
+
+    # 通貨ペア選択（お気に入り・最近使った通貨の保存先と、候補の表示件数）
+    SYMBOL_PREFS_FILE = os.getenv(
+        'SYMBOL_PREFS_FILE',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'symbol_prefs.json')
+    )
+    try:
+        SYMBOL_PICKER_RESULTS = int(os.getenv('SYMBOL_PICKER_RESULTS', '10'))
+        if SYMBOL_PICKER_RESULTS <= 0:
+            print("警告: SYMBOL_PICKER_RESULTSは正の数である必要があります。デフォルト値10を使用します。")
+            SYMBOL_PICKER_RESULTS = 10
+    except (ValueError, TypeError):
+        print("警告: SYMBOL_PICKER_RESULTSの値が不正です。デフォルト値10を使用します。")
+        SYMBOL_PICKER_RESULTS = 10
+
+    # 約定ログ設定（GUIに残す行数と、ローテーション付きファイル出力）
+    try:
+        LOG_MAX_LINES = int(os.getenv('LOG_MAX_LINES', '500'))
+        LOG_FILE_MAX_BYTES = int(os.getenv('LOG_FILE_MAX_BYTES', str(5 * 1024 * 1024)))
+        LOG_FILE_BACKUP_COUNT = int(os.getenv('LOG_FILE_BACKUP_COUNT', '5'))
+        if LOG_MAX_LINES <= 0 or LOG_FILE_MAX_BYTES <= 0 or LOG_FILE_BACKUP_COUNT < 0:
+            print("警告: LOG_MAX_LINES/LOG_FILE_MAX_BYTES/LOG_FILE_BACKUP_COUNTの値が不正です。既定値を使用します。")
+            LOG_MAX_LINES = 500
+            LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+            LOG_FILE_BACKUP_COUNT = 5
+    except (ValueError, TypeError):
+        print("警告: 約定ログ設定の値が不正です。既定値を使用します。")
+        LOG_MAX_LINES = 500
+        LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+        LOG_FILE_BACKUP_COUNT = 5
+    # 空文字にするとファイル出力なし
+    LOG_FILE = os.getenv(
+        'LOG_FILE',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs', 'execution.log')
+    )
+
+    # エンジンプロセス設定（engine_server.py の待ち受け先。GUIは --engine で接続）
+    ENGINE_HOST = os.getenv('ENGINE_HOST', '127.0.0.1')  # 既定はローカルのみ
+    try:
+        ENGINE_PORT = int(os.getenv('ENGINE_PORT', '8765'))
+        if not 0 < ENGINE_PORT < 65536:
+            print("警告: ENGINE_PORTの値が範囲外です。デフォルト値8765を使用します。")
+            ENGINE_PORT = 8765
+    except (ValueError, TypeError):
+        print("警告: ENGINE_PORTの値が不正です。デフォルト値8765を使用します。")
+        ENGINE_PORT = 8765
+    # 接続時に照合する共有トークン（ローカル以外で待ち受ける場合は必須）
+    ENGINE_TOKEN = os.getenv('ENGINE_TOKEN', '')
+
+    # デッドマンスイッチ設定（取引所側のスケジュールキャンセルを定期的に先送りする）
+    # プロセスが停止すると、TIMEOUT秒後に取引所側で全未約定注文がキャンセルされる
+    DEAD_MAN_SWITCH_ENABLED = os.getenv('DEAD_MAN_SWITCH_ENABLED', 'False').lower() == 'true'
+    try:
+        DEAD_MAN_SWITCH_INTERVAL = float(os.getenv('DEAD_MAN_SWITCH_INTERVAL', '15'))  # 更新間隔（秒）
+        DEAD_MAN_SWITCH_TIMEOUT = float(os.getenv('DEAD_MAN_SWITCH_TIMEOUT', '60'))  # キャンセル予定時刻までの猶予（秒）
+        # 取引所の仕様: 予定時刻は現在時刻から5秒以上先である必要がある
+        if DEAD_MAN_SWITCH_INTERVAL <= 0 or DEAD_MAN_SWITCH_TIMEOUT < DEAD_MAN_SWITCH_INTERVAL + 5:
+            print("警告: DEAD_MAN_SWITCH_TIMEOUTはINTERVAL+5秒以上である必要があります。既定値を使用します。")
+            DEAD_MAN_SWITCH_INTERVAL = 15.0
+            DEAD_MAN_SWITCH_TIMEOUT = 60.0
+    except (ValueError, TypeError):
+        print("警告: DEAD_MAN_SWITCHの値が不正です。既定値を使用します。")
+        DEAD_MAN_SWITCH_INTERVAL = 15.0
+        DEAD_MAN_SWITCH_TIMEOUT = 60.0
+
     # API URL
     @staticmethod
     def get_api_url():
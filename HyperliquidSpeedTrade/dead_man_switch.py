@@ -0,0 +1,96 @@
+"""
+デッドマンスイッチモジュール
+取引所側の「全注文スケジュールキャンセル」を定期的に先送りし、
+プロセス停止時に未約定注文が放置されないようにします
+"""
+import threading
+import time
+from typing import Callable, Optional
+
+
+class DeadManSwitch:
+    """スケジュールキャンセルのハートビートサービス
+
+    interval秒ごとに「現在時刻+timeout秒」を取引所のキャンセル予定時刻として再設定します。
+    GUIのフリーズやストリームスレッドの停止でハートビートが途切れると、
+    取引所側で全未約定注文がキャンセルされます（こちらからのポーリングは不要）。
+
+    注意: 取引所側のトリガー回数は1日10回まで（UTC 0時にリセット）
+    """
+
+    def __init__(self, api, interval: float = 15.0, timeout: float = 60.0,
+                 on_status: Optional[Callable[[bool, Optional[float], str], None]] = None):
+        """
+        Args:
+            api: HyperliquidAPIインスタンス（schedule_cancelを使用）
+            interval: ハートビート間隔（秒）
+            timeout: キャンセル予定時刻までの猶予（秒）
+            on_status: 状態通知コールバック (有効か, 予定時刻(UNIX秒)またはNone, メッセージ)
+        """
+        self.api = api
+        self.interval = interval
+        self.timeout = timeout
+        self.on_status = on_status
+        self.deadline: Optional[float] = None  # 現在有効なキャンセル予定時刻（UNIX秒）
+        self.last_error: Optional[str] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """ハートビートスレッドを開始"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, disarm: bool = True):
+        """ハートビートを停止
+
+        Args:
+            disarm: 正常終了時にキャンセル予定を解除するか（Falseなら予定時刻に全キャンセル）
+        """
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        if disarm and self.deadline is not None:
+            result = self.api.schedule_cancel(None)
+            if result['success']:
+                self.deadline = None
+            self._notify(False, result['message'])
+
+    def heartbeat(self) -> bool:
+        """キャンセル予定時刻を1回先送りする"""
+        deadline = time.time() + self.timeout
+        result = self.api.schedule_cancel(int(deadline * 1000))
+        if result['success']:
+            self.deadline = deadline
+            self.last_error = None
+            self._notify(True, result['message'])
+            return True
+
+        self.last_error = result['message']
+        print(f"[DEAD_MAN] {result['message']}")
+        self._notify(False, result['message'])
+        return False
+
+    def seconds_remaining(self) -> Optional[float]:
+        """キャンセル予定時刻までの残り秒数（未設定ならNone）"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.time())
+
+    def _run(self):
+        """ハートビートループ"""
+        while not self._stop_event.is_set():
+            self.heartbeat()
+            # 失敗時は短い間隔で再試行（猶予が切れる前に再設定できるように）
+            wait = self.interval if self.last_error is None else min(self.interval, 5.0)
+            self._stop_event.wait(wait)
+
+    def _notify(self, armed: bool, message: str):
+        if self.on_status:
+            try:
+                self.on_status(armed, self.deadline, message)
+            except Exception:
+                pass  # 表示側のエラーでハートビートを止めない
@@ -0,0 +1,203 @@
+"""
+板（DOM）ラダーモジュール
+現在の通貨のL2板を価格ごとの行で表示し、自分の未約定注文とエントリー価格を重ねます。
+買い/売り数量のセルをクリックでその価格に指値、自分の注文セルのクリックでキャンセルします
+"""
+import threading
+from typing import Callable, Dict, List, Optional
+
+import tkinter as tk
+
+
+class DomLadder:
+    """MT4風の板ラダー
+
+    - L2板の受信（WebSocketスレッド）は最新の板を保存するだけ
+    - GUIスレッドのfpsごとの描画で、前回と内容が変わったセルだけitemconfigureする
+    - 上半分が売り板（高い順）、下半分が買い板（高い順）
+    """
+
+    ROW_HEIGHT = 16
+    COLUMNS = (  # (名前, 幅)
+        ('orders', 60),
+        ('bid', 70),
+        ('price', 90),
+        ('ask', 70),
+        ('marker', 40),
+    )
+    BG = "#1a1a1a"
+    BID_BG = "#12301a"
+    ASK_BG = "#3a1616"
+
+    def __init__(self, parent, levels: int = 10, fps: int = 30,
+                 on_place: Optional[Callable[[float, bool], None]] = None,
+                 on_cancel: Optional[Callable[[float, List[int]], None]] = None):
+        """
+        Args:
+            levels: 片側の表示段数
+            on_place: on_place(price, is_buy) 数量セルのクリック時
+            on_cancel: on_cancel(price, order_ids) 自分の注文セルのクリック時
+        """
+        self.levels = levels
+        self.interval_ms = max(1, int(1000 / fps))
+        self.on_place = on_place
+        self.on_cancel = on_cancel
+        self.symbol: Optional[str] = None
+        self._lock = threading.Lock()
+        self._book = None  # (bids, asks) 各 [(px, sz), ...]
+        self._book_version = 0
+        self._drawn_version = -1
+        self._orders: Dict[float, List[Dict]] = {}  # 価格 -> 自分の注文
+        self._entry_price: Optional[float] = None
+        self._running = False
+
+        rows = levels * 2
+        self.width = sum(width for _, width in self.COLUMNS)
+        self.canvas = tk.Canvas(parent, width=self.width, height=rows * self.ROW_HEIGHT,
+                                bg=self.BG, highlightthickness=0)
+        self._row_prices: List[Optional[float]] = [None] * rows
+        self._cells: List[Dict[str, int]] = []
+        self._cell_state: List[Dict[str, tuple]] = []
+        for r in range(rows):
+            y0, y1 = r * self.ROW_HEIGHT, (r + 1) * self.ROW_HEIGHT
+            is_ask_row = r < levels
+            x = 0
+            cells = {}
+            for name, width in self.COLUMNS:
+                if name in ('bid', 'ask'):
+                    side_bg = self.ASK_BG if is_ask_row else self.BID_BG
+                    self.canvas.create_rectangle(x, y0, x + width, y1, fill=side_bg, outline="#222222")
+                else:
+                    self.canvas.create_rectangle(x, y0, x + width, y1, fill=self.BG, outline="#222222")
+                cells[name] = self.canvas.create_text(x + width / 2, (y0 + y1) / 2, text="",
+                                                      fill="white", font=("", 9))
+                x += width
+            self._cells.append(cells)
+            self._cell_state.append({})
+        self.canvas.bind("<Button-1>", self._on_click)
+
+    def set_symbol(self, symbol: str):
+        """表示通貨を切り替え（板は次の受信まで空）"""
+        with self._lock:
+            self.symbol = symbol
+            self._book = None
+            self._book_version += 1
+
+    def on_book(self, data: Dict):
+        """l2Bookストリームの受信（WebSocketスレッド）"""
+        levels = data.get('levels') or []
+        if len(levels) < 2:
+            return
+        try:
+            bids = [(float(level['px']), float(level['sz'])) for level in levels[0][:self.levels]]
+            asks = [(float(level['px']), float(level['sz'])) for level in levels[1][:self.levels]]
+        except (KeyError, ValueError, TypeError):
+            return
+        with self._lock:
+            if data.get('coin') != self.symbol:
+                return  # 切り替え前の通貨の板
+            self._book = (bids, asks)
+            self._book_version += 1
+
+    def set_orders(self, orders: List[Dict]):
+        """自分の未約定注文（get_open_orders形式）を設定"""
+        by_price: Dict[float, List[Dict]] = {}
+        for order in orders:
+            if order.get('coin') == self.symbol:
+                by_price.setdefault(order['limit_price'], []).append(order)
+        with self._lock:
+            self._orders = by_price
+            self._book_version += 1
+
+    def set_entry_price(self, entry_price: Optional[float]):
+        """現在通貨のポジションのエントリー価格を設定"""
+        with self._lock:
+            if entry_price != self._entry_price:
+                self._entry_price = entry_price
+                self._book_version += 1
+
+    def start(self):
+        """fpsごとの描画ループを開始"""
+        if not self._running:
+            self._running = True
+            self.canvas.after(self.interval_ms, self._loop)
+
+    def stop(self):
+        self._running = False
+
+    def _loop(self):
+        if not self._running:
+            return
+        try:
+            self.redraw()
+        finally:
+            self.canvas.after(self.interval_ms, self._loop)
+
+    def redraw(self):
+        """板が変わっていれば、変わったセルだけ更新"""
+        with self._lock:
+            if self._book_version == self._drawn_version:
+                return
+            self._drawn_version = self._book_version
+            book, orders, entry = self._book, self._orders, self._entry_price
+
+        bids, asks = book if book else ([], [])
+        rows: List[Optional[tuple]] = []
+        # 売り板: 最良気配が中央に来るよう高い順に並べる
+        ask_rows = list(reversed(asks))
+        rows.extend([None] * (self.levels - len(ask_rows)) + [('ask', px, sz) for px, sz in ask_rows])
+        rows.extend([('bid', px, sz) for px, sz in bids] + [None] * (self.levels - len(bids)))
+
+        # エントリー価格に最も近い行に印を付ける
+        entry_row = None
+        if entry is not None:
+            priced = [(abs(row[1] - entry), i) for i, row in enumerate(rows) if row]
+            if priced:
+                entry_row = min(priced)[1]
+
+        for i, row in enumerate(rows):
+            if row is None:
+                self._row_prices[i] = None
+                values = {name: ("", "white") for name, _ in self.COLUMNS}
+            else:
+                side, px, sz = row
+                self._row_prices[i] = px
+                my_orders = orders.get(px, [])
+                my_size = sum(order['size'] for order in my_orders)
+                values = {
+                    'orders': (f"{my_size:g}" if my_orders else "", "#FFD54F"),
+                    'bid': (f"{sz:g}" if side == 'bid' else "", "#44FF44"),
+                    'price': (f"{px:,.6g}", "white"),
+                    'ask': (f"{sz:g}" if side == 'ask' else "", "#FF4444"),
+                    'marker': ("◀EP" if i == entry_row else "", "#FFA500"),
+                }
+            self._apply(i, values)
+
+    def _apply(self, row: int, values: Dict[str, tuple]):
+        state = self._cell_state[row]
+        for name, value in values.items():
+            if state.get(name) != value:
+                text, color = value
+                self.canvas.itemconfigure(self._cells[row][name], text=text, fill=color)
+                state[name] = value
+
+    def _on_click(self, event):
+        row = int(event.y // self.ROW_HEIGHT)
+        if row < 0 or row >= len(self._row_prices) or self._row_prices[row] is None:
+            return
+        price = self._row_prices[row]
+        x, column = 0, None
+        for name, width in self.COLUMNS:
+            if x <= event.x < x + width:
+                column = name
+                break
+            x += width
+
+        if column == 'orders':
+            with self._lock:
+                order_ids = [order['order_id'] for order in self._orders.get(price, [])]
+            if order_ids and self.on_cancel:
+                self.on_cancel(price, order_ids)
+        elif column in ('bid', 'ask') and self.on_place:
+            # 買い数量セル=その価格に買い指値、売り数量セル=売り指値
+            self.on_place(price, column == 'bid')
@@ -0,0 +1,338 @@
+"""
+エンジンクライアントモジュール
+別プロセスのエンジン（engine_server.py）にIPCで接続し、
+HyperliquidAPIと同じメソッドでGUI・CLIから利用できるようにします
+"""
+import itertools
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from config import Config
+from ipc import ConnectionClosed, connect, recv_frame, send_frame
+from position_book import PositionBook
+
+
+class RemoteCallError(Exception):
+    """エンジン側の呼び出しが失敗した（切断・タイムアウト・エンジン側の例外）"""
+
+
+class RemoteAPI:
+    """エンジンプロセスへのプロキシ（HyperliquidAPI互換）
+
+    - 要求は応答をIDで待ち合わせる（受信は専用スレッド）
+    - allMids・追加チャネルはエンジンから届いたイベントをローカルのハンドラーへ渡す
+    - ポジションブックはローカルに持ち、スナップショットとuserFillsで更新する
+    - 切断時はバックグラウンドで再接続し、購読をやり直す
+    - エンジン側のAPI接続状態は専用スレッドで定期的に確認し、is_connected() は通信せずに返す
+    """
+
+    STATUS_INTERVAL = 5.0  # エンジン側のAPI接続状態を確認する間隔（秒）
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None, timeout: float = 10.0,
+                 token: Optional[str] = None):
+        self.host = host or Config.ENGINE_HOST
+        self.port = port or Config.ENGINE_PORT
+        self.token = Config.ENGINE_TOKEN if token is None else token
+        self.timeout = timeout
+        self.address = None
+        self.position_book = PositionBook()
+        self.latest_mids: Dict[str, str] = {}
+        self.latest_mids_ts = 0.0
+        self.latest_mids_recv = None  # 最新のallMidsを受信した時刻（time.perf_counter、遅延計測用）
+        self.asset_ctxs: Dict[str, Dict] = {}
+        self._sock = None
+        self._send_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, list] = {}  # 要求ID -> [Event, ok, 値]
+        self._pending_lock = threading.Lock()
+        self._price_callback = None
+        self._bbo_callback = None
+        self._stream_subscriptions: List[Dict] = []
+        self._stream_handlers: Dict[str, List[Callable]] = {}
+        self._connected = False
+        self._engine_api_connected = False  # エンジン側のAPI接続（最後に確認した値）
+        self._closing = False
+
+    # ---- 接続 ----
+
+    def initialize(self) -> bool:
+        """エンジンに接続"""
+        try:
+            self._connect()
+            self.address = self._call('get_address')
+            self._refresh_status()
+            threading.Thread(target=self._status_loop, name="engine-client-status", daemon=True).start()
+            print(f"[ENGINE] エンジンに接続しました: {self.host}:{self.port}")
+            return True
+        except (OSError, RemoteCallError) as e:
+            print(f"[ENGINE] エンジンに接続できません（{self.host}:{self.port}）: {e}")
+            return False
+
+    def _connect(self):
+        sock = connect(self.host, self.port)
+        try:
+            # 最初に共有トークンを送り、エンジンの承認を待つ
+            sock.settimeout(self.timeout)
+            send_frame(sock, {'t': 'auth', 'token': self.token})
+            reply = recv_frame(sock)
+            sock.settimeout(None)
+        except (ConnectionClosed, OSError, ValueError) as e:
+            sock.close()
+            raise OSError(f"認証の応答がありません: {e}")
+        if not (isinstance(reply, dict) and reply.get('ok')):
+            sock.close()
+            raise OSError("エンジンに認証を拒否されました（ENGINE_TOKEN を確認してください）")
+        self._sock = sock
+        self._connected = True
+        threading.Thread(target=self._reader, args=(self._sock,), name="engine-client-reader",
+                         daemon=True).start()
+
+    def close(self):
+        """切断（再接続しない）"""
+        self._closing = True
+        self._connected = False
+        if self._sock:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+
+    def is_connected(self) -> bool:
+        """エンジンとの接続と、エンジン側のAPI接続の両方（通信しないのでGUIスレッドから呼べる）"""
+        return self._connected and self._engine_api_connected
+
+    def _refresh_status(self):
+        try:
+            self._engine_api_connected = bool(self._call('is_connected'))
+        except RemoteCallError:
+            self._engine_api_connected = False
+
+    def _status_loop(self):
+        while not self._closing:
+            time.sleep(self.STATUS_INTERVAL)
+            if self._connected:
+                self._refresh_status()
+
+    def _reader(self, sock):
+        try:
+            while True:
+                message = recv_frame(sock)
+                kind = message.get('t') if isinstance(message, dict) else None
+                if kind == 'res':
+                    self._on_response(message)
+                elif kind == 'evt':
+                    self._on_event(message.get('ch'), message.get('d'))
+        except (ConnectionClosed, OSError, ValueError):
+            pass
+        if sock is not self._sock:
+            return
+        self._connected = False
+        self._fail_pending("エンジンとの接続が切れました")
+        if not self._closing:
+            print("[ENGINE] エンジンとの接続が切れました。再接続します...")
+            threading.Thread(target=self._reconnect_loop, name="engine-client-reconnect", daemon=True).start()
+
+    def _reconnect_loop(self):
+        while not self._closing:
+            time.sleep(Config.WS_RECONNECT_DELAY)
+            try:
+                self._connect()
+            except OSError:
+                continue
+            # 購読をやり直す
+            if self._price_callback:
+                self._notify('subscribe', {'type': 'allMids'})
+            for subscription in list(self._stream_subscriptions):
+                self._notify('subscribe', subscription)
+            self._refresh_status()
+            print("[ENGINE] エンジンに再接続しました")
+            return
+
+    # ---- 要求・応答 ----
+
+    def _send(self, message: Dict):
+        sock = self._sock
+        if sock is None or not self._connected:
+            raise RemoteCallError("エンジンに接続していません")
+        try:
+            with self._send_lock:
+                send_frame(sock, message)
+        except OSError as e:
+            raise RemoteCallError(f"送信エラー: {e}")
+
+    def _call(self, method: str, *args, **kwargs):
+        """要求を送り、応答を待って戻り値を返す"""
+        request_id = next(self._ids)
+        waiter = [threading.Event(), False, None]
+        with self._pending_lock:
+            self._pending[request_id] = waiter
+        try:
+            self._send({'t': 'req', 'id': request_id, 'm': method, 'a': list(args), 'k': kwargs})
+            if not waiter[0].wait(self.timeout):
+                raise RemoteCallError(f"{method}: エンジンの応答がタイムアウトしました")
+        finally:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+        if not waiter[1]:
+            raise RemoteCallError(f"{method}: {waiter[2]}")
+        return waiter[2]
+
+    def _notify(self, method: str, *args):
+        """応答を待たない要求（購読の追加・解除）"""
+        try:
+            self._send({'t': 'req', 'id': 0, 'm': method, 'a': list(args), 'k': {}})
+        except RemoteCallError:
+            pass  # 再接続時に購読し直す
+
+    def _on_response(self, message: Dict):
+        with self._pending_lock:
+            waiter = self._pending.get(message.get('id'))
+        if waiter is None:
+            return  # 通知の応答、またはタイムアウト済み
+        waiter[1] = bool(message.get('ok'))
+        waiter[2] = message.get('r') if waiter[1] else message.get('e')
+        waiter[0].set()
+
+    def _fail_pending(self, reason: str):
+        with self._pending_lock:
+            waiters = list(self._pending.values())
+        for waiter in waiters:
+            waiter[1], waiter[2] = False, reason
+            waiter[0].set()
+
+    def _call_or(self, default, method: str, *args, **kwargs):
+        try:
+            return self._call(method, *args, **kwargs)
+        except RemoteCallError as e:
+            print(f"[ENGINE] {e}")
+            return default
+
+    def _order_call(self, method: str, *args) -> Dict:
+        try:
+            return self._call(method, *args)
+        except RemoteCallError as e:
+            return {'success': False, 'error': str(e), 'message': f"エンジン呼び出しエラー: {e}"}
+
+    # ---- 取得系 ----
+
+    def get_price(self, symbol: str = "BTC") -> Optional[float]:
+        return self._call_or(None, 'get_price', symbol)
+
+    def get_symbols_by_volume(self) -> List[str]:
+        symbols = self._call_or([], 'get_symbols_by_volume')
+        self.asset_ctxs = self._call_or({}, 'get_asset_ctxs')
+        return symbols
+
+    def get_account_state(self) -> Optional[Dict]:
+        return self._call_or(None, 'get_account_state')
+
+    def get_account_leverage(self) -> Optional[float]:
+        return self._call_or(None, 'get_account_leverage')
+
+    def get_account_info(self) -> Optional[Dict]:
+        return self._call_or(None, 'get_account_info')
+
+    def get_positions(self) -> List[Dict]:
+        requested_at = time.time()
+        try:
+            positions = self._call('get_positions')
+        except RemoteCallError as e:
+            print(f"ポジション取得エラー: {e}")
+            return []
+        # ローカルポジションブックを更新
+        self.position_book.apply_snapshot(positions, as_of=requested_at)
+        return positions
+
+    def get_open_orders(self) -> List[Dict]:
+        return self._call_or([], 'get_open_orders')
+
+    # ---- 注文系（エンジン側のディスパッチャーで実行） ----
+
+    def place_market_order(self, symbol: str, is_buy: bool, size: float, reduce_only: bool = False) -> Dict:
+        return self._order_call('place_market_order', symbol, is_buy, size, reduce_only)
+
+    def place_limit_order(self, symbol: str, is_buy: bool, size: float, limit_price: float) -> Dict:
+        return self._order_call('place_limit_order', symbol, is_buy, size, limit_price)
+
+    def place_order_with_tpsl(self, symbol: str, is_buy: bool, size: float, limit_price: Optional[float] = None,
+                              take_profit_px: Optional[float] = None,
+                              stop_loss_px: Optional[float] = None) -> Dict:
+        return self._order_call('place_order_with_tpsl', symbol, is_buy, size, limit_price,
+                                take_profit_px, stop_loss_px)
+
+    def cancel_order(self, symbol: str, order_id: int) -> Dict:
+        return self._order_call('cancel_order', symbol, order_id)
+
+    def close_position(self, symbol: str) -> Dict:
+        return self._order_call('close_position', symbol)
+
+    def close_position_partial(self, symbol: str, close_size: float) -> Dict:
+        return self._order_call('close_position_partial', symbol, close_size)
+
+    def close_all_positions(self) -> Dict:
+        return self._order_call('close_all_positions')
+
+    def schedule_cancel(self, cancel_time_ms: Optional[int]) -> Dict:
+        return self._order_call('schedule_cancel', cancel_time_ms)
+
+    # ---- ストリーム ----
+
+    def start_price_stream(self, symbols: List[str], callback: Callable):
+        """価格ストリームを開始（通貨はエンジン側の購読に従う）"""
+        self._price_callback = callback
+        self._notify('subscribe', {'type': 'allMids'})
+        # ユーザー約定ストリーム（ポジションブックの差分更新）
+        if self.address:
+            self.subscribe_stream({"type": "userFills", "user": self.address}, self._on_user_fills)
+
+    def subscribe_stream(self, subscription: Dict, handler: Callable):
+        """追加チャネルを購読（エンジン経由で中継される）"""
+        handlers = self._stream_handlers.setdefault(subscription['type'], [])
+        if handler not in handlers:
+            handlers.append(handler)
+        if subscription not in self._stream_subscriptions:
+            self._stream_subscriptions.append(subscription)
+            self._notify('subscribe', subscription)
+
+    def unsubscribe_stream(self, subscription: Dict):
+        """追加チャネルの購読を解除"""
+        if subscription in self._stream_subscriptions:
+            self._stream_subscriptions.remove(subscription)
+            self._notify('unsubscribe', subscription)
+
+    def subscribe_bbo(self, symbols: List[str], handler: Callable):
+        """指定通貨の最良気配（bbo）を購読（handler(coin, bid, ask)）"""
+        self._bbo_callback = handler
+        for symbol in symbols:
+            self.subscribe_stream({"type": "bbo", "coin": symbol}, self._on_bbo)
+
+    def _on_bbo(self, data: Dict):
+        levels = data.get('bbo') or []
+        if not self._bbo_callback or len(levels) < 2 or not levels[0] or not levels[1]:
+            return  # 片側の板が空
+        try:
+            self._bbo_callback(data['coin'], float(levels[0]['px']), float(levels[1]['px']))
+        except (KeyError, ValueError, TypeError):
+            pass
+
+    def _on_user_fills(self, data: Dict):
+        self.position_book.apply_user_fills(data)
+
+    def _on_event(self, channel: str, data):
+        if channel == 'allMids':
+            if data:
+                self.latest_mids.update(data)
+                self.latest_mids_ts = time.time()
+                self.latest_mids_recv = time.perf_counter()
+                if self._price_callback:
+                    try:
+                        self._price_callback(data)
+                    except Exception as e:
+                        print(f"[ENGINE] 価格コールバックでエラー: {e}")
+            return
+        for handler in self._stream_handlers.get(channel, []):
+            try:
+                handler(data)
+            except Exception as e:
+                print(f"[ENGINE] {channel}ハンドラーでエラー: {e}")
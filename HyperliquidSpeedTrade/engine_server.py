@@ -0,0 +1,403 @@
+"""
+エンジンサーバーモジュール
+API・WebSocketストリーム・注文ディスパッチを独立したプロセスで動かし、
+GUIやCLIをローカルのIPC（ipc.pyのバイナリフレーム）で接続させます。
+GUIの描画やGCが注文経路を止めないようにし、複数のクライアントが1つのエンジンを共有できます
+
+使い方:
+    python engine_server.py [--host 127.0.0.1] [--port 8765]
+    python main.py --engine 127.0.0.1:8765
+
+注文を出せる接続なので、ローカル以外のアドレスで待ち受けるには ENGINE_TOKEN（.env）が必要です。
+トークンを設定した場合、クライアントは接続直後に同じトークンを送らないと切断されます。
+"""
+import argparse
+import hmac
+import ipaddress
+import socket
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from config import Config
+from hyperliquid_api import HyperliquidAPI
+from ipc import ConnectionClosed, encode_frame, recv_frame
+from order_dispatcher import OrderDispatcher
+
+# クライアントから呼び出せるメソッド
+READ_METHODS = {
+    'get_price', 'get_symbols_by_volume', 'get_account_state', 'get_account_leverage',
+    'get_account_info', 'get_positions', 'get_open_orders', 'is_connected', 'get_asset_ctxs', 'get_address',
+}
+# 注文系はディスパッチャー経由（通貨ごとの順序保証）。値は順序キーにする引数の位置（Noneは全ワーカー横断）
+ORDER_METHODS = {
+    'place_market_order': 0,
+    'place_limit_order': 0,
+    'place_order_with_tpsl': 0,
+    'cancel_order': 0,
+    'close_position': 0,
+    'close_position_partial': 0,
+    'close_all_positions': None,
+}
+# 注文ワーカーを止めないよう専用スレッドで順に実行するもの（デッドマンスイッチの定期更新）
+CONTROL_METHODS = {'schedule_cancel'}
+AUTH_TIMEOUT = 5.0  # 接続後、認証フレームを待つ秒数
+
+
+def is_loopback(host: str) -> bool:
+    """ローカル（ループバック）のアドレスか（名前は解決して判定）"""
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+class _ClientConnection:
+    """接続中のクライアント（送信は専用スレッド、価格は最新のみ保持して間引く）
+
+    要求への応答（'res'）は捨てない（注文の結果が届かないと、約定した注文がタイムアウト扱いになる）。
+    送信が追いつかないときに捨てるのはストリームのイベント（'evt'）だけ。
+    """
+
+    def __init__(self, server: 'EngineServer', sock: socket.socket, address):
+        self.server = server
+        self.sock = sock
+        self.address = address
+        self.subscriptions: List[Dict] = []
+        self.wants_mids = False
+        self._cond = threading.Condition()
+        self._replies = deque()  # 応答（上限なし・捨てない）
+        self._outbox = deque()   # イベント（上限を超えたら古いものから捨てる）
+        self._pending_mids: Optional[Dict] = None
+        self._closed = False
+        self.dropped = 0
+
+    def start(self):
+        threading.Thread(target=self._reader, name=f"engine-client-r-{self.address}", daemon=True).start()
+        threading.Thread(target=self._writer, name=f"engine-client-w-{self.address}", daemon=True).start()
+
+    def send(self, message: Dict):
+        """送信キューに追加（イベントは上限を超えたら古いものから捨てる。応答は捨てない）"""
+        with self._cond:
+            if self._closed:
+                return
+            if message.get('t') == 'res':
+                self._replies.append(encode_frame(message))
+                self._cond.notify()
+                return
+            if len(self._outbox) >= self.server.max_outbox:
+                self._outbox.popleft()
+                self.dropped += 1
+            self._outbox.append(encode_frame(message))
+            self._cond.notify()
+
+    def send_mids(self, mids: Dict):
+        """価格を送信（未送信の価格があれば上書きして最新だけ送る）"""
+        with self._cond:
+            if self._closed:
+                return
+            if self._pending_mids is None:
+                self._pending_mids = dict(mids)
+            else:
+                self._pending_mids.update(mids)
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+        self.server._on_client_closed(self)
+
+    def _writer(self):
+        while True:
+            with self._cond:
+                while (not self._closed and not self._replies and not self._outbox
+                       and self._pending_mids is None):
+                    self._cond.wait()
+                if self._closed:
+                    return
+                # 応答、イベントの順に送り、価格は最後にまとめて1フレーム
+                frames = list(self._replies)
+                frames.extend(self._outbox)
+                self._replies.clear()
+                self._outbox.clear()
+                if self._pending_mids is not None:
+                    frames.append(encode_frame({'t': 'evt', 'ch': 'allMids', 'd': self._pending_mids}))
+                    self._pending_mids = None
+            try:
+                self.sock.sendall(b''.join(frames))
+            except OSError:
+                self.close()
+                return
+
+    def _authenticate(self) -> bool:
+        """最初のフレームで共有トークンを照合（トークン未設定のエンジンはどのトークンでも通す）"""
+        self.sock.settimeout(AUTH_TIMEOUT)
+        message = recv_frame(self.sock)
+        self.sock.settimeout(None)
+        token = message.get('token') if isinstance(message, dict) and message.get('t') == 'auth' else None
+        ok = isinstance(token, str) and (
+            not self.server.token or hmac.compare_digest(token.encode(), self.server.token.encode()))
+        # 認証前はほかに送るものがないため、書き込みスレッドを通さずに返す
+        self.sock.sendall(encode_frame({'t': 'auth', 'ok': ok}))
+        return ok
+
+    def _reader(self):
+        try:
+            if not self._authenticate():
+                print(f"[ENGINE] 認証に失敗したため切断します: {self.address}")
+                return
+            while True:
+                message = recv_frame(self.sock)
+                if isinstance(message, dict) and message.get('t') == 'req':
+                    self.server._handle_request(self, message)
+        except (ConnectionClosed, OSError, ValueError):
+            pass
+        finally:
+            self.close()
+
+
+class EngineServer:
+    """エンジンサーバー
+
+    - 読み取り系のメソッドはスレッドプールで実行
+    - 注文系のメソッドはOrderDispatcherで実行（通貨ごとの順序保証・背圧）
+    - 'subscribe'/'unsubscribe' でWebSocketのチャネルをクライアントへ中継
+    """
+
+    def __init__(self, api: HyperliquidAPI, host: str = '127.0.0.1', port: int = 8765,
+                 max_outbox: int = 1000, token: Optional[str] = None):
+        """
+        Args:
+            token: 共有トークン（省略時は Config.ENGINE_TOKEN。空ならローカルでのみ待ち受けられる）
+        """
+        self.api = api
+        self.host = host
+        self.port = port
+        self.token = Config.ENGINE_TOKEN if token is None else token
+        self.max_outbox = max_outbox
+        self.dispatcher = OrderDispatcher(workers=Config.ORDER_WORKERS, queue_size=Config.ORDER_QUEUE_SIZE)
+        self._readers = ThreadPoolExecutor(max_workers=4, thread_name_prefix="engine-read")
+        self._control = ThreadPoolExecutor(max_workers=1, thread_name_prefix="engine-control")
+        self._clients: List[_ClientConnection] = []
+        self._clients_lock = threading.Lock()
+        self._channel_refs: Dict[str, int] = {}  # 購読内容（キー） -> 購読しているクライアント数
+        self._channel_handlers: Dict[str, Callable] = {}
+        self._subs_lock = threading.Lock()
+        self._listener: Optional[socket.socket] = None
+        self._running = False
+
+    def start(self, symbols: Optional[List[str]] = None) -> bool:
+        """APIを初期化してストリームを開始し、接続の受け付けを始める"""
+        if not self.token and not is_loopback(self.host):
+            print(f"[ENGINE] {self.host} はローカルのアドレスではありません。"
+                  "ローカル以外で待ち受けるには ENGINE_TOKEN を設定してください")
+            return False
+        if not self.api.initialize():
+            print("[ENGINE] APIの初期化に失敗しました")
+            return False
+        self.dispatcher.start()
+        symbols = symbols or self.api.get_symbols_by_volume()
+        self.api.start_price_stream(symbols[:100], self._broadcast_mids)
+
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind((self.host, self.port))
+        self._listener.listen()
+        self._running = True
+        threading.Thread(target=self._accept_loop, name="engine-accept", daemon=True).start()
+        print(f"[ENGINE] {self.host}:{self.port} で接続を待機しています")
+        return True
+
+    def stop(self):
+        """停止（接続中のクライアントも切断）"""
+        self._running = False
+        if self._listener:
+            try:
+                self._listener.close()
+            except OSError:
+                pass
+        with self._clients_lock:
+            clients = list(self._clients)
+        for client in clients:
+            client.close()
+        self.dispatcher.stop()
+        self._readers.shutdown(wait=False)
+        self._control.shutdown(wait=False)
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                sock, address = self._listener.accept()
+            except OSError:
+                break
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client = _ClientConnection(self, sock, address)
+            with self._clients_lock:
+                self._clients.append(client)
+            print(f"[ENGINE] クライアント接続: {address}")
+            client.start()
+
+    def _on_client_closed(self, client: _ClientConnection):
+        with self._clients_lock:
+            if client not in self._clients:
+                return
+            self._clients.remove(client)
+        for subscription in list(client.subscriptions):
+            self._unsubscribe(client, subscription)
+        print(f"[ENGINE] クライアント切断: {client.address}")
+
+    def _handle_request(self, client: _ClientConnection, message: Dict):
+        request_id = message.get('id')
+        method = message.get('m')
+        args = message.get('a') or []
+        kwargs = message.get('k') or {}
+
+        def reply(ok: bool, value):
+            client.send({'t': 'res', 'id': request_id, 'ok': ok, ('r' if ok else 'e'): value})
+
+        if method in ('subscribe', 'unsubscribe'):
+            subscription = args[0] if args else {}
+            (self._subscribe if method == 'subscribe' else self._unsubscribe)(client, subscription)
+            reply(True, None)
+            return
+
+        if method in ORDER_METHODS:
+            key_index = ORDER_METHODS[method]
+            key = args[key_index] if key_index is not None and len(args) > key_index else None
+            fn = getattr(self.api, method)
+
+            def on_done(job):
+                if job.error is not None:
+                    reply(False, str(job.error))
+                else:
+                    reply(True, job.result)
+
+            if not self.dispatcher.submit(key, lambda: fn(*args, **kwargs), on_done):
+                reply(True, {'success': False, 'error': 'queue full',
+                             'message': "注文キューが満杯です（エンジン側）"})
+            return
+
+        if method in CONTROL_METHODS:
+            def run_control():
+                try:
+                    reply(True, getattr(self.api, method)(*args, **kwargs))
+                except Exception as e:
+                    reply(False, str(e))
+            self._control.submit(run_control)
+            return
+
+        if method in READ_METHODS:
+            def run():
+                try:
+                    # 属性の読み出し（メソッドではないもの）
+                    if method == 'get_asset_ctxs':
+                        reply(True, self.api.asset_ctxs)
+                    elif method == 'get_address':
+                        reply(True, self.api.address)
+                    else:
+                        reply(True, getattr(self.api, method)(*args, **kwargs))
+                except Exception as e:
+                    reply(False, str(e))
+            self._readers.submit(run)
+            return
+
+        reply(False, f"未対応のメソッドです: {method}")
+
+    # ---- ストリーム中継 ----
+
+    @staticmethod
+    def _subscription_key(subscription: Dict) -> str:
+        return '|'.join(f"{k}={subscription[k]}" for k in sorted(subscription))
+
+    def _subscribe(self, client: _ClientConnection, subscription: Dict):
+        if subscription.get('type') == 'allMids':
+            client.wants_mids = True
+            return
+        with self._subs_lock:
+            if subscription in client.subscriptions:
+                return
+            client.subscriptions.append(subscription)
+            key = self._subscription_key(subscription)
+            self._channel_refs[key] = self._channel_refs.get(key, 0) + 1
+            first = self._channel_refs[key] == 1
+        if first:
+            self.api.subscribe_stream(subscription, self._channel_handler(subscription['type']))
+
+    def _unsubscribe(self, client: _ClientConnection, subscription: Dict):
+        if subscription.get('type') == 'allMids':
+            client.wants_mids = False
+            return
+        with self._subs_lock:
+            if subscription not in client.subscriptions:
+                return
+            client.subscriptions.remove(subscription)
+            key = self._subscription_key(subscription)
+            self._channel_refs[key] = self._channel_refs.get(key, 1) - 1
+            last = self._channel_refs[key] <= 0
+            if last:
+                del self._channel_refs[key]
+        # エンジン自身の購読（userFills）は解除しない
+        if last and subscription.get('type') != 'userFills':
+            self.api.unsubscribe_stream(subscription)
+
+    def _channel_handler(self, channel: str):
+        """チャネルごとの中継ハンドラー（同じチャネルには同じオブジェクトを返して二重登録を防ぐ）"""
+        if channel not in self._channel_handlers:
+            self._channel_handlers[channel] = lambda data: self._broadcast_channel(channel, data)
+        return self._channel_handlers[channel]
+
+    def _broadcast_mids(self, mids: Dict):
+        with self._clients_lock:
+            clients = [c for c in self._clients if c.wants_mids]
+        for client in clients:
+            client.send_mids(mids)
+
+    def _broadcast_channel(self, channel: str, data: Dict):
+        """追加チャネル（bbo・l2Book・userFillsなど）を購読中のクライアントへ中継"""
+        coin = data.get('coin') if isinstance(data, dict) else None
+        user = data.get('user') if isinstance(data, dict) else None
+        with self._clients_lock:
+            clients = list(self._clients)
+        message = {'t': 'evt', 'ch': channel, 'd': data}
+        for client in clients:
+            for subscription in list(client.subscriptions):
+                if subscription.get('type') != channel:
+                    continue
+                # 通貨・ユーザー指定の購読はデータの通貨・ユーザーと一致するものだけ
+                if 'coin' in subscription and coin is not None and subscription['coin'] != coin:
+                    continue
+                if 'user' in subscription and user is not None and subscription['user'].lower() != user.lower():
+                    continue
+                client.send(message)
+                break
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Hyperliquid Speed Trade エンジン（GUI/CLIとは別プロセス）")
+    parser.add_argument("--host", default=Config.ENGINE_HOST, help="待ち受けアドレス（既定: ローカルのみ。ローカル以外は ENGINE_TOKEN が必要）")
+    parser.add_argument("--port", type=int, default=Config.ENGINE_PORT, help="待ち受けポート")
+    args = parser.parse_args(argv)
+
+    server = EngineServer(HyperliquidAPI(), host=args.host, port=args.port)
+    if not server.start():
+        return 1
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("\n[ENGINE] 停止します...")
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+約定ログバッファモジュール
+GUIの約定ログを固定長のリングバッファに溜めて1フレームごとにまとめて描画し、
+同じ内容をローテーション付きのファイルにも書き出します
+"""
+import datetime
+import logging
+import os
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from typing import List, Optional
+
+
+class ExecutionLog:
+    """約定ログのリングバッファ（スレッドセーフ）
+
+    - append(): 時刻を付けてバッファへ追加し、ファイルにも書き出す
+    - drain(): 未描画の行をまとめて取り出す（GUIの描画タイミングで呼ぶ）
+
+    描画が追いつかない場合は古い行から捨てるため、メモリ使用量は max_lines で頭打ちになります。
+    """
+
+    def __init__(self, max_lines: int = 500, file_path: Optional[str] = None,
+                 max_bytes: int = 5 * 1024 * 1024, backup_count: int = 5):
+        """
+        Args:
+            max_lines: 未描画行の保持上限（GUIに残す行数もこれに合わせる）
+            file_path: ミラー先のログファイル（Noneまたは空ならファイル出力なし）
+            max_bytes: ログファイル1つあたりの上限サイズ
+            backup_count: ローテーションで残す世代数
+        """
+        self.max_lines = max_lines
+        self._lock = threading.Lock()
+        self._pending = deque(maxlen=max_lines)
+        self.dropped = 0  # 描画前に捨てた行数
+        self._logger = self._create_file_logger(file_path, max_bytes, backup_count) if file_path else None
+
+    def append(self, message: str) -> str:
+        """ログを追加（整形済みの1行を返す）"""
+        line = f"[{datetime.datetime.now().strftime('%H:%M:%S')}] {message}"
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(line)
+        if self._logger:
+            self._logger.info(message)
+        return line
+
+    def drain(self) -> List[str]:
+        """未描画の行をすべて取り出す"""
+        with self._lock:
+            lines = list(self._pending)
+            self._pending.clear()
+            return lines
+
+    @staticmethod
+    def _create_file_logger(file_path: str, max_bytes: int, backup_count: int) -> Optional[logging.Logger]:
+        try:
+            directory = os.path.dirname(file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            logger = logging.getLogger(f"execution_log.{os.path.abspath(file_path)}")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            if not logger.handlers:
+                handler = RotatingFileHandler(file_path, maxBytes=max_bytes, backupCount=backup_count,
+                                              encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+                logger.addHandler(handler)
+            return logger
+        except OSError as e:
+            print(f"警告: 約定ログファイルを開けません（ファイル出力なしで続行します）: {e}")
+            return None
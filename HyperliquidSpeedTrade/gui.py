@@ -2,9 +2,17 @@
 GUI モジュール
 CustomTkinterを使用したユーザーインターフェース
 """
+import time
 import customtkinter as ctk
 from typing import Callable
 from config import Config
+from widget_pool import KeyedRowRenderer
+from execution_log import ExecutionLog
+from watchlist import WatchlistPanel
+from chart import PriceChart
+from dom_ladder import DomLadder
+from symbol_picker import SymbolIndex, SymbolPicker
+from latency import get_latency_tracer
 
 class SpeedTradeGUI:
     """スピード注文GUIクラス"""
@@ -25,6 +33,14 @@ class SpeedTradeGUI:
         self.on_close_callback = None
         self.on_symbol_change_callback = None
         self.on_cancel_order_callback = None  # 注文キャンセル
+        self.on_bracket_order_callback = None  # 取引所ネイティブTP/SL付き注文
+        self.on_add_conditional_callback = None  # 条件付き注文の登録
+        self.on_cancel_conditional_callback = None  # 条件付き注文の解除
+        
+        # レイテンシ計測（ワンクリック注文のクリック時刻を注文処理へ引き渡す）
+        self.latency = get_latency_tracer()
+        self._click_time = None
+        self.latency_indicator = None
         
         # 現在の価格
         self.current_prices = {}
@@ -46,11 +62,42 @@ class SpeedTradeGUI:
         self.account_spot_label = None
         self.account_perps_label = None
         
-        # 約定ログ
+        # 約定ログ（リングバッファに溜めて1フレームごとにまとめて描画）
         self.log_textbox = None
+        self.execution_log = ExecutionLog(
+            max_lines=Config.LOG_MAX_LINES,
+            file_path=Config.LOG_FILE or None,
+            max_bytes=Config.LOG_FILE_MAX_BYTES,
+            backup_count=Config.LOG_FILE_BACKUP_COUNT
+        )
+        self._log_line_count = 0  # テキストボックス内の行数
+        self._log_flush_scheduled = False
+        
+        # 条件付き注文（クライアント監視）
+        self.conditional_count_label = None
+        
+        # ウォッチリスト（購読中の全通貨）
+        self.watchlist_panel = None
+        
+        # プライスチャート（現在の通貨）
+        self.price_area_frame = None
+        self.chart = None
+        
+        # 板ラダー（現在の通貨）
+        self.dom_ladder = None
+        
+        # デッドマンスイッチ表示
+        self.dead_man_indicator = None
+        self.dead_man_deadline = None  # キャンセル予定時刻（UNIX秒）
         
         # 現在のポジションリスト（決済ダイアログで使用）
         self.current_positions = []
+        self.current_open_orders = []  # 板ラダーで使用
+        
+        # ポジション・未約定注文一覧の差分レンダラー（行ウィジェットを使い回す）
+        self._position_renderer = None
+        self._open_orders_renderer = None
+        self._fonts = {}  # (サイズ, 太さ) -> CTkFont
         
         # 通貨ペアリスト（出来高順）
         self.available_symbols = Config.AVAILABLE_SYMBOLS
@@ -129,6 +176,7 @@ class SpeedTradeGUI:
         
     def _execute_buy_market(self):
         """F1キー: 成行買い注文を即座に実行"""
+        t_click = time.perf_counter()
         try:
             size = float(self.size_entry.get())
             if size <= 0:
@@ -138,6 +186,7 @@ class SpeedTradeGUI:
             # 確認なしで即座に実行（MT4ライク）
             if not self.confirm_orders_var.get():
                 if self.on_buy_callback:
+                    self._click_time = t_click
                     self.on_buy_callback(self.current_symbol, size)
             else:
                 # 確認が必要な場合は通常のフロー
@@ -147,6 +196,7 @@ class SpeedTradeGUI:
     
     def _execute_sell_market(self):
         """F2キー: 成行売り注文を即座に実行"""
+        t_click = time.perf_counter()
         try:
             size = float(self.size_entry.get())
             if size <= 0:
@@ -156,6 +206,7 @@ class SpeedTradeGUI:
             # 確認なしで即座に実行（MT4ライク）
             if not self.confirm_orders_var.get():
                 if self.on_sell_callback:
+                    self._click_time = t_click
                     self.on_sell_callback(self.current_symbol, size)
             else:
                 # 確認が必要な場合は通常のフロー
@@ -268,6 +319,7 @@ class SpeedTradeGUI:
         """価格表示エリアを作成"""
         price_frame = ctk.CTkFrame(self.root)
         price_frame.grid(row=1, column=0, padx=10, pady=10, sticky="ew")
+        self.price_area_frame = price_frame  # チャート・板の追加先
         
         # 通貨ペア選択
         symbol_select_frame = ctk.CTkFrame(price_frame)
@@ -280,18 +332,20 @@ class SpeedTradeGUI:
         )
         symbol_label.pack(side="left", padx=5)
         
-        self.symbol_combo = ctk.CTkComboBox(
+        # 型入力で絞り込む通貨ペア選択（前方一致の索引。候補は上位k件だけ表示）
+        self.symbol_index = SymbolIndex(self.available_symbols, storage_path=Config.SYMBOL_PREFS_FILE)
+        self.symbol_index.load()
+        self.symbol_picker = SymbolPicker(
             symbol_select_frame,
-            values=self.available_symbols,
-            command=self._on_symbol_changed,
-            width=150,
-            font=ctk.CTkFont(size=14, weight="bold")
+            self.symbol_index,
+            on_select=self._on_symbol_changed,
+            max_results=Config.SYMBOL_PICKER_RESULTS
         )
         # デフォルトは出来高順リストの最初の通貨
         default_symbol = self.available_symbols[0] if self.available_symbols else Config.DEFAULT_SYMBOL
-        self.symbol_combo.set(default_symbol)
+        self.symbol_picker.set(default_symbol)
         self.current_symbol = default_symbol
-        self.symbol_combo.pack(side="left", padx=5)
+        self.symbol_picker.pack(side="left", padx=5)
         
         self.symbol_label = ctk.CTkLabel(
             price_frame,
@@ -467,6 +521,22 @@ class SpeedTradeGUI:
             )
             btn.pack(side="left", padx=2)
         
+        # 取引所ネイティブTP/SL（入力時は新規注文と同時に発注）
+        native_tpsl_frame = ctk.CTkFrame(order_frame, fg_color="transparent")
+        native_tpsl_frame.pack(pady=5)
+        
+        native_tpsl_label = ctk.CTkLabel(
+            native_tpsl_frame,
+            text="TP/SL (取引所):",
+            font=ctk.CTkFont(size=12)
+        )
+        native_tpsl_label.pack(side="left", padx=5)
+        
+        self.native_tp_entry = ctk.CTkEntry(native_tpsl_frame, width=100, placeholder_text="利確 TP $")
+        self.native_tp_entry.pack(side="left", padx=2)
+        self.native_sl_entry = ctk.CTkEntry(native_tpsl_frame, width=100, placeholder_text="損切り SL $")
+        self.native_sl_entry.pack(side="left", padx=2)
+        
         # ボタンフレーム
         button_frame = ctk.CTkFrame(order_frame, fg_color="transparent")
         button_frame.pack(pady=10)
@@ -496,6 +566,67 @@ class SpeedTradeGUI:
             height=50
         )
         sell_button.pack(side="left", padx=10)
+        
+        # 条件付き注文（ストップ・利確・トレーリングをクライアント側で監視）
+        conditional_frame = ctk.CTkFrame(order_frame, fg_color="transparent")
+        conditional_frame.pack(pady=5)
+        
+        conditional_label = ctk.CTkLabel(
+            conditional_frame,
+            text="条件注文:",
+            font=ctk.CTkFont(size=12)
+        )
+        conditional_label.pack(side="left", padx=5)
+        
+        self.stop_entry = ctk.CTkEntry(conditional_frame, width=90, placeholder_text="ストップ$")
+        self.stop_entry.pack(side="left", padx=2)
+        self.take_profit_entry = ctk.CTkEntry(conditional_frame, width=90, placeholder_text="利確$")
+        self.take_profit_entry.pack(side="left", padx=2)
+        self.trail_entry = ctk.CTkEntry(conditional_frame, width=70, placeholder_text="トレール%")
+        self.trail_entry.pack(side="left", padx=2)
+        
+        conditional_button_frame = ctk.CTkFrame(order_frame, fg_color="transparent")
+        conditional_button_frame.pack(pady=5)
+        
+        ctk.CTkButton(
+            conditional_button_frame,
+            text="買い条件",
+            command=lambda: self._on_add_conditional_clicked(True),
+            font=ctk.CTkFont(size=11),
+            fg_color="green",
+            hover_color="darkgreen",
+            width=80,
+            height=25
+        ).pack(side="left", padx=2)
+        
+        ctk.CTkButton(
+            conditional_button_frame,
+            text="売り条件",
+            command=lambda: self._on_add_conditional_clicked(False),
+            font=ctk.CTkFont(size=11),
+            fg_color="red",
+            hover_color="darkred",
+            width=80,
+            height=25
+        ).pack(side="left", padx=2)
+        
+        ctk.CTkButton(
+            conditional_button_frame,
+            text="条件解除",
+            command=self._on_cancel_conditional_clicked,
+            font=ctk.CTkFont(size=11),
+            fg_color="gray",
+            width=80,
+            height=25
+        ).pack(side="left", padx=2)
+        
+        self.conditional_count_label = ctk.CTkLabel(
+            conditional_button_frame,
+            text="登録: 0件",
+            font=ctk.CTkFont(size=10),
+            text_color="gray"
+        )
+        self.conditional_count_label.pack(side="left", padx=5)
     
     def _create_position_area(self):
         """ポジション表示エリアを作成"""
@@ -535,13 +666,9 @@ class SpeedTradeGUI:
         )
         self.position_frame.pack(pady=5, padx=5, fill="both", expand=True)
         
-        # 初期メッセージ
-        no_position_label = ctk.CTkLabel(
-            self.position_frame,
-            text="ポジションがありません",
-            text_color="gray"
-        )
-        no_position_label.pack(pady=20)
+        # 初期メッセージ（0件表示）
+        self._position_renderer = self._create_position_renderer()
+        self._position_renderer.render([])
     
     def _create_open_orders_area(self):
         """未約定注文エリアを作成"""
@@ -564,14 +691,9 @@ class SpeedTradeGUI:
         )
         self.open_orders_frame.pack(pady=5, padx=5, fill="x")
         
-        # 初期メッセージ
-        no_orders_label = ctk.CTkLabel(
-            self.open_orders_frame,
-            text="未約定注文がありません",
-            text_color="gray",
-            font=ctk.CTkFont(size=10)
-        )
-        no_orders_label.pack(pady=10)
+        # 初期メッセージ（0件表示）
+        self._open_orders_renderer = self._create_open_orders_renderer()
+        self._open_orders_renderer.render([])
     
     def _create_log_area(self):
         """約定ログエリアを作成"""
@@ -597,6 +719,7 @@ class SpeedTradeGUI:
         
         # 初期メッセージ
         self.log_textbox.insert("1.0", "約定ログがここに表示されます...\n")
+        self._log_line_count = 1
         self.log_textbox.configure(state="disabled")  # 読み取り専用
     
     def _create_status_bar(self):
@@ -642,9 +765,30 @@ class SpeedTradeGUI:
             text_color="gray"
         )
         self.rate_limit_indicator.pack(side="left", padx=5)
+        
+        # レイテンシインジケーター（p50/p99。クリックで集計結果をファイルに書き出し）
+        self.latency_indicator = ctk.CTkLabel(
+            connection_frame,
+            text="⏱ --",
+            font=ctk.CTkFont(size=10),
+            text_color="gray",
+            cursor="hand2"
+        )
+        self.latency_indicator.pack(side="left", padx=5)
+        self.latency_indicator.bind("<Button-1>", lambda e: self._export_latency())
+        
+        # デッドマンスイッチ状態インジケーター
+        self.dead_man_indicator = ctk.CTkLabel(
+            connection_frame,
+            text="🛡️ DMS: 無効",
+            font=ctk.CTkFont(size=10),
+            text_color="gray"
+        )
+        self.dead_man_indicator.pack(side="left", padx=5)
     
     def _on_one_click_buy(self):
         """ワンクリック買い注文"""
+        t_click = time.perf_counter()
         try:
             size = float(self.size_entry.get())
             if size <= 0:
@@ -654,6 +798,7 @@ class SpeedTradeGUI:
             # 確認なしで即座に実行（MT4ライク）
             if not self.confirm_orders_var.get():
                 if self.on_buy_callback:
+                    self._click_time = t_click
                     self.on_buy_callback(self.current_symbol, size)
             else:
                 # 確認が必要な場合は通常のフロー
@@ -663,6 +808,7 @@ class SpeedTradeGUI:
     
     def _on_one_click_sell(self):
         """ワンクリック売り注文"""
+        t_click = time.perf_counter()
         try:
             size = float(self.size_entry.get())
             if size <= 0:
@@ -672,6 +818,7 @@ class SpeedTradeGUI:
             # 確認なしで即座に実行（MT4ライク）
             if not self.confirm_orders_var.get():
                 if self.on_sell_callback:
+                    self._click_time = t_click
                     self.on_sell_callback(self.current_symbol, size)
             else:
                 # 確認が必要な場合は通常のフロー
@@ -683,6 +830,7 @@ class SpeedTradeGUI:
         """通貨ペアが変更された時"""
         self.current_symbol = new_symbol
         self.symbol_label.configure(text=f"{new_symbol}-USD")
+        self.symbol_index.add_recent(new_symbol)
         
         # 価格表示をリセット
         if new_symbol in self.current_prices:
@@ -697,10 +845,117 @@ class SpeedTradeGUI:
         if self.price_change_label:
             self.price_change_label.configure(text="")
         
+        # チャートを切り替え（履歴はメモリ上にあるため即時表示）
+        if self.chart:
+            self.chart.set_symbol(new_symbol)
+        
+        # 板ラダーを切り替え（自分の注文とエントリー価格も新しい通貨で表示し直す）
+        if self.dom_ladder:
+            self.dom_ladder.set_symbol(new_symbol)
+            self.dom_ladder.set_orders(self.current_open_orders)
+            entry = next((pos['entry_price'] for pos in self.current_positions if pos['coin'] == new_symbol), None)
+            self.dom_ladder.set_entry_price(entry)
+        
         # コールバックを呼び出す
         if self.on_symbol_change_callback:
             self.on_symbol_change_callback(new_symbol)
     
+    def create_watchlist(self, model):
+        """ウォッチリストパネルをメイン画面の右側に作成"""
+        self.watchlist_panel = WatchlistPanel(self.root, model, on_select=self.select_symbol,
+                                              visible_rows=Config.WATCHLIST_ROWS)
+        self.watchlist_panel.frame.grid(row=0, column=1, rowspan=7, padx=(0, 10), pady=10, sticky="ns")
+        self._resize_for_side_panels()
+        self.watchlist_panel.paint()
+    
+    def create_chart(self, store):
+        """価格エリアにチャート（ティック・1秒足・1分足）を作成"""
+        chart_frame = ctk.CTkFrame(self.price_area_frame, fg_color="transparent")
+        chart_frame.pack(pady=5, fill="x")
+        
+        mode_selector = ctk.CTkSegmentedButton(
+            chart_frame,
+            values=["Tick", "1s", "1m"],
+            command=lambda value: self.chart.set_mode(value.lower()),
+            font=ctk.CTkFont(size=10)
+        )
+        mode_selector.set("Tick")
+        mode_selector.pack(pady=2)
+        
+        self.chart = PriceChart(chart_frame, store, width=Config.WINDOW_WIDTH - 60, fps=Config.CHART_FPS)
+        self.chart.canvas.pack(pady=2)
+        self.chart.set_symbol(self.current_symbol)
+        self.chart.start()
+    
+    def create_dom_ladder(self):
+        """板ラダーをメイン画面の右端に作成"""
+        ladder_frame = ctk.CTkFrame(self.root)
+        ladder_frame.grid(row=0, column=2, rowspan=7, padx=(0, 10), pady=10, sticky="ns")
+        
+        ladder_title = ctk.CTkLabel(
+            ladder_frame,
+            text="📶 板（クリックで指値 / 自分の注文をクリックでキャンセル）",
+            font=ctk.CTkFont(size=11, weight="bold"),
+            wraplength=300
+        )
+        ladder_title.pack(pady=3)
+        
+        self.dom_ladder = DomLadder(ladder_frame, levels=Config.DOM_LEVELS, fps=Config.CHART_FPS,
+                                    on_place=self._on_ladder_place, on_cancel=self._on_ladder_cancel)
+        self.dom_ladder.canvas.pack(padx=5, pady=5)
+        self.dom_ladder.set_symbol(self.current_symbol)
+        self.dom_ladder.start()
+        self._resize_for_side_panels()
+    
+    def _resize_for_side_panels(self):
+        """ウォッチリスト・板ラダーの分だけウィンドウ幅を広げる"""
+        width = Config.WINDOW_WIDTH
+        if self.watchlist_panel:
+            width += 380
+        if self.dom_ladder:
+            width += self.dom_ladder.width + 30
+        self.root.geometry(f"{width}x{Config.WINDOW_HEIGHT}")
+    
+    def _on_ladder_place(self, price: float, is_buy: bool):
+        """板ラダーの数量セルがクリックされた時（その価格に指値）"""
+        t_click = time.perf_counter()
+        try:
+            size = float(self.size_entry.get())
+            if size <= 0:
+                self.show_error("サイズは正の数である必要があります")
+                return
+        except ValueError:
+            self.show_error("無効なサイズです")
+            return
+        
+        side = "買い（板・指値）" if is_buy else "売り（板・指値）"
+        if self.confirm_orders_var.get():
+            if not self._confirm_order(self.current_symbol, side, size, price):
+                return
+        else:
+            self._click_time = t_click
+        callback = self.on_limit_buy_callback if is_buy else self.on_limit_sell_callback
+        if callback:
+            callback(self.current_symbol, size, price)
+    
+    def _on_ladder_cancel(self, price: float, order_ids: list):
+        """板ラダーの自分の注文セルがクリックされた時（その価格の注文をキャンセル）"""
+        if self.on_cancel_order_callback:
+            for order_id in order_ids:
+                self.on_cancel_order_callback(self.current_symbol, order_id)
+    
+    def paint_watchlist(self):
+        """ウォッチリストの表示中の行を差分更新"""
+        if self.watchlist_panel:
+            self.watchlist_panel.paint()
+    
+    def select_symbol(self, symbol: str):
+        """通貨ペアを切り替え（ウォッチリストのクリックなど）"""
+        if symbol == self.current_symbol:
+            return
+        self.symbol_picker.set(symbol)
+        self._on_symbol_changed(symbol)
+    
     def _set_size(self, size: float):
         """プリセットサイズをセット"""
         self.size_entry.delete(0, "end")
@@ -721,8 +976,67 @@ class SpeedTradeGUI:
             # 成行が選択された場合、価格入力を非表示
             self.price_frame.pack_forget()
     
+    def _get_native_tpsl(self):
+        """TP/SL入力欄の値を取得（未入力はNone、不正な値はValueError）"""
+        values = []
+        for entry in (self.native_tp_entry, self.native_sl_entry):
+            text = entry.get().strip()
+            if not text:
+                values.append(None)
+                continue
+            value = float(text)
+            if value <= 0:
+                raise ValueError("TP/SL価格は正の数である必要があります")
+            values.append(value)
+        return values[0], values[1]
+    
+    def _submit_bracket_order(self, is_buy: bool, take_profit_px, stop_loss_px):
+        """TP/SL付き注文を送信（指値/成行は注文タイプに従う）"""
+        try:
+            size = float(self.size_entry.get())
+            if size <= 0:
+                self.show_error("サイズは正の数である必要があります")
+                return
+        except ValueError:
+            self.show_error("無効なサイズです")
+            return
+        
+        limit_price = None
+        if self.order_type.get() == "limit":
+            try:
+                limit_price = float(self.price_entry.get())
+                if limit_price <= 0:
+                    self.show_error("価格は正の数である必要があります")
+                    return
+            except ValueError:
+                self.show_error("無効な価格です")
+                return
+        
+        side = f"{'買い' if is_buy else '売り'}（{'成行' if limit_price is None else '指値'}+TP/SL）"
+        if self.confirm_orders_var.get() and not self._confirm_order(self.current_symbol, side, size, limit_price):
+            return
+        if self.on_bracket_order_callback:
+            self.on_bracket_order_callback(self.current_symbol, is_buy, size, limit_price,
+                                           take_profit_px, stop_loss_px)
+            for entry in (self.native_tp_entry, self.native_sl_entry):
+                entry.delete(0, 'end')
+    
+    def _route_native_tpsl(self, is_buy: bool) -> bool:
+        """TP/SLが入力されていればTP/SL付き注文として送信（処理した場合True）"""
+        try:
+            take_profit_px, stop_loss_px = self._get_native_tpsl()
+        except ValueError:
+            self.show_error("無効なTP/SL価格です")
+            return True
+        if take_profit_px is None and stop_loss_px is None:
+            return False
+        self._submit_bracket_order(is_buy, take_profit_px, stop_loss_px)
+        return True
+    
     def _on_buy_clicked(self):
         """買いボタンがクリックされた時"""
+        if self._route_native_tpsl(True):
+            return
         try:
             size = float(self.size_entry.get())
             if size <= 0:
@@ -763,8 +1077,60 @@ class SpeedTradeGUI:
         except ValueError:
             self.show_error("無効なサイズです")
     
+    def _on_add_conditional_clicked(self, is_buy: bool):
+        """条件注文ボタンがクリックされた時（is_buy=発動時の売買方向）"""
+        try:
+            size = float(self.size_entry.get())
+            if size <= 0:
+                self.show_error("サイズは正の数である必要があります")
+                return
+        except ValueError:
+            self.show_error("無効なサイズです")
+            return
+        
+        values = {}
+        for name, entry in (('stop', self.stop_entry), ('take_profit', self.take_profit_entry),
+                            ('trail', self.trail_entry)):
+            text = entry.get().strip()
+            if not text:
+                values[name] = None
+                continue
+            try:
+                values[name] = float(text)
+            except ValueError:
+                self.show_error("無効な条件価格です")
+                return
+            if values[name] <= 0:
+                self.show_error("条件価格は正の数である必要があります")
+                return
+        
+        if not any(values.values()):
+            self.show_error("ストップ・利確・トレール%のいずれかを入力してください")
+            return
+        
+        if self.on_add_conditional_callback:
+            self.on_add_conditional_callback(self.current_symbol, is_buy, size,
+                                             values['stop'], values['take_profit'], values['trail'])
+            for entry in (self.stop_entry, self.take_profit_entry, self.trail_entry):
+                entry.delete(0, 'end')
+    
+    def _on_cancel_conditional_clicked(self):
+        """条件解除ボタンがクリックされた時（現在の通貨の条件注文をすべて解除）"""
+        if self.on_cancel_conditional_callback:
+            self.on_cancel_conditional_callback(self.current_symbol)
+    
+    def update_conditional_count(self, count: int):
+        """登録中の条件付き注文数を更新"""
+        if self.conditional_count_label:
+            self.conditional_count_label.configure(
+                text=f"登録: {count}件",
+                text_color="orange" if count else "gray"
+            )
+    
     def _on_sell_clicked(self):
         """売りボタンがクリックされた時"""
+        if self._route_native_tpsl(False):
+            return
         try:
             size = float(self.size_entry.get())
             if size <= 0:
@@ -861,9 +1227,12 @@ class SpeedTradeGUI:
             self.show_status("注文がキャンセルされました")
             return False
     
-    def update_price(self, prices: dict):
-        """価格を更新（前回価格からの変化を表示）"""
-        import time
+    def update_price(self, prices: dict, t_recv: float = None):
+        """価格を更新（前回価格からの変化を表示）
+        
+        Args:
+            t_recv: 価格の受信時刻（time.perf_counter）。指定時は受信→描画の遅延を記録
+        """
         self.current_prices = prices
         self.last_price_update = time.time()
         
@@ -876,6 +1245,7 @@ class SpeedTradeGUI:
             
             # 価格表示を更新
             self.price_label.configure(text=f"${price:,.2f}")
+            self.latency.record_since('tick.paint', t_recv)
             
             # 前回価格からの変化を表示
             if self.previous_price is not None and self.price_change_label:
@@ -904,181 +1274,141 @@ class SpeedTradeGUI:
             # 前回価格を更新
             self.previous_price = price
     
-    def update_positions(self, positions: list):
-        """ポジションを更新"""
-        # 現在のポジションリストを保存（決済ダイアログで使用）
-        self.current_positions = positions
-        
-        # 既存のウィジェットをクリア
-        for widget in self.position_frame.winfo_children():
-            widget.destroy()
-        
-        if not positions:
-            no_position_label = ctk.CTkLabel(
-                self.position_frame,
-                text="ポジションがありません",
-                text_color="gray"
+    def _font(self, size: int, weight: str = "normal") -> ctk.CTkFont:
+        """フォントを取得（同じ指定は1度だけ生成して使い回す）"""
+        key = (size, weight)
+        if key not in self._fonts:
+            self._fonts[key] = ctk.CTkFont(size=size, weight=weight)
+        return self._fonts[key]
+    
+    def _create_position_renderer(self) -> KeyedRowRenderer:
+        """ポジション一覧の差分レンダラーを作成"""
+        def build_row(frame, row):
+            row.widgets['symbol'] = ctk.CTkLabel(frame, text="", font=self._font(14, "bold"), width=80)
+            row.widgets['symbol'].pack(side="left", padx=5)
+            row.widgets['size'] = ctk.CTkLabel(frame, text="", font=self._font(12), width=120)
+            row.widgets['size'].pack(side="left", padx=5)
+            row.widgets['entry'] = ctk.CTkLabel(frame, text="", font=self._font(12), width=110)
+            row.widgets['entry'].pack(side="left", padx=3)
+            row.widgets['leverage'] = ctk.CTkLabel(frame, text="", font=self._font(11, "bold"),
+                                                   text_color="#FFA500", width=50)
+            row.widgets['leverage'].pack(side="left", padx=3)
+            row.widgets['pnl'] = ctk.CTkLabel(frame, text="", font=self._font(12, "bold"), width=90)
+            row.widgets['pnl'].pack(side="left", padx=3)
+            row.widgets['liquidation'] = ctk.CTkLabel(frame, text="", font=self._font(11), width=100)
+            row.widgets['liquidation'].pack(side="left", padx=3)
+            # 決済ボタン（行は使い回すため、押された時点の表示中ポジションを参照）
+            row.widgets['close'] = ctk.CTkButton(
+                frame,
+                text="決済",
+                command=lambda r=row: r.data and self._on_close_position(r.data['coin']),
+                width=80,
+                height=30,
+                fg_color="orange",
+                hover_color="darkorange"
             )
-            no_position_label.pack(pady=20)
-            return
+            row.widgets['close'].pack(side="right", padx=5)
         
-        # ポジションを表示
-        for pos in positions:
-            pos_frame = ctk.CTkFrame(self.position_frame)
-            pos_frame.pack(pady=5, padx=5, fill="x")
-            
-            # シンボル
-            symbol_label = ctk.CTkLabel(
-                pos_frame,
-                text=pos['coin'],
-                font=ctk.CTkFont(size=14, weight="bold"),
-                width=80
-            )
-            symbol_label.pack(side="left", padx=5)
-            
-            # サイズ
+        def row_values(pos):
             size = pos['size']
-            side_text = "ロング" if size > 0 else "ショート"
-            side_color = "green" if size > 0 else "red"
-            size_label = ctk.CTkLabel(
-                pos_frame,
-                text=f"{side_text} {abs(size):.4f}",
-                font=ctk.CTkFont(size=12),
-                text_color=side_color,
-                width=120
-            )
-            size_label.pack(side="left", padx=5)
-            
-            # エントリー価格
-            entry_label = ctk.CTkLabel(
-                pos_frame,
-                text=f"EP: ${pos['entry_price']:.2f}",
-                font=ctk.CTkFont(size=12),
-                width=110
-            )
-            entry_label.pack(side="left", padx=3)
-            
-            # レバレッジ
             leverage = pos.get('leverage', {})
             if isinstance(leverage, dict):
                 lev_value = leverage.get('value', 1)
             else:
                 lev_value = leverage if leverage else 1
-            lev_label = ctk.CTkLabel(
-                pos_frame,
-                text=f"⚡{lev_value}x",
-                font=ctk.CTkFont(size=11, weight="bold"),
-                text_color="#FFA500",
-                width=50
-            )
-            lev_label.pack(side="left", padx=3)
-            
-            # 損益
             pnl = pos['unrealized_pnl']
-            pnl_color = "green" if pnl >= 0 else "red"
-            pnl_label = ctk.CTkLabel(
-                pos_frame,
-                text=f"PnL: ${pnl:.2f}",
-                font=ctk.CTkFont(size=12, weight="bold"),
-                text_color=pnl_color,
-                width=90
-            )
-            pnl_label.pack(side="left", padx=3)
-            
-            # 決済ボタン
-            close_button = ctk.CTkButton(
-                pos_frame,
-                text="決済",
-                command=lambda c=pos['coin']: self._on_close_position(c),
-                width=80,
-                height=30,
-                fg_color="orange",
-                hover_color="darkorange"
-            )
-            close_button.pack(side="right", padx=5)
+            # 清算価格までの距離（時価評価エンジンが計算、5%未満は赤で警告）
+            liq_distance = pos.get('liquidation_distance_pct')
+            if liq_distance is None:
+                liq_text, liq_color = "清算: --", "gray"
+            else:
+                liq_text = f"清算まで {liq_distance:.1f}%"
+                liq_color = "#FF4444" if liq_distance < 5 else ("#FFA500" if liq_distance < 15 else "gray")
+            return {
+                'symbol': {'text': pos['coin']},
+                'size': {'text': f"{'ロング' if size > 0 else 'ショート'} {abs(size):.4f}",
+                         'text_color': "green" if size > 0 else "red"},
+                'entry': {'text': f"EP: ${pos['entry_price']:.2f}"},
+                'leverage': {'text': f"⚡{lev_value}x"},
+                'pnl': {'text': f"PnL: ${pnl:.2f}", 'text_color': "green" if pnl >= 0 else "red"},
+                'liquidation': {'text': liq_text, 'text_color': liq_color},
+            }
+        
+        return KeyedRowRenderer(
+            self.position_frame,
+            build_row=build_row,
+            row_values=row_values,
+            key_fn=lambda pos: pos['coin'],
+            create_frame=lambda parent: ctk.CTkFrame(parent),
+            create_empty=lambda parent: ctk.CTkLabel(parent, text="ポジションがありません", text_color="gray"),
+            pack_options={'pady': 5, 'padx': 5, 'fill': "x"},
+            empty_pack_options={'pady': 20}
+        )
     
-    def update_open_orders(self, orders: list):
-        """未約定注文を更新"""
-        # 既存のウィジェットをクリア
-        for widget in self.open_orders_frame.winfo_children():
-            widget.destroy()
-        
-        if not orders:
-            no_orders_label = ctk.CTkLabel(
-                self.open_orders_frame,
-                text="未約定注文がありません",
-                text_color="gray",
-                font=ctk.CTkFont(size=10)
-            )
-            no_orders_label.pack(pady=10)
-            return
-        
-        # 注文を表示
-        for order in orders:
-            order_frame = ctk.CTkFrame(self.open_orders_frame)
-            order_frame.pack(pady=3, padx=5, fill="x")
-            
-            # シンボル
-            symbol_label = ctk.CTkLabel(
-                order_frame,
-                text=order['coin'],
-                font=ctk.CTkFont(size=12, weight="bold"),
-                width=70
-            )
-            symbol_label.pack(side="left", padx=5)
-            
-            # タイプ（買い/売り）
-            side_text = "買い" if order['is_buy'] else "売り"
-            side_color = "green" if order['is_buy'] else "red"
-            side_label = ctk.CTkLabel(
-                order_frame,
-                text=side_text,
-                font=ctk.CTkFont(size=11, weight="bold"),
-                text_color=side_color,
-                width=50
-            )
-            side_label.pack(side="left", padx=5)
-            
-            # サイズ
-            size_label = ctk.CTkLabel(
-                order_frame,
-                text=f"{order['size']:.4f}",
-                font=ctk.CTkFont(size=11),
-                width=80
-            )
-            size_label.pack(side="left", padx=5)
-            
-            # 指値価格
-            price_label = ctk.CTkLabel(
-                order_frame,
-                text=f"@ ${order['limit_price']:.4f}",
-                font=ctk.CTkFont(size=11),
-                width=110
-            )
-            price_label.pack(side="left", padx=5)
-            
-            # 注文ID
-            oid_label = ctk.CTkLabel(
-                order_frame,
-                text=f"ID: {order['order_id']}",
-                font=ctk.CTkFont(size=9),
-                text_color="gray",
-                width=90
-            )
-            oid_label.pack(side="left", padx=5)
-            
-            # キャンセルボタン
-            cancel_button = ctk.CTkButton(
-                order_frame,
+    def _create_open_orders_renderer(self) -> KeyedRowRenderer:
+        """未約定注文一覧の差分レンダラーを作成"""
+        def build_row(frame, row):
+            row.widgets['symbol'] = ctk.CTkLabel(frame, text="", font=self._font(12, "bold"), width=70)
+            row.widgets['symbol'].pack(side="left", padx=5)
+            row.widgets['side'] = ctk.CTkLabel(frame, text="", font=self._font(11, "bold"), width=50)
+            row.widgets['side'].pack(side="left", padx=5)
+            row.widgets['size'] = ctk.CTkLabel(frame, text="", font=self._font(11), width=80)
+            row.widgets['size'].pack(side="left", padx=5)
+            row.widgets['price'] = ctk.CTkLabel(frame, text="", font=self._font(11), width=110)
+            row.widgets['price'].pack(side="left", padx=5)
+            row.widgets['oid'] = ctk.CTkLabel(frame, text="", font=self._font(9), text_color="gray", width=90)
+            row.widgets['oid'].pack(side="left", padx=5)
+            # キャンセルボタン（行は使い回すため、押された時点の表示中注文を参照）
+            row.widgets['cancel'] = ctk.CTkButton(
+                frame,
                 text="キャンセル",
-                command=lambda symbol=order['coin'], oid=order['order_id']: self._on_cancel_order(symbol, oid),
+                command=lambda r=row: r.data and self._on_cancel_order(r.data['coin'], r.data['order_id']),
                 width=90,
                 height=25,
                 fg_color="#DC3545",
                 hover_color="#A02A37",
-                font=ctk.CTkFont(size=10)
+                font=self._font(10)
             )
-            cancel_button.pack(side="right", padx=5)
+            row.widgets['cancel'].pack(side="right", padx=5)
+        
+        def row_values(order):
+            return {
+                'symbol': {'text': order['coin']},
+                'side': {'text': "買い" if order['is_buy'] else "売り",
+                         'text_color': "green" if order['is_buy'] else "red"},
+                'size': {'text': f"{order['size']:.4f}"},
+                'price': {'text': f"@ ${order['limit_price']:.4f}"},
+                'oid': {'text': f"ID: {order['order_id']}"},
+            }
+        
+        return KeyedRowRenderer(
+            self.open_orders_frame,
+            build_row=build_row,
+            row_values=row_values,
+            key_fn=lambda order: order['order_id'],
+            create_frame=lambda parent: ctk.CTkFrame(parent),
+            create_empty=lambda parent: ctk.CTkLabel(parent, text="未約定注文がありません",
+                                                     text_color="gray", font=self._font(10)),
+            pack_options={'pady': 3, 'padx': 5, 'fill': "x"},
+            empty_pack_options={'pady': 10}
+        )
+    
+    def update_positions(self, positions: list):
+        """ポジションを更新（通貨ごとに行を使い回し、変わった値だけ更新）"""
+        # 現在のポジションリストを保存（決済ダイアログで使用）
+        self.current_positions = positions
+        
+        self._position_renderer.render(positions)
+        if self.dom_ladder:
+            entry = next((pos['entry_price'] for pos in positions if pos['coin'] == self.current_symbol), None)
+            self.dom_ladder.set_entry_price(entry)
+    
+    def update_open_orders(self, orders: list):
+        """未約定注文を更新（注文IDごとに行を使い回し、変わった値だけ更新）"""
+        self._open_orders_renderer.render(orders)
+        self.current_open_orders = orders
+        if self.dom_ladder:
+            self.dom_ladder.set_orders(orders)
     
     def _on_cancel_order(self, symbol: str, order_id: int):
         """注文キャンセルボタンがクリックされた時"""
@@ -1349,6 +1679,11 @@ class SpeedTradeGUI:
         if result_var["confirmed"] and self.on_close_callback:
             self.on_close_callback(symbol, size=result_var["size"])
     
+    def take_click_time(self) -> float:
+        """直前のワンクリック操作のクリック時刻を取り出す（なければ現在時刻）"""
+        t_click, self._click_time = self._click_time, None
+        return t_click if t_click is not None else time.perf_counter()
+    
     def show_status(self, message: str):
         """ステータスメッセージを表示"""
         self.status_label.configure(text=message)
@@ -1405,16 +1740,33 @@ class SpeedTradeGUI:
             )
     
     def add_log(self, message: str):
-        """約定ログを追加"""
-        if self.log_textbox:
-            import datetime
-            timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-            log_message = f"[{timestamp}] {message}\n"
-            
-            self.log_textbox.configure(state="normal")
-            self.log_textbox.insert("end", log_message)
-            self.log_textbox.see("end")  # 最新行にスクロール
-            self.log_textbox.configure(state="disabled")
+        """約定ログを追加（描画は次のフレームでまとめて行う）"""
+        self.execution_log.append(message)
+        if self.root and not self._log_flush_scheduled:
+            self._log_flush_scheduled = True
+            self.root.after(16, self._flush_log)  # 約60fps
+    
+    def _flush_log(self):
+        """溜まったログをまとめて描画し、上限を超えた古い行を一括削除"""
+        self._log_flush_scheduled = False
+        lines = self.execution_log.drain()
+        if not lines or not self.log_textbox:
+            return
+        
+        self.log_textbox.configure(state="normal")
+        text = "\n".join(lines) + "\n"
+        self.log_textbox.insert("end", text)
+        # 1件のログが複数行（注文エラーの[原因]・[対策]など）のこともあるので改行で数える
+        self._log_line_count += text.count("\n")
+        
+        # 上限の1割を超えたらまとめて削除（1行ごとの削除を避ける）
+        excess = self._log_line_count - self.execution_log.max_lines
+        if excess > max(1, self.execution_log.max_lines // 10):
+            self.log_textbox.delete("1.0", f"{excess + 1}.0")
+            self._log_line_count -= excess
+        
+        self.log_textbox.see("end")  # 最新行にスクロール
+        self.log_textbox.configure(state="disabled")
     
     def set_buy_callback(self, callback: Callable):
         """買い注文のコールバックを設定"""
@@ -1440,6 +1792,11 @@ class SpeedTradeGUI:
             else:
                 self.lag_indicator.configure(text="🟢 接続良好", text_color="green")
         
+        # デッドマンスイッチの残り時間を更新
+        if self.dead_man_deadline is not None and self.dead_man_indicator:
+            remaining = max(0, int(self.dead_man_deadline - time.time()))
+            self.dead_man_indicator.configure(text=f"🛡️ DMS: {remaining}s")
+        
         # 1秒ごとに再チェック
         if self.root:
             self.root.after(1000, self.check_connection_lag)
@@ -1477,6 +1834,42 @@ class SpeedTradeGUI:
                 text_color=color
             )
     
+    def update_latency_status(self, text: str):
+        """レイテンシ状態を更新（区間ごとのp50/p99）"""
+        if self.latency_indicator:
+            self.latency_indicator.configure(text=f"⏱ {text}" if text else "⏱ --")
+    
+    def _export_latency(self):
+        """レイテンシの集計結果をファイルに書き出す"""
+        try:
+            path = self.latency.export(Config.LATENCY_EXPORT_FILE)
+            self.show_status(f"レイテンシを書き出しました: {path}")
+            self.add_log(f"レイテンシ書き出し: {path}")
+        except OSError as e:
+            self.show_error(f"レイテンシの書き出しに失敗しました: {e}")
+    
+    def update_dead_man_status(self, armed: bool, deadline: float = None):
+        """デッドマンスイッチ状態を更新
+        
+        Args:
+            armed: キャンセル予定が有効か（Falseはエラーまたは解除）
+            deadline: キャンセル予定時刻（UNIX秒）
+        """
+        import time
+        if not self.dead_man_indicator:
+            return
+        
+        if armed and deadline is not None:
+            self.dead_man_deadline = deadline
+            remaining = max(0, int(deadline - time.time()))
+            self.dead_man_indicator.configure(text=f"🛡️ DMS: {remaining}s", text_color="green")
+        elif self.dead_man_deadline is not None and deadline is not None:
+            # 更新失敗（前回の予定時刻はまだ有効）
+            self.dead_man_indicator.configure(text_color="#FFA500")
+        else:
+            self.dead_man_deadline = None
+            self.dead_man_indicator.configure(text="🛡️ DMS: 停止", text_color="#FF4444")
+    
     def run(self):
         """GUIを起動"""
         if self.root:
@@ -8,11 +8,14 @@ import time
 import websockets
 from typing import Optional, Dict, List, Callable
 from hyperliquid.info import Info
-from hyperliquid.exchange import Exchange
 from hyperliquid.utils import constants
+from hyperliquid.utils.types import Cloid
 from eth_account import Account
 from config import Config
 from rate_limiter import get_rate_limiter, RequestPriority
+from nonce_manager import NonceSafeExchange, install_nonce_allocator
+from position_book import PositionBook
+from latency import get_latency_tracer
 
 class HyperliquidAPI:
     """Hyperliquid APIクライアントクラス"""
@@ -26,6 +29,24 @@ class HyperliquidAPI:
         self.address = None
         self._price_callback = None
         self._is_connected = False
+        # ローカルポジションブック（スナップショット + ユーザー約定ストリーム）
+        self.position_book = PositionBook()
+        # WebSocketで受信した最新の中値（成行注文のスリッページ価格計算に使用）
+        self.latest_mids: Dict[str, str] = {}
+        self.latest_mids_ts = 0.0
+        self.latest_mids_recv = None  # 最新のallMidsを受信した時刻（time.perf_counter、遅延計測用）
+        # 追加購読（allMids以外）: チャネル名 -> ハンドラー一覧
+        self._stream_subscriptions: List[Dict] = []
+        self._stream_handlers: Dict[str, List[Callable]] = {}
+        self._ws = None
+        self._ws_loop = None
+        self._bbo_callback = None
+        # allMidsの追加リスナー（listener(mids, t_recv)）と接続リスナー（listener(reconnected)）
+        self._mids_listeners: List[Callable] = []
+        self._connection_listeners: List[Callable] = []
+        self._ws_thread = None
+        # 出来高取得時の資産コンテキスト（通貨 -> 前日終値・24時間出来高）
+        self.asset_ctxs: Dict[str, Dict] = {}
         # レートリミッターを初期化
         self.rate_limiter = get_rate_limiter(
             max_calls=Config.RATE_LIMIT_MAX_CALLS,
@@ -57,7 +78,10 @@ class HyperliquidAPI:
         attempt = 0
         while True:
             try:
-                return fn()
+                t_start = time.perf_counter()
+                result = fn()
+                get_latency_tracer().record_since(f"api.{op_name}", t_start)
+                return result
             except Exception as e:
                 msg = str(e)
                 # HTTP 429エラーは特別に処理（より長い待機時間）
@@ -99,17 +123,21 @@ class HyperliquidAPI:
                 self.info = Info(constants.MAINNET_API_URL, skip_ws=True)
             
             # Exchangeクライアント（取引用）
+            # 並列署名でnonceが重複しないよう、共有アロケーター付きのExchangeを使う
+            nonce_allocator = install_nonce_allocator()
             if Config.USE_TESTNET:
-                self.exchange = Exchange(
+                self.exchange = NonceSafeExchange(
                     self.account,
                     constants.TESTNET_API_URL,
-                    account_address=self.address
+                    account_address=self.address,
+                    nonce_allocator=nonce_allocator
                 )
             else:
-                self.exchange = Exchange(
+                self.exchange = NonceSafeExchange(
                     self.account,
                     constants.MAINNET_API_URL,
-                    account_address=self.address
+                    account_address=self.address,
+                    nonce_allocator=nonce_allocator
                 )
             
             self._is_connected = True
@@ -145,6 +173,24 @@ class HyperliquidAPI:
             print(f"価格取得エラー: {e}")
             return None
     
+    def get_all_mids(self) -> Optional[Dict[str, str]]:
+        """全通貨の中値を取得（通貨 -> 価格文字列）"""
+        try:
+            return self._with_retry("all_mids", lambda: self.info.all_mids(),
+                                    priority=RequestPriority.NORMAL)
+        except Exception as e:
+            print(f"中値取得エラー: {e}")
+            return None
+
+    def get_l2_snapshot(self, symbol: str) -> Optional[Dict]:
+        """板のスナップショットを取得（WebSocketのl2Bookと同じ形式: coin, time, levels）"""
+        try:
+            return self._with_retry("l2_snapshot", lambda: self.info.l2_snapshot(symbol),
+                                    priority=RequestPriority.NORMAL)
+        except Exception as e:
+            print(f"板取得エラー ({symbol}): {e}")
+            return None
+
     def get_symbols_by_volume(self) -> List[str]:
         """出来高順に通貨ペアリストを取得（全通貨対応）"""
         try:
@@ -170,6 +216,7 @@ class HyperliquidAPI:
             
             # 通貨ペアと出来高のリストを作成
             volume_list = []
+            asset_ctxs_by_symbol = {}
             
             # universeとasset_ctxsを組み合わせ
             for universe_item, ctx in zip(universe, asset_ctxs):
@@ -180,6 +227,13 @@ class HyperliquidAPI:
                 
                 if symbol:
                     volume_list.append((symbol, volume))
+                    # ウォッチリスト用（前日終値と24時間出来高）
+                    prev_day_px = ctx.get('prevDayPx')
+                    asset_ctxs_by_symbol[symbol] = {
+                        'prev_day_px': float(prev_day_px) if prev_day_px else None,
+                        'day_volume': volume,
+                    }
+            self.asset_ctxs = asset_ctxs_by_symbol
             
             # 出来高が大きい順にソート
             volume_list.sort(key=lambda x: x[1], reverse=True)
@@ -272,6 +326,7 @@ class HyperliquidAPI:
     def get_positions(self) -> List[Dict]:
         """現在のポジションを取得"""
         try:
+            requested_at = time.time()
             user_state = self.get_account_state()
             if user_state and 'assetPositions' in user_state:
                 positions = []
@@ -284,7 +339,13 @@ class HyperliquidAPI:
                             'entry_price': float(position_data.get('entryPx', 0)),
                             'unrealized_pnl': float(position_data.get('unrealizedPnl', 0)),
                             'leverage': position_data.get('leverage', {}),
+                            # 清算価格（証拠金に余裕がある場合はNone）
+                            'liquidation_price': float(position_data['liquidationPx'])
+                                                 if position_data.get('liquidationPx') else None,
                         })
+                # ローカルポジションブックを更新（取引所時刻はストリームの約定時刻との比較用）
+                exchange_ts = float(user_state['time']) / 1000.0 if user_state.get('time') else None
+                self.position_book.apply_snapshot(positions, as_of=requested_at, exchange_ts=exchange_ts)
                 return positions
             return []
         except Exception as e:
@@ -403,13 +464,58 @@ class HyperliquidAPI:
                 'message': error_msg
             }
     
-    def place_limit_order(self, symbol: str, is_buy: bool, size: float, limit_price: float) -> Dict:
-        """指値注文を送信（高優先度）"""
+    def schedule_cancel(self, cancel_time_ms: Optional[int]) -> Dict:
+        """全注文キャンセルの予定時刻を設定（デッドマンスイッチ用）
+
+        Args:
+            cancel_time_ms: キャンセル予定時刻（UTCミリ秒）。Noneで予定を解除
+        """
+        try:
+            # 定期ハートビートで共有レート枠を消費しないようローカルリミッターは使わない
+            result = self._with_retry(
+                "schedule_cancel",
+                lambda: self.exchange.schedule_cancel(cancel_time_ms),
+                priority=RequestPriority.HIGH,
+                max_retries=2,
+                use_rate_limiter=False
+            )
+
+            if isinstance(result, dict) and result.get('status') == 'ok':
+                return {
+                    'success': True,
+                    'message': "キャンセル予定時刻を更新しました" if cancel_time_ms else "キャンセル予定を解除しました"
+                }
+
+            error_msg = result.get('response', result) if isinstance(result, dict) else result
+            return {
+                'success': False,
+                'error': str(error_msg),
+                'message': f"スケジュールキャンセルエラー: {error_msg}"
+            }
+
+        except Exception as e:
+            error_msg = f"スケジュールキャンセルエラー: {e}"
+            print(error_msg)
+            return {
+                'success': False,
+                'error': str(e),
+                'message': error_msg
+            }
+
+    def place_limit_order(self, symbol: str, is_buy: bool, size: float, limit_price: float,
+                          cloid: Optional[str] = None, priority: RequestPriority = RequestPriority.HIGH) -> Dict:
+        """指値注文を送信（高優先度）
+
+        Args:
+            cloid: クライアント注文ID（"0x" + 32桁の16進数。userFills の約定と注文を対応付ける）
+            priority: レートリミッターでの優先度（自動売買は NORMAL にして共有の上限を守る）
+        """
         try:
             action = '買い' if is_buy else '売り'
             print(f"[指値注文] {symbol} {action} サイズ={size} 価格=${limit_price}")
             
             # 指値注文を送信（高優先度、レートリミッターはバイパス可能）
+            sent_at = time.time()  # 約定はこれより後（ポジションブックのスナップショットとの比較用）
             order_result = self._with_retry(
                 "limit_order",
                 lambda: self.exchange.order(
@@ -417,9 +523,10 @@ class HyperliquidAPI:
                     is_buy=is_buy,
                     sz=size,
                     limit_px=limit_price,
-                    order_type={"limit": {"tif": "Gtc"}}
+                    order_type={"limit": {"tif": "Gtc"}},
+                    cloid=Cloid.from_str(cloid) if cloid else None
                 ),
-                priority=RequestPriority.HIGH,
+                priority=priority,
                 max_retries=3  # 注文は少ないリトライ回数で
             )
             
@@ -487,11 +594,16 @@ class HyperliquidAPI:
                             message = f"指値注文が即座に約定しました: {symbol} {'買い' if is_buy else '売り'} " \
                                      f"{filled_size} @ ${filled_price:.4f}"
                             
+                            self.position_book.apply_fill(symbol, is_buy, filled_size, filled_price,
+                                                          oid=filled_info.get('oid'), source='ack', ts=sent_at)
+                            
                             return {
                                 'success': True,
                                 'result': order_result,
                                 'message': message,
-                                'filled_price': filled_price
+                                'filled_size': filled_size,
+                                'filled_price': filled_price,
+                                'order_id': filled_info.get('oid')
                             }
             
             # ここに到達した場合は情報不足
@@ -510,22 +622,62 @@ class HyperliquidAPI:
                 'message': error_msg
             }
     
-    def place_market_order(self, symbol: str, is_buy: bool, size: float) -> Dict:
-        """成行注文を送信（高優先度）"""
+    @staticmethod
+    def _order_statuses(order_result) -> List:
+        """注文レスポンスからstatuses一覧を取り出す（なければ空リスト）"""
+        if not isinstance(order_result, dict):
+            return []
+        response = order_result.get('response', {})
+        if isinstance(response, dict):
+            return response.get('data', {}).get('statuses', []) or []
+        return []
+    
+    def _round_price(self, symbol: str, price: float) -> float:
+        """取引所の価格刻み（有効数字5桁・通貨ごとの小数桁数）に丸める"""
+        return self.exchange._slippage_price(symbol, True, 0.0, px=price)
+    
+    def _fresh_mid(self, symbol: str) -> Optional[float]:
+        """WebSocketの最新中値（5秒以内に更新されたもののみ）"""
+        mid = self.latest_mids.get(symbol)
+        return float(mid) if mid is not None and time.time() - self.latest_mids_ts <= 5 else None
+    
+    def _market_order_request(self, symbol: str, is_buy: bool, size: float, reduce_only: bool = False,
+                              cloid: Optional[str] = None):
+        """成行（スリッページ付きIOC指値）注文を送信
+        
+        WebSocketの最新中値が新しければそれを基準価格に使い、
+        SDKのmarket_openが行うall_midsの事前取得（往復1回分）を省略します。
+        """
+        limit_px = self.exchange._slippage_price(symbol, is_buy, 0.05, px=self._fresh_mid(symbol))
+        return self.exchange.order(
+            name=symbol,
+            is_buy=is_buy,
+            sz=size,
+            limit_px=limit_px,
+            order_type={"limit": {"tif": "Ioc"}},
+            reduce_only=reduce_only,
+            cloid=Cloid.from_str(cloid) if cloid else None
+        )
+    
+    def place_market_order(self, symbol: str, is_buy: bool, size: float, reduce_only: bool = False,
+                           cloid: Optional[str] = None, priority: RequestPriority = RequestPriority.HIGH) -> Dict:
+        """成行注文を送信（高優先度）
+        
+        Args:
+            reduce_only: ポジションを減らす方向のみ約定させるか（決済用）
+            cloid: クライアント注文ID（"0x" + 32桁の16進数）
+            priority: レートリミッターでの優先度（自動売買は NORMAL にして共有の上限を守る）
+        """
         try:
             action = '買い' if is_buy else '売り'
-            print(f"[注文] {symbol} {action} サイズ={size}")
+            print(f"[注文] {symbol} {action} サイズ={size}{' (reduce-only)' if reduce_only else ''}")
             
             # 成行注文を送信（高優先度、レートリミッターはバイパス可能）
+            sent_at = time.time()  # 約定はこれより後（ポジションブックのスナップショットとの比較用）
             order_result = self._with_retry(
                 "market_open",
-                lambda: self.exchange.market_open(
-                    name=symbol,
-                    is_buy=is_buy,
-                    sz=size,
-                    slippage=0.05
-                ),
-                priority=RequestPriority.HIGH,
+                lambda: self._market_order_request(symbol, is_buy, size, reduce_only, cloid),
+                priority=priority,
                 max_retries=3  # 注文は少ないリトライ回数で
             )
             
@@ -554,8 +706,8 @@ class HyperliquidAPI:
                             'error': error_msg,
                             'message': f"注文エラー: {error_msg}"
                         }
-                    elif status == 'ok':
-                        # 成功
+                    elif status == 'ok' and not self._order_statuses(order_result):
+                        # 成功（約定詳細なし）
                         return {
                             'success': True,
                             'result': order_result,
@@ -610,12 +762,18 @@ class HyperliquidAPI:
                             
                             print(f"[約定成功] {symbol} {action} サイズ={filled_size} 価格=${filled_price:.4f}")
                             
+                            # ローカルポジションブックに即時反映（userFillsとは注文IDで重複排除）
+                            self.position_book.apply_fill(symbol, is_buy, filled_size, filled_price,
+                                                          oid=filled_info.get('oid'), source='ack', ts=sent_at)
+                            
                             return {
                                 'success': True,
                                 'result': order_result,
                                 'message': message,
                                 'filled_size': filled_size,
-                                'requested_size': size
+                                'filled_price': filled_price,
+                                'requested_size': size,
+                                'order_id': filled_info.get('oid')
                             }
             
             # ここに到達した場合は失敗とみなす（約定情報がない）
@@ -634,17 +792,156 @@ class HyperliquidAPI:
                 'message': error_msg
             }
     
+    def place_order_with_tpsl(self, symbol: str, is_buy: bool, size: float, limit_price: Optional[float] = None,
+                              take_profit_px: Optional[float] = None, stop_loss_px: Optional[float] = None) -> Dict:
+        """新規注文と取引所ネイティブのTP/SLをまとめて送信（高優先度）
+        
+        新規注文・利確（指値トリガー）・損切り（成行トリガー）を1つのnormalTpslバッチで送ります。
+        TP/SLは取引所側で監視されるため、このプロセスが停止していても発動します。
+        
+        Args:
+            limit_price: 指値価格（Noneなら成行）
+            take_profit_px: 利確トリガー価格（Noneなら付けない）
+            stop_loss_px: 損切りトリガー価格（Noneなら付けない）
+        """
+        try:
+            action = '買い' if is_buy else '売り'
+            if take_profit_px is None and stop_loss_px is None:
+                return {
+                    'success': False,
+                    'error': 'No TP/SL',
+                    'message': "TP/SL注文エラー: 利確・損切り価格のいずれかを指定してください"
+                }
+            
+            # 基準価格に対するTP/SLの向きを確認（買いならSL < 基準 < TP）
+            reference_px = limit_price or self._fresh_mid(symbol) or self.get_price(symbol)
+            if reference_px:
+                wrong_tp = take_profit_px is not None and (take_profit_px <= reference_px if is_buy else take_profit_px >= reference_px)
+                wrong_sl = stop_loss_px is not None and (stop_loss_px >= reference_px if is_buy else stop_loss_px <= reference_px)
+                if wrong_tp or wrong_sl:
+                    return {
+                        'success': False,
+                        'error': 'Invalid TP/SL',
+                        'message': f"TP/SL注文エラー: {action}の場合は"
+                                   f"{'損切り < 価格 < 利確' if is_buy else '利確 < 価格 < 損切り'}で指定してください "
+                                   f"(基準価格: ${reference_px:,.4f})"
+                    }
+            
+            print(f"[TP/SL注文] {symbol} {action} サイズ={size} "
+                  f"{'成行' if limit_price is None else f'指値=${limit_price}'} TP={take_profit_px} SL={stop_loss_px}")
+            
+            def build_requests():
+                if limit_price is None:
+                    entry_px = self.exchange._slippage_price(symbol, is_buy, 0.05, px=self._fresh_mid(symbol))
+                    entry_type = {"limit": {"tif": "Ioc"}}
+                else:
+                    entry_px = self._round_price(symbol, limit_price)
+                    entry_type = {"limit": {"tif": "Gtc"}}
+                requests = [{"coin": symbol, "is_buy": is_buy, "sz": size, "limit_px": entry_px,
+                             "order_type": entry_type, "reduce_only": False}]
+                if take_profit_px is not None:
+                    # 利確: トリガー到達で指値（トリガー価格）を発注
+                    tp_px = self._round_price(symbol, take_profit_px)
+                    requests.append({"coin": symbol, "is_buy": not is_buy, "sz": size, "limit_px": tp_px,
+                                     "order_type": {"trigger": {"triggerPx": tp_px, "isMarket": False, "tpsl": "tp"}},
+                                     "reduce_only": True})
+                if stop_loss_px is not None:
+                    # 損切り: トリガー到達で成行（スリッページ上限付き）を発注
+                    sl_px = self._round_price(symbol, stop_loss_px)
+                    requests.append({"coin": symbol, "is_buy": not is_buy, "sz": size,
+                                     "limit_px": self.exchange._slippage_price(symbol, not is_buy, 0.05, px=sl_px),
+                                     "order_type": {"trigger": {"triggerPx": sl_px, "isMarket": True, "tpsl": "sl"}},
+                                     "reduce_only": True})
+                return requests
+            
+            sent_at = time.time()  # 約定はこれより後（ポジションブックのスナップショットとの比較用）
+            order_result = self._with_retry(
+                "order_with_tpsl",
+                lambda: self.exchange.bulk_orders(build_requests(), grouping="normalTpsl"),
+                priority=RequestPriority.HIGH,
+                max_retries=3  # 注文は少ないリトライ回数で
+            )
+            
+            if isinstance(order_result, dict) and order_result.get('status') == 'err':
+                error_msg = order_result.get('response', 'Unknown error')
+                return {
+                    'success': False,
+                    'error': error_msg,
+                    'message': f"TP/SL注文エラー: {error_msg}"
+                }
+            
+            statuses = self._order_statuses(order_result)
+            if not statuses:
+                return {
+                    'success': False,
+                    'error': 'No order info',
+                    'message': f"TP/SL注文失敗: 注文情報が確認できません ({order_result})"
+                }
+            
+            entry_status = statuses[0]
+            if isinstance(entry_status, dict) and 'error' in entry_status:
+                return {
+                    'success': False,
+                    'error': entry_status['error'],
+                    'message': f"TP/SL注文エラー（新規注文）: {entry_status['error']}"
+                }
+            
+            if isinstance(entry_status, dict) and 'filled' in entry_status:
+                filled_info = entry_status['filled']
+                filled_size = float(filled_info.get('totalSz', size))
+                filled_price = float(filled_info.get('avgPx', 0))
+                self.position_book.apply_fill(symbol, is_buy, filled_size, filled_price,
+                                              oid=filled_info.get('oid'), source='ack', ts=sent_at)
+                entry_text = f"約定 {filled_size} @ ${filled_price:.4f}"
+            elif isinstance(entry_status, dict) and 'resting' in entry_status:
+                entry_text = f"指値待機中 (注文ID: {entry_status['resting'].get('oid', 'unknown')})"
+            else:
+                entry_text = str(entry_status)
+            
+            # TP/SL側のエラー（新規注文は通っているので成功扱いにし、内容を通知する）
+            trigger_errors = [st['error'] for st in statuses[1:] if isinstance(st, dict) and 'error' in st]
+            trigger_text = ' / '.join(f"{label}=${px:,.4f}" for label, px in
+                                      (('TP', take_profit_px), ('SL', stop_loss_px)) if px is not None)
+            message = f"TP/SL付き注文を発注しました: {symbol} {action} {size} {entry_text} [{trigger_text}]"
+            if trigger_errors:
+                message += f"\n[警告] TP/SLの一部が受け付けられませんでした: {'; '.join(trigger_errors)}"
+                print(f"[警告] TP/SLエラー: {trigger_errors}")
+            
+            return {
+                'success': True,
+                'result': order_result,
+                'message': message,
+                'trigger_errors': trigger_errors
+            }
+            
+        except Exception as e:
+            error_msg = f"TP/SL注文エラー: {e}"
+            print(error_msg)
+            return {
+                'success': False,
+                'error': str(e),
+                'message': error_msg
+            }
+    
+    def _find_position(self, symbol: str) -> Optional[Dict]:
+        """決済対象のポジションを取得
+        
+        ローカルポジションブックを優先し、見つからない場合（未取得・取りこぼし）のみ
+        user_stateを取得して確認します。
+        """
+        position = self.position_book.get(symbol) if self.position_book.is_primed() else None
+        if position:
+            return position
+        for pos in self.get_positions():
+            if pos['coin'] == symbol:
+                return pos
+        return None
+    
     def close_position(self, symbol: str) -> Dict:
         """ポジションを決済（全量）"""
         try:
-            # 現在のポジションを取得
-            positions = self.get_positions()
-            position = None
-            
-            for pos in positions:
-                if pos['coin'] == symbol:
-                    position = pos
-                    break
+            # 現在のポジションを取得（ローカルブック優先、REST往復なし）
+            position = self._find_position(symbol)
             
             if not position:
                 return {
@@ -656,8 +953,8 @@ class HyperliquidAPI:
             size = abs(position['size'])
             is_buy = position['size'] < 0  # ショートポジションの場合は買いで決済
             
-            # 決済注文を送信
-            result = self.place_market_order(symbol, is_buy, size)
+            # 決済注文を送信（reduce-only: ローカル値が古くても建玉を超えて反対売買しない）
+            result = self.place_market_order(symbol, is_buy, size, reduce_only=True)
             
             if result['success']:
                 result['message'] = f"{symbol}のポジションを決済しました（全量: {size}）"
@@ -676,14 +973,8 @@ class HyperliquidAPI:
     def close_position_partial(self, symbol: str, close_size: float) -> Dict:
         """ポジションを一部決済"""
         try:
-            # 現在のポジションを取得
-            positions = self.get_positions()
-            position = None
-            
-            for pos in positions:
-                if pos['coin'] == symbol:
-                    position = pos
-                    break
+            # 現在のポジションを取得（ローカルブック優先、REST往復なし）
+            position = self._find_position(symbol)
             
             if not position:
                 return {
@@ -702,8 +993,8 @@ class HyperliquidAPI:
                     'message': f"決済サイズ({close_size})が現在のポジション({current_size})を超えています"
                 }
             
-            # 決済注文を送信
-            result = self.place_market_order(symbol, is_buy, close_size)
+            # 決済注文を送信（reduce-only）
+            result = self.place_market_order(symbol, is_buy, close_size, reduce_only=True)
             
             if result['success']:
                 remaining = current_size - close_size
@@ -725,7 +1016,10 @@ class HyperliquidAPI:
         import concurrent.futures
         
         try:
-            positions = self.get_positions()
+            # ローカルブック優先（空の場合のみRESTで確認）
+            positions = self.position_book.all() if self.position_book.is_primed() else []
+            if not positions:
+                positions = self.get_positions()
             
             if not positions:
                 return {
@@ -747,7 +1041,7 @@ class HyperliquidAPI:
                 
                 print(f"決済中: {symbol} {'買い' if is_buy else '売り'} {size}")
                 
-                result = self.place_market_order(symbol, is_buy, size)
+                result = self.place_market_order(symbol, is_buy, size, reduce_only=True)
                 
                 if result['success']:
                     print(f"[OK] {symbol} 決済成功")
@@ -798,6 +1092,7 @@ class HyperliquidAPI:
         self._price_callback = callback
         ws_url = Config.get_ws_url()
         reconnect_count = 0
+        connected_once = False
         
         while True:
             try:
@@ -810,37 +1105,69 @@ class HyperliquidAPI:
                         }
                     }
                     await websocket.send(json.dumps(subscribe_msg))
+                    # 追加購読（ユーザー約定など）を再送
+                    for subscription in list(self._stream_subscriptions):
+                        await websocket.send(json.dumps({"method": "subscribe", "subscription": subscription}))
+                    self._ws = websocket
+                    self._ws_loop = asyncio.get_running_loop()
                     print("WebSocket接続成功")
                     reconnect_count = 0  # 接続成功時にカウントをリセット
+                    for listener in list(self._connection_listeners):
+                        try:
+                            listener(connected_once)
+                        except Exception as e:
+                            print(f"[WS] 接続リスナーでエラー: {e}")
+                    connected_once = True
                     
                     # メッセージを受信
                     async for message in websocket:
+                        t_recv = time.perf_counter()
                         try:
                             data = json.loads(message)
+                            channel = data.get('channel')
                             
-                            if data.get('channel') == 'allMids' and 'data' in data:
+                            if channel == 'allMids' and 'data' in data:
                                 mids = data['data'].get('mids', {})
+                                if mids:
+                                    self.latest_mids.update(mids)
+                                    self.latest_mids_ts = time.time()
+                                    self.latest_mids_recv = t_recv
                                 
                                 # コールバックを呼び出し
                                 if self._price_callback and mids:
                                     self._price_callback(mids)
+                                for listener in self._mids_listeners:
+                                    try:
+                                        listener(mids, t_recv)
+                                    except Exception as e:
+                                        print(f"[WS] allMidsリスナーでエラー: {e}")
+                            elif channel in self._stream_handlers and 'data' in data:
+                                for handler in self._stream_handlers[channel]:
+                                    try:
+                                        handler(data['data'])
+                                    except Exception as e:
+                                        print(f"[WS] {channel}ハンドラーでエラー: {e}")
                         except json.JSONDecodeError:
                             print("警告: WebSocketメッセージのJSON解析に失敗しました")
                             continue
                 
             except websockets.exceptions.ConnectionClosedError:
+                self._ws = None
                 reconnect_count += 1
                 print(f"WebSocket接続が切断されました（試行 {reconnect_count}回目）")
             except websockets.exceptions.ConnectionClosedOK:
+                self._ws = None
                 print("WebSocket接続が正常に終了しました")
                 break
             except websockets.exceptions.InvalidStatusCode as e:
                 reconnect_count += 1
                 print(f"WebSocket接続エラー: 無効なステータスコード（{e.status_code}）")
             except OSError as e:
+                self._ws = None
                 reconnect_count += 1
                 print(f"ネットワークエラー: 接続できません")
             except Exception as e:
+                self._ws = None
                 reconnect_count += 1
                 print(f"WebSocket予期しないエラー: {type(e).__name__}")
                 # デバッグモードの場合のみ詳細を表示
@@ -857,10 +1184,99 @@ class HyperliquidAPI:
             print(f"{wait_time}秒後に再接続します...")
             await asyncio.sleep(wait_time)
     
+    def subscribe_stream(self, subscription: Dict, handler: Callable):
+        """WebSocketの追加チャネルを購読（接続中なら即時送信、再接続時は自動で再購読）
+        
+        Args:
+            subscription: 購読内容（例: {"type": "userFills", "user": address}）
+            handler: チャネルのdataを受け取るコールバック（WebSocketスレッドから呼ばれる）
+        """
+        handlers = self._stream_handlers.setdefault(subscription['type'], [])
+        if handler not in handlers:
+            handlers.append(handler)
+        if subscription not in self._stream_subscriptions:
+            self._stream_subscriptions.append(subscription)
+            self._send_ws({"method": "subscribe", "subscription": subscription})
+    
+    def unsubscribe_stream(self, subscription: Dict):
+        """追加チャネルの購読を解除"""
+        if subscription in self._stream_subscriptions:
+            self._stream_subscriptions.remove(subscription)
+            self._send_ws({"method": "unsubscribe", "subscription": subscription})
+    
+    def add_mids_listener(self, listener: Callable):
+        """allMidsの受信ごとに listener(mids, t_recv) を呼ぶ（WebSocketスレッドから呼ばれる）"""
+        if listener not in self._mids_listeners:
+            self._mids_listeners.append(listener)
+
+    def remove_stream_handler(self, channel: str, handler: Callable):
+        """subscribe_stream で登録したハンドラだけを外す（購読は他のハンドラのために残す）"""
+        handlers = self._stream_handlers.get(channel)
+        if handlers and handler in handlers:
+            handlers.remove(handler)
+
+    def remove_mids_listener(self, listener: Callable):
+        if listener in self._mids_listeners:
+            self._mids_listeners.remove(listener)
+
+    def add_connection_listener(self, listener: Callable):
+        """WebSocketの接続（購読の送信後）ごとに listener(reconnected) を呼ぶ
+
+        reconnected は2回目以降の接続で True（切断中の欠損を取り直す契機）
+        """
+        if listener not in self._connection_listeners:
+            self._connection_listeners.append(listener)
+
+    def remove_connection_listener(self, listener: Callable):
+        if listener in self._connection_listeners:
+            self._connection_listeners.remove(listener)
+
+    def is_streaming(self) -> bool:
+        """価格ストリームのスレッドが動いているか"""
+        return self._ws_thread is not None and self._ws_thread.is_alive()
+
+    def _send_ws(self, payload: Dict):
+        """接続中のWebSocketへ送信（未接続なら再接続時の購読に任せる）"""
+        websocket, loop = self._ws, self._ws_loop
+        if websocket is None or loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(websocket.send(json.dumps(payload)), loop)
+        except RuntimeError:
+            pass  # ループ停止中
+    
+    def subscribe_bbo(self, symbols: List[str], handler: Callable):
+        """指定通貨の最良気配（bbo）を購読
+        
+        Args:
+            handler: handler(coin, bid, ask) を受け取るコールバック（WebSocketスレッドから呼ばれる）
+        """
+        self._bbo_callback = handler
+        for symbol in symbols:
+            self.subscribe_stream({"type": "bbo", "coin": symbol}, self._on_bbo)
+    
+    def _on_bbo(self, data: Dict):
+        """bboストリームの最良気配をコールバックへ渡す"""
+        levels = data.get('bbo') or []
+        if not self._bbo_callback or len(levels) < 2 or not levels[0] or not levels[1]:
+            return  # 片側の板が空
+        try:
+            self._bbo_callback(data['coin'], float(levels[0]['px']), float(levels[1]['px']))
+        except (KeyError, ValueError, TypeError):
+            pass
+    
+    def _on_user_fills(self, data: Dict):
+        """userFillsストリームの約定をポジションブックに反映"""
+        self.position_book.apply_user_fills(data)
+    
     def start_price_stream(self, symbols: List[str], callback: Callable):
         """価格ストリームを開始（別スレッドで実行）"""
         import threading
         
+        # ユーザー約定ストリーム（ポジションブックの差分更新）
+        if self.address:
+            self.subscribe_stream({"type": "userFills", "user": self.address}, self._on_user_fills)
+        
         def run_async():
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
@@ -868,4 +1284,5 @@ class HyperliquidAPI:
         
         thread = threading.Thread(target=run_async, daemon=True)
         thread.start()
+        self._ws_thread = thread
 
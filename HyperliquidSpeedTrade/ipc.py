@@ -0,0 +1,63 @@
+"""
+IPCフレーミングモジュール
+エンジンプロセスとGUI/CLIクライアント間のメッセージを
+「4バイト長（ビッグエンディアン）+ msgpack本体」のバイナリフレームで送受信します
+
+メッセージの種類（キー 't'）:
+  - 'auth': 接続直後にクライアントが送る {'t', 'token'}。エンジンは {'t', 'ok'} を返し、失敗なら切断する
+  - 'req': {'t', 'id', 'm'(メソッド名), 'a'(位置引数), 'k'(キーワード引数)}
+  - 'res': {'t', 'id', 'ok', 'r'(戻り値) または 'e'(エラー文字列)}
+  - 'evt': {'t', 'ch'(チャネル), 'd'(データ)}
+"""
+import socket
+import struct
+from typing import Any, Optional
+
+import msgpack
+
+_HEADER = struct.Struct('>I')
+MAX_FRAME_SIZE = 16 * 1024 * 1024  # 壊れたフレームで巨大なバッファを確保しないための上限
+
+
+class ConnectionClosed(Exception):
+    """相手側が接続を閉じた"""
+
+
+def encode_frame(message: Any) -> bytes:
+    """メッセージを1フレームのバイト列に変換"""
+    body = msgpack.packb(message, use_bin_type=True)
+    return _HEADER.pack(len(body)) + body
+
+
+def send_frame(sock: socket.socket, message: Any):
+    """1フレーム送信（呼び出し側で送信ロックを取ること）"""
+    sock.sendall(encode_frame(message))
+
+
+def recv_frame(sock: socket.socket) -> Any:
+    """1フレーム受信（接続が閉じられたらConnectionClosed）"""
+    header = _recv_exact(sock, _HEADER.size)
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ConnectionClosed(f"フレームが大きすぎます: {length} bytes")
+    return msgpack.unpackb(_recv_exact(sock, length), raw=False, strict_map_key=False)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:], size - received)
+        if n == 0:
+            raise ConnectionClosed("接続が閉じられました")
+        received += n
+    return bytes(buf)
+
+
+def connect(host: str, port: int, timeout: Optional[float] = 5.0) -> socket.socket:
+    """エンジンに接続（Nagleを無効化して小さなフレームを即送信）"""
+    sock = socket.create_connection((host, port), timeout=timeout)
+    sock.settimeout(None)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
@@ -0,0 +1,153 @@
+"""
+レイテンシ計測モジュール
+クリック→取引所応答、価格受信→描画などの区間ごとの遅延を
+対数バケットのヒストグラムに記録し、p50/p99/最大値を求めます
+"""
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from config import Config
+
+
+class LatencyHistogram:
+    """ストリーミング用の対数バケットヒストグラム（ミリ秒）
+
+    サンプルを保存せずバケット数だけのカウンタで分位点を求めます（誤差はバケット幅の約10%以内）
+    """
+
+    MIN_MS = 0.01
+    MAX_MS = 120000.0
+    RATIO = 1.1
+
+    _LOG_RATIO = math.log(RATIO)
+    _BUCKETS = int(math.log(MAX_MS / MIN_MS) / math.log(RATIO)) + 2
+
+    def __init__(self):
+        self.counts = [0] * self._BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, ms: float):
+        if ms < 0:
+            return
+        if ms <= self.MIN_MS:
+            index = 0
+        else:
+            index = min(int(math.log(ms / self.MIN_MS) / self._LOG_RATIO) + 1, self._BUCKETS - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, q: float) -> Optional[float]:
+        """分位点（q: 0〜100）。バケットの上端を返す（最大値で頭打ち）"""
+        if self.count == 0:
+            return None
+        target = max(1, math.ceil(self.count * q / 100.0))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                upper = self.MIN_MS * (self.RATIO ** index)
+                return min(upper, self.max)
+        return self.max
+
+    def summary(self) -> Dict:
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'max': self.max if self.count else None,
+        }
+
+
+class LatencyTracer:
+    """区間ごとのレイテンシを集計（スレッドセーフ）
+
+    区間名の例:
+      - order.queue: クリック → ワーカーでの送信開始
+      - order.exchange: 送信開始 → 取引所応答
+      - order.total: クリック → 取引所応答
+      - order.paint: 取引所応答 → GUIへの結果表示
+      - tick.dispatch: 価格受信 → GUIスレッドでの処理開始
+      - tick.paint: 価格受信 → price_labelの更新
+      - api.<操作名>: API呼び出し1回（リトライ・レートリミット待機を除く）
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self.started_at = time.time()
+
+    def record(self, stage: str, ms: Optional[float]):
+        """区間の遅延（ミリ秒）を記録"""
+        if not self.enabled or ms is None:
+            return
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = LatencyHistogram()
+            histogram.record(ms)
+
+    def record_since(self, stage: str, t_start: Optional[float]):
+        """t_start（time.perf_counter）から現在までを記録"""
+        if t_start is not None:
+            self.record(stage, (time.perf_counter() - t_start) * 1000.0)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """区間名 -> {'count', 'mean', 'p50', 'p99', 'max'}"""
+        with self._lock:
+            return {stage: h.summary() for stage, h in sorted(self._histograms.items())}
+
+    def summary_text(self, stages: List[tuple]) -> str:
+        """ステータスバー用の短い表示（例: 注文 45/120ms = p50/p99）
+
+        Args:
+            stages: [(区間名, 表示名), ...]
+        """
+        snapshot = self.snapshot()
+        parts = []
+        for stage, label in stages:
+            stats = snapshot.get(stage)
+            if stats and stats['count']:
+                parts.append(f"{label} {stats['p50']:.0f}/{stats['p99']:.0f}ms")
+        return " | ".join(parts)
+
+    def export(self, path: str) -> str:
+        """集計結果をJSONで書き出し、書き出したパスを返す"""
+        data = {
+            'started_at': self.started_at,
+            'exported_at': time.time(),
+            'stages': self.snapshot(),
+        }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return path
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self.started_at = time.time()
+
+
+# グローバルインスタンス（GUI・メイン・APIで共有）
+_global_tracer: Optional[LatencyTracer] = None
+
+
+def get_latency_tracer() -> LatencyTracer:
+    """グローバルレイテンシトレーサーを取得（シングルトン）"""
+    global _global_tracer
+    if _global_tracer is None:
+        _global_tracer = LatencyTracer(enabled=Config.LATENCY_TRACING)
+    return _global_tracer
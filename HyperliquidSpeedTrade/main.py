@@ -2,21 +2,56 @@
 Hyperliquid Speed Trade - メインアプリケーション
 MT4スピード注文のようなUIでHyperliquidの取引を行います
 """
+import argparse
 import sys
 import threading
 import time
 from hyperliquid_api import HyperliquidAPI
 from gui import SpeedTradeGUI
 from config import Config
+from conditional_orders import ConditionalOrderEngine
+from dead_man_switch import DeadManSwitch
+from order_dispatcher import OrderDispatcher
+from mark_to_market import MarkToMarketEngine
+from watchlist import WatchlistModel
+from price_history import PriceHistoryStore
+from latency import get_latency_tracer
+
+# ステータスバーに表示するレイテンシ区間（区間名, 表示名）
+LATENCY_STATUS_STAGES = [('order.total', "注文"), ('tick.paint', "価格")]
 
 class SpeedTradeApp:
     """メインアプリケーションクラス"""
     
-    def __init__(self):
-        """初期化"""
-        self.api = HyperliquidAPI()
+    def __init__(self, api=None):
+        """初期化
+        
+        Args:
+            api: APIクライアント（省略時はこのプロセスで動くHyperliquidAPI。
+                 別プロセスのエンジンに接続する場合はengine_client.RemoteAPI）
+        """
+        self.api = api or HyperliquidAPI()
         self.gui = SpeedTradeGUI()
         self.is_running = True
+        self.dead_man_switch = None
+        # 注文ディスパッチャー（ワーカーは起動時に事前生成）
+        self.dispatcher = OrderDispatcher(workers=Config.ORDER_WORKERS, queue_size=Config.ORDER_QUEUE_SIZE)
+        # 条件付き注文エンジン（発動時はディスパッチャー経由で成行注文）
+        self.conditional_engine = ConditionalOrderEngine(
+            fire_callback=self.on_conditional_fired,
+            storage_path=Config.CONDITIONAL_ORDERS_FILE
+        )
+        # 時価評価エンジン（ポジションブックと中値から含み損益などを毎フレーム再計算）
+        self.mark_to_market = MarkToMarketEngine(self.api.position_book)
+        # 価格更新のまとめ処理（GUIの1フレームに最新価格を1回だけ反映）
+        self._price_lock = threading.Lock()
+        self._pending_prices = {}
+        self._price_flush_scheduled = False
+        self._pending_recv = None  # まとめた価格のうち最も古い受信時刻（time.perf_counter）
+        self.latency = get_latency_tracer()
+        self.watchlist = None
+        self.price_history = None
+        self._book_symbol = None  # L2板を購読中の通貨
         
     def initialize(self):
         """アプリケーションを初期化"""
@@ -31,6 +66,9 @@ class SpeedTradeApp:
             print("2. PRIVATE_KEYを設定")
             return False
         
+        # 注文ワーカーを事前起動
+        self.dispatcher.start()
+        
         # 出来高順に通貨ペアリストを取得
         print("出来高情報を取得中...")
         sorted_symbols = self.api.get_symbols_by_volume()
@@ -46,16 +84,49 @@ class SpeedTradeApp:
         self.gui.set_close_callback(self.on_close_position)
         self.gui.on_symbol_change_callback = self.on_symbol_change
         self.gui.on_cancel_order_callback = self.on_cancel_order  # 注文キャンセル
+        self.gui.on_bracket_order_callback = self.on_bracket_order  # TP/SL付き注文
+        self.gui.on_add_conditional_callback = self.on_add_conditional  # 条件付き注文の登録
+        self.gui.on_cancel_conditional_callback = self.on_cancel_conditional  # 条件付き注文の解除
+        
+        # 前回起動時の条件付き注文を復元
+        restored = self.conditional_engine.load()
+        if restored:
+            self.gui.add_log(f"条件付き注文を復元しました: {restored}件")
+        self.gui.update_conditional_count(restored)
         
         # 価格ストリーム開始（全ての通貨ペアを購読）
         # 取得した通貨ペアリスト（上位100個まで）を購読してWebSocketの負荷を軽減
         subscribe_symbols = sorted_symbols[:100] if len(sorted_symbols) > 100 else sorted_symbols
         print(f"価格ストリーム開始: {len(subscribe_symbols)}個の通貨ペアを購読")
+        
+        # 価格履歴とチャート（全購読通貨の履歴を保持し、表示通貨の切り替えを即時にする）
+        if Config.CHART_ENABLED:
+            self.price_history = PriceHistoryStore(subscribe_symbols, tick_capacity=Config.CHART_TICK_CAPACITY,
+                                                   candle_capacity=Config.CHART_CANDLE_CAPACITY)
+            self.gui.create_chart(self.price_history)
+        
+        # 板ラダー（現在の通貨のL2板のみ購読し、通貨切り替え時に購読し直す）
+        if Config.DOM_ENABLED:
+            self.gui.create_dom_ladder()
+            self._subscribe_book(self.gui.current_symbol)
+        
+        # ウォッチリスト（購読中の全通貨の価格・変化率・スプレッド・出来高）
+        if Config.WATCHLIST_ENABLED:
+            self.watchlist = WatchlistModel(subscribe_symbols, self.api.asset_ctxs)
+            self.gui.create_watchlist(self.watchlist)
+            self.api.subscribe_bbo(subscribe_symbols, self.watchlist.update_bbo)
         self.api.start_price_stream(subscribe_symbols, self.on_price_update)
         
+        # 起動直後にポジションを取得（ローカルポジションブックの初期化を兼ねる）
+        self.update_positions()
+        
         # ポジション更新スレッド開始
         self.start_position_updater()
         
+        # デッドマンスイッチ開始（有効時のみ）
+        if Config.DEAD_MAN_SWITCH_ENABLED:
+            self.start_dead_man_switch()
+        
         print("初期化完了！")
         self.gui.show_status("接続済み - 取引準備完了")
         
@@ -66,25 +137,88 @@ class SpeedTradeApp:
     
     def on_price_update(self, prices: dict):
         """価格が更新された時のコールバック"""
-        # GUIスレッドで価格を更新（クロージャ問題を回避）
+        # 条件付き注文の判定はGUIを待たずにストリームのスレッドで行う
+        self.conditional_engine.on_prices(prices)
+        # 価格履歴（チャート用）もストリームのスレッドで記録
+        if self.price_history:
+            self.price_history.record(prices)
+        
+        # GUIスレッドで価格を更新（未反映の更新はまとめて1回だけ描画する）
         if self.gui.root:
-            # pricesのコピーを作成して安全に渡す
-            prices_copy = dict(prices)
-            self.gui.root.after(0, lambda p=prices_copy: self.gui.update_price(p))
+            t_recv = getattr(self.api, 'latest_mids_recv', None)
+            with self._price_lock:
+                self._pending_prices.update(prices)
+                if self._pending_recv is None:
+                    self._pending_recv = t_recv
+                if self._price_flush_scheduled:
+                    return
+                self._price_flush_scheduled = True
+            self.gui.root.after(0, self._flush_prices)
+    
+    def _flush_prices(self):
+        """まとめた最新価格をGUIへ反映し、ポジションを時価評価（GUIスレッド）"""
+        with self._price_lock:
+            prices = dict(self._pending_prices)
+            t_recv, self._pending_recv = self._pending_recv, None
+            self._price_flush_scheduled = False
+        self.latency.record_since('tick.dispatch', t_recv)
+        self.gui.update_price(prices, t_recv=t_recv)
+        self._update_live_metrics(prices)
+        if self.watchlist:
+            self.watchlist.update_mids(prices)
+            self.gui.paint_watchlist()
+    
+    def _update_live_metrics(self, prices: dict, fallback_positions: list = None):
+        """含み損益・Equity・レバレッジ・清算距離をローカルで再計算して表示（GUIスレッド）"""
+        live = self.mark_to_market.compute(prices)
+        if live is None:
+            if fallback_positions is not None:
+                self.gui.update_positions(fallback_positions)
+            return
+        self.gui.update_positions(live['positions'])
+        if live['equity'] is not None:
+            self.gui.update_account_info(equity=live['equity'])
+            self.gui.update_account_leverage(live['leverage'])
     
     def on_symbol_change(self, symbol: str):
         """通貨ペアが変更された時のコールバック"""
         print(f"通貨ペアを {symbol} に変更しました")
+        if self.gui.dom_ladder:
+            self._subscribe_book(symbol)
         self.gui.show_status(f"{symbol}-USD に切り替えました")
     
-    def on_buy_order(self, symbol: str, size: float):
-        """買い注文のコールバック"""
-        self.gui.show_status(f"買い注文を送信中: {symbol} {size}...")
-        self.gui.add_log(f"買い注文送信: {symbol} サイズ={size}")
+    def _subscribe_book(self, symbol: str):
+        """L2板の購読を指定通貨に切り替え"""
+        if self._book_symbol == symbol:
+            return
+        if self._book_symbol:
+            self.api.unsubscribe_stream({"type": "l2Book", "coin": self._book_symbol})
+        self.api.subscribe_stream({"type": "l2Book", "coin": symbol}, self.gui.dom_ladder.on_book)
+        self._book_symbol = symbol
+    
+    def _dispatch_order(self, key, fn, refresh_schedule, t_click=None):
+        """注文ジョブをディスパッチャーに投入し、完了時にGUIへ結果を反映
         
-        # 別スレッドで実行
-        def execute():
-            result = self.api.place_market_order(symbol, True, size)
+        Args:
+            key: 順序保証のキー（通貨シンボル、Noneは全決済）
+            fn: 実行するAPI呼び出し
+            refresh_schedule: 成功後のポジション更新予定 [(遅延ms, 未約定注文も更新するか), ...]
+            t_click: クリック時刻（time.perf_counter）
+        
+        Returns:
+            bool: 投入できたか（キュー満杯ならFalse）
+        """
+        def on_done(job):
+            result = job.result if job.error is None else {
+                'success': False,
+                'error': str(job.error),
+                'message': f"注文処理エラー: {job.error}"
+            }
+            latency = job.latency_text()
+            if latency:
+                print(f"[LATENCY] {latency}")
+            for stage, ms in job.latency_ms().items():
+                self.latency.record(f"order.{stage}", ms)
             
             # GUIスレッドで結果を表示（クロージャ問題を回避）
             if self.gui.root:
@@ -92,158 +226,172 @@ class SpeedTradeApp:
                 message = result['message']
                 
                 if success:
-                    self.gui.root.after(0, lambda msg=message: self.gui.show_success(msg))
-                    self.gui.root.after(0, lambda msg=message: self.gui.add_log(f"[OK] {msg}"))
-                    # 成行注文後はポジションのみ更新（未約定注文は不要）
-                    self.gui.root.after(1000, lambda: self.update_positions(include_orders=False))
+                    self.gui.root.after(0, lambda msg=message: self._show_order_result(msg, True, job.t_ack))
+                    self.gui.root.after(0, lambda msg=message, lat=latency: self.gui.add_log(f"[OK] {msg} ({lat})"))
+                    for delay, include_orders in refresh_schedule:
+                        self.gui.root.after(delay, lambda inc=include_orders: self.update_positions(include_orders=inc))
                 else:
-                    self.gui.root.after(0, lambda msg=message: self.gui.show_error(msg))
+                    self.gui.root.after(0, lambda msg=message: self._show_order_result(msg, False, job.t_ack))
                     self.gui.root.after(0, lambda msg=message: self.gui.add_log(f"[NG] {msg}"))
         
-        threading.Thread(target=execute, daemon=True).start()
+        if not self.dispatcher.submit(key, fn, on_done, t_click=t_click):
+            # キュー満杯（連打時の背圧）: 注文は送信しない
+            # 条件付き注文の発動はストリームのスレッドから来るため、GUI更新はafter経由
+            if self.gui.root:
+                depth = self.dispatcher.queue_depth()
+                self.gui.root.after(0, lambda: self.gui.show_error(
+                    "注文キューが満杯です。処理完了を待ってから再度実行してください"))
+                self.gui.root.after(0, lambda d=depth: self.gui.add_log(
+                    f"[NG] 注文キュー満杯のため破棄: {key or '全決済'} (待機中: {d}件)"))
+            return False
+        return True
+    
+    def _show_order_result(self, message: str, success: bool, t_ack: float = None):
+        """注文結果を表示し、取引所応答から表示までの遅延を記録（GUIスレッド）"""
+        if success:
+            self.gui.show_success(message)
+        else:
+            self.gui.show_error(message)
+        self.latency.record_since('order.paint', t_ack)
+    
+    def on_buy_order(self, symbol: str, size: float):
+        """買い注文のコールバック"""
+        t_click = self.gui.take_click_time()
+        self.gui.show_status(f"買い注文を送信中: {symbol} {size}...")
+        self.gui.add_log(f"買い注文送信: {symbol} サイズ={size}")
+        
+        # 成行注文後はポジションのみ更新（未約定注文は不要）
+        self._dispatch_order(symbol, lambda: self.api.place_market_order(symbol, True, size),
+                             [(1000, False)], t_click=t_click)
     
     def on_limit_buy_order(self, symbol: str, size: float, limit_price: float):
         """指値買い注文のコールバック"""
+        t_click = self.gui.take_click_time()
         self.gui.show_status(f"指値買い注文を送信中: {symbol} {size} @ ${limit_price}...")
         self.gui.add_log(f"指値買い注文送信: {symbol} サイズ={size} 価格=${limit_price}")
         
-        # 別スレッドで実行
-        def execute():
-            result = self.api.place_limit_order(symbol, True, size, limit_price)
-            
-            # GUIスレッドで結果を表示（クロージャ問題を回避）
-            if self.gui.root:
-                success = result['success']
-                message = result['message']
-                
-                if success:
-                    self.gui.root.after(0, lambda msg=message: self.gui.show_success(msg))
-                    self.gui.root.after(0, lambda msg=message: self.gui.add_log(f"[OK] {msg}"))
-                    # 指値注文後は未約定注文リストも含めて更新
-                    self.gui.root.after(1000, lambda: self.update_positions(include_orders=True))
-                else:
-                    self.gui.root.after(0, lambda msg=message: self.gui.show_error(msg))
-                    self.gui.root.after(0, lambda msg=message: self.gui.add_log(f"[NG] {msg}"))
-        
-        threading.Thread(target=execute, daemon=True).start()
+        # 指値注文後は未約定注文リストも含めて更新
+        self._dispatch_order(symbol, lambda: self.api.place_limit_order(symbol, True, size, limit_price),
+                             [(1000, True)], t_click=t_click)
     
     def on_limit_sell_order(self, symbol: str, size: float, limit_price: float):
         """指値売り注文のコールバック"""
+        t_click = self.gui.take_click_time()
         self.gui.show_status(f"指値売り注文を送信中: {symbol} {size} @ ${limit_price}...")
         self.gui.add_log(f"指値売り注文送信: {symbol} サイズ={size} 価格=${limit_price}")
         
-        # 別スレッドで実行
-        def execute():
-            result = self.api.place_limit_order(symbol, False, size, limit_price)
-            
-            # GUIスレッドで結果を表示（クロージャ問題を回避）
-            if self.gui.root:
-                success = result['success']
-                message = result['message']
-                
-                if success:
-                    self.gui.root.after(0, lambda msg=message: self.gui.show_success(msg))
-                    self.gui.root.after(0, lambda msg=message: self.gui.add_log(f"[OK] {msg}"))
-                    # 指値注文後は未約定注文リストも含めて更新
-                    self.gui.root.after(1000, lambda: self.update_positions(include_orders=True))
-                else:
-                    self.gui.root.after(0, lambda msg=message: self.gui.show_error(msg))
-                    self.gui.root.after(0, lambda msg=message: self.gui.add_log(f"[NG] {msg}"))
-        
-        threading.Thread(target=execute, daemon=True).start()
+        # 指値注文後は未約定注文リストも含めて更新
+        self._dispatch_order(symbol, lambda: self.api.place_limit_order(symbol, False, size, limit_price),
+                             [(1000, True)], t_click=t_click)
     
     def on_sell_order(self, symbol: str, size: float):
         """売り注文のコールバック"""
+        t_click = self.gui.take_click_time()
         self.gui.show_status(f"売り注文を送信中: {symbol} {size}...")
         self.gui.add_log(f"売り注文送信: {symbol} サイズ={size}")
         
-        # 別スレッドで実行
-        def execute():
-            result = self.api.place_market_order(symbol, False, size)
-            
-            # GUIスレッドで結果を表示（クロージャ問題を回避）
-            if self.gui.root:
-                success = result['success']
-                message = result['message']
-                
-                if success:
-                    self.gui.root.after(0, lambda msg=message: self.gui.show_success(msg))
-                    self.gui.root.after(0, lambda msg=message: self.gui.add_log(f"[OK] {msg}"))
-                    # 成行注文後はポジションのみ更新（未約定注文は不要）
-                    self.gui.root.after(1000, lambda: self.update_positions(include_orders=False))
-                else:
-                    self.gui.root.after(0, lambda msg=message: self.gui.show_error(msg))
-                    self.gui.root.after(0, lambda msg=message: self.gui.add_log(f"[NG] {msg}"))
+        # 成行注文後はポジションのみ更新（未約定注文は不要）
+        self._dispatch_order(symbol, lambda: self.api.place_market_order(symbol, False, size),
+                             [(1000, False)], t_click=t_click)
+    
+    def on_bracket_order(self, symbol: str, is_buy: bool, size: float, limit_price: float = None,
+                         take_profit_px: float = None, stop_loss_px: float = None):
+        """TP/SL付き注文のコールバック（TP/SLは取引所側でトリガー）"""
+        t_click = self.gui.take_click_time()
+        side = '買い' if is_buy else '売り'
+        self.gui.show_status(f"TP/SL付き{side}注文を送信中: {symbol} {size}...")
+        self.gui.add_log(f"TP/SL付き{side}注文送信: {symbol} サイズ={size} "
+                         f"{'成行' if limit_price is None else f'指値=${limit_price}'} TP={take_profit_px} SL={stop_loss_px}")
         
-        threading.Thread(target=execute, daemon=True).start()
+        # TP/SLは未約定注文として残るため、未約定注文リストも含めて更新
+        self._dispatch_order(symbol, lambda: self.api.place_order_with_tpsl(
+            symbol, is_buy, size, limit_price, take_profit_px, stop_loss_px
+        ), [(1000, True)], t_click=t_click)
     
     def on_close_position(self, symbol: str = None, size: float = None):
         """ポジション決済のコールバック（symbol=Noneで全決済、size=Noneで全量決済）"""
+        t_click = self.gui.take_click_time()
         if symbol is None:
             self.gui.show_status("全ポジション決済中...")
             self.gui.add_log("全決済開始（並列処理）")
+            fn = self.api.close_all_positions
         else:
             if size is None:
                 self.gui.show_status(f"ポジション決済中: {symbol} (全量)...")
                 self.gui.add_log(f"決済開始: {symbol} (全量)")
+                fn = lambda: self.api.close_position(symbol)
             else:
                 self.gui.show_status(f"ポジション決済中: {symbol} {size}...")
                 self.gui.add_log(f"決済開始: {symbol} サイズ={size}")
+                fn = lambda: self.api.close_position_partial(symbol, size)
         
-        # 別スレッドで実行
-        def execute():
-            if symbol is None:
-                # 全決済
-                result = self.api.close_all_positions()
-            elif size is None:
-                # 個別全決済
-                result = self.api.close_position(symbol)
-            else:
-                # 一部決済
-                result = self.api.close_position_partial(symbol, size)
-            
-            # GUIスレッドで結果を表示（クロージャ問題を回避）
-            if self.gui.root:
-                success = result['success']
-                message = result['message']
-                
-                if success:
-                    self.gui.root.after(0, lambda msg=message: self.gui.show_success(msg))
-                    self.gui.root.after(0, lambda msg=message: self.gui.add_log(f"[OK] {msg}"))
-                    # 決済後はポジションを複数回更新（APIの遅延に対応、未約定注文は不要）
-                    self.gui.root.after(50, lambda: self.update_positions(include_orders=False))   # 即座に更新
-                    self.gui.root.after(300, lambda: self.update_positions(include_orders=False))  # 0.3秒後に再更新
-                    self.gui.root.after(800, lambda: self.update_positions(include_orders=False))  # 0.8秒後に再更新
-                else:
-                    self.gui.root.after(0, lambda msg=message: self.gui.show_error(msg))
-                    self.gui.root.after(0, lambda msg=message: self.gui.add_log(f"[NG] {msg}"))
-        
-        threading.Thread(target=execute, daemon=True).start()
+        # 決済後はポジションを複数回更新（APIの遅延に対応、未約定注文は不要）
+        self._dispatch_order(symbol, fn, [(50, False), (300, False), (800, False)], t_click=t_click)
     
     def on_cancel_order(self, symbol: str, order_id: int):
         """注文キャンセルのコールバック"""
+        t_click = self.gui.take_click_time()
         self.gui.show_status(f"注文をキャンセル中: {symbol} (ID: {order_id})...")
         self.gui.add_log(f"キャンセル送信: {symbol} 注文ID={order_id}")
         
-        # 別スレッドで実行
-        def execute():
-            result = self.api.cancel_order(symbol, order_id)
-            
-            # GUIスレッドで結果を表示（クロージャ問題を回避）
-            if self.gui.root:
-                success = result['success']
-                message = result['message']
-                
-                if success:
-                    self.gui.root.after(0, lambda msg=message: self.gui.show_success(msg))
-                    self.gui.root.after(0, lambda msg=message: self.gui.add_log(f"[OK] {msg}"))
-                    # キャンセル後は未約定注文リストを即座に更新
-                    self.gui.root.after(1000, lambda: self.update_positions(include_orders=True))
-                else:
-                    self.gui.root.after(0, lambda msg=message: self.gui.show_error(msg))
-                    self.gui.root.after(0, lambda msg=message: self.gui.add_log(f"[NG] {msg}"))
+        # キャンセル後は未約定注文リストを更新
+        self._dispatch_order(symbol, lambda: self.api.cancel_order(symbol, order_id),
+                             [(1000, True)], t_click=t_click)
+    
+    def on_add_conditional(self, symbol: str, is_buy: bool, size: float,
+                           stop_px: float = None, take_profit_px: float = None, trail_pct: float = None):
+        """条件付き注文登録のコールバック
         
-        threading.Thread(target=execute, daemon=True).start()
+        トレール%が指定されればトレーリングストップ、ストップと利確の両方ならOCO、
+        片方だけなら単独の条件注文として登録します（いずれも決済専用）。
+        """
+        try:
+            if trail_pct:
+                current_px = self.gui.current_prices.get(symbol)
+                orders = [self.conditional_engine.add(symbol, 'trailing', is_buy, size,
+                                                      trigger_px=float(current_px) if current_px else 0.0,
+                                                      trail_pct=trail_pct)]
+            elif stop_px and take_profit_px:
+                orders = self.conditional_engine.add_oco(symbol, is_buy, size, stop_px, take_profit_px)
+            elif stop_px:
+                orders = [self.conditional_engine.add(symbol, 'stop', is_buy, size, trigger_px=stop_px)]
+            else:
+                orders = [self.conditional_engine.add(symbol, 'take_profit', is_buy, size, trigger_px=take_profit_px)]
+        except ValueError as e:
+            self.gui.show_error(str(e))
+            return
+        
+        for order in orders:
+            self.gui.add_log(f"条件注文登録: {order.describe()}")
+        self.gui.show_status(f"条件注文を登録しました: {symbol} ({len(orders)}件)")
+        self.gui.update_conditional_count(self.conditional_engine.count())
+    
+    def on_cancel_conditional(self, symbol: str):
+        """条件付き注文解除のコールバック"""
+        removed = self.conditional_engine.cancel_coin(symbol)
+        self.gui.add_log(f"条件注文解除: {symbol} {removed}件")
+        self.gui.show_status(f"{symbol} の条件注文を解除しました ({removed}件)")
+        self.gui.update_conditional_count(self.conditional_engine.count())
+    
+    def on_conditional_fired(self, order):
+        """条件付き注文が発動した時のコールバック（価格ストリームのスレッドから呼ばれる）"""
+        t_click = time.perf_counter()
+        print(f"[CONDITIONAL] 発動: {order.describe()}")
+        if self.gui.root:
+            count = self.conditional_engine.count()
+            self.gui.root.after(0, lambda text=order.describe(): self.gui.add_log(f"条件注文発動: {text}"))
+            self.gui.root.after(0, lambda c=count: self.gui.update_conditional_count(c))
+        
+        dispatched = self._dispatch_order(
+            order.coin,
+            lambda: self.api.place_market_order(order.coin, order.is_buy, order.size,
+                                                reduce_only=order.reduce_only),
+            [(50, False), (300, False), (800, False)],
+            t_click=t_click
+        )
+        if not dispatched:
+            # キュー満杯で送れなかった場合は再登録し、次の価格更新で再発動させる
+            self.conditional_engine.restore(order)
     
     def update_positions(self, include_orders=True):
         """ポジション情報と未約定注文を更新
@@ -266,11 +414,18 @@ class SpeedTradeApp:
             # アカウント情報を取得
             account_info = self.api.get_account_info()
             
+            # 時価評価の基準値（REST時点の口座評価額と含み損益）を更新
+            if account_info:
+                self.mark_to_market.set_account_snapshot(
+                    account_info['equity'], sum(pos['unrealized_pnl'] for pos in positions)
+                )
+            
             # GUIスレッドで更新（クロージャ問題を回避）
             if self.gui.root:
-                # positionsのコピーを作成して安全に渡す
+                # positionsのコピーを作成して安全に渡す（最新価格で時価評価して表示）
                 positions_copy = list(positions)
-                self.gui.root.after(0, lambda p=positions_copy: self.gui.update_positions(p))
+                self.gui.root.after(0, lambda p=positions_copy: self._update_live_metrics(
+                    self.gui.current_prices, fallback_positions=p))
                 
                 # 未約定注文を更新（データがある場合のみ）
                 if include_orders:
@@ -301,6 +456,8 @@ class SpeedTradeApp:
                     update_count += 1
                     # 未約定注文は10秒ごと（2回に1回）に更新して負荷を減らす
                     self.update_positions(include_orders=(update_count % 2 == 0))
+                    # トレーリング基準価格の変更を保存
+                    self.conditional_engine.flush()
                     
                     # 接続状態とレートリミット状態を更新
                     if self.gui.root:
@@ -316,10 +473,30 @@ class SpeedTradeApp:
                             self.gui.root.after(0, lambda c=current, m=max_calls: self.gui.update_rate_limit_status(c, m))
                         except Exception:
                             pass  # エラー時は無視
+                        
+                        # レイテンシ（区間ごとのp50/p99）
+                        text = self.latency.summary_text(LATENCY_STATUS_STAGES)
+                        self.gui.root.after(0, lambda t=text: self.gui.update_latency_status(t))
         
         thread = threading.Thread(target=updater, daemon=True)
         thread.start()
     
+    def start_dead_man_switch(self):
+        """デッドマンスイッチ（スケジュールキャンセルのハートビート）を開始"""
+        def on_status(armed, deadline, message):
+            if self.gui.root:
+                self.gui.root.after(0, lambda a=armed, d=deadline: self.gui.update_dead_man_status(a, d))
+        
+        self.dead_man_switch = DeadManSwitch(
+            self.api,
+            interval=Config.DEAD_MAN_SWITCH_INTERVAL,
+            timeout=Config.DEAD_MAN_SWITCH_TIMEOUT,
+            on_status=on_status
+        )
+        self.dead_man_switch.start()
+        print(f"デッドマンスイッチ開始: {Config.DEAD_MAN_SWITCH_INTERVAL:.0f}秒ごとに更新 "
+              f"(猶予 {Config.DEAD_MAN_SWITCH_TIMEOUT:.0f}秒)")
+    
     def run(self):
         """アプリケーションを実行"""
         if not self.initialize():
@@ -332,12 +509,42 @@ class SpeedTradeApp:
             print("\n終了しています...")
         finally:
             self.is_running = False
+            self.dispatcher.stop()
+            self.conditional_engine.flush()
+            self._export_latency()
+            # 正常終了時はキャンセル予定を解除（未約定注文は残す）
+            if self.dead_man_switch:
+                self.dead_man_switch.stop(disarm=True)
         
         return 0
 
+    def _export_latency(self):
+        """レイテンシの集計結果をファイルに書き出す"""
+        if not self.latency.enabled:
+            return
+        try:
+            path = self.latency.export(Config.LATENCY_EXPORT_FILE)
+            print(f"[LATENCY] 集計結果を書き出しました: {path}")
+        except OSError as e:
+            print(f"[LATENCY] 集計結果の書き出しに失敗しました: {e}")
+
 def main():
     """メイン関数"""
-    app = SpeedTradeApp()
+    parser = argparse.ArgumentParser(description="Hyperliquid Speed Trade")
+    parser.add_argument("--engine", metavar="HOST:PORT", nargs="?", const="",
+                        help="別プロセスのエンジン（engine_server.py）に接続（省略時はENGINE_HOST/ENGINE_PORT）")
+    args = parser.parse_args()
+    
+    api = None
+    if args.engine is not None:
+        from engine_client import RemoteAPI
+        host, _, port = args.engine.partition(":")
+        try:
+            api = RemoteAPI(host or None, int(port) if port else None)
+        except ValueError:
+            print(f"エラー: --engine の形式が不正です（HOST:PORT）: {args.engine}")
+            sys.exit(1)
+    app = SpeedTradeApp(api)
     sys.exit(app.run())
 
 if __name__ == "__main__":
@@ -0,0 +1,105 @@
+"""
+時価評価（マーク・トゥ・マーケット）モジュール
+ローカルのポジションブックとストリームの中値から、含み損益・Equity・
+実効レバレッジ・清算価格までの距離をNumPyでまとめて再計算します
+"""
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from position_book import PositionBook
+
+
+class MarkToMarketEngine:
+    """時価評価エンジン
+
+    - ポジションはPositionBookから取得し、ブックの更新（約定・スナップショット）時だけ配列を作り直す
+    - 価格更新ごとの計算は全ポジション分をベクトル演算で一括処理
+    - EquityはRESTの口座評価額から当時の含み損益を差し引いた基準値に、最新の含み損益を足して求める
+    """
+
+    def __init__(self, position_book: PositionBook):
+        self.position_book = position_book
+        self._lock = threading.Lock()
+        self._version = -1
+        self._coins: List[str] = []
+        self._positions: List[Dict] = []
+        self._sizes = np.zeros(0)
+        self._entries = np.zeros(0)
+        self._liq_prices = np.zeros(0)
+        self._base_equity: Optional[float] = None  # 口座評価額 - 含み損益（REST取得時点）
+
+    def set_account_snapshot(self, equity: float, unrealized_pnl: float):
+        """RESTの口座評価額と、その時点の含み損益合計を基準値として登録"""
+        with self._lock:
+            self._base_equity = equity - unrealized_pnl
+
+    def compute(self, mids: Dict[str, str]) -> Optional[Dict]:
+        """最新の中値で全ポジションを評価
+
+        Args:
+            mids: allMids形式の価格（通貨 -> 価格文字列）
+
+        Returns:
+            Dict: {'positions': [...], 'unrealized_pnl', 'equity', 'leverage', 'notional'}
+                  ポジションブック未初期化ならNone
+        """
+        if not self.position_book.is_primed():
+            return None
+
+        with self._lock:
+            self._refresh_positions()
+            if not self._coins:
+                return {
+                    'positions': [],
+                    'unrealized_pnl': 0.0,
+                    'equity': self._base_equity,
+                    'leverage': 0.0 if self._base_equity else None,
+                    'notional': 0.0,
+                }
+
+            # 価格の取り出しだけは通貨ごと、それ以降は配列演算
+            marks = np.array([float(mids[c]) if c in mids else np.nan for c in self._coins])
+            marks = np.where(np.isnan(marks), self._entries, marks)  # 価格未着はエントリー価格で代用
+
+            pnl = self._sizes * (marks - self._entries)
+            notional = np.abs(self._sizes) * marks
+            # 清算価格までの距離（%）: ロングは下方向、ショートは上方向
+            with np.errstate(divide='ignore', invalid='ignore'):
+                liq_distance = np.sign(self._sizes) * (marks - self._liq_prices) / marks * 100.0
+
+            total_pnl = float(pnl.sum())
+            total_notional = float(notional.sum())
+            equity = self._base_equity + total_pnl if self._base_equity is not None else None
+            leverage = total_notional / equity if equity and equity > 0 else None
+
+            positions = []
+            for i, pos in enumerate(self._positions):
+                live = dict(pos)
+                live['mark_price'] = float(marks[i])
+                live['unrealized_pnl'] = float(pnl[i])
+                live['liquidation_distance_pct'] = None if np.isnan(liq_distance[i]) else float(liq_distance[i])
+                positions.append(live)
+
+            return {
+                'positions': positions,
+                'unrealized_pnl': total_pnl,
+                'equity': equity,
+                'leverage': leverage,
+                'notional': total_notional,
+            }
+
+    def _refresh_positions(self):
+        version = self.position_book.version()
+        if version == self._version:
+            return
+        self._version = version
+        self._positions = self.position_book.all()
+        self._coins = [pos['coin'] for pos in self._positions]
+        self._sizes = np.array([pos['size'] for pos in self._positions], dtype=float)
+        self._entries = np.array([pos['entry_price'] for pos in self._positions], dtype=float)
+        self._liq_prices = np.array([
+            pos['liquidation_price'] if pos.get('liquidation_price') else np.nan
+            for pos in self._positions
+        ], dtype=float)
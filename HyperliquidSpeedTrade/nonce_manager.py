@@ -0,0 +1,171 @@
+"""
+nonce管理モジュール
+SDKのExchangeはミリ秒タイムスタンプをそのままnonceに使うため、
+複数スレッドから同時に署名すると同じnonceが重複して拒否されます。
+プロセス全体で厳密に単調増加するnonceを払い出し、送信順序も揃えます
+"""
+import heapq
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+import hyperliquid.exchange as _hl_exchange
+from hyperliquid.exchange import Exchange
+
+
+class NonceAllocator:
+    """スレッド・非同期ランタイム間で共有するnonceアロケーター
+
+    - next(): 現在時刻(ms)と前回値+1の大きい方を返す（ロック内は数命令のみ）
+    - wait_turn(): 払い出し済みnonceが小さい順に送信されるよう待機する
+    - complete(): 応答を受け取ったnonceを送信中から外す
+
+    署名（ECDSA）はロック外で並列に実行され、送信の直前だけ順番を揃えます。
+    Hyperliquidは「直近100件の最小値より大きく未使用」のnonceを受け付けるため、
+    応答待ちの最古のnonceからwindow件以上先のnonceは送信を待たせ、
+    遅れて到着したnonceが受付範囲から外れないようにします。
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time, window: int = 64,
+                 stale_timeout: float = 5.0, inflight_timeout: float = 10.0):
+        """
+        Args:
+            clock: 時刻取得関数（秒）。テスト用に差し替え可能
+            window: 応答待ちの最古のnonceから先に送信できる件数（取引所の保持数100未満）
+            stale_timeout: 送信されないまま残ったnonceを順番待ちから外すまでの秒数
+            inflight_timeout: 応答が返らないnonceを送信中から外すまでの秒数
+        """
+        self._clock = clock
+        self.window = window
+        self.stale_timeout = stale_timeout
+        self.inflight_timeout = inflight_timeout
+        self._cond = threading.Condition(threading.Lock())
+        self._last = 0
+        self._seq = 0
+        self._seq_of: Dict[int, int] = {}  # nonce -> 払い出し順
+        self._issued_at: Dict[int, float] = {}
+        self._unsent: List[int] = []  # 未送信nonceのヒープ
+        self._unsent_live: Set[int] = set()
+        self._incomplete: List[int] = []  # 応答待ちnonceのヒープ
+        self._incomplete_live: Set[int] = set()
+        self._waiting: Set[int] = set()  # wait_turn()で順番待ち中のnonce
+        self._local = threading.local()  # スレッドごとの未送信nonce
+
+    def next(self) -> int:
+        """次のnonceを払い出す（スレッドセーフ、ブロックしない）"""
+        with self._cond:
+            # 同じスレッドの前回nonceが未送信のままなら、署名中の例外などで破棄されたもの
+            abandoned = getattr(self._local, 'nonce', None)
+            if abandoned is not None and abandoned in self._unsent_live:
+                self._forget(abandoned)
+                self._cond.notify_all()
+            now = int(self._clock() * 1000)
+            nonce = now if now > self._last else self._last + 1
+            self._last = nonce
+            self._seq += 1
+            self._seq_of[nonce] = self._seq
+            self._issued_at[nonce] = time.monotonic()
+            heapq.heappush(self._unsent, nonce)
+            self._unsent_live.add(nonce)
+            heapq.heappush(self._incomplete, nonce)
+            self._incomplete_live.add(nonce)
+            self._local.nonce = nonce
+            return nonce
+
+    def wait_turn(self, nonce: int):
+        """自分より小さい未送信nonceがなく、送信枠に収まるまで待機する"""
+        with self._cond:
+            seq = self._seq_of.get(nonce)
+            self._waiting.add(nonce)
+            while seq is not None and nonce in self._unsent_live:
+                self._drop_stale()
+                head = self._head(self._unsent, self._unsent_live)
+                oldest = self._head(self._incomplete, self._incomplete_live)
+                in_order = head is None or head >= nonce
+                in_window = oldest is None or seq - self._seq_of[oldest] < self.window
+                if in_order and in_window:
+                    break
+                self._cond.wait(0.1)
+            self._waiting.discard(nonce)
+            self._unsent_live.discard(nonce)
+            self._cond.notify_all()
+
+    def complete(self, nonce: int):
+        """応答を受け取ったnonceを送信中から外す"""
+        with self._cond:
+            self._forget(nonce)
+            self._cond.notify_all()
+
+    def last_nonce(self) -> int:
+        """最後に払い出したnonce"""
+        with self._cond:
+            return self._last
+
+    def pending_count(self) -> int:
+        """応答待ち（未送信を含む）のnonce数"""
+        with self._cond:
+            return len(self._incomplete_live)
+
+    @staticmethod
+    def _head(heap: List[int], live: Set[int]) -> Optional[int]:
+        # 遅延削除: 処理済みのnonceはヒープ先頭に来た時点で取り除く
+        while heap and heap[0] not in live:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def _drop_stale(self):
+        # 別スレッドで破棄されたnonceや応答のない送信が後続を塞がないようにする（最終手段）
+        now = time.monotonic()
+        head = self._head(self._unsent, self._unsent_live)
+        while (head is not None and head not in self._waiting
+               and now - self._issued_at[head] > self.stale_timeout):
+            self._forget(head)
+            head = self._head(self._unsent, self._unsent_live)
+        oldest = self._head(self._incomplete, self._incomplete_live)
+        while oldest is not None and now - self._issued_at[oldest] > self.inflight_timeout:
+            self._forget(oldest)
+            oldest = self._head(self._incomplete, self._incomplete_live)
+
+    def _forget(self, nonce: int):
+        self._unsent_live.discard(nonce)
+        self._incomplete_live.discard(nonce)
+        self._seq_of.pop(nonce, None)
+        self._issued_at.pop(nonce, None)
+
+
+class NonceSafeExchange(Exchange):
+    """送信をnonce順に揃えるExchange
+
+    nonce自体はinstall_nonce_allocator()で差し替えたget_timestamp_msから払い出されます。
+    """
+
+    def __init__(self, *args, nonce_allocator: Optional[NonceAllocator] = None, **kwargs):
+        self.nonce_allocator = nonce_allocator or install_nonce_allocator()
+        super().__init__(*args, **kwargs)
+
+    def _post_action(self, action, signature, nonce):
+        self.nonce_allocator.wait_turn(nonce)
+        try:
+            return super()._post_action(action, signature, nonce)
+        finally:
+            self.nonce_allocator.complete(nonce)
+
+
+# グローバルインスタンス（モジュールレベル）
+# 同一アカウントのnonceはプロセス内で一意である必要があるため共有する
+_global_nonce_allocator: Optional[NonceAllocator] = None
+
+
+def install_nonce_allocator() -> NonceAllocator:
+    """
+    グローバルnonceアロケーターを取得し、SDKのnonce生成を差し替える（シングルトン）
+
+    Returns:
+        NonceAllocator: グローバルnonceアロケーターインスタンス
+    """
+    global _global_nonce_allocator
+    if _global_nonce_allocator is None:
+        _global_nonce_allocator = NonceAllocator()
+    # SDKの各アクションはモジュール内のget_timestamp_msでnonceを決めている
+    _hl_exchange.get_timestamp_ms = _global_nonce_allocator.next
+    return _global_nonce_allocator
@@ -0,0 +1,135 @@
+"""
+nonce衝突ストレステスト（ローカルのモック取引所に対して実行）
+
+Hyperliquidと同じnonce規則（直近100件の最小値より大きく未使用であること）で
+受け付けるモック取引所を起動し、数百件のアクションを同時に送信して
+nonce拒否が0件であることを確認します。
+
+使い方:
+  python nonce_stress.py                 # アロケーターあり（拒否0件を期待）
+  python nonce_stress.py --no-allocator  # SDK標準のタイムスタンプnonce（比較用）
+  python nonce_stress.py --orders 1000 --workers 64
+"""
+import argparse
+import heapq
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from eth_account import Account
+from hyperliquid.exchange import Exchange
+from requests.adapters import HTTPAdapter
+
+from nonce_manager import NonceSafeExchange, install_nonce_allocator
+
+MOCK_META = {"universe": [{"name": "BTC", "szDecimals": 5}]}
+MOCK_SPOT_META = {"universe": [], "tokens": []}
+NONCE_WINDOW = 100  # 取引所が保持する直近nonce数
+
+
+class MockExchangeState:
+    """アドレスごとのnonce集合を模したモック取引所の状態"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.nonces = []  # 直近NONCE_WINDOW件の最小ヒープ
+        self.seen = set()
+        self.accepted = 0
+        self.rejected = 0
+
+    def check_nonce(self, nonce: int):
+        with self.lock:
+            now_ms = int(time.time() * 1000)
+            if not (now_ms - 2 * 86400 * 1000 < nonce < now_ms + 86400 * 1000):
+                self.rejected += 1
+                return "Invalid nonce: out of time window"
+            if nonce in self.seen or (len(self.nonces) >= NONCE_WINDOW and nonce <= self.nonces[0]):
+                self.rejected += 1
+                return f"Invalid nonce: duplicate or too low ({nonce})"
+            heapq.heappush(self.nonces, nonce)
+            self.seen.add(nonce)
+            if len(self.nonces) > NONCE_WINDOW:
+                self.seen.discard(heapq.heappop(self.nonces))
+            self.accepted += 1
+            return None
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # 同時接続で接続拒否が起きないように
+
+
+def make_handler(state: MockExchangeState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if self.path == "/info":
+                response = MOCK_SPOT_META if body.get("type") == "spotMeta" else MOCK_META
+            else:
+                error = state.check_nonce(int(body["nonce"]))
+                if error:
+                    response = {"status": "err", "response": error}
+                else:
+                    response = {"status": "ok", "response": {"type": "order", "data": {
+                        "statuses": [{"resting": {"oid": body["nonce"]}}]}}}
+            data = json.dumps(response).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            return
+
+    return Handler
+
+
+def run(orders: int, workers: int, use_allocator: bool) -> int:
+    state = MockExchangeState()
+    server = MockServer(("127.0.0.1", 0), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    wallet = Account.create()
+    if use_allocator:
+        exchange = NonceSafeExchange(wallet, base_url, meta=MOCK_META, spot_meta=MOCK_SPOT_META,
+                                     nonce_allocator=install_nonce_allocator())
+    else:
+        exchange = Exchange(wallet, base_url, meta=MOCK_META, spot_meta=MOCK_SPOT_META)
+    # 並列数分のHTTP接続を再利用する
+    exchange.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=workers))
+
+    def submit(i: int):
+        return exchange.order("BTC", i % 2 == 0, 0.001, 50000.0 + i, {"limit": {"tif": "Gtc"}})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(submit, range(orders)))
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    rejected = sum(1 for r in results if r.get("status") != "ok")
+    print(f"モード: {'アロケーターあり' if use_allocator else 'SDK標準'}  "
+          f"送信: {orders}件 / 並列: {workers}")
+    print(f"受付: {state.accepted}件  nonce拒否: {rejected}件  所要時間: {elapsed:.2f}秒 "
+          f"({orders / elapsed:.0f}件/秒)")
+    return 0 if rejected == 0 else 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="nonce衝突ストレステスト")
+    parser.add_argument("--orders", type=int, default=500, help="送信するアクション数")
+    parser.add_argument("--workers", type=int, default=32, help="並列スレッド数")
+    parser.add_argument("--no-allocator", action="store_true", help="SDK標準のnonceで実行（比較用）")
+    args = parser.parse_args(argv)
+    return run(args.orders, args.workers, not args.no_allocator)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+注文ディスパッチモジュール
+事前起動したワーカースレッドで注文を実行し、クリックごとのスレッド生成をなくします
+"""
+import queue
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+
+class OrderJob:
+    """ディスパッチされる注文ジョブ（クリック→送信→応答のタイムスタンプを記録）"""
+
+    def __init__(self, key: Optional[str], fn: Callable[[], Any],
+                 on_done: Optional[Callable[['OrderJob'], None]] = None,
+                 t_click: Optional[float] = None):
+        """
+        Args:
+            key: 順序保証のキー（通貨シンボル）。Noneは全ワーカー横断（全決済など）
+            fn: 実行する関数（API呼び出し）
+            on_done: 完了時コールバック（ワーカースレッドから呼ばれる）
+            t_click: クリック時刻（time.perf_counter）
+        """
+        self.key = key
+        self.fn = fn
+        self.on_done = on_done
+        self.t_click = t_click if t_click is not None else time.perf_counter()
+        self.t_enqueue: Optional[float] = None
+        self.t_submit: Optional[float] = None
+        self.t_ack: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    def latency_ms(self) -> dict:
+        """各区間の遅延（ミリ秒）"""
+        def span(a, b):
+            return (b - a) * 1000.0 if a is not None and b is not None else None
+        return {
+            'queue': span(self.t_click, self.t_submit),  # クリック→送信開始
+            'exchange': span(self.t_submit, self.t_ack),  # 送信開始→取引所応答
+            'total': span(self.t_click, self.t_ack),  # クリック→応答
+        }
+
+    def latency_text(self) -> str:
+        """ログ表示用の遅延サマリー"""
+        lat = self.latency_ms()
+        if lat['total'] is None:
+            return ""
+        return f"待機 {lat['queue']:.1f}ms / 取引所 {lat['exchange']:.1f}ms / 合計 {lat['total']:.1f}ms"
+
+
+class OrderDispatcher:
+    """注文ディスパッチサービス
+
+    - 起動時にワーカースレッドを用意（クリック時のスレッド生成コストなし）
+    - 同じシンボルの注文は同じワーカーで順番に実行（シンボル単位の順序保証）
+    - ワーカーごとのキューは上限付き。満杯ならsubmit()がFalseを返す（GUIへの背圧）
+    - key=Noneのジョブは全ワーカーの先行ジョブ完了を待ってから実行（全決済など）
+    """
+
+    def __init__(self, workers: int = 4, queue_size: int = 8):
+        """
+        Args:
+            workers: ワーカースレッド数
+            queue_size: ワーカーごとのキュー上限
+        """
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self._queues: List[queue.Queue] = [queue.Queue(maxsize=queue_size) for _ in range(self.workers)]
+        self._threads: List[threading.Thread] = []
+        self._submit_lock = threading.Lock()
+        self._running = False
+
+    def start(self):
+        """ワーカースレッドを起動（事前ウォームアップ）"""
+        if self._running:
+            return
+        self._running = True
+        for i, q in enumerate(self._queues):
+            thread = threading.Thread(target=self._worker, args=(q,), name=f"order-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """ワーカースレッドを停止（キュー内の残りジョブは破棄）"""
+        self._running = False
+        for q in self._queues:
+            try:
+                q.put_nowait(None)
+            except queue.Full:
+                pass
+
+    def submit(self, key: Optional[str], fn: Callable[[], Any],
+               on_done: Optional[Callable[[OrderJob], None]] = None,
+               t_click: Optional[float] = None) -> bool:
+        """注文ジョブを投入
+
+        Returns:
+            bool: 投入できたか（キュー満杯ならFalse）
+        """
+        job = OrderJob(key, fn, on_done, t_click)
+        with self._submit_lock:
+            job.t_enqueue = time.perf_counter()
+            if key is not None:
+                try:
+                    self._queue_for(key).put_nowait(job)
+                    return True
+                except queue.Full:
+                    return False
+
+            # 全ワーカー横断ジョブ: 全キューに空きがある場合のみ投入
+            if any(q.full() for q in self._queues):
+                return False
+            barrier = threading.Barrier(self.workers, action=lambda: self._run(job))
+            for q in self._queues:
+                q.put_nowait(barrier)
+            return True
+
+    def queue_depth(self) -> int:
+        """キュー内の待機ジョブ数（全ワーカー合計）"""
+        return sum(q.qsize() for q in self._queues)
+
+    def _queue_for(self, key: str) -> queue.Queue:
+        return self._queues[hash(key) % self.workers]
+
+    def _worker(self, q: queue.Queue):
+        while self._running:
+            item = q.get()
+            if item is None:
+                break
+            if isinstance(item, threading.Barrier):
+                # 全ワーカーが到達した時点で1つのスレッドがジョブを実行する
+                try:
+                    item.wait()
+                except threading.BrokenBarrierError:
+                    pass
+            else:
+                self._run(item)
+
+    def _run(self, job: OrderJob):
+        job.t_submit = time.perf_counter()
+        try:
+            job.result = job.fn()
+        except Exception as e:
+            job.error = e
+            print(f"[DISPATCH] 注文ジョブでエラー: {e}")
+        job.t_ack = time.perf_counter()
+        if job.on_done:
+            try:
+                job.on_done(job)
+            except Exception as e:
+                print(f"[DISPATCH] 完了コールバックでエラー: {e}")
@@ -0,0 +1,183 @@
+"""
+ポジションブックモジュール
+REST スナップショットとユーザー約定ストリームからポジションをローカルに保持し、
+決済時に user_state を取得し直さずに済むようにします
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+MAX_TRACKED_OIDS = 4096  # 重複判定のために約定数量を覚えておく注文IDの数（古いものから捨てる）
+REPLAY_FILLS = 512       # スナップショット後に再適用できるよう覚えておく約定の数
+
+
+class PositionBook:
+    """ローカルで管理するポジション一覧（スレッドセーフ）
+
+    - apply_snapshot(): get_positions() の結果で全体を置き換える
+    - apply_fill(): 約定（注文応答またはuserFillsストリーム）で差分を反映する
+
+    同じ注文の約定が注文応答とストリームの両方から届いても二重計上しないよう、
+    注文IDごとに「応答の約定数量」と「ストリームの累計数量」の大きい方だけを反映します。
+    この記録はスナップショットをまたいで保持します（直近 MAX_TRACKED_OIDS 件）。
+
+    スナップショットに含まれている約定は反映せず、含まれていない約定は置き換えた後で再適用します。
+    判定には同じ時計の時刻どうしだけを比べます:
+    - 注文応答の約定: 注文の送信時刻（ローカル）とスナップショットの要求時刻 as_of（ローカル）。
+      as_of より前に送った注文の約定はスナップショットに含まれているとみなす
+    - ストリームの約定: 約定時刻（取引所）とスナップショットの取引所時刻 exchange_ts。
+      exchange_ts がなければ、受信時刻（ローカル）と as_of で比べる
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._positions: Dict[str, Dict] = {}
+        self._primed = False  # スナップショットを1度でも受け取ったか
+        self._snapshot_ts = 0.0  # 反映済みスナップショットの要求時刻（ローカル）
+        self._snapshot_exchange_ts: Optional[float] = None  # 同じスナップショットの取引所時刻
+        self._oid_fills: "OrderedDict[int, Tuple[float, float]]" = OrderedDict()  # oid -> (ストリーム累計, 応答数量)
+        # (ローカル時刻, 取引所時刻 or None, 通貨, 差分, 価格)
+        self._recent_fills: Deque[Tuple[float, Optional[float], str, float, float]] = deque(maxlen=REPLAY_FILLS)
+        self._version = 0  # ポジションが変わるたびに増える（時価評価の配列再構築の判定用）
+
+    def is_primed(self) -> bool:
+        """スナップショット受信済みか"""
+        with self._lock:
+            return self._primed
+
+    def apply_snapshot(self, positions: List[Dict], as_of: Optional[float] = None,
+                       exchange_ts: Optional[float] = None) -> bool:
+        """RESTのポジション一覧で置き換える
+
+        Args:
+            positions: get_positions() 形式のポジション一覧
+            as_of: スナップショット要求時刻（ローカルのUNIX秒）。これより後の約定は置き換え後に再適用する
+            exchange_ts: スナップショットの取引所時刻（UNIX秒。user_state の time）
+
+        Returns:
+            bool: 反映したか（より新しいスナップショットを反映済みなら破棄してFalse）
+        """
+        with self._lock:
+            if as_of is not None and as_of < self._snapshot_ts:
+                return False
+            self._positions = {pos['coin']: dict(pos) for pos in positions}
+            if as_of is not None:
+                self._snapshot_ts = as_of
+                self._snapshot_exchange_ts = exchange_ts
+                newer = [fill for fill in self._recent_fills if not self._included(fill[0], fill[1])]
+                self._recent_fills.clear()
+                for fill in newer:
+                    _, _, coin, delta, price = fill
+                    self._apply_delta(coin, delta, price)
+                    self._recent_fills.append(fill)
+            self._primed = True
+            self._version += 1
+            return True
+
+    def _included(self, ts: float, exchange_ts: Optional[float]) -> bool:
+        """最後のスナップショットに含まれている約定か（同じ時計の時刻どうしで比べる）"""
+        if exchange_ts is not None and self._snapshot_exchange_ts is not None:
+            return exchange_ts <= self._snapshot_exchange_ts
+        return ts <= self._snapshot_ts
+
+    def version(self) -> int:
+        """更新カウンター（内容が変わるたびに増える）"""
+        with self._lock:
+            return self._version
+    
+    def get(self, coin: str) -> Optional[Dict]:
+        """指定通貨のポジション（なければNone）"""
+        with self._lock:
+            pos = self._positions.get(coin)
+            return dict(pos) if pos else None
+
+    def all(self) -> List[Dict]:
+        """全ポジションのコピー"""
+        with self._lock:
+            return [dict(pos) for pos in self._positions.values()]
+
+    def apply_fill(self, coin: str, is_buy: bool, size: float, price: float,
+                   oid: Optional[int] = None, source: str = 'stream', ts: Optional[float] = None,
+                   exchange_ts: Optional[float] = None):
+        """約定をポジションに反映
+
+        Args:
+            coin: 通貨シンボル
+            is_buy: 買い約定か
+            size: 約定数量（source='ack'なら注文全体の約定数量、'stream'なら今回の約定分）
+            price: 約定価格
+            oid: 注文ID
+            source: 'ack'（注文応答）または 'stream'（userFills）
+            ts: ローカル時刻（UNIX秒）。注文応答は注文の送信時刻、ストリームは受信時刻（省略時は現在時刻）
+            exchange_ts: 取引所の約定時刻（UNIX秒。ストリームの time）
+        """
+        if ts is None:
+            ts = time.time()
+        with self._lock:
+            if oid is not None:
+                stream_sz, ack_sz = self._oid_fills.pop(oid, (0.0, 0.0))
+                applied = max(stream_sz, ack_sz)
+                if source == 'ack':
+                    ack_sz = max(ack_sz, size)
+                else:
+                    stream_sz += size
+                self._oid_fills[oid] = (stream_sz, ack_sz)  # 末尾へ（最近使った順）
+                if len(self._oid_fills) > MAX_TRACKED_OIDS:
+                    self._oid_fills.popitem(last=False)
+                size = max(stream_sz, ack_sz) - applied
+                if size <= 0:
+                    return
+            if self._included(ts, exchange_ts):
+                return  # スナップショットに含まれている（数量の記録だけ更新）
+            delta = size if is_buy else -size
+            self._apply_delta(coin, delta, price)
+            self._recent_fills.append((ts, exchange_ts, coin, delta, price))
+            self._version += 1
+
+    def apply_user_fills(self, data: Dict):
+        """userFillsストリームのメッセージを反映（接続時のスナップショットは無視）"""
+        if data.get('isSnapshot'):
+            return  # 接続時の過去約定はスナップショットに含まれている
+        for fill in data.get('fills', []):
+            try:
+                self.apply_fill(
+                    fill['coin'],
+                    fill.get('side') == 'B',
+                    float(fill['sz']),
+                    float(fill['px']),
+                    oid=fill.get('oid'),
+                    source='stream',
+                    exchange_ts=float(fill['time']) / 1000.0 if fill.get('time') else None
+                )
+            except (KeyError, ValueError, TypeError):
+                continue
+
+    def _apply_delta(self, coin: str, delta: float, price: float):
+        pos = self._positions.get(coin)
+        current = pos['size'] if pos else 0.0
+        new_size = current + delta
+
+        if abs(new_size) < 1e-12:
+            self._positions.pop(coin, None)
+            return
+
+        if pos is None:
+            self._positions[coin] = {
+                'coin': coin,
+                'size': new_size,
+                'entry_price': price,
+                'unrealized_pnl': 0.0,
+                'leverage': {},
+                'liquidation_price': None,  # 次のスナップショットで取得
+            }
+            return
+
+        if current == 0 or (current > 0) == (delta > 0):
+            # 同方向への追加: 加重平均
+            pos['entry_price'] = (abs(current) * pos['entry_price'] + abs(delta) * price) / abs(new_size)
+        elif (current > 0) != (new_size > 0):
+            # ドテン: 残りは新しい建玉
+            pos['entry_price'] = price
+        # 一部決済は平均価格を変えない
+        pos['size'] = new_size
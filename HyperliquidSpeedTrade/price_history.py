@@ -0,0 +1,120 @@
+"""
+価格履歴モジュール
+購読中の全通貨のティックと1秒足・1分足を固定長のNumPyリングバッファに保持します。
+allMidsは全通貨の価格をまとめて届けるため、通貨を行・時刻を列とした2次元配列に
+1回の代入で書き込みます
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class _CandleRing:
+    """全通貨共通の時間足リングバッファ（OHLC）"""
+
+    def __init__(self, n_coins: int, capacity: int, interval: float):
+        self.interval = interval
+        self.capacity = capacity
+        self.times = np.full(capacity, np.nan)
+        self.ohlc = np.full((4, n_coins, capacity), np.nan)  # open/high/low/close
+        self.index = -1
+        self.count = 0
+        self.bucket = None
+
+    def update(self, ts: float, prices: np.ndarray):
+        bucket = int(ts // self.interval)
+        if bucket != self.bucket:
+            # 新しい足: 書き込み位置を進めて始値=高値=安値=終値で初期化
+            self.bucket = bucket
+            self.index = (self.index + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+            self.times[self.index] = bucket * self.interval
+            for k in range(4):
+                self.ohlc[k, :, self.index] = prices
+            return
+        i = self.index
+        o, h, l, c = self.ohlc[0, :, i], self.ohlc[1, :, i], self.ohlc[2, :, i], self.ohlc[3, :, i]
+        # 足の途中で初めて価格が来た通貨は始値も埋める（NaNは無視して更新）
+        np.copyto(o, prices, where=np.isnan(o))
+        np.fmax(h, prices, out=h)
+        np.fmin(l, prices, out=l)
+        np.copyto(c, prices, where=~np.isnan(prices))
+
+    def tail(self, row: int, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        n = min(n, self.count)
+        idx = (np.arange(self.index - n + 1, self.index + 1)) % self.capacity
+        return self.times[idx], self.ohlc[:, row, idx].T  # (n,), (n, 4)
+
+
+class PriceHistoryStore:
+    """全通貨の価格履歴（スレッドセーフ）
+
+    - record(): allMidsを受け取ってティック・1秒足・1分足を更新（WebSocketスレッド）
+    - ticks()/candles(): 指定通貨の直近n件を古い順に返す（GUIスレッド）
+
+    全通貨の履歴を常にメモリに持つため、表示通貨の切り替え時に再取得は不要です。
+    """
+
+    def __init__(self, coins: List[str], tick_capacity: int = 3600, candle_capacity: int = 720):
+        self.coins = list(coins)
+        self._row: Dict[str, int] = {coin: i for i, coin in enumerate(self.coins)}
+        self._lock = threading.Lock()
+        self.tick_capacity = tick_capacity
+        self._tick_times = np.full(tick_capacity, np.nan)
+        self._tick_prices = np.full((len(self.coins), tick_capacity), np.nan)
+        self._tick_index = -1
+        self._tick_count = 0
+        self._candles = {
+            '1s': _CandleRing(len(self.coins), candle_capacity, 1.0),
+            '1m': _CandleRing(len(self.coins), candle_capacity, 60.0),
+        }
+        self.version = 0  # 更新ごとに増える
+        self._coin_versions = np.zeros(len(self.coins), dtype=np.int64)  # 通貨ごと（チャートの再描画判定用）
+
+    def record(self, mids: Dict[str, str], ts: Optional[float] = None):
+        """allMidsの価格を記録"""
+        ts = ts if ts is not None else time.time()
+        prices = np.array([float(mids[c]) if c in mids else np.nan for c in self.coins])
+        with self._lock:
+            self._tick_index = (self._tick_index + 1) % self.tick_capacity
+            self._tick_count = min(self._tick_count + 1, self.tick_capacity)
+            self._tick_times[self._tick_index] = ts
+            self._tick_prices[:, self._tick_index] = prices
+            for ring in self._candles.values():
+                ring.update(ts, prices)
+            self.version += 1
+            self._coin_versions += ~np.isnan(prices)
+
+    def coin_version(self, coin: str) -> int:
+        """指定通貨の価格が記録されるたびに増える番号（未登録の通貨は -1）"""
+        row = self._row.get(coin)
+        return int(self._coin_versions[row]) if row is not None else -1
+
+    def has(self, coin: str) -> bool:
+        return coin in self._row
+
+    def ticks(self, coin: str, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """直近n件のティック（時刻, 価格）。価格未着の点は除く"""
+        row = self._row.get(coin)
+        if row is None:
+            return np.zeros(0), np.zeros(0)
+        with self._lock:
+            n = min(n, self._tick_count)
+            idx = np.arange(self._tick_index - n + 1, self._tick_index + 1) % self.tick_capacity
+            times = self._tick_times[idx]
+            prices = self._tick_prices[row, idx]
+        mask = ~np.isnan(prices)
+        return times[mask], prices[mask]
+
+    def candles(self, coin: str, interval: str, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """直近n本の足（時刻, OHLC配列(n, 4)）"""
+        row = self._row.get(coin)
+        if row is None:
+            return np.zeros(0), np.zeros((0, 4))
+        with self._lock:
+            times, ohlc = self._candles[interval].tail(row, n)
+            times, ohlc = times.copy(), ohlc.copy()
+        mask = ~np.isnan(ohlc[:, 3])
+        return times[mask], ohlc[mask]
@@ -0,0 +1,83 @@
+"""
+エージェントパイプラインのパラメータスイープ
+
+backtest_agents.py と同じ構成のバックテストを、パラメータを変えながらプロセスプールで並列に実行し、
+PnL・最大ドローダウン・約定数などの結果表を出します。データは1回だけ読み、ワーカーはメモリマップで共有します。
+
+パラメータ（--param を繰り返し指定。未指定のものは backtest_agents.py の既定値）:
+  short, long, max_losses         整数
+  size, max_notional, cooldown    数値
+  name=a,b,c        候補値
+  name=low:high     範囲（random / bayes）
+  name=low:high:step  刻み付きの範囲（grid でも使える）
+
+使い方:
+  python sweep_agents.py --synthetic 7 --param short=3,5,8 --param long=20,40,60 --param cooldown=10,60,300
+  python sweep_agents.py --ticks hype_ticks.csv --search random -n 1000 \\
+      --param short=2:20 --param long=10:120 --param max_losses=2:6 --out sweep.csv
+  python sweep_agents.py --candles hype_1m.json --search bayes -n 200 --param short=2:20 --param long=10:120
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from agents.sweep import (METRICS, SweepRunner, format_table, grid_points, parse_space, random_points,
+                          ticks_to_arrays, write_csv)
+from backtest_agents import add_data_arguments, load_data
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="エージェントパイプラインのパラメータスイープ")
+    add_data_arguments(parser)
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=SPEC", help="探索するパラメータ")
+    parser.add_argument("--search", choices=("grid", "random", "bayes"), default="grid", help="探索方法")
+    parser.add_argument("-n", type=int, default=100, help="random / bayes で評価する点の数")
+    parser.add_argument("--processes", type=int, default=None, help="ワーカー数（既定はCPU数。0で親プロセスのみ）")
+    parser.add_argument("--objective", choices=METRICS, default="pnl", help="並べ替え・bayes で改善する指標（max_drawdown・wall_seconds は小さいほど良い）")
+    parser.add_argument("--top", type=int, default=10, help="表示する上位の行数")
+    parser.add_argument("--out", metavar="CSV", help="全結果をCSVに書き出す")
+    args = parser.parse_args()
+
+    space = parse_space(args.param)
+    if not space:
+        parser.error("--param を1つ以上指定してください")
+    rng = random.Random(args.seed)
+    if args.search == "grid":
+        points = grid_points(space)
+    elif args.search == "random":
+        points = random_points(space, args.n, rng)
+    else:
+        points = []
+
+    t0 = time.perf_counter()
+    times, prices = ticks_to_arrays(load_data(args))
+    print(f"[SWEEP] {args.symbol} ティック {len(times):,} を読み込みました（{time.perf_counter() - t0:.1f}秒）")
+    if not len(times):
+        return
+
+    def progress(done: int, total: int, row) -> None:
+        if done == total or done % max(1, total // 20) == 0:
+            elapsed = time.perf_counter() - t1
+            print(f"[SWEEP] {done}/{total} 完了（{elapsed:.1f}秒、{args.objective}={row[args.objective]:.4f}）")
+
+    t1 = time.perf_counter()
+    with SweepRunner(times, prices, args.symbol, seed=args.seed, processes=args.processes) as runner:
+        print(f"[SWEEP] {args.search}: ワーカー {runner.processes}")
+        if args.search == "bayes":
+            rows = runner.bayes(space, args.n, objective=args.objective, rng=rng, progress=progress)
+        else:
+            rows = runner.run(points, progress)
+    elapsed = time.perf_counter() - t1
+
+    print(f"[SWEEP] {len(rows)} 点を {elapsed:.1f}秒で評価（1点あたり {elapsed / max(len(rows), 1):.2f}秒）")
+    if rows:
+        print(format_table(rows, args.objective, args.top))
+    if args.out:
+        write_csv(rows, args.out)
+        print(f"[SWEEP] 結果を {args.out} に書き出しました")
+
+
+if __name__ == "__main__":
+    main()
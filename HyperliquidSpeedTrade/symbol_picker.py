@@ -0,0 +1,267 @@
+"""
+通貨ペア選択モジュール
+全通貨を前方一致のトライ木で索引し、入力中の文字列に一致する通貨を
+お気に入り・最近使った通貨を先頭に、出来高順で上位k件だけ表示します
+"""
+import json
+import os
+from typing import Callable, Dict, Iterable, List, Optional
+
+import customtkinter as ctk
+
+
+class _TrieNode:
+    __slots__ = ('children', 'ranks')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.ranks: List[int] = []  # この接頭辞を持つ通貨の出来高順位（昇順）
+
+
+class SymbolIndex:
+    """通貨の前方一致索引
+
+    - 通貨は出来高順に登録するため、各ノードの順位リストは常に昇順で、上位k件は先頭から取るだけ
+    - 大文字・小文字は区別しない（kPEPEなどはそのままの表記で返す）
+    - お気に入り・最近使った通貨はJSONに保存し、次回起動時も先頭に表示する
+    """
+
+    def __init__(self, symbols: Iterable[str], storage_path: Optional[str] = None, max_recents: int = 8):
+        self.symbols: List[str] = []
+        self._root = _TrieNode()
+        self._known = set()
+        self.storage_path = storage_path
+        self.max_recents = max_recents
+        self.favorites: List[str] = []
+        self.recents: List[str] = []
+        for symbol in symbols:
+            self._add(symbol)
+
+    def _add(self, symbol: str):
+        if symbol in self._known:
+            return
+        rank = len(self.symbols)
+        self.symbols.append(symbol)
+        self._known.add(symbol)
+        node = self._root
+        node.ranks.append(rank)
+        for ch in symbol.upper():
+            node = node.children.setdefault(ch, _TrieNode())
+            node.ranks.append(rank)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._known
+
+    def search(self, query: str, k: int = 10) -> List[str]:
+        """接頭辞に一致する通貨を最大k件（お気に入り → 最近使った通貨 → 出来高順）"""
+        prefix = query.strip().upper()
+        node = self._root
+        for ch in prefix:
+            node = node.children.get(ch)
+            if node is None:
+                return []
+
+        results: List[str] = []
+        seen = set()
+        for symbol in self.favorites + self.recents:
+            if len(results) >= k:
+                return results
+            if symbol not in seen and symbol in self._known and symbol.upper().startswith(prefix):
+                results.append(symbol)
+                seen.add(symbol)
+        for rank in node.ranks:
+            if len(results) >= k:
+                break
+            symbol = self.symbols[rank]
+            if symbol not in seen:
+                results.append(symbol)
+        return results
+
+    def resolve(self, query: str) -> Optional[str]:
+        """入力文字列を通貨名に解決（完全一致を優先し、なければ検索結果の先頭）"""
+        text = query.strip()
+        for symbol in (text, text.upper()):
+            if symbol in self._known:
+                return symbol
+        matches = self.search(text, 1)
+        return matches[0] if matches else None
+
+    def is_favorite(self, symbol: str) -> bool:
+        return symbol in self.favorites
+
+    def toggle_favorite(self, symbol: str) -> bool:
+        """お気に入りを切り替え（戻り値: 切り替え後にお気に入りかどうか）"""
+        if symbol in self.favorites:
+            self.favorites.remove(symbol)
+        else:
+            self.favorites.append(symbol)
+        self.save()
+        return symbol in self.favorites
+
+    def add_recent(self, symbol: str):
+        """最近使った通貨の先頭に追加"""
+        if self.recents and self.recents[0] == symbol:
+            return
+        if symbol in self.recents:
+            self.recents.remove(symbol)
+        self.recents.insert(0, symbol)
+        del self.recents[self.max_recents:]
+        self.save()
+
+    def load(self):
+        """保存済みのお気に入り・最近使った通貨を読み込む"""
+        if not self.storage_path or not os.path.exists(self.storage_path):
+            return
+        try:
+            with open(self.storage_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[SYMBOL] 通貨ペア設定の読み込みに失敗しました: {e}")
+            return
+        self.favorites = [s for s in data.get('favorites', []) if isinstance(s, str)]
+        self.recents = [s for s in data.get('recents', []) if isinstance(s, str)][:self.max_recents]
+
+    def save(self):
+        if not self.storage_path:
+            return
+        data = {'favorites': self.favorites, 'recents': self.recents}
+        tmp_path = f"{self.storage_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.storage_path)  # 書き込み途中で落ちても壊れないように
+        except OSError as e:
+            print(f"[SYMBOL] 通貨ペア設定の保存に失敗しました: {e}")
+
+
+class SymbolPicker:
+    """インクリメンタル検索の通貨ペア選択
+
+    入力欄の下に候補をk行だけ表示し（行ウィジェットは使い回す）、
+    ↑↓で選択・Enterで確定・Escで取り消します。★で現在の通貨をお気に入りに切り替えます。
+    """
+
+    FAVORITE_ON = "★"
+    FAVORITE_OFF = "☆"
+
+    def __init__(self, parent, index: SymbolIndex, on_select: Optional[Callable[[str], None]] = None,
+                 max_results: int = 10, width: int = 150):
+        self.index = index
+        self.on_select = on_select
+        self.max_results = max_results
+        self.current: Optional[str] = None
+        self._results: List[str] = []
+        self._highlight = 0
+        self._open = False
+        self._font = ctk.CTkFont(size=12)
+
+        self.frame = ctk.CTkFrame(parent, fg_color="transparent")
+        self.entry = ctk.CTkEntry(self.frame, width=width, font=ctk.CTkFont(size=14, weight="bold"),
+                                  placeholder_text="銘柄を検索")
+        self.entry.pack(side="left")
+        self.favorite_button = ctk.CTkButton(self.frame, text=self.FAVORITE_OFF, width=28,
+                                             fg_color="transparent", command=self._on_favorite_clicked)
+        self.favorite_button.pack(side="left", padx=(3, 0))
+
+        # 候補リスト（トップレベルウィンドウ上に重ねて表示）
+        self.popup = ctk.CTkFrame(parent.winfo_toplevel(), corner_radius=4, border_width=1)
+        self._rows: List[ctk.CTkButton] = []
+        self._row_state: List[tuple] = []
+        for i in range(max_results):
+            row = ctk.CTkButton(self.popup, text="", width=width, height=22, anchor="w",
+                                font=self._font, fg_color="transparent",
+                                command=lambda i=i: self._choose(i))
+            self._rows.append(row)
+            self._row_state.append(None)
+
+        self.entry.bind("<KeyRelease>", self._on_key)
+        self.entry.bind("<Return>", lambda e: self._choose(self._highlight))
+        self.entry.bind("<Escape>", lambda e: self._cancel())
+        self.entry.bind("<Down>", lambda e: self._move(1))
+        self.entry.bind("<Up>", lambda e: self._move(-1))
+        self.entry.bind("<FocusIn>", lambda e: self._on_focus_in())
+        # 候補のクリックより先に閉じないよう少し遅らせる
+        self.entry.bind("<FocusOut>", lambda e: self.entry.after(150, self._close))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def set(self, symbol: str):
+        """表示中の通貨を設定（コールバックは呼ばない）"""
+        self.current = symbol
+        self.entry.delete(0, "end")
+        self.entry.insert(0, symbol)
+        self.favorite_button.configure(
+            text=self.FAVORITE_ON if self.index.is_favorite(symbol) else self.FAVORITE_OFF)
+
+    def _on_focus_in(self):
+        self.entry.select_range(0, "end")
+        self._refresh("")
+
+    def _on_key(self, event):
+        if event.keysym in ("Return", "Escape", "Up", "Down"):
+            return
+        self._refresh(self.entry.get())
+
+    def _refresh(self, query: str):
+        self._results = self.index.search(query, self.max_results)
+        self._highlight = 0
+        self._paint()
+
+    def _paint(self):
+        if not self._results:
+            self._close()
+            return
+        for i, row in enumerate(self._rows):
+            if i < len(self._results):
+                symbol = self._results[i]
+                mark = self.FAVORITE_ON if self.index.is_favorite(symbol) else ""
+                state = (symbol, mark, i == self._highlight)
+                if state != self._row_state[i]:
+                    row.configure(text=f"{symbol} {mark}",
+                                  fg_color=("gray75", "gray30") if i == self._highlight else "transparent")
+                    if self._row_state[i] is None:
+                        row.pack(fill="x", padx=2, pady=1)
+                    self._row_state[i] = state
+            elif self._row_state[i] is not None:
+                row.pack_forget()
+                self._row_state[i] = None
+        if not self._open:
+            self.popup.place(in_=self.entry, relx=0, rely=1.0, y=2)
+            self.popup.lift()
+            self._open = True
+
+    def _close(self):
+        if self._open:
+            self.popup.place_forget()
+            self._open = False
+
+    def _move(self, step: int):
+        if not self._results:
+            return
+        self._highlight = (self._highlight + step) % len(self._results)
+        self._paint()
+
+    def _cancel(self):
+        self._close()
+        if self.current:
+            self.set(self.current)
+
+    def _choose(self, i: int):
+        symbol = self._results[i] if 0 <= i < len(self._results) else self.index.resolve(self.entry.get())
+        self._close()
+        if not symbol:
+            self._cancel()
+            return
+        changed = symbol != self.current
+        self.set(symbol)
+        self.entry.master.focus_set()
+        if changed and self.on_select:
+            self.on_select(symbol)
+
+    def _on_favorite_clicked(self):
+        if self.current:
+            self.index.toggle_favorite(self.current)
+            self.set(self.current)
+            if self._open:
+                self._paint()
@@ -0,0 +1,287 @@
+"""
+ウォッチリストモジュール
+購読中の全通貨の価格・24時間変化率・スプレッド・出来高を一覧表示します。
+表示中の行数分だけウィジェットを持ち、スクロール時は中身を差し替える仮想化リストです
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import customtkinter as ctk
+
+
+class WatchlistModel:
+    """ウォッチリストのデータ（スレッドセーフ）
+
+    - 価格・BBOは受信スレッドから更新し、変わった通貨をdirtyとして記録
+    - ソート用のキー（変化率・スプレッド等）は値の更新時に計算しておく
+    - 並び順はソート列・フィルター変更時と、resort_interval秒ごとにだけ作り直す
+    """
+
+    SORT_COLUMNS = ('coin', 'mid', 'change', 'spread', 'volume')
+
+    def __init__(self, coins: List[str], asset_ctxs: Optional[Dict[str, Dict]] = None,
+                 resort_interval: float = 1.0):
+        """
+        Args:
+            coins: 表示対象の通貨（出来高順など）
+            asset_ctxs: 通貨 -> {'prev_day_px', 'day_volume'}（get_symbols_by_volume取得時の値）
+            resort_interval: 値による並び替えの最小間隔（秒）。行が頻繁に入れ替わらないようにする
+        """
+        self._lock = threading.Lock()
+        self.coins = list(coins)
+        self.resort_interval = resort_interval
+        asset_ctxs = asset_ctxs or {}
+        self._prev_day_px = {c: asset_ctxs.get(c, {}).get('prev_day_px') for c in self.coins}
+        # ソートキー（列 -> 通貨 -> 値）。未取得はソート時に末尾へ回す
+        self._keys: Dict[str, Dict[str, float]] = {
+            'mid': {},
+            'change': {},
+            'spread': {},
+            'volume': {c: asset_ctxs.get(c, {}).get('day_volume', 0.0) for c in self.coins},
+        }
+        self._dirty = set(self.coins)
+        self.sort_column = 'volume'
+        self.sort_descending = True
+        self.filter_text = ''
+        self._view: List[str] = []
+        self._view_valid = False
+        self._last_sort = 0.0
+
+    def update_mids(self, mids: Dict[str, str]):
+        """allMidsの価格を反映"""
+        with self._lock:
+            mid_keys = self._keys['mid']
+            for coin in self.coins:
+                raw = mids.get(coin)
+                if raw is None:
+                    continue
+                mid = float(raw)
+                if mid_keys.get(coin) == mid:
+                    continue
+                mid_keys[coin] = mid
+                prev = self._prev_day_px.get(coin)
+                if prev:
+                    self._keys['change'][coin] = (mid / prev - 1.0) * 100.0
+                self._dirty.add(coin)
+
+    def update_bbo(self, coin: str, bid: float, ask: float):
+        """最良気配を反映（スプレッドはbps）"""
+        with self._lock:
+            if coin not in self._prev_day_px:
+                return
+            mid = (bid + ask) / 2.0
+            spread = (ask - bid) / mid * 10000.0 if mid > 0 else None
+            if spread is not None and self._keys['spread'].get(coin) != spread:
+                self._keys['spread'][coin] = spread
+                self._dirty.add(coin)
+
+    def set_sort(self, column: str):
+        """ソート列を設定（同じ列なら昇順/降順を切り替え）"""
+        with self._lock:
+            if column == self.sort_column:
+                self.sort_descending = not self.sort_descending
+            else:
+                self.sort_column = column
+                self.sort_descending = column != 'coin'
+            self._view_valid = False
+
+    def set_filter(self, text: str):
+        """通貨名の部分一致フィルターを設定"""
+        with self._lock:
+            self.filter_text = text.strip().upper()
+            self._view_valid = False
+
+    def view(self) -> List[str]:
+        """現在の並び順（フィルター適用後）"""
+        with self._lock:
+            now = time.monotonic()
+            resort_due = self.sort_column != 'coin' and now - self._last_sort >= self.resort_interval
+            if not self._view_valid or resort_due:
+                self._view = self._build_view()
+                self._view_valid = True
+                self._last_sort = now
+            return self._view
+
+    def row(self, coin: str) -> Dict:
+        """1行分の値"""
+        with self._lock:
+            return {
+                'coin': coin,
+                'mid': self._keys['mid'].get(coin),
+                'change': self._keys['change'].get(coin),
+                'spread': self._keys['spread'].get(coin),
+                'volume': self._keys['volume'].get(coin),
+            }
+
+    def take_dirty(self) -> set:
+        """前回から値が変わった通貨を取り出す"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            return dirty
+
+    def _build_view(self) -> List[str]:
+        coins = [c for c in self.coins if self.filter_text in c] if self.filter_text else list(self.coins)
+        if self.sort_column == 'coin':
+            coins.sort(reverse=self.sort_descending)
+            return coins
+        keys = self._keys[self.sort_column]
+        present = [c for c in coins if keys.get(c) is not None]
+        missing = [c for c in coins if keys.get(c) is None]
+        present.sort(key=keys.__getitem__, reverse=self.sort_descending)
+        return present + missing
+
+
+class WatchlistPanel:
+    """仮想化ウォッチリストパネル
+
+    表示行数分のラベルだけを作成し、スクロール位置に応じて通貨を割り当てます。
+    描画時は「割り当てが変わった行」か「値が変わった通貨の行」だけを更新します。
+    """
+
+    COLUMNS = (
+        ('coin', "銘柄", 70),
+        ('mid', "価格", 90),
+        ('change', "24h%", 60),
+        ('spread', "Spread", 60),
+        ('volume', "出来高", 70),
+    )
+
+    def __init__(self, parent, model: WatchlistModel, on_select: Optional[Callable[[str], None]] = None,
+                 visible_rows: int = 20):
+        self.model = model
+        self.on_select = on_select
+        self.visible_rows = visible_rows
+        self.offset = 0
+        self._fonts = {'row': ctk.CTkFont(size=11), 'bold': ctk.CTkFont(size=11, weight="bold")}
+        self._slots: List[Dict] = []  # 行ごとの {'coin', 'labels', 'values'}
+
+        self.frame = ctk.CTkFrame(parent)
+
+        title = ctk.CTkLabel(self.frame, text="👀 ウォッチリスト", font=ctk.CTkFont(size=12, weight="bold"))
+        title.pack(pady=3)
+
+        self.filter_entry = ctk.CTkEntry(self.frame, width=150, placeholder_text="銘柄で絞り込み")
+        self.filter_entry.pack(pady=3)
+        self.filter_entry.bind("<KeyRelease>", lambda e: self._on_filter_changed())
+
+        header = ctk.CTkFrame(self.frame, fg_color="transparent")
+        header.pack(fill="x", padx=3)
+        for key, text, width in self.COLUMNS:
+            ctk.CTkButton(
+                header,
+                text=text,
+                width=width,
+                height=22,
+                font=self._fonts['bold'],
+                fg_color="transparent",
+                command=lambda k=key: self._on_sort(k)
+            ).pack(side="left")
+
+        body = ctk.CTkFrame(self.frame, fg_color="transparent")
+        body.pack(fill="both", expand=True, padx=3, pady=3)
+        rows_frame = ctk.CTkFrame(body, fg_color="transparent")
+        rows_frame.pack(side="left", fill="both", expand=True)
+        self.scrollbar = ctk.CTkScrollbar(body, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+
+        for i in range(visible_rows):
+            row_frame = ctk.CTkFrame(rows_frame, fg_color="transparent", height=20)
+            row_frame.pack(fill="x")
+            labels = {}
+            for key, _, width in self.COLUMNS:
+                label = ctk.CTkLabel(row_frame, text="", width=width, height=20,
+                                     font=self._fonts['bold' if key == 'coin' else 'row'], anchor="e")
+                label.pack(side="left")
+                label.bind("<Button-1>", lambda e, slot=i: self._on_click(slot))
+                label.bind("<MouseWheel>", self._on_mousewheel)
+                label.bind("<Button-4>", lambda e: self._scroll(-3))
+                label.bind("<Button-5>", lambda e: self._scroll(3))
+                labels[key] = label
+            self._slots.append({'coin': None, 'labels': labels, 'values': {}})
+
+    def paint(self):
+        """表示中の行だけを差分更新（価格更新のフレームごとに呼ぶ）"""
+        view = self.model.view()
+        dirty = self.model.take_dirty()
+        max_offset = max(0, len(view) - self.visible_rows)
+        self.offset = min(self.offset, max_offset)
+
+        for i, slot in enumerate(self._slots):
+            index = self.offset + i
+            coin = view[index] if index < len(view) else None
+            if coin == slot['coin'] and coin not in dirty:
+                continue
+            slot['coin'] = coin
+            self._apply(slot, self._format(self.model.row(coin)) if coin else self._blank())
+
+        if view:
+            first = self.offset / len(view)
+            self.scrollbar.set(first, min(1.0, (self.offset + self.visible_rows) / len(view)))
+
+    def _apply(self, slot: Dict, values: Dict[str, Dict]):
+        for key, options in values.items():
+            if slot['values'].get(key) != options:
+                slot['labels'][key].configure(**options)
+                slot['values'][key] = options
+
+    @staticmethod
+    def _blank() -> Dict[str, Dict]:
+        return {key: {'text': ""} for key, _, _ in WatchlistPanel.COLUMNS}
+
+    @staticmethod
+    def _format(row: Dict) -> Dict[str, Dict]:
+        mid, change, spread, volume = row['mid'], row['change'], row['spread'], row['volume']
+        if change is None:
+            change_options = {'text': "--", 'text_color': "gray"}
+        else:
+            change_options = {'text': f"{change:+.2f}%",
+                              'text_color': "#44FF44" if change > 0 else ("#FF4444" if change < 0 else "gray")}
+        if volume is None:
+            volume_text = "--"
+        elif volume >= 1e9:
+            volume_text = f"{volume / 1e9:.1f}B"
+        elif volume >= 1e6:
+            volume_text = f"{volume / 1e6:.1f}M"
+        else:
+            volume_text = f"{volume / 1e3:.0f}K"
+        return {
+            'coin': {'text': row['coin']},
+            'mid': {'text': "--" if mid is None else f"{mid:,.{2 if mid >= 100 else 4}f}"},
+            'change': change_options,
+            'spread': {'text': "--" if spread is None else f"{spread:.1f}bp"},
+            'volume': {'text': volume_text},
+        }
+
+    def _on_click(self, slot_index: int):
+        coin = self._slots[slot_index]['coin']
+        if coin and self.on_select:
+            self.on_select(coin)
+
+    def _on_sort(self, column: str):
+        self.model.set_sort(column)
+        self.offset = 0
+        self.paint()
+
+    def _on_filter_changed(self):
+        self.model.set_filter(self.filter_entry.get())
+        self.offset = 0
+        self.paint()
+
+    def _on_mousewheel(self, event):
+        self._scroll(-3 if event.delta > 0 else 3)
+
+    def _scroll(self, rows: int):
+        self.offset = max(0, self.offset + rows)
+        self.paint()
+
+    def _on_scrollbar(self, *args):
+        view = self.model.view()
+        if not view:
+            return
+        if args[0] == 'moveto':
+            self.offset = int(float(args[1]) * len(view))
+        elif args[0] == 'scroll':
+            step = int(args[1]) * (self.visible_rows if args[2] == 'pages' else 1)
+            self.offset = max(0, self.offset + step)
+        self.paint()
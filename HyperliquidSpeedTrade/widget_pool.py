@@ -0,0 +1,132 @@
+"""
+ウィジェットプールモジュール
+一覧表示の行ウィジェットをキー（通貨・注文ID）ごとに再利用し、
+値が変わったラベルだけを更新する差分レンダラーを提供します
+"""
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+
+class PooledRow:
+    """再利用される1行分のウィジェット"""
+
+    def __init__(self, frame, widgets: Dict[str, Any]):
+        self.frame = frame
+        self.widgets = widgets  # 名前 -> ウィジェット
+        self.key: Optional[Hashable] = None
+        self.data: Any = None  # 現在表示中の項目（ボタンのコマンドから参照）
+        self.values: Dict[str, Dict[str, Any]] = {}  # 前回configureした値
+
+
+class KeyedRowRenderer:
+    """キー付き行差分レンダラー
+
+    - 既存キーの行はウィジェットを作り直さず、値が変わった項目だけconfigureする
+    - 行の追加・削除はキー集合が変わった時だけ。削除した行は非表示にしてプールし、次の追加で再利用する
+    - 並び順が変わった時だけpackし直す
+
+    更新コストは一覧の件数ではなく、変化した件数に比例します。
+    """
+
+    def __init__(self, parent, build_row: Callable[[Any, PooledRow], None],
+                 row_values: Callable[[Any], Dict[str, Dict[str, Any]]],
+                 key_fn: Callable[[Any], Hashable],
+                 create_frame: Callable[[Any], Any],
+                 create_empty: Optional[Callable[[Any], Any]] = None,
+                 pack_options: Optional[Dict[str, Any]] = None,
+                 empty_pack_options: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            parent: 行を配置する親ウィジェット
+            build_row: 行のウィジェットを作成しrow.widgetsに登録する関数（row.dataはコマンドから参照）
+            row_values: 項目から {ウィジェット名: configure引数} を返す関数
+            key_fn: 項目から行キーを返す関数
+            create_frame: 行フレームを作成する関数
+            create_empty: 0件時に表示するウィジェットを作成する関数
+            pack_options: 行フレームのpack引数
+            empty_pack_options: 0件表示のpack引数
+        """
+        self.parent = parent
+        self.build_row = build_row
+        self.row_values = row_values
+        self.key_fn = key_fn
+        self.create_frame = create_frame
+        self.create_empty = create_empty
+        self.pack_options = pack_options or {}
+        self.empty_pack_options = empty_pack_options or {}
+        self._rows: Dict[Hashable, PooledRow] = {}
+        self._order: List[Hashable] = []
+        self._free: List[PooledRow] = []
+        self._empty_widget = None
+        self._empty_visible = False
+        self.configure_count = 0  # 直近のrender()で実行したconfigure数（計測用）
+
+    def render(self, items: Iterable[Any]):
+        """一覧を差分更新"""
+        items = list(items)
+        self.configure_count = 0
+        new_order = [self.key_fn(item) for item in items]
+        new_keys = set(new_order)
+
+        # 消えた行はプールへ戻す
+        for key in [k for k in self._rows if k not in new_keys]:
+            row = self._rows.pop(key)
+            row.frame.pack_forget()
+            row.key = None
+            row.data = None
+            self._free.append(row)
+
+        repack = new_order != self._order
+        for key, item in zip(new_order, items):
+            row = self._rows.get(key)
+            if row is None:
+                row = self._acquire()
+                row.key = key
+                self._rows[key] = row
+            row.data = item
+            self._apply(row, self.row_values(item))
+
+        if repack:
+            # 並び順・メンバーが変わった時だけ配置し直す
+            for key in self._order:
+                if key in self._rows:
+                    self._rows[key].frame.pack_forget()
+            for key in new_order:
+                self._rows[key].frame.pack(**self.pack_options)
+            self._order = new_order
+
+        self._show_empty(not items)
+
+    def clear(self):
+        """全行を破棄（プールも含む）"""
+        for row in list(self._rows.values()) + self._free:
+            row.frame.destroy()
+        self._rows.clear()
+        self._free.clear()
+        self._order = []
+
+    def _acquire(self) -> PooledRow:
+        if self._free:
+            return self._free.pop()
+        row = PooledRow(self.create_frame(self.parent), {})
+        self.build_row(row.frame, row)
+        return row
+
+    def _apply(self, row: PooledRow, values: Dict[str, Dict[str, Any]]):
+        for name, options in values.items():
+            previous = row.values.get(name, {})
+            changed = {k: v for k, v in options.items() if previous.get(k) != v}
+            if changed:
+                row.widgets[name].configure(**changed)
+                self.configure_count += 1
+                row.values[name] = {**previous, **changed}
+
+    def _show_empty(self, visible: bool):
+        if not self.create_empty or visible == self._empty_visible:
+            return
+        if visible:
+            if self._empty_widget is None:
+                self._empty_widget = self.create_empty(self.parent)
+            self._empty_widget.pack(**self.empty_pack_options)
+        elif self._empty_widget is not None:
+            self._empty_widget.pack_forget()
+        self._empty_visible = visible